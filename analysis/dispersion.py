@@ -0,0 +1,442 @@
+"""
+Dispersion Statistics
+
+How evenly each word is spread over the corpus, computed for the whole
+vocabulary at once with the documents as corpus parts:
+- range: number of documents containing the word
+- Juilland's D: 1 - CV / sqrt(n - 1), with CV the coefficient of variation
+  of the word's relative frequency in the n documents (1: perfectly even,
+  0: one document only)
+- Gries' DP: 0.5 * sum_i |v_i / f - s_i|, the difference between the
+  word's share v_i / f of occurrences and the document's share s_i of the
+  corpus (0: even, towards 1: concentrated); DP_norm divides by
+  1 - min(s_i) so that 1 is reachable (Lijffijt & Gries 2012)
+- ARF: average reduced frequency (Savický & Hlaváčová 2002), the frequency
+  discounted for occurrences clustered together in running text:
+  sum_i min(d_i, N / f) / (N / f) over the distances d_i between
+  consecutive occurrences (cyclically)
+
+Words are tokens without punctuation, in token_id order.
+
+One pass over the tokens table reads every word token into two integer
+arrays: its type and its document. A sort of (type, document) keys gives
+the type x document count matrix in sparse coordinate form, and a stable
+sort by type gives every type's positions for ARF; all measures are numpy
+reductions over these arrays, without a loop over the vocabulary.
+
+The measures are sums over documents and over distances between
+occurrences, so a corpus split into slices holding whole documents (the
+shards of a sharded corpus) is measured exactly from per-slice sums
+(partial_measures) and the slices' first and last positions of every type
+(combine_measures).
+
+The results are stored in the dispersion table per word type ('norm',
+'lemma' or 'form') and looked up from there; they become stale when
+documents are added, replaced or deleted, and the next lookup recomputes
+them (or ingestion, with DISPERSION_AFTER_INGESTION).
+"""
+
+import time
+import logging
+from array import array
+from typing import List, Dict, Any, Optional, Iterable, Iterator
+
+import numpy as np
+
+from database.schema import DISPERSION_TABLES_SQL
+from query.subcorpus import corpus_state
+
+logger = logging.getLogger(__name__)
+
+WORD_TYPES = ('norm', 'lemma', 'form')
+
+# Stored measures (dispersion table columns) and their result names
+MEASURES = {'doc_range': 'range', 'juilland_d': 'juilland_d', 'dp': 'dp', 'dp_norm': 'dp_norm', 'arf': 'arf'}
+
+# Tokens fetched per batch
+FETCH_SIZE = 100_000
+
+# Words looked up per statement
+LOOKUP_BATCH_SIZE = 500
+
+
+def dispersion_measures(type_ids: np.ndarray, doc_ids: np.ndarray, n_types: int) -> Dict[str, np.ndarray]:
+    """
+    Dispersion measures of every type
+
+    Args:
+        type_ids: Type (0 .. n_types - 1) of every word token in corpus
+                  order; -1 for tokens that count towards the corpus size but
+                  have no type (e.g. a missing lemma)
+        doc_ids: Document of every word token
+        n_types: Number of types
+
+    Returns:
+        Arrays indexed by type: frequency, range, juilland_d, dp, dp_norm,
+        arf (juilland_d and dp_norm are NaN for a single document)
+    """
+    type_ids = np.asarray(type_ids, dtype=np.int64)
+    frequency = np.bincount(type_ids[type_ids >= 0], minlength=n_types)
+    return combine_measures([partial_measures(type_ids, doc_ids, frequency, len(type_ids))],
+                            frequency, len(type_ids))
+
+
+def partial_measures(type_ids: np.ndarray, doc_ids: np.ndarray, frequency: np.ndarray,
+                     total: int) -> Dict[str, Any]:
+    """
+    Additive parts of the measures over one slice of the corpus (a shard)
+
+    Every document must lie within one slice. DP and ARF need the
+    corpus-wide frequency of every type and the corpus size (total).
+
+    Returns:
+        Arrays indexed by type: range, relative and relative_square (sums of
+        the type's relative frequency in the documents and of its square),
+        deviation (sum of |v_i / f - s_i|), covered (sum of the shares of the
+        documents containing the type), reduced (sum of min(d_i, N / f) over
+        the distances between occurrences within the slice), first and last
+        (positions in the slice, -1 if absent); and the slice's number of
+        documents (parts), words in its smallest document (smallest) and
+        words (size)
+    """
+    type_ids = np.asarray(type_ids, dtype=np.int64)
+    frequency = np.asarray(frequency)
+    n_types = len(frequency)
+    size = len(type_ids)
+    _, parts = np.unique(np.asarray(doc_ids), return_inverse=True)
+    n_parts = int(parts.max()) + 1 if size else 0
+    part_sizes = np.bincount(parts, minlength=n_parts).astype(np.float64)
+    shares = part_sizes / total if total else part_sizes
+
+    typed = type_ids >= 0
+    types = type_ids[typed]
+    positions = np.flatnonzero(typed)
+    local_frequency = np.bincount(types, minlength=n_types)
+
+    # Sparse type x document counts: one entry per (type, document) pair
+    keys = np.sort(types * n_parts + parts[typed])
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, np.int64)
+    counts = np.diff(np.r_[starts, len(keys)]).astype(np.float64)
+    rows = keys[starts] // max(n_parts, 1)
+    cols = keys[starts] % max(n_parts, 1)
+    result = {'range': np.bincount(rows, minlength=n_types), 'parts': n_parts,
+              'smallest': float(part_sizes.min()) if n_parts else 0.0, 'size': size}
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = counts / part_sizes[cols]
+        result['relative'] = np.bincount(rows, weights=relative, minlength=n_types)
+        result['relative_square'] = np.bincount(rows, weights=relative * relative, minlength=n_types)
+        result['deviation'] = np.bincount(rows, weights=np.abs(counts / frequency[rows] - shares[cols]),
+                                          minlength=n_types)
+        result['covered'] = np.bincount(rows, weights=shares[cols], minlength=n_types)
+
+    # ARF: positions of each type in slice order
+    order = np.argsort(types, kind='stable')
+    sorted_types = types[order]
+    sorted_positions = positions[order]
+    distances = np.empty(len(order), dtype=np.float64)
+    distances[1:] = np.diff(sorted_positions)
+    first = np.cumsum(local_frequency) - local_frequency
+    present = local_frequency > 0
+    first, last = first[present], (first + local_frequency - 1)[present]
+    # The distance to a first occurrence crosses the slice start (combine_measures)
+    distances[first] = 0.0
+    segment = total / frequency[sorted_types]
+    result['reduced'] = np.bincount(sorted_types, weights=np.minimum(distances, segment), minlength=n_types)
+    result['first'] = np.full(n_types, -1, dtype=np.int64)
+    result['first'][present] = sorted_positions[first]
+    result['last'] = np.full(n_types, -1, dtype=np.int64)
+    result['last'][present] = sorted_positions[last]
+    return result
+
+
+def combine_measures(partials: List[Dict[str, Any]], frequency: np.ndarray, total: int) -> Dict[str, np.ndarray]:
+    """
+    Dispersion measures of every type from the partial_measures of the
+    slices of the corpus, in corpus order
+
+    Returns:
+        The arrays of dispersion_measures
+    """
+    frequency = np.asarray(frequency)
+    n_types = len(frequency)
+    n_parts = sum(partial['parts'] for partial in partials)
+
+    def summed(name: str) -> np.ndarray:
+        return np.sum([partial[name] for partial in partials], axis=0, dtype=np.float64) \
+            if partials else np.zeros(n_types)
+
+    result = {'frequency': frequency, 'range': summed('range').astype(np.int64)}
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Juilland's D over relative frequencies (documents without the word add 0)
+        mean = summed('relative') / n_parts
+        mean_square = summed('relative_square') / n_parts
+        deviation = np.sqrt(np.maximum(mean_square - mean * mean, 0.0))
+        if n_parts > 1:
+            result['juilland_d'] = np.clip(1.0 - deviation / mean / np.sqrt(n_parts - 1), 0.0, 1.0)
+        else:
+            result['juilland_d'] = np.full(n_types, np.nan)
+
+        # DP: documents without the word contribute their whole share
+        dp = 0.5 * (summed('deviation') + 1.0 - summed('covered'))
+        result['dp'] = np.clip(dp, 0.0, 1.0)
+        smallest = min(partial['smallest'] for partial in partials if partial['parts']) / total \
+            if n_parts else 1.0
+        result['dp_norm'] = np.clip(dp / (1.0 - smallest), 0.0, 1.0) if n_parts > 1 else np.full(n_types, np.nan)
+
+        # ARF: distances within the slices, then across slice boundaries, and
+        # the first occurrence's distance wrapping around from the last one
+        segment = total / frequency
+        reduced = summed('reduced')
+        first = np.full(n_types, -1, dtype=np.int64)
+        last = np.full(n_types, -1, dtype=np.int64)
+        offset = 0
+        for partial in partials:
+            present = partial['first'] >= 0
+            crossing = present & (last >= 0)
+            reduced[crossing] += np.minimum(offset + partial['first'][crossing] - last[crossing],
+                                            segment[crossing])
+            new = present & (first < 0)
+            first[new] = offset + partial['first'][new]
+            last[present] = offset + partial['last'][present]
+            offset += partial['size']
+        seen = first >= 0
+        reduced[seen] += np.minimum(first[seen] + total - last[seen], segment[seen])
+        result['arf'] = reduced * frequency / total if total else np.zeros(n_types)
+
+    return result
+
+
+def measure_entries(words: List[str], measures: Dict[str, np.ndarray]) -> Iterator[Dict[str, Any]]:
+    """Result dicts of the words' measures (NaN as None), as lookups return them"""
+    def value(name: str, i: int) -> Optional[float]:
+        number = float(measures[name][i])
+        return None if np.isnan(number) else number
+
+    for i, word in enumerate(words):
+        yield {'word': word, 'frequency': int(measures['frequency'][i]), 'range': int(measures['range'][i]),
+               'juilland_d': value('juilland_d', i), 'dp': value('dp', i),
+               'dp_norm': value('dp_norm', i), 'arf': value('arf', i)}
+
+
+def rank_entries(entries: Iterable[Dict[str, Any]], measure: str = 'dp', min_freq: int = 1,
+                 limit: int = 100, descending: bool = False) -> List[Dict[str, Any]]:
+    """In-memory DispersionAnalyzer.ranked over measure_entries"""
+    check_measure(measure)
+    selected = [entry for entry in entries if entry['frequency'] >= min_freq and entry[measure] is not None]
+    # Ties: most frequent first, then by word
+    selected.sort(key=lambda entry: (-entry['frequency'], entry['word']))
+    selected.sort(key=lambda entry: entry[measure], reverse=descending)
+    return selected if limit < 0 else selected[:limit]
+
+
+def check_measure(measure: str) -> str:
+    """Dispersion table column of a measure name; ValueError if unknown"""
+    columns = {name: column for column, name in MEASURES.items()}
+    columns['frequency'] = 'frequency'
+    if measure not in columns:
+        raise ValueError(f"Unknown dispersion measure: {measure}")
+    return columns[measure]
+
+
+class DispersionAnalyzer:
+    """Computes, stores and looks up the dispersion measures of one database"""
+
+    def __init__(self, connection):
+        self.conn = connection
+
+    def ensure_tables(self) -> None:
+        """Create the dispersion tables of databases made before they existed"""
+        cursor = self.conn.cursor()
+        for sql in DISPERSION_TABLES_SQL:
+            cursor.execute(sql)
+
+    def _has_tables(self) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'dispersion_runs'")
+        return cursor.fetchone() is not None
+
+    @staticmethod
+    def _check_word_type(word_type: str) -> None:
+        if word_type not in WORD_TYPES:
+            raise ValueError(f"Invalid word_type: {word_type}")
+
+    # --- Computation -----------------------------------------------------------
+
+    def word_tokens(self, word_type: str = 'norm', vocabulary: Optional[Dict[str, int]] = None) -> tuple:
+        """
+        Type and document of every word token, in one pass in corpus order
+
+        Args:
+            vocabulary: Type ids of the words; new words are added to it
+                        (a new dict if None)
+
+        Returns:
+            (vocabulary, type ids, doc ids), the ids as int64 arrays
+        """
+        self._check_word_type(word_type)
+        vocabulary = {} if vocabulary is None else vocabulary
+        type_ids = array('q')
+        doc_ids = array('q')
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT doc_id, {word_type} FROM tokens
+            WHERE is_punctuation = 0 ORDER BY token_id
+        """)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            doc_ids.extend(row[0] for row in rows)
+            type_ids.extend(vocabulary.setdefault(row[1], len(vocabulary)) if row[1] else -1
+                            for row in rows)
+        return vocabulary, np.frombuffer(type_ids, dtype=np.int64), np.frombuffer(doc_ids, dtype=np.int64)
+
+    def word_frequencies(self, word_type: str = 'norm') -> tuple:
+        """
+        Frequency of every word and the number of word tokens (including
+        those without a word of this type), counted in SQLite
+
+        Returns:
+            ({word: frequency}, word tokens)
+        """
+        self._check_word_type(word_type)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT {word_type}, COUNT(*) FROM tokens
+            WHERE is_punctuation = 0 GROUP BY {word_type}
+        """)
+        frequencies, total = {}, 0
+        for word, frequency in cursor.fetchall():
+            total += frequency
+            if word:
+                frequencies[word] = frequencies.get(word, 0) + frequency
+        return frequencies, total
+
+    def compute(self, word_type: str = 'norm') -> Dict[str, Any]:
+        """
+        Compute and store the measures of every word of the corpus
+
+        Holds two int64 arrays per word token and their sorts while computing:
+        about 120 bytes per word token at the peak (some 1.2 GB for 10
+        million words), plus the vocabulary.
+
+        Returns:
+            The run record (see status)
+        """
+        self._check_word_type(word_type)
+        start = time.perf_counter()
+        state = corpus_state(self.conn)
+
+        vocabulary, type_ids, doc_ids = self.word_tokens(word_type)
+        words = list(vocabulary)
+        measures = dispersion_measures(type_ids, doc_ids, len(words))
+        n_docs = len(np.unique(doc_ids))
+
+        self.ensure_tables()
+        cursor = self.conn.cursor()
+        cursor.execute("DELETE FROM dispersion WHERE word_type = ?", (word_type,))
+        cursor.executemany("""
+            INSERT INTO dispersion (word_type, word, frequency, doc_range, juilland_d, dp, dp_norm, arf)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """, ((word_type, entry['word'], entry['frequency'], entry['range'], entry['juilland_d'],
+               entry['dp'], entry['dp_norm'], entry['arf'])
+              for entry in measure_entries(words, measures)))
+        cursor.execute("""
+            INSERT OR REPLACE INTO dispersion_runs
+                (word_type, doc_count, token_count, type_count, corpus_state, computed_at)
+            VALUES (?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, (word_type, n_docs, len(doc_ids), len(words), state))
+        self.conn.commit()
+        logger.info(f"Dispersion ({word_type}): {len(words)} types over {n_docs} documents, "
+                    f"{len(doc_ids)} tokens in {time.perf_counter() - start:.2f}s")
+        return self.status(word_type)
+
+    def refresh(self, word_types: Iterable[str] = ('norm',)) -> int:
+        """
+        Compute the measures of the given word types, and of all word types
+        computed before, where missing or stale
+
+        Returns:
+            Number of word types computed
+        """
+        runs = {run['word_type']: run for run in self.runs()}
+        computed = 0
+        for word_type in sorted(set(word_types) | set(runs)):
+            run = runs.get(word_type)
+            if run is None or run['stale']:
+                self.compute(word_type)
+                computed += 1
+        return computed
+
+    # --- Lookup ----------------------------------------------------------------
+
+    def runs(self) -> List[Dict[str, Any]]:
+        """Records of all computed word types"""
+        if not self._has_tables():
+            return []
+        state = corpus_state(self.conn)
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT word_type, doc_count, token_count, type_count, corpus_state, computed_at
+            FROM dispersion_runs ORDER BY word_type
+        """)
+        return [{
+            'word_type': row[0],
+            'doc_count': row[1],
+            'token_count': row[2],
+            'type_count': row[3],
+            'computed_at': row[5],
+            'stale': row[4] != state,
+        } for row in cursor.fetchall()]
+
+    def status(self, word_type: str = 'norm') -> Optional[Dict[str, Any]]:
+        """Record of a computed word type: corpus size, time and whether it is stale (None if not computed)"""
+        return next((run for run in self.runs() if run['word_type'] == word_type), None)
+
+    def lookup(self, words: Iterable[str], word_type: str = 'norm') -> Dict[str, Dict[str, Any]]:
+        """Stored measures of words (words not in the corpus are left out)"""
+        self._check_word_type(word_type)
+        words = list(words)
+        results: Dict[str, Dict[str, Any]] = {}
+        if not words or not self._has_tables():
+            return results
+        cursor = self.conn.cursor()
+        for start in range(0, len(words), LOOKUP_BATCH_SIZE):
+            batch = words[start:start + LOOKUP_BATCH_SIZE]
+            cursor.execute(f"""
+                SELECT word, frequency, {', '.join(MEASURES)} FROM dispersion
+                WHERE word_type = ? AND word IN ({','.join('?' * len(batch))})
+            """, [word_type, *batch])
+            for row in cursor.fetchall():
+                results[row[0]] = {'word': row[0], 'frequency': row[1],
+                                   **{name: row[i + 2] for i, name in enumerate(MEASURES.values())}}
+        return results
+
+    def get(self, word: str, word_type: str = 'norm') -> Optional[Dict[str, Any]]:
+        """Stored measures of one word (None if it is not in the corpus)"""
+        return self.lookup([word], word_type).get(word)
+
+    def ranked(self, measure: str = 'dp', word_type: str = 'norm', min_freq: int = 1,
+               limit: int = 100, descending: bool = False) -> List[Dict[str, Any]]:
+        """
+        Words ordered by a stored measure, e.g. the most evenly dispersed ones
+        (lowest DP) among words occurring at least min_freq times
+
+        Raises:
+            ValueError: unknown measure or word type
+        """
+        self._check_word_type(word_type)
+        column = check_measure(measure)
+        if not self._has_tables():
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT word, frequency, {', '.join(MEASURES)} FROM dispersion
+            WHERE word_type = ? AND frequency >= ? AND {column} IS NOT NULL
+            ORDER BY {column} {'DESC' if descending else 'ASC'}, frequency DESC, word
+            LIMIT ?
+        """, (word_type, min_freq, limit))
+        return [{'word': row[0], 'frequency': row[1],
+                 **{name: row[i + 2] for i, name in enumerate(MEASURES.values())}}
+                for row in cursor.fetchall()]
@@ -0,0 +1,465 @@
+"""
+Lexical Diversity and Readability
+
+Length-robust lexical diversity measures, replacing the plain type-token
+ratio (which falls as a text grows):
+- MATTR: moving-average TTR, the mean TTR of every window of W words
+  (Covington & McFall 2010); a text shorter than W is one window
+- MTLD: measure of textual lexical diversity (McCarthy & Jarvis 2010), the
+  mean length of the stretches of text whose TTR stays above a threshold
+  (0.72); a trailing partial stretch counts as a fraction of a factor.
+  Computed forwards only, so that it takes a single pass
+- HD-D: the expected TTR of a random sample of 42 words, from the
+  hypergeometric distribution: sum over types of P(type in sample) / 42
+- Yule's K: 10^4 * (sum_m m^2 V(m) - N) / N^2, with V(m) the number of
+  types occurring m times
+
+and Turkish readability indices from words per sentence (OKS) and syllables
+per word (OHS), a syllable being a vowel:
+- Ateşman (1997): 198.825 - 40.175 OHS - 2.610 OKS
+- Çetinkaya-Uzun (2010): 118.823 - 25.987 OHS - 0.971 OKS
+- Bezirci-Yılmaz (2010): sqrt(OKS * (0.84 H3 + 1.5 H4 + 3.5 H5 + 26.25 H6)),
+  with Hn the words of n (H6: six or more) syllables per sentence
+
+Words are tokens without punctuation, by norm. The accumulator takes the
+words of a document as they are ingested, in one pass: MATTR keeps the last
+W words, MTLD the types of the current stretch, and HD-D and Yule's K the
+document's frequency spectrum. Each document's results are stored in
+lexical_stats together with additive totals (window TTR sums, MTLD factors,
+word, sentence and syllable counts), and the corpus word frequencies in
+lexical_types are updated as documents are added or removed, so corpus-wide
+values come from sums over the stored rows and the frequency spectrum,
+without a pass over the tokens table.
+"""
+
+import math
+import logging
+from collections import Counter, deque
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+
+from database.schema import LEXICAL_STATS_TABLES_SQL
+from query.subcorpus import range_condition, range_scan
+
+try:
+    from config.config import MATTR_WINDOW, MTLD_THRESHOLD, HDD_SAMPLE_SIZE
+except ImportError:
+    MATTR_WINDOW = 50
+    MTLD_THRESHOLD = 0.72
+    HDD_SAMPLE_SIZE = 42
+
+logger = logging.getLogger(__name__)
+
+TURKISH_VOWELS = frozenset('aeıioöuüâîû')
+
+# lexical_stats columns that add up over documents
+TOTAL_COLUMNS = ('word_count', 'sentence_count', 'syllable_count', 'words_3_syllables',
+                 'words_4_syllables', 'words_5_syllables', 'words_6_syllables',
+                 'mattr_sum', 'mattr_windows', 'mtld_factors')
+
+# Stored per-document measures
+MEASURES = ('mattr', 'mtld', 'hdd', 'yules_k', 'atesman', 'cetinkaya_uzun', 'bezirci_yilmaz')
+
+# Tokens fetched per batch
+FETCH_SIZE = 100_000
+
+
+def count_syllables(word: str) -> int:
+    """Syllables of a Turkish word: its vowels (one for words without any, e.g. numbers)"""
+    return max(1, sum(map(TURKISH_VOWELS.__contains__, word)))
+
+
+def hdd(spectrum: Iterable[Tuple[int, int]], n_words: int, sample_size: int = HDD_SAMPLE_SIZE) -> Optional[float]:
+    """
+    HD-D from a frequency spectrum
+
+    Args:
+        spectrum: (frequency m, number of types occurring m times) pairs
+        n_words: Words in the text (None if fewer than sample_size)
+    """
+    if n_words < sample_size:
+        return None
+    log_total = math.lgamma(n_words + 1) - math.lgamma(n_words - sample_size + 1)
+    expected_types = 0.0
+    for frequency, types in spectrum:
+        rest = n_words - frequency
+        # P(no occurrence in the sample) = C(N - m, s) / C(N, s)
+        absent = 0.0 if rest < sample_size else \
+            math.exp(math.lgamma(rest + 1) - math.lgamma(rest - sample_size + 1) - log_total)
+        expected_types += types * (1.0 - absent)
+    return expected_types / sample_size
+
+
+def yules_k(spectrum: Iterable[Tuple[int, int]], n_words: int) -> Optional[float]:
+    """Yule's K from a frequency spectrum (see hdd)"""
+    if not n_words:
+        return None
+    squares = sum(frequency * frequency * types for frequency, types in spectrum)
+    return 1e4 * (squares - n_words) / (n_words * n_words)
+
+
+def lexical_measures(totals: Dict[str, float], spectrum: Iterable[Tuple[int, int]],
+                     sample_size: int = HDD_SAMPLE_SIZE) -> Dict[str, Any]:
+    """
+    All measures of a text from its totals (TOTAL_COLUMNS) and frequency spectrum
+
+    Documents, subcorpora and the corpus differ only in what the totals are
+    summed over.
+    """
+    spectrum = list(spectrum)
+    words, sentences = totals['word_count'], totals['sentence_count']
+    types = sum(n for _, n in spectrum)
+    results = {
+        'word_count': words,
+        'type_count': types,
+        'ttr': types / words if words else None,
+        'mattr': totals['mattr_sum'] / totals['mattr_windows'] if totals['mattr_windows'] else None,
+        'mtld': words / totals['mtld_factors'] if totals['mtld_factors'] else None,
+        'hdd': hdd(spectrum, words, sample_size),
+        'yules_k': yules_k(spectrum, words),
+        'atesman': None,
+        'cetinkaya_uzun': None,
+        'bezirci_yilmaz': None,
+    }
+    if words and sentences:
+        oks = words / sentences
+        ohs = totals['syllable_count'] / words
+        long_words = (0.84 * totals['words_3_syllables'] + 1.5 * totals['words_4_syllables']
+                      + 3.5 * totals['words_5_syllables'] + 26.25 * totals['words_6_syllables'])
+        results['atesman'] = 198.825 - 40.175 * ohs - 2.610 * oks
+        results['cetinkaya_uzun'] = 118.823 - 25.987 * ohs - 0.971 * oks
+        results['bezirci_yilmaz'] = math.sqrt(oks * long_words / sentences)
+    return results
+
+
+def frequency_spectrum(frequencies: Iterable[int]) -> List[Tuple[int, int]]:
+    """(frequency, number of types) pairs from the frequencies of the types"""
+    return sorted(Counter(frequencies).items())
+
+
+class LexicalStatsAccumulator:
+    """Streaming lexical diversity and readability counts of one document"""
+
+    def __init__(self, window: int = MATTR_WINDOW, threshold: float = MTLD_THRESHOLD,
+                 sample_size: int = HDD_SAMPLE_SIZE):
+        self.window = window
+        self.threshold = threshold
+        self.sample_size = sample_size
+        self.type_counts: Counter = Counter()
+        self.word_count = 0
+        self.sentence_count = 0
+        self.syllable_count = 0
+        self.long_words = [0, 0, 0, 0]          # 3, 4, 5, 6+ syllables
+        self.mattr_sum = 0.0
+        self.mattr_windows = 0
+        self.mtld_factors = 0
+        self._window: deque = deque()
+        self._window_counts: Counter = Counter()
+        self._segment_types = set()
+        self._segment_length = 0
+
+    def add(self, word: str) -> None:
+        """Count the next word of the document"""
+        self.word_count += 1
+        self.type_counts[word] += 1
+        syllables = count_syllables(word)
+        self.syllable_count += syllables
+        if syllables >= 3:
+            self.long_words[min(syllables, 6) - 3] += 1
+
+        window, counts = self._window, self._window_counts
+        window.append(word)
+        counts[word] += 1
+        if len(window) > self.window:
+            dropped = window.popleft()
+            counts[dropped] -= 1
+            if not counts[dropped]:
+                del counts[dropped]
+        if len(window) == self.window:
+            self.mattr_sum += len(counts) / self.window
+            self.mattr_windows += 1
+
+        self._segment_types.add(word)
+        self._segment_length += 1
+        if len(self._segment_types) / self._segment_length <= self.threshold:
+            self.mtld_factors += 1
+            self._segment_types = set()
+            self._segment_length = 0
+
+    def add_sentence(self, words: Iterable[str]) -> None:
+        """Count the words of the next sentence"""
+        before = self.word_count
+        for word in words:
+            self.add(word)
+        if self.word_count > before:
+            self.sentence_count += 1
+
+    def observe(self, annotated: Iterable[Tuple[str, list]]) -> Iterator[Tuple[str, list]]:
+        """Pass (sentence text, tokens) pairs through, counting their words"""
+        for text, tokens in annotated:
+            self.add_sentence(token.norm for token in tokens if token.norm and not token.is_punctuation)
+            yield text, tokens
+
+    def totals(self) -> Dict[str, float]:
+        """Additive totals (TOTAL_COLUMNS)"""
+        mattr_sum, mattr_windows = self.mattr_sum, self.mattr_windows
+        if not mattr_windows and self.word_count:
+            # Shorter than the window: the whole document is one window
+            mattr_sum, mattr_windows = len(self.type_counts) / self.word_count, 1
+        mtld_factors = float(self.mtld_factors)
+        if self._segment_length:
+            ttr = len(self._segment_types) / self._segment_length
+            mtld_factors += (1.0 - ttr) / (1.0 - self.threshold)
+        return dict(zip(TOTAL_COLUMNS, (self.word_count, self.sentence_count, self.syllable_count,
+                                        *self.long_words, mattr_sum, mattr_windows, mtld_factors)))
+
+    def results(self) -> Dict[str, Any]:
+        """Totals and measures of the document so far"""
+        totals = self.totals()
+        return {**totals, **lexical_measures(totals, frequency_spectrum(self.type_counts.values()),
+                                             self.sample_size)}
+
+
+class LexicalStatsIndex:
+    """Stores, maintains and combines the lexical statistics of one database"""
+
+    def __init__(self, connection, window: int = MATTR_WINDOW, threshold: float = MTLD_THRESHOLD,
+                 sample_size: int = HDD_SAMPLE_SIZE):
+        self.conn = connection
+        self.window = window
+        self.threshold = threshold
+        self.sample_size = sample_size
+        # Rows computed with other settings are recomputed by refresh
+        self.settings = f"{window}/{threshold}/{sample_size}"
+
+    def ensure_tables(self) -> None:
+        """Create the lexical statistics tables of databases made before they existed"""
+        cursor = self.conn.cursor()
+        for sql in LEXICAL_STATS_TABLES_SQL:
+            cursor.execute(sql)
+
+    def has_tables(self) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'lexical_types'")
+        return cursor.fetchone() is not None
+
+    def accumulator(self) -> LexicalStatsAccumulator:
+        """Accumulator for a document, with this index's settings"""
+        return LexicalStatsAccumulator(self.window, self.threshold, self.sample_size)
+
+    # --- Maintenance -------------------------------------------------------------
+
+    def store(self, doc_id: int, accumulator: LexicalStatsAccumulator) -> None:
+        """Store a document's statistics and add its words to the corpus frequencies (caller commits)"""
+        results = accumulator.results()
+        columns = ('doc_id', 'type_count') + TOTAL_COLUMNS + MEASURES + ('settings',)
+        values = (doc_id, results['type_count'], *(results[c] for c in TOTAL_COLUMNS + MEASURES), self.settings)
+        cursor = self.conn.cursor()
+        cursor.execute(f"INSERT OR REPLACE INTO lexical_stats ({', '.join(columns)}) "
+                       f"VALUES ({', '.join('?' * len(columns))})", values)
+        cursor.executemany("""
+            INSERT INTO lexical_types (word, frequency) VALUES (?, ?)
+            ON CONFLICT(word) DO UPDATE SET frequency = frequency + excluded.frequency
+        """, accumulator.type_counts.items())
+
+    def delete(self, doc_id: int) -> None:
+        """Take a document's words off the corpus frequencies (before its tokens are deleted; caller commits)"""
+        if not self.has_tables():
+            return
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM lexical_stats WHERE doc_id = ?", (doc_id,))
+        if cursor.fetchone() is None:
+            return
+        cursor.execute("""
+            SELECT norm, COUNT(*) FROM tokens
+            WHERE doc_id = ? AND is_punctuation = 0 AND norm IS NOT NULL AND norm != ''
+            GROUP BY norm
+        """, (doc_id,))
+        cursor.executemany("UPDATE lexical_types SET frequency = frequency - ? WHERE word = ?",
+                           [(count, word) for word, count in cursor.fetchall()])
+        cursor.execute("DELETE FROM lexical_types WHERE frequency <= 0")
+        cursor.execute("DELETE FROM lexical_stats WHERE doc_id = ?", (doc_id,))
+
+    def _accumulate(self, cursor) -> Iterator[Tuple[int, LexicalStatsAccumulator]]:
+        """
+        Feed (doc_id, sent_id, norm) rows in token order into one accumulator
+        at a time, yielding (doc_id, accumulator) as each document ends
+        (documents are contiguous in token order)
+        """
+        accumulator, doc_id, sent_id, words = None, None, None, []
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for row_doc, row_sent, norm in rows:
+                if row_sent != sent_id or row_doc != doc_id:
+                    if words:
+                        accumulator.add_sentence(words)
+                    words, sent_id = [], row_sent
+                    if row_doc != doc_id:
+                        if accumulator is not None:
+                            yield doc_id, accumulator
+                        doc_id, accumulator = row_doc, self.accumulator()
+                words.append(norm)
+        if words:
+            accumulator.add_sentence(words)
+        if accumulator is not None:
+            yield doc_id, accumulator
+
+    def missing_documents(self, subcorpus_id: Optional[int] = None) -> List[int]:
+        """Documents without statistics (or with statistics from other settings)"""
+        condition, params = ("1", []) if subcorpus_id is None else range_condition('d.doc_id', subcorpus_id, 'doc')
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT d.doc_id FROM documents d LEFT JOIN lexical_stats l ON l.doc_id = d.doc_id
+            WHERE {condition} AND (l.doc_id IS NULL OR l.settings != ?)
+            ORDER BY d.doc_id
+        """, params + [self.settings])
+        return [row[0] for row in cursor.fetchall()]
+
+    def refresh(self) -> int:
+        """
+        Compute the statistics of documents that have none (e.g. imported
+        CoNLL-U files, databases from before lexical statistics were stored)
+
+        Returns:
+            Number of documents computed
+        """
+        self.ensure_tables()
+        missing = self.missing_documents()
+        cursor = self.conn.cursor()
+        for doc_id in missing:
+            self.delete(doc_id)
+            cursor.execute("""
+                SELECT doc_id, sent_id, norm FROM tokens
+                WHERE doc_id = ? AND is_punctuation = 0 AND norm IS NOT NULL AND norm != ''
+                ORDER BY token_id
+            """, (doc_id,))
+            accumulators = dict(self._accumulate(cursor))
+            self.store(doc_id, accumulators.get(doc_id) or self.accumulator())
+        self.conn.commit()
+        if missing:
+            logger.info(f"Computed lexical statistics of {len(missing)} documents")
+        return len(missing)
+
+    # --- Lookup ------------------------------------------------------------------
+
+    def documents(self, doc_ids: Optional[Iterable[int]] = None,
+                  subcorpus_id: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Stored statistics per document (of a subcorpus), with the document names"""
+        conditions, params = [], []
+        if doc_ids is not None:
+            doc_ids = list(doc_ids)
+            conditions.append(f"d.doc_id IN ({', '.join('?' * len(doc_ids))})")
+            params.extend(doc_ids)
+        if subcorpus_id is not None:
+            sql, range_params = range_condition('d.doc_id', subcorpus_id, 'doc')
+            conditions.append(sql)
+            params.extend(range_params)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT d.doc_id, d.doc_name, l.type_count, {', '.join('l.' + c for c in TOTAL_COLUMNS + MEASURES)}
+            FROM lexical_stats l JOIN documents d ON d.doc_id = l.doc_id
+            WHERE {' AND '.join(conditions) or '1'}
+            ORDER BY d.doc_id
+        """, params)
+        names = [description[0] for description in cursor.description]
+        results = []
+        for row in cursor.fetchall():
+            result = dict(zip(names, row))
+            words = result['word_count']
+            result['ttr'] = result['type_count'] / words if words else None
+            results.append(result)
+        return results
+
+    def totals(self, subcorpus_id: Optional[int] = None) -> Dict[str, float]:
+        """TOTAL_COLUMNS summed over the stored documents (of a subcorpus)"""
+        condition, params = ("1", []) if subcorpus_id is None else range_condition('l.doc_id', subcorpus_id, 'doc')
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT {', '.join(f'SUM({c})' for c in TOTAL_COLUMNS)} FROM lexical_stats l "
+                       f"WHERE {condition}", params)
+        return {column: value or 0 for column, value in zip(TOTAL_COLUMNS, cursor.fetchone())}
+
+    def word_frequencies(self, subcorpus_id: Optional[int] = None) -> Iterator[Tuple[str, int]]:
+        """
+        (word, frequency) pairs: stored for the corpus, counted from the
+        tokens of a subcorpus
+        """
+        cursor = self.conn.cursor()
+        if subcorpus_id is None:
+            cursor.execute("SELECT word, frequency FROM lexical_types")
+        else:
+            source, condition, params = range_scan('t', subcorpus_id)
+            cursor.execute(f"""
+                SELECT t.norm, COUNT(*) FROM {source}
+                WHERE {condition} AND t.is_punctuation = 0 AND t.norm IS NOT NULL AND t.norm != ''
+                GROUP BY t.norm
+            """, params)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for word, frequency in rows:
+                yield word, frequency
+
+    def spectrum(self, subcorpus_id: Optional[int] = None) -> List[Tuple[int, int]]:
+        """Frequency spectrum of the corpus (or a subcorpus)"""
+        if subcorpus_id is not None:
+            return frequency_spectrum(frequency for _, frequency in self.word_frequencies(subcorpus_id))
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT frequency, COUNT(*) FROM lexical_types GROUP BY frequency ORDER BY frequency")
+        return [tuple(row) for row in cursor.fetchall()]
+
+    def scan(self, subcorpus_id: Optional[int] = None) -> Tuple[Dict[str, float], Counter]:
+        """
+        Totals and word frequencies computed from the tokens, without the
+        stored statistics (for databases that lack them)
+
+        Each document is added to the running totals and frequencies as soon
+        as its tokens end, so only one document's accumulator is kept.
+        """
+        if subcorpus_id is None:
+            source, condition, params = "tokens t", "1", []
+        else:
+            source, condition, params = range_scan('t', subcorpus_id)
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT t.doc_id, t.sent_id, t.norm FROM {source}
+            WHERE {condition} AND t.is_punctuation = 0 AND t.norm IS NOT NULL AND t.norm != ''
+            ORDER BY t.token_id
+        """, params)
+        totals = dict.fromkeys(TOTAL_COLUMNS, 0)
+        frequencies: Counter = Counter()
+        for _, accumulator in self._accumulate(cursor):
+            for column, value in accumulator.totals().items():
+                totals[column] += value
+            frequencies.update(accumulator.type_counts)
+        return totals, frequencies
+
+    def _stored(self, subcorpus_id: Optional[int]) -> bool:
+        """True if every document (of a subcorpus) has statistics; warns otherwise"""
+        if self.has_tables() and not self.missing_documents(subcorpus_id):
+            return True
+        logger.warning("Lexical statistics are missing for some documents and are computed from "
+                       "the tokens (run compute_lexical_stats or ingest again to store them)")
+        return False
+
+    def corpus_stats(self, subcorpus_id: Optional[int] = None) -> Dict[str, Any]:
+        """Measures of the whole corpus (or a subcorpus)"""
+        if self._stored(subcorpus_id):
+            totals, spectrum = self.totals(subcorpus_id), self.spectrum(subcorpus_id)
+        else:
+            totals, frequencies = self.scan(subcorpus_id)
+            spectrum = frequency_spectrum(frequencies.values())
+        return lexical_measures(totals, spectrum, self.sample_size)
+
+    def combinable_stats(self, subcorpus_id: Optional[int] = None) -> Tuple[Dict[str, float], List[Tuple[str, int]]]:
+        """
+        Totals and word frequencies of the corpus (or a subcorpus), for
+        measures over several databases: totals add up, frequencies of the
+        same word add up, and lexical_measures takes the combined totals and
+        the spectrum of the combined frequencies
+        """
+        if self._stored(subcorpus_id):
+            return self.totals(subcorpus_id), list(self.word_frequencies(subcorpus_id))
+        totals, frequencies = self.scan(subcorpus_id)
+        return totals, list(frequencies.items())
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+BERT Inference Benchmark: FP32 vs. int8 / ONNX
+
+Runs the custom BERT POS tagger with every CPU inference path on the
+sentences of Cleaned-for-tags.csv and reports
+- parity with the FP32 PyTorch model (same label per word, confidence drift),
+- accuracy against the gold tags of the CSV,
+- throughput (sentences/s and words/s).
+
+Kullanım:
+    python benchmark_bert_inference.py
+    python benchmark_bert_inference.py --inference pytorch int8 onnx-int8 --limit 2000 --output results.json
+"""
+
+import sys
+import os
+import csv
+import json
+import time
+import argparse
+from collections import OrderedDict
+
+# Add current directory to path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlp.custom_bert_processor import create_custom_bert_processor, INFERENCE_BACKENDS
+
+
+# Gold tag suffixes of the CSV ('FİİL-VERB', 'NOKTALAMA-PUNC', ...) -> UPOS, as
+# CustomBERTProcessor maps the model labels
+GOLD_TO_UPOS = {
+    'ADVERB': 'ADV', 'ADJECTIVE': 'ADJ', 'PRONOUN': 'PRON', 'PREPOS': 'ADP',
+    'CONJ': 'CCONJ', 'QUESTION': 'INTJ', 'PUNCTUATION': 'PUNCT', 'PUNC': 'PUNCT',
+}
+
+
+def load_sentences(csv_path, limit=None):
+    """Sentences of the tag CSV with their gold (word, UPOS) pairs, in file order"""
+    sentences = OrderedDict()
+    with open(csv_path, encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            sentence = row['Full_Sentence'].strip()
+            if sentence not in sentences:
+                if limit and len(sentences) >= limit:
+                    break
+                sentences[sentence] = []
+            # 'FİİL-VERB' -> 'VERB', 'BELİRTEÇ-ADVERB' -> 'ADV'
+            suffix = row['Tag'].rsplit('-', 1)[-1].strip()
+            sentences[sentence].append((row['Word'].strip(), GOLD_TO_UPOS.get(suffix, suffix)))
+    return sentences
+
+
+def gold_matches(tokens, gold):
+    """Number of gold words whose predicted UPOS is correct (matched in order by form)"""
+    correct = 0
+    position = 0
+    for word, tag in gold:
+        for i in range(position, len(tokens)):
+            if tokens[i]['word'] == word:
+                correct += tokens[i]['upos'] == tag
+                position = i + 1
+                break
+    return correct
+
+
+def run(processor, sentences, repeat):
+    """Annotate every sentence; returns the annotations and the best wall time of `repeat` runs"""
+    # Warm-up (lazy initialization, allocator, ONNX session)
+    for sentence in list(sentences)[:20]:
+        processor.process_text(sentence)
+
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        results = [processor.process_text(sentence) for sentence in sentences]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return results, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parity and throughput of the BERT inference paths")
+    parser.add_argument('--csv', default='Cleaned-for-tags.csv', help="Tag CSV (Full_Sentence, Word, Tag)")
+    parser.add_argument('--model', default=None, help="Model id or local path (default from config)")
+    parser.add_argument('--inference', nargs='+', default=list(INFERENCE_BACKENDS),
+                        choices=INFERENCE_BACKENDS, help="Inference paths to compare")
+    parser.add_argument('--limit', type=int, default=None, help="Maximum number of sentences")
+    parser.add_argument('--repeat', type=int, default=1, help="Timed runs per path (best is reported)")
+    parser.add_argument('--output', help="Write the results as JSON")
+    args = parser.parse_args()
+
+    sentences = load_sentences(args.csv, args.limit)
+    gold_total = sum(len(gold) for gold in sentences.values())
+    print(f"{len(sentences)} cümle, {gold_total} etiketli kelime: {args.csv}\n")
+
+    inference_paths = ['pytorch'] + [name for name in args.inference if name != 'pytorch']
+    reference = None
+    results = {}
+
+    for name in inference_paths:
+        processor = create_custom_bert_processor(model_path=args.model, inference=name)
+        if not processor.is_loaded:
+            print("BERT modeli yüklenemedi; karşılaştırma yapılamıyor.")
+            return 1
+        if processor.inference != name:
+            print(f"{name}: kullanılamıyor (FP32'ye düştü), atlandı")
+            continue
+
+        annotations, elapsed = run(processor, sentences, args.repeat)
+        words = sum(len(tokens) for tokens in annotations)
+        correct = sum(gold_matches(tokens, gold) for tokens, gold in zip(annotations, sentences.values()))
+
+        result = {
+            'seconds': round(elapsed, 3),
+            'sentences_per_second': round(len(sentences) / elapsed, 1),
+            'words_per_second': round(words / elapsed, 1),
+            'gold_accuracy': round(correct / gold_total, 4) if gold_total else None,
+            'load_seconds': round(processor.load_seconds, 3),
+        }
+
+        if reference is None:
+            reference = annotations
+        else:
+            same = total = 0
+            drift = 0.0
+            for ref_tokens, tokens in zip(reference, annotations):
+                for ref, token in zip(ref_tokens, tokens):
+                    same += ref['upos'] == token['upos']
+                    drift = max(drift, abs(ref['bert_confidence'] - token['bert_confidence']))
+                    total += 1
+            result['label_agreement'] = round(same / total, 4) if total else None
+            result['max_confidence_drift'] = round(drift, 4)
+            result['speedup'] = round(results['pytorch']['seconds'] / elapsed, 2)
+
+        results[name] = result
+
+    print(f"{'Yol':<10} {'cümle/s':>9} {'kelime/s':>10} {'hızlanma':>9} {'FP32 uyum':>10} {'altın doğr.':>11}")
+    print("-" * 64)
+    for name, result in results.items():
+        agreement = result.get('label_agreement')
+        print(f"{name:<10} {result['sentences_per_second']:>9} {result['words_per_second']:>10} "
+              f"{result.get('speedup', 1.0):>9} {'-' if agreement is None else f'{agreement:.2%}':>10} "
+              f"{result['gold_accuracy']:>11.2%}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'csv': args.csv, 'sentences': len(sentences), 'results': results}, f, indent=2)
+        print(f"\nSonuçlar yazıldı: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,11 @@
+"""
+Benchmarks
+
+Synthetic Turkish corpus generation and a benchmark suite for ingestion,
+queries and export, with baseline comparison for regression checks.
+"""
+
+from benchmarks.corpus_generator import generate_corpus, TurkishLikeVocabulary
+from benchmarks.suite import run_suite, compare_results
+
+__all__ = ['generate_corpus', 'TurkishLikeVocabulary', 'run_suite', 'compare_results']
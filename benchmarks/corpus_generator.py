@@ -0,0 +1,292 @@
+"""
+Synthetic Turkish Corpus Generator
+
+Builds reproducible benchmark corpora of plain-text documents:
+- Turkish-like vocabulary: stems from CV/CVC syllables with vowel harmony,
+  inflected with harmonizing suffix chains (-lAr, -DA, -(y)I, -Iyor, ...),
+  led by real high-frequency function words
+- Zipf-Mandelbrot token frequencies, p(r) ~ 1 / (r + q)^s
+- Gamma-distributed sentence lengths (mean ~11 words), commas, '.', '?' and
+  '!' endings, paragraphs of 2-7 sentences, documents of ~5,000 words
+- Vocabulary size grows with the corpus (Heaps' law)
+
+The same seed and parameters always produce byte-identical files. A
+manifest.json next to the documents records the parameters and a few probe
+words from different frequency bands for the query benchmarks.
+
+Kullanım:
+    python -m benchmarks.corpus_generator data/bench-1M --size 1M
+"""
+
+import json
+import time
+import logging
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+GENERATOR_VERSION = 1
+
+SIZES = {'1M': 1_000_000, '10M': 10_000_000, '100M': 100_000_000}
+
+# Most frequent words first; they take the top Zipf ranks
+FUNCTION_WORDS = [
+    've', 'bir', 'bu', 'da', 'de', 'için', 'ile', 'çok', 'daha', 'o', 'ne', 'gibi',
+    'kadar', 'var', 'ama', 'her', 'olarak', 'sonra', 'en', 'değil', 'ben', 'biz',
+    'mi', 'ki', 'şey', 'zaman', 'yok', 'onun', 'bunu', 'göre',
+]
+
+BACK_VOWELS = 'aıou'
+FRONT_VOWELS = 'eiöü'
+ONSETS = ['b', 'c', 'ç', 'd', 'g', 'h', 'k', 'l', 'm', 'n', 'p', 'r', 's', 'ş', 't', 'v', 'y', 'z']
+ONSET_WEIGHTS = [5, 2, 3, 6, 3, 2, 8, 4, 4, 3, 2, 3, 6, 2, 6, 2, 4, 3]
+CODAS = ['', '', '', 'l', 'n', 'r', 'k', 't', 'm', 's', 'ş', 'z']
+VOICELESS = set('çfhkpsşt')
+
+# Suffix templates: A = a/e, I = ı/i/u/ü, D = d/t, (y)/(n) buffers after vowels
+NOUN_SUFFIXES = ['', 'lAr', 'DA', 'DAn', '(y)I', '(y)A', '(n)In', 'lArI', 'lArDA', 'Im',
+                 'ImIz', 'lArIn', 'DAki', '(y)lA', 'sI', 'lArInDAn']
+VERB_SUFFIXES = ['mAk', 'Iyor', 'DI', 'mIş', '(y)AcAk', 'Ir', 'mAz', 'DIk', 'Iyorum',
+                 'DIm', 'mAdI', '(y)An', '(y)Ip', 'DIğI', 'mAsI']
+
+
+def parse_size(size: Union[str, int]) -> int:
+    """'1M' / '250k' / 10000 -> number of words"""
+    if isinstance(size, int):
+        return size
+    size = size.strip()
+    if size in SIZES:
+        return SIZES[size]
+    multiplier = {'k': 1_000, 'm': 1_000_000}.get(size[-1].lower())
+    if multiplier:
+        return int(float(size[:-1]) * multiplier)
+    return int(size)
+
+
+def default_vocabulary_size(words: int) -> int:
+    """Heaps' law estimate of distinct word forms for a corpus of `words` words"""
+    return max(2_000, min(1_000_000, int(30 * words ** 0.55)))
+
+
+def _harmonize(stem: str, template: str) -> str:
+    """Append a suffix template to a stem following vowel harmony and consonant assimilation"""
+    word = stem
+    i = 0
+    if template[:1] == 'I' and stem[-1] in BACK_VOWELS + FRONT_VOWELS:
+        if template[1:2] == 'y':
+            # Progressive: the stem vowel narrows (bekle + Iyor -> bekliyor)
+            word = stem[:-1]
+        else:
+            # araba + Im -> arabam, oku + Ir -> okur
+            i = 1
+    while i < len(template):
+        char = template[i]
+        if char == '(':
+            # Buffer consonant, only after a vowel
+            buffer = template[i + 1]
+            if word[-1] in BACK_VOWELS + FRONT_VOWELS:
+                word += buffer
+            i += 3
+            continue
+        last_vowel = next((c for c in reversed(word) if c in BACK_VOWELS + FRONT_VOWELS), 'a')
+        if char == 'A':
+            word += 'a' if last_vowel in BACK_VOWELS else 'e'
+        elif char == 'I':
+            word += {'a': 'ı', 'ı': 'ı', 'o': 'u', 'u': 'u',
+                     'e': 'i', 'i': 'i', 'ö': 'ü', 'ü': 'ü'}[last_vowel]
+        elif char == 'D':
+            word += 't' if word[-1] in VOICELESS else 'd'
+        else:
+            word += char
+        i += 1
+    return word
+
+
+def _capitalize(word: str) -> str:
+    """Turkish sentence-initial capital (i -> İ)"""
+    return ('İ' if word[0] == 'i' else word[0].upper()) + word[1:]
+
+
+class TurkishLikeVocabulary:
+    """Deterministic vocabulary of inflected Turkish-like word forms, most frequent first"""
+
+    def __init__(self, size: int, seed: int = 0):
+        self.rng = np.random.default_rng(seed)
+        self.size = size
+        self.words: List[str] = []
+        self._build()
+
+    def _syllable(self, back: bool) -> str:
+        vowels = BACK_VOWELS if back else FRONT_VOWELS
+        onset = ONSETS[bisect_right(self._onset_cdf, self.rng.random() * self._onset_cdf[-1])]
+        return onset + vowels[self.rng.integers(4)] + CODAS[self.rng.integers(len(CODAS))]
+
+    def _stem(self) -> str:
+        back = self.rng.random() < 0.55
+        n_syllables = 1 + int(self.rng.choice(3, p=[0.35, 0.45, 0.2]))
+        return ''.join(self._syllable(back) for _ in range(n_syllables))
+
+    def _build(self):
+        self._onset_cdf = list(np.cumsum(ONSET_WEIGHTS))
+        seen = set(FUNCTION_WORDS)
+        self.words = list(FUNCTION_WORDS)
+
+        # Lemmas are themselves Zipf distributed; frequent lemmas yield many forms
+        n_lemmas = max(200, self.size // 6)
+        lemmas = []
+        while len(lemmas) < n_lemmas:
+            stem = self._stem()
+            if stem not in seen:
+                seen.add(stem)
+                lemmas.append((stem, self.rng.random() < 0.35))
+        lemma_cdf = np.cumsum(1.0 / np.arange(1, n_lemmas + 1) ** 1.1)
+        noun_cdf = np.cumsum(1.0 / np.arange(1, len(NOUN_SUFFIXES) + 1) ** 1.2)
+        verb_cdf = np.cumsum(1.0 / np.arange(1, len(VERB_SUFFIXES) + 1) ** 1.2)
+
+        while len(self.words) < self.size:
+            draws = self.rng.random((3, 4096))
+            lemma_ids = np.searchsorted(lemma_cdf, draws[0] * lemma_cdf[-1]).tolist()
+            noun_ids = np.searchsorted(noun_cdf, draws[1] * noun_cdf[-1]).tolist()
+            verb_ids = np.searchsorted(verb_cdf, draws[2] * verb_cdf[-1]).tolist()
+            for lemma_id, noun_id, verb_id in zip(lemma_ids, noun_ids, verb_ids):
+                stem, is_verb = lemmas[lemma_id]
+                suffix = VERB_SUFFIXES[verb_id] if is_verb else NOUN_SUFFIXES[noun_id]
+                word = _harmonize(stem, suffix)
+                if word not in seen:
+                    seen.add(word)
+                    self.words.append(word)
+                    if len(self.words) >= self.size:
+                        break
+
+
+def zipf_cdf(vocabulary_size: int, exponent: float = 1.07, shift: float = 2.7) -> np.ndarray:
+    """Cumulative Zipf-Mandelbrot distribution over ranks 1..vocabulary_size"""
+    weights = 1.0 / (np.arange(1, vocabulary_size + 1) + shift) ** exponent
+    cdf = np.cumsum(weights)
+    return cdf / cdf[-1]
+
+
+def generate_corpus(output_dir: Union[str, Path], size: Union[str, int] = '1M', seed: int = 42,
+                    vocabulary_size: Optional[int] = None, document_words: int = 5_000,
+                    zipf_exponent: float = 1.07, overwrite: bool = False) -> Dict[str, Any]:
+    """
+    Write a synthetic corpus of plain-text documents
+
+    Args:
+        output_dir: Directory for doc_NNNNNN.txt files and manifest.json
+        size: Number of words ('1M', '10M', '100M', '250k' or an int);
+              punctuation comes on top
+        seed: Random seed; equal parameters give identical corpora
+        vocabulary_size: Distinct word forms (default: Heaps' law estimate)
+        document_words: Words per document
+        zipf_exponent: Exponent s of the Zipf-Mandelbrot distribution
+        overwrite: Regenerate even if an identical corpus already exists
+
+    Returns:
+        The manifest (parameters, document count, probe words)
+    """
+    output_dir = Path(output_dir)
+    words_total = parse_size(size)
+    vocabulary_size = vocabulary_size or default_vocabulary_size(words_total)
+    params = {
+        'generator_version': GENERATOR_VERSION,
+        'words': words_total,
+        'seed': seed,
+        'vocabulary_size': vocabulary_size,
+        'document_words': document_words,
+        'zipf_exponent': zipf_exponent,
+    }
+
+    manifest_path = output_dir / 'manifest.json'
+    if manifest_path.exists() and not overwrite:
+        manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+        if all(manifest.get(key) == value for key, value in params.items()):
+            logger.info(f"Reusing generated corpus: {output_dir}")
+            return manifest
+
+    output_dir.mkdir(parents=True, exist_ok=True)
+    for old in output_dir.glob('doc_*.txt'):
+        old.unlink()
+
+    start = time.perf_counter()
+    vocabulary = TurkishLikeVocabulary(vocabulary_size, seed).words
+    cdf = zipf_cdf(len(vocabulary), zipf_exponent)
+    rng = np.random.default_rng(seed + 1)
+
+    written = 0
+    documents = 0
+    while written < words_total:
+        target = min(document_words, words_total - written)
+        # Sentence lengths first, then all words of the document in one draw
+        lengths = []
+        total = 0
+        while total < target:
+            length = min(int(min(60, max(2, round(rng.gamma(2.2, 4.8))))), target - total)
+            lengths.append(length)
+            total += length
+        ids = np.minimum(np.searchsorted(cdf, rng.random(total)), len(vocabulary) - 1).tolist()
+        comma_draws = rng.random(total)
+        end_draws = rng.random(len(lengths))
+        paragraph_sizes = rng.integers(2, 8, size=len(lengths))
+
+        paragraphs = []
+        sentences = []
+        position = 0
+        for n, length in enumerate(lengths):
+            tokens = []
+            for k in range(position, position + length):
+                word = vocabulary[ids[k]]
+                if comma_draws[k] < 0.07 and k < position + length - 1:
+                    word += ','
+                tokens.append(word)
+            position += length
+            tokens[0] = _capitalize(tokens[0])
+            end = '.' if end_draws[n] < 0.88 else ('?' if end_draws[n] < 0.95 else '!')
+            sentences.append(' '.join(tokens) + end)
+            if len(sentences) >= paragraph_sizes[len(paragraphs) % len(paragraph_sizes)]:
+                paragraphs.append(' '.join(sentences))
+                sentences = []
+        if sentences:
+            paragraphs.append(' '.join(sentences))
+
+        documents += 1
+        (output_dir / f"doc_{documents:06d}.txt").write_text('\n\n'.join(paragraphs) + '\n', encoding='utf-8')
+        written += total
+
+    first_content = len(FUNCTION_WORDS)
+    manifest = {
+        **params,
+        'documents': documents,
+        'generated_seconds': round(time.perf_counter() - start, 2),
+        # Probe words of decreasing frequency for KWIC/collocation/CQL benchmarks
+        'probe_words': {
+            'high': vocabulary[0],
+            'content_high': vocabulary[first_content],
+            'mid': vocabulary[min(first_content + 500, len(vocabulary) - 1)],
+            'low': vocabulary[min(first_content + 20_000, len(vocabulary) // 4)],
+        },
+    }
+    manifest_path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False), encoding='utf-8')
+    logger.info(f"Generated {words_total:,} words in {documents} documents: {output_dir}")
+    return manifest
+
+
+if __name__ == "__main__":
+    import argparse
+
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Generate a synthetic Turkish benchmark corpus")
+    parser.add_argument("output_dir")
+    parser.add_argument("--size", default='1M', help="Words: 1M, 10M, 100M, 250k, ...")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--vocabulary-size", type=int, default=None)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    result = generate_corpus(args.output_dir, args.size, args.seed, args.vocabulary_size,
+                             overwrite=args.overwrite)
+    print(json.dumps(result, indent=2, ensure_ascii=False))
@@ -0,0 +1,342 @@
+"""
+Corpus Benchmark Suite
+
+Times the main workloads on a generated corpus (see corpus_generator):
+- ingestion, per NLP backend (words/s, with the per-stage profile)
+- KWIC for high, mid and low frequency words
+- frequency lists, collocation analysis, CQL search and word sketch
+- CoNLL-U and NDJSON export
+
+Query benchmarks report the median and minimum of several runs. Results are
+written as JSON together with an environment fingerprint, and can be
+compared against a stored baseline: a benchmark whose median time grows by
+more than the tolerance is reported as a regression (exit code 1).
+
+Kullanım:
+    python -m benchmarks --size 1M
+    python -m benchmarks --size 10M --backends simple stanza --output results.json
+    python -m benchmarks --size 1M --save-baseline benchmarks/baselines/1M.json
+    python -m benchmarks --size 1M --baseline benchmarks/baselines/1M.json --tolerance 0.2
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import platform
+import sqlite3
+import statistics
+import subprocess
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable, Sequence
+
+from benchmarks.corpus_generator import generate_corpus, parse_size
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FORMAT_VERSION = 1
+
+# Benchmarks faster than this are too noisy to flag as regressions
+MIN_COMPARABLE_SECONDS = 0.005
+
+DEFAULT_TOLERANCE = 0.25
+
+try:
+    from config.config import DATA_DIR, OUTPUT_DIR
+except ImportError:
+    DATA_DIR = Path('data')
+    OUTPUT_DIR = Path('output')
+
+BASELINE_DIR = Path(__file__).parent / 'baselines'
+
+
+def environment_info() -> Dict[str, Any]:
+    """Fingerprint of the machine and code the results were measured on"""
+    info = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'sqlite': sqlite3.sqlite_version,
+    }
+    try:
+        info['git_commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+            capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        info['git_commit'] = None
+    return info
+
+
+def time_runs(function: Callable[[], Any], repeats: int) -> Dict[str, Any]:
+    """Median and minimum wall time of `repeats` calls; `results` is the size of the last result"""
+    times = []
+    result = None
+    for _ in range(max(1, repeats)):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    size = None
+    if isinstance(result, (list, dict)):
+        size = len(result)
+    elif isinstance(result, int):
+        size = result
+    return {
+        'seconds': round(statistics.median(times), 6),
+        'min_seconds': round(min(times), 6),
+        'runs': len(times),
+        'results': size,
+    }
+
+
+def benchmark_ingestion(corpus_dir: Path, db_path: Path, backend: str,
+                        pipeline: bool = False) -> Dict[str, Any]:
+    """Ingest the corpus into a fresh database with one backend"""
+    from ingestion.corpus_ingestor import CorpusIngestor
+
+    if db_path.exists():
+        db_path.unlink()
+    ingestor = CorpusIngestor(str(db_path), nlp_backend=backend, annotation_cache=False)
+    try:
+        if ingestor.nlp_processor.backend != backend:
+            return {'skipped': f"backend '{backend}' not available "
+                               f"(would fall back to '{ingestor.nlp_processor.backend}')"}
+        start = time.perf_counter()
+        ingestor.ingest_directory(str(corpus_dir), file_patterns=['*.txt'], pipeline=pipeline)
+        elapsed = time.perf_counter() - start
+        stats = ingestor.stats
+        stages = ingestor.profiler.get_stats()['stages']
+        return {
+            'seconds': round(elapsed, 3),
+            'documents': stats['documents_processed'],
+            'tokens': stats['tokens_processed'],
+            'tokens_per_second': round(stats['tokens_processed'] / elapsed, 1) if elapsed else None,
+            'errors': stats['errors'],
+            'stage_seconds': {name: stage['wall_seconds'] for name, stage in stages.items()},
+        }
+    finally:
+        ingestor.close()
+
+
+def query_benchmarks(probe: Dict[str, str]) -> Dict[str, Callable]:
+    """Benchmark name -> function(query) for the query workloads"""
+    high, content, mid, low = probe['high'], probe['content_high'], probe['mid'], probe['low']
+    return {
+        'kwic.high': lambda q: q.kwic_concordance(high, limit=100),
+        'kwic.mid': lambda q: q.kwic_concordance(mid, limit=100),
+        'kwic.low': lambda q: q.kwic_concordance(low, limit=100),
+        'frequency.norm': lambda q: q.frequency_list('norm', limit=1000),
+        'frequency.form': lambda q: q.frequency_list('form', limit=1000),
+        'collocation.content': lambda q: q.collocation_analysis(content, window_size=5, limit=100),
+        'collocation.mid': lambda q: q.collocation_analysis(mid, window_size=5, limit=100),
+        'cql.single': lambda q: q.cql_search(f'[word="{mid}"]', limit=100),
+        'cql.sequence': lambda q: q.cql_search(f'[word="{high}"] [word="{content}"]', limit=100),
+        'word_sketch': lambda q: q.word_sketch(content, limit=50),
+        'stats': lambda q: q.get_advanced_stats(),
+    }
+
+
+def benchmark_exports(db_path: Path, formats: Sequence[str] = ('conllu', 'ndjson')) -> Dict[str, Any]:
+    """Export the corpus once per format into a temporary directory"""
+    from export.corpus_exporter import CorpusExporter
+
+    results = {}
+    out_dir = Path(tempfile.mkdtemp(prefix='corpus-bench-export-'))
+    try:
+        for fmt in formats:
+            stats = CorpusExporter(str(db_path)).export(str(out_dir / f"corpus.{fmt}"), fmt=fmt,
+                                                        compression=None)
+            results[f'export.{fmt}'] = {
+                'seconds': round(stats['elapsed_s'], 3),
+                'tokens': stats['tokens_written'],
+                'tokens_per_second': round(stats['tokens_per_sec'], 1),
+            }
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return results
+
+
+def run_suite(size: str = '1M', backends: Sequence[str] = ('simple',), seed: int = 42,
+              repeats: int = 3, work_dir: Optional[Path] = None, pipeline: bool = False,
+              only: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """
+    Generate (or reuse) a corpus and run all benchmarks
+
+    Args:
+        size: Corpus size ('1M', '10M', '100M', '250k', ...)
+        backends: NLP backends to time ingestion with; queries and exports run
+                  on the database of the first available one
+        seed: Corpus generator seed
+        repeats: Runs per query benchmark
+        work_dir: Where corpora and databases are kept (default: DATA_DIR/benchmarks)
+        pipeline: Ingest through the staged pipeline
+        only: Run only benchmarks whose name starts with one of these prefixes
+
+    Returns:
+        Results document (see RESULTS_FORMAT_VERSION)
+    """
+    from query.corpus_query import CorpusQuery
+
+    work_dir = Path(work_dir or Path(DATA_DIR) / 'benchmarks')
+    corpus_dir = work_dir / f"corpus-{size}-seed{seed}"
+    manifest = generate_corpus(corpus_dir, size, seed=seed)
+
+    def selected(name: str) -> bool:
+        return not only or any(name.startswith(prefix) for prefix in only)
+
+    results: Dict[str, Any] = {}
+    query_db = None
+    for backend in backends:
+        db_path = work_dir / f"corpus-{size}-seed{seed}-{backend}.db"
+        name = f'ingest.{backend}'
+        if not selected(name) and db_path.exists():
+            # Reuse the database of an earlier run
+            query_db = query_db or db_path
+            continue
+        print(f"{name}: {manifest['words']:,} kelime içeri aktarılıyor...")
+        results[name] = benchmark_ingestion(corpus_dir, db_path, backend, pipeline)
+        if query_db is None and 'skipped' not in results[name]:
+            query_db = db_path
+
+    if query_db is None:
+        raise RuntimeError("No backend could ingest the benchmark corpus")
+
+    query = CorpusQuery(str(query_db))
+    try:
+        for name, function in query_benchmarks(manifest['probe_words']).items():
+            if selected(name):
+                results[name] = time_runs(lambda: function(query), repeats)
+                print(f"{name}: {results[name]['seconds'] * 1000:.1f} ms")
+    finally:
+        query.close()
+
+    if selected('export'):
+        results.update(benchmark_exports(query_db))
+
+    return {
+        'format_version': RESULTS_FORMAT_VERSION,
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'environment': environment_info(),
+        'corpus': {key: manifest[key] for key in ('words', 'seed', 'vocabulary_size', 'documents',
+                                                  'zipf_exponent', 'generator_version')},
+        'settings': {'size': size, 'backends': list(backends), 'repeats': repeats, 'pipeline': pipeline},
+        'results': results,
+    }
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any],
+                    tolerance: float = DEFAULT_TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Benchmarks that got slower than the baseline
+
+    A benchmark regresses when its median time exceeds the baseline by more
+    than `tolerance` (relative). Benchmarks missing on either side, skipped,
+    or faster than MIN_COMPARABLE_SECONDS in the baseline are not compared.
+
+    Returns:
+        One dict per regression: name, baseline and current seconds, ratio
+    """
+    if current.get('corpus') != baseline.get('corpus'):
+        logger.warning("Baseline was measured on a different corpus; comparison may be meaningless")
+
+    regressions = []
+    for name, result in current.get('results', {}).items():
+        reference = baseline.get('results', {}).get(name)
+        if not reference or 'seconds' not in reference or 'seconds' not in result:
+            continue
+        if reference['seconds'] < MIN_COMPARABLE_SECONDS:
+            continue
+        ratio = result['seconds'] / reference['seconds']
+        if ratio > 1 + tolerance:
+            regressions.append({
+                'name': name,
+                'baseline_seconds': reference['seconds'],
+                'current_seconds': result['seconds'],
+                'ratio': round(ratio, 3),
+            })
+    return regressions
+
+
+def print_results(document: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    """Results as a table, with the change against the baseline if given"""
+    print(f"\n{'Benchmark':<22} {'süre (ms)':>12} {'en iyi (ms)':>12} {'token/s':>12} {'değişim':>9}")
+    print("-" * 71)
+    reference = (baseline or {}).get('results', {})
+    for name, result in document['results'].items():
+        if 'skipped' in result:
+            print(f"{name:<22} atlandı: {result['skipped']}")
+            continue
+        seconds = result['seconds'] * 1000
+        best = result.get('min_seconds', result['seconds']) * 1000
+        rate = result.get('tokens_per_second')
+        change = ''
+        if name in reference and reference[name].get('seconds'):
+            change = f"{result['seconds'] / reference[name]['seconds'] - 1:+.0%}"
+        print(f"{name:<22} {seconds:>12.1f} {best:>12.1f} {'' if rate is None else f'{rate:,.0f}':>12} {change:>9}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Corpus ingestion and query benchmarks")
+    parser.add_argument('--size', default='1M', help="Corpus size: 1M, 10M, 100M, 250k, ...")
+    parser.add_argument('--backends', nargs='+', default=['simple'], help="NLP backends to ingest with")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeats', type=int, default=3, help="Runs per query benchmark")
+    parser.add_argument('--work-dir', help="Corpora and databases (default: data/benchmarks)")
+    parser.add_argument('--pipeline', action='store_true', help="Ingest through the staged pipeline")
+    parser.add_argument('--only', nargs='+', help="Run benchmarks with these name prefixes only")
+    parser.add_argument('--output', help="Results JSON (default: output/benchmarks/<size>-<time>.json)")
+    parser.add_argument('--baseline', help="Compare against this results file "
+                                           "(default: benchmarks/baselines/<size>.json if present)")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Allowed relative slowdown before a regression is reported")
+    parser.add_argument('--save-baseline', help="Also write the results as a baseline file")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    parse_size(args.size)
+
+    document = run_suite(args.size, args.backends, args.seed, args.repeats,
+                         Path(args.work_dir) if args.work_dir else None, args.pipeline, args.only)
+
+    output = Path(args.output) if args.output else \
+        Path(OUTPUT_DIR) / 'benchmarks' / f"{args.size}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, indent=2, ensure_ascii=False), encoding='utf-8')
+
+    baseline_path = Path(args.baseline) if args.baseline else BASELINE_DIR / f"{args.size}.json"
+    baseline = None
+    if baseline_path.exists():
+        baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    elif args.baseline:
+        print(f"Baseline bulunamadı: {baseline_path}")
+        return 2
+
+    print_results(document, baseline)
+    print(f"\nSonuçlar yazıldı: {output}")
+
+    if args.save_baseline:
+        Path(args.save_baseline).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save_baseline).write_text(json.dumps(document, indent=2, ensure_ascii=False),
+                                            encoding='utf-8')
+        print(f"Baseline yazıldı: {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare_results(document, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} gerileme (tolerans {args.tolerance:.0%}):")
+            for regression in regressions:
+                print(f"  {regression['name']}: {regression['baseline_seconds'] * 1000:.1f} ms -> "
+                      f"{regression['current_seconds'] * 1000:.1f} ms (x{regression['ratio']})")
+            return 1
+        print(f"\nBaseline'a göre gerileme yok (tolerans {args.tolerance:.0%})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
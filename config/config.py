@@ -23,6 +23,54 @@ DEFAULT_WINDOW_SIZE = 5  # For collocation analysis
 MAX_TOKEN_LENGTH = 100
 MIN_TOKEN_LENGTH = 1
 
+# NLP model store: models are loaded from this directory without network
+# access; missing models are fetched into it unless offline mode is on
+MODEL_STORE_DIR = Path(os.environ.get("CORPUS_MODEL_STORE", BASE_DIR / "models"))
+MODEL_STORE_OFFLINE = os.environ.get("CORPUS_MODELS_OFFLINE", "0").lower() in ("1", "true", "yes")
+DEFAULT_BERT_MODEL = "LiProject/Bert-turkish-pos-trained"
+DEFAULT_STANZA_LANGUAGE = "tr"
+
+# custom_bert inference path on CPU: 'pytorch' (FP32), 'int8' (dynamic int8
+# quantization), 'onnx' or 'onnx-int8' (ONNX Runtime)
+BERT_INFERENCE = os.environ.get("CORPUS_BERT_INFERENCE", "pytorch")
+
+# Sliding-window inference for sentences longer than the BERT model accepts:
+# window length and step between window starts, in sub-tokens (None: the
+# model maximum, and a step leaving 64 sub-tokens of overlap)
+BERT_WINDOW_SIZE = None
+BERT_WINDOW_STRIDE = None
+
+# Ingestion instrumentation: write a JSON run report (per-stage times,
+# throughput, commit latencies) into LOGS_DIR after every directory ingestion,
+# and optionally profile the run with 'cprofile' or 'pyinstrument'
+INGESTION_RUN_REPORTS = os.environ.get("CORPUS_INGEST_REPORTS", "0").lower() in ("1", "true", "yes")
+INGESTION_CODE_PROFILER = os.environ.get("CORPUS_INGEST_PROFILER", "none").lower()
+
+# Dispersion measures (range, Juilland's D, DP, ARF) of the vocabulary go
+# stale when documents change and are recomputed by the first lookup; turn
+# this on to recompute them after every ingestion run that changed documents
+# instead. Computing holds about 120 bytes per word token (1.2 GB for 10
+# million words) and is most of an ingestion run's time on small updates.
+DISPERSION_AFTER_INGESTION = os.environ.get("CORPUS_DISPERSION_ON_INGEST", "0").lower() in ("1", "true", "yes")
+
+# Lexical diversity, stored per document at ingestion: MATTR window length,
+# MTLD factor threshold and HD-D sample size (in words)
+MATTR_WINDOW = 50
+MTLD_THRESHOLD = 0.72
+HDD_SAMPLE_SIZE = 42
+
+# Document metadata: JSON keys, XML attributes and XML leaf elements with these
+# names are stored per document (document_metadata) for faceted queries
+DOCUMENT_METADATA_FIELDS = [
+    'author', 'title', 'date', 'year', 'category', 'genre', 'source',
+    'publisher', 'language', 'tags',
+]
+
+# Query tracing: record the SQL, row counts and timings of every CorpusQuery
+# call in LOGS_DIR/query_trace.jsonl, with EXPLAIN QUERY PLAN if requested
+QUERY_TRACING = os.environ.get("CORPUS_QUERY_TRACE", "0").lower() in ("1", "true", "yes")
+QUERY_TRACE_EXPLAIN = os.environ.get("CORPUS_QUERY_TRACE_EXPLAIN", "0").lower() in ("1", "true", "yes")
+
 # Turkish language specific settings
 TURKISH_STOPWORDS = {
     've', 'bir', 'bu', 'da', 'de', 'ile', 'için', 'var', 'yok', 'çok', 'daha',
@@ -0,0 +1,388 @@
+"""
+Connection Pool for Corpus Database
+
+This module lets several threads query the corpus while ingestion writes:
+- WAL journal mode so readers never block the writer (and vice versa)
+- Read-only `mode=ro` URI connections for readers, one per live thread
+  (readers of finished threads are closed when the next reader opens)
+- Tuned cache_size / mmap_size pragmas on every connection
+- A single writer connection serialized by a lock
+
+Usage:
+    pool = get_connection_pool("corpus.db")       # the database must exist
+    query = CorpusQuery("corpus.db", pool=pool)   # thread-local reader
+    with pool.writer() as conn:                   # exclusive writer
+        conn.execute("UPDATE ...")
+"""
+
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+import logging
+
+from database.schema import CorpusDatabase
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Pragma defaults (cache_size is negative = KiB, as in the SQLite docs)
+DEFAULT_CACHE_SIZE_KB = 64 * 1024          # 64 MiB page cache per connection
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024      # 256 MiB memory-mapped I/O
+DEFAULT_BUSY_TIMEOUT_MS = 30000
+
+
+class CorpusConnectionPool:
+    """Thread-local read-only connections plus one locked writer connection"""
+
+    def __init__(self, db_path: str = "corpus.db",
+                 cache_size_kb: int = DEFAULT_CACHE_SIZE_KB,
+                 mmap_size: int = DEFAULT_MMAP_SIZE,
+                 busy_timeout_ms: int = DEFAULT_BUSY_TIMEOUT_MS,
+                 shared_cache: bool = False,
+                 create: bool = False):
+        """
+        Initialize the connection pool
+
+        Args:
+            db_path: Path to SQLite database
+            cache_size_kb: Page cache size per connection in KiB
+            mmap_size: Maximum bytes of the database file to memory-map
+            busy_timeout_ms: How long a connection waits on a locked database
+            shared_cache: Open readers with cache=shared. Off by default because
+                shared cache uses table-level locks, which defeats WAL concurrency.
+            create: Create a missing database; otherwise a missing file raises
+                FileNotFoundError (a mistyped path must not become an empty corpus)
+        """
+        self.db_path = Path(db_path)
+        self.cache_size_kb = cache_size_kb
+        self.mmap_size = mmap_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self.shared_cache = shared_cache
+
+        if not create and not self.db_path.is_file():
+            raise FileNotFoundError(f"Corpus database not found: {self.db_path}")
+
+        # Reader per thread; a thread's reader is closed once the thread finished
+        self._readers: Dict[threading.Thread, CorpusDatabase] = {}
+        self._readers_lock = threading.Lock()
+
+        self._writer: Optional[CorpusDatabase] = None
+        self._writer_lock = threading.RLock()
+        self._closed = False
+
+        self._enable_wal()
+
+    def _enable_wal(self):
+        """Ensure the schema exists and switch the file to WAL mode (persistent)"""
+        # Readers cannot create tables, so make sure the schema is in place first
+        db = CorpusDatabase(self.db_path)
+        db.connect()
+        db.create_schema()
+        db.close()
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            mode = conn.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+            if str(mode).lower() != 'wal':
+                logger.warning(f"Could not enable WAL mode for {self.db_path} (mode={mode})")
+        finally:
+            conn.close()
+
+    def _apply_pragmas(self, conn: sqlite3.Connection, read_only: bool):
+        """Apply performance pragmas to a fresh connection"""
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kb)}")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        if not read_only:
+            # WAL + NORMAL is durable against application crashes
+            conn.execute("PRAGMA synchronous = NORMAL")
+            conn.execute("PRAGMA foreign_keys = ON")
+
+    def _reader_uri(self) -> str:
+        """Build the read-only URI for reader connections"""
+        uri = f"{self.db_path.resolve().as_uri()}?mode=ro"
+        if self.shared_cache:
+            uri += "&cache=shared"
+        return uri
+
+    def reader(self) -> sqlite3.Connection:
+        """Return the calling thread's read-only connection, opening it on first use"""
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        thread = threading.current_thread()
+        with self._readers_lock:
+            db = self._readers.get(thread)
+        if db is None or db.connection is None:
+            # Not bound to this thread so that the pool can close it after the
+            # thread finished; only this thread uses it until then
+            db = CorpusDatabase(self.db_path)
+            db.connect(uri=self._reader_uri(), check_same_thread=False)
+            self._apply_pragmas(db.connection, read_only=True)
+            with self._readers_lock:
+                self._close_finished_readers()
+                self._readers[thread] = db
+        return db.connection
+
+    def _close_finished_readers(self):
+        """Close the readers of threads that have finished (caller holds _readers_lock)"""
+        for thread in [t for t in self._readers if not t.is_alive()]:
+            self._readers.pop(thread).close()
+
+    @contextmanager
+    def writer(self):
+        """
+        Exclusive access to the single writer connection
+
+        Commits on success and rolls back on error.
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        with self._writer_lock:
+            if self._writer is None:
+                self._writer = CorpusDatabase(self.db_path)
+                self._writer.connect(check_same_thread=False)
+                self._apply_pragmas(self._writer.connection, read_only=False)
+            conn = self._writer.connection
+            try:
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def release_reader(self):
+        """Close the calling thread's reader connection (e.g. when a worker exits)"""
+        with self._readers_lock:
+            db = self._readers.pop(threading.current_thread(), None)
+        if db is not None:
+            db.close()
+
+    def get_pool_info(self) -> Dict[str, Any]:
+        """Get information about open connections"""
+        with self._readers_lock:
+            self._close_finished_readers()
+            open_readers = sum(1 for db in self._readers.values() if db.connection is not None)
+        return {
+            'db_path': str(self.db_path),
+            'open_readers': open_readers,
+            'writer_open': self._writer is not None,
+            'cache_size_kb': self.cache_size_kb,
+            'mmap_size': self.mmap_size,
+            'shared_cache': self.shared_cache
+        }
+
+    def close(self):
+        """Close all connections owned by the pool"""
+        self._closed = True
+        with self._readers_lock:
+            for db in self._readers.values():
+                db.close()
+            self._readers = {}
+        with self._writer_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def __enter__(self):
+        """Context manager support"""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Close the pool on context exit"""
+        self.close()
+
+
+# Process-wide pools, one per database file
+_pools: Dict[str, CorpusConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(db_path: str = "corpus.db", **kwargs) -> CorpusConnectionPool:
+    """
+    Get (or create) the shared connection pool for a database file
+
+    Args:
+        db_path: Path to SQLite database
+        **kwargs: Passed to CorpusConnectionPool when the pool is created
+
+    Returns:
+        CorpusConnectionPool instance shared by all callers in this process
+    """
+    key = str(Path(db_path).resolve())
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = CorpusConnectionPool(db_path, **kwargs)
+            _pools[key] = pool
+        return pool
+
+
+def close_all_pools():
+    """Close every pool created through get_connection_pool"""
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close()
+        _pools.clear()
+
+
+def run_concurrency_benchmark(db_path: Optional[str] = None, n_readers: int = 4,
+                              duration: float = 5.0,
+                              write_batch: int = 500) -> Dict[str, Any]:
+    """
+    Benchmark N reader threads against 1 writer thread on the same database
+
+    Readers run frequency and lookup queries through thread-local read-only
+    connections while the writer keeps inserting token batches. The
+    benchmark runs on a temporary copy of the corpus (or on an empty scratch
+    database), never on the corpus itself.
+
+    Args:
+        db_path: Corpus to copy for the benchmark (None: an empty scratch database)
+        n_readers: Number of concurrent reader threads
+        duration: Benchmark length in seconds
+        write_batch: Tokens inserted per writer transaction
+
+    Returns:
+        Throughput and latency statistics
+    """
+    with tempfile.TemporaryDirectory(prefix="pool_benchmark_") as scratch_dir:
+        scratch = Path(scratch_dir) / "benchmark.db"
+        if db_path is not None:
+            if not Path(db_path).exists():
+                raise FileNotFoundError(f"Corpus database not found: {db_path}")
+            # Consistent copy, including pages still in the WAL
+            source = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+            target = sqlite3.connect(str(scratch))
+            try:
+                source.backup(target)
+            finally:
+                source.close()
+                target.close()
+        return _run_benchmark(CorpusConnectionPool(scratch, create=True), n_readers, duration, write_batch)
+
+
+def _run_benchmark(pool: CorpusConnectionPool, n_readers: int, duration: float,
+                   write_batch: int) -> Dict[str, Any]:
+    """run_concurrency_benchmark on an open pool of a scratch database (closed afterwards)"""
+    stop = threading.Event()
+    reader_latencies: List[List[float]] = [[] for _ in range(n_readers)]
+    reader_errors = [0] * n_readers
+    writer_stats = {'batches': 0, 'tokens': 0, 'latencies': []}
+
+    with pool.writer() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO documents (doc_name, file_path, file_size, text_length)
+            VALUES ('__benchmark__', NULL, 0, 0)
+        """)
+        doc_id = cursor.lastrowid
+        cursor.execute("""
+            INSERT INTO sentences (doc_id, sent_number, sent_text, token_start, token_end)
+            VALUES (?, 1, '', 0, 0)
+        """, (doc_id,))
+        sent_id = cursor.lastrowid
+
+    def reader_loop(idx: int):
+        conn = pool.reader()
+        queries = [
+            ("SELECT norm, COUNT(*) AS c FROM tokens GROUP BY norm ORDER BY c DESC LIMIT 20", ()),
+            ("SELECT COUNT(*) FROM tokens WHERE norm = ?", ("ev",)),
+            ("SELECT token_id, form FROM tokens WHERE sent_id = ? LIMIT 50", (sent_id,)),
+        ]
+        i = 0
+        while not stop.is_set():
+            sql, params = queries[i % len(queries)]
+            start = time.perf_counter()
+            try:
+                conn.execute(sql, params).fetchall()
+                reader_latencies[idx].append(time.perf_counter() - start)
+            except sqlite3.Error:
+                reader_errors[idx] += 1
+            i += 1
+        pool.release_reader()
+
+    def writer_loop():
+        token_number = 0
+        while not stop.is_set():
+            rows = []
+            for _ in range(write_batch):
+                rows.append((doc_id, sent_id, token_number, 'ev', 'ev', 'ev',
+                             'NOUN', None, None, None, None, 0, 2, 0, 0))
+                token_number += 1
+            start = time.perf_counter()
+            with pool.writer() as conn:
+                conn.executemany("""
+                    INSERT INTO tokens (
+                        doc_id, sent_id, token_number, form, norm, lemma, upos, xpos,
+                        morph, dep_head, dep_rel, start_char, end_char,
+                        is_punctuation, is_space
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+            writer_stats['latencies'].append(time.perf_counter() - start)
+            writer_stats['batches'] += 1
+            writer_stats['tokens'] += len(rows)
+
+    threads = [threading.Thread(target=reader_loop, args=(i,), daemon=True)
+               for i in range(n_readers)]
+    threads.append(threading.Thread(target=writer_loop, daemon=True))
+
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    pool.close()
+
+    all_reads = sorted(lat for lats in reader_latencies for lat in lats)
+    write_lats = sorted(writer_stats['latencies'])
+
+    def percentile(values: List[float], pct: float) -> float:
+        if not values:
+            return 0.0
+        return values[min(len(values) - 1, int(len(values) * pct))] * 1000
+
+    return {
+        'n_readers': n_readers,
+        'duration_s': elapsed,
+        'reads': len(all_reads),
+        'reads_per_sec': len(all_reads) / elapsed if elapsed else 0.0,
+        'read_errors': sum(reader_errors),
+        'read_p50_ms': percentile(all_reads, 0.50),
+        'read_p95_ms': percentile(all_reads, 0.95),
+        'writes_tokens': writer_stats['tokens'],
+        'write_tokens_per_sec': writer_stats['tokens'] / elapsed if elapsed else 0.0,
+        'write_p50_ms': percentile(write_lats, 0.50),
+        'write_p95_ms': percentile(write_lats, 0.95),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="N readers / 1 writer concurrency benchmark")
+    parser.add_argument("db_path", nargs="?", default=None,
+                        help="corpus to benchmark a temporary copy of (default: an empty scratch database)")
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+
+    print("=== CONNECTION POOL BENCHMARK ===")
+    results = run_concurrency_benchmark(args.db_path, args.readers, args.duration, args.batch)
+    for key, value in results.items():
+        if isinstance(value, float):
+            print(f"{key}: {value:.2f}")
+        else:
+            print(f"{key}: {value}")
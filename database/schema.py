@@ -16,6 +16,154 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Subcorpus definitions and their materialized id ranges (see query.subcorpus)
+SUBCORPUS_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS subcorpora (
+        subcorpus_id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL UNIQUE,
+        definition TEXT NOT NULL,           -- JSON
+        doc_count INTEGER NOT NULL DEFAULT 0,
+        sentence_count INTEGER NOT NULL DEFAULT 0,
+        token_count INTEGER NOT NULL DEFAULT 0,
+        word_count INTEGER NOT NULL DEFAULT 0,  -- tokens without punctuation
+        range_count INTEGER NOT NULL DEFAULT 0,
+        corpus_state TEXT,                  -- documents when materialized
+        materialized_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS subcorpus_ranges (
+        subcorpus_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,                 -- 'doc' or 'token'
+        range_start INTEGER NOT NULL,
+        range_end INTEGER NOT NULL,         -- inclusive
+        PRIMARY KEY (subcorpus_id, kind, range_start)
+    ) WITHOUT ROWID
+    """,
+)
+
+# Typed document metadata (author, date, category, ...) and per-value facet
+# counts, kept up to date by triggers (see query.metadata)
+METADATA_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS document_metadata (
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        value_num REAL,                     -- numeric values, for ranges
+        doc_id INTEGER NOT NULL,
+        PRIMARY KEY (key, value, doc_id)
+    ) WITHOUT ROWID
+    """,
+    "CREATE INDEX IF NOT EXISTS idx_document_metadata_doc ON document_metadata(doc_id, key)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_document_metadata_num ON document_metadata(key, value_num)
+    WHERE value_num IS NOT NULL
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS metadata_facets (
+        key TEXT NOT NULL,
+        value TEXT NOT NULL,
+        value_num REAL,
+        doc_count INTEGER NOT NULL DEFAULT 0,
+        token_count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (key, value)
+    ) WITHOUT ROWID
+    """,
+    # A document's metadata is written before its token count is known; the
+    # count reaches the facets through the documents trigger
+    """
+    CREATE TRIGGER IF NOT EXISTS document_metadata_ai AFTER INSERT ON document_metadata BEGIN
+        INSERT INTO metadata_facets (key, value, value_num, doc_count, token_count)
+        VALUES (new.key, new.value, new.value_num, 1,
+                COALESCE((SELECT token_count FROM documents WHERE doc_id = new.doc_id), 0))
+        ON CONFLICT(key, value) DO UPDATE SET
+            doc_count = doc_count + 1,
+            token_count = token_count + excluded.token_count;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS document_metadata_ad AFTER DELETE ON document_metadata BEGIN
+        UPDATE metadata_facets SET
+            doc_count = doc_count - 1,
+            token_count = token_count
+                - COALESCE((SELECT token_count FROM documents WHERE doc_id = old.doc_id), 0)
+        WHERE key = old.key AND value = old.value;
+        DELETE FROM metadata_facets WHERE key = old.key AND value = old.value AND doc_count <= 0;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS documents_token_count_au AFTER UPDATE OF token_count ON documents
+    WHEN COALESCE(new.token_count, 0) != COALESCE(old.token_count, 0) BEGIN
+        UPDATE metadata_facets SET
+            token_count = token_count + COALESCE(new.token_count, 0) - COALESCE(old.token_count, 0)
+        WHERE (key, value) IN (SELECT key, value FROM document_metadata WHERE doc_id = new.doc_id);
+    END
+    """,
+)
+
+# Stored dispersion measures per word type (see analysis.dispersion)
+DISPERSION_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS dispersion (
+        word_type TEXT NOT NULL,            -- 'norm', 'lemma' or 'form'
+        word TEXT NOT NULL,
+        frequency INTEGER NOT NULL,
+        doc_range INTEGER NOT NULL,         -- documents containing the word
+        juilland_d REAL,
+        dp REAL,
+        dp_norm REAL,
+        arf REAL,
+        PRIMARY KEY (word_type, word)
+    ) WITHOUT ROWID
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS dispersion_runs (
+        word_type TEXT PRIMARY KEY,
+        doc_count INTEGER NOT NULL,
+        token_count INTEGER NOT NULL,       -- word tokens (without punctuation)
+        type_count INTEGER NOT NULL,
+        corpus_state TEXT,                  -- documents when computed
+        computed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """,
+)
+
+LEXICAL_STATS_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS lexical_stats (
+        doc_id INTEGER PRIMARY KEY,
+        word_count INTEGER NOT NULL,        -- tokens without punctuation
+        type_count INTEGER NOT NULL,
+        sentence_count INTEGER NOT NULL,    -- sentences with words
+        syllable_count INTEGER NOT NULL,
+        words_3_syllables INTEGER NOT NULL,
+        words_4_syllables INTEGER NOT NULL,
+        words_5_syllables INTEGER NOT NULL,
+        words_6_syllables INTEGER NOT NULL, -- six or more
+        mattr_sum REAL NOT NULL,            -- sum of the window TTRs
+        mattr_windows INTEGER NOT NULL,
+        mtld_factors REAL NOT NULL,
+        mattr REAL,
+        mtld REAL,
+        hdd REAL,
+        yules_k REAL,
+        atesman REAL,
+        cetinkaya_uzun REAL,
+        bezirci_yilmaz REAL,
+        settings TEXT NOT NULL,             -- MATTR window / MTLD threshold / HD-D sample
+        FOREIGN KEY (doc_id) REFERENCES documents (doc_id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS lexical_types (
+        word TEXT PRIMARY KEY,              -- norm
+        frequency INTEGER NOT NULL          -- in documents with lexical_stats
+    ) WITHOUT ROWID
+    """,
+)
+
+
 class CorpusDatabase:
     """Manages the SQLite database for corpus storage"""
     
@@ -23,9 +171,18 @@ class CorpusDatabase:
         self.db_path = Path(db_path)
         self.connection = None
         
-    def connect(self):
-        """Establish database connection"""
-        self.connection = sqlite3.connect(self.db_path)
+    def connect(self, uri: Optional[str] = None, check_same_thread: bool = True):
+        """
+        Establish database connection
+        
+        Args:
+            uri: Optional SQLite URI (e.g. "file:corpus.db?mode=ro") used instead of db_path
+            check_same_thread: Passed to sqlite3.connect; disable only for lock-guarded sharing
+        """
+        if uri:
+            self.connection = sqlite3.connect(uri, uri=True, check_same_thread=check_same_thread)
+        else:
+            self.connection = sqlite3.connect(self.db_path, check_same_thread=check_same_thread)
         self.connection.row_factory = sqlite3.Row  # Enable column access by name
         return self.connection
         
@@ -92,6 +249,35 @@ class CorpusDatabase:
             )
         """)
         
+        # Ingestion manifest (one row per source file, used to skip unchanged
+        # files by stat alone and to resume interrupted runs)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS ingestion_manifest (
+                path TEXT PRIMARY KEY,
+                file_size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                content_hash TEXT,
+                doc_id INTEGER,
+                state TEXT NOT NULL DEFAULT 'pending',  -- pending, annotating, written, done
+                error TEXT,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Subcorpora
+        for sql in SUBCORPUS_TABLES_SQL:
+            cursor.execute(sql)
+
+        # Document metadata and facet counts
+        for sql in METADATA_TABLES_SQL:
+            cursor.execute(sql)
+
+        # Dispersion measures
+        for sql in DISPERSION_TABLES_SQL:
+            cursor.execute(sql)
+        for sql in LEXICAL_STATS_TABLES_SQL:
+            cursor.execute(sql)
+
         # Create FTS5 virtual table for full-text search
         cursor.execute("""
             CREATE VIRTUAL TABLE IF NOT EXISTS tokens_fts USING fts5(
@@ -113,11 +299,15 @@ class CorpusDatabase:
     def _create_indices(self, cursor):
         """Create performance indices"""
         
+        # Single-column indices on doc_id, norm and lemma (and a second lemma+upos
+        # index) duplicated prefixes of the compound indices below; they only
+        # slowed down every token insert.
+        for redundant in ('idx_tokens_doc_id', 'idx_tokens_norm', 'idx_tokens_lemma',
+                          'idx_tokens_lemmapos'):
+            cursor.execute(f"DROP INDEX IF EXISTS {redundant}")
+        
         # Token-level indices
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_doc_id ON tokens(doc_id)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_sent_id ON tokens(sent_id)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_norm ON tokens(norm)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_lemma ON tokens(lemma)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_upos ON tokens(upos)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_dep_head ON tokens(dep_head)")
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_dep_rel ON tokens(dep_rel)")
@@ -130,12 +320,31 @@ class CorpusDatabase:
         # Sentence-level indices
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_sentences_doc_id ON sentences(doc_id)")
         
-        # Frequency analysis indices
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_tokens_lemmapos ON tokens(lemma, upos)")
+        # Manifest lookups by state (resume)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_manifest_state ON ingestion_manifest(state)")
+        
+    def _drop_token_indices(self, cursor):
+        """Drop secondary token indices (bulk loads rebuild them with _create_indices)"""
+        cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'index' AND tbl_name = 'tokens' AND name LIKE 'idx_%'
+        """)
+        for (name,) in cursor.fetchall():
+            cursor.execute(f"DROP INDEX IF EXISTS {name}")
         
     def _create_triggers(self, cursor):
         """Create triggers to maintain FTS index"""
         
+        # Older databases were created with 'delete' triggers that omit the old
+        # column values, which makes every UPDATE/DELETE on tokens fail. Replace them.
+        cursor.execute("""
+            SELECT name, sql FROM sqlite_master
+            WHERE type = 'trigger' AND name IN ('tokens_au', 'tokens_ad')
+        """)
+        for name, sql in cursor.fetchall():
+            if 'old.form' not in sql:
+                cursor.execute(f"DROP TRIGGER {name}")
+        
         # Trigger for INSERT
         cursor.execute("""
             CREATE TRIGGER IF NOT EXISTS tokens_ai AFTER INSERT ON tokens BEGIN
@@ -148,7 +357,7 @@ class CorpusDatabase:
         cursor.execute("""
             CREATE TRIGGER IF NOT EXISTS tokens_au AFTER UPDATE ON tokens BEGIN
                 INSERT INTO tokens_fts(tokens_fts, rowid, form, norm, lemma) 
-                VALUES('delete', old.token_id);
+                VALUES('delete', old.token_id, old.form, old.norm, old.lemma);
                 INSERT INTO tokens_fts(rowid, form, norm, lemma) 
                 VALUES (new.token_id, new.form, new.norm, new.lemma);
             END
@@ -158,7 +367,7 @@ class CorpusDatabase:
         cursor.execute("""
             CREATE TRIGGER IF NOT EXISTS tokens_ad AFTER DELETE ON tokens BEGIN
                 INSERT INTO tokens_fts(tokens_fts, rowid, form, norm, lemma) 
-                VALUES('delete', old.token_id);
+                VALUES('delete', old.token_id, old.form, old.norm, old.lemma);
             END
         """)
         
@@ -0,0 +1,152 @@
+"""
+Sharded Corpus Layout
+
+A sharded corpus is a directory of N ordinary corpus databases plus a
+shards.json manifest:
+
+    corpus_shards/
+        shards.json
+        shard-000.db
+        shard-001.db
+        ...
+
+Documents are partitioned by doc_id: every shard hands out ids (documents,
+sentences and tokens alike) from its own range of SHARD_ID_STRIDE values,
+so ids stay unique across the corpus, results of different shards can be
+merged on them, and the shard holding a document follows from its doc_id.
+New files are assigned to a shard by a stable hash of their name, so
+re-ingesting a directory sends every file to the shard that already holds
+it (duplicate detection by content hash is per shard).
+
+Each shard can be written by its own process and queried in parallel; see
+ingestion.sharded_ingestor and query.sharded_query.
+"""
+
+import json
+import zlib
+import logging
+from datetime import datetime
+from pathlib import Path
+from typing import List, Dict, Any, Union
+
+from database.schema import CorpusDatabase
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "shards.json"
+MANIFEST_FORMAT_VERSION = 1
+
+# Size of each shard's id range (2^40 ids per shard and table)
+SHARD_ID_STRIDE = 1 << 40
+
+# AUTOINCREMENT tables whose ids are offset per shard
+SHARDED_ID_TABLES = ('documents', 'sentences', 'tokens')
+
+
+class ShardedCorpus:
+    """The shards and manifest of a sharded corpus directory"""
+
+    def __init__(self, path: Union[str, Path]):
+        """
+        Open an existing sharded corpus
+
+        Args:
+            path: The corpus directory or its shards.json
+        """
+        path = Path(path)
+        self.manifest_path = path if path.suffix == '.json' else path / MANIFEST_NAME
+        if not self.manifest_path.exists():
+            raise FileNotFoundError(f"Shard manifest not found: {self.manifest_path}")
+        self.directory = self.manifest_path.parent
+        self.manifest = json.loads(self.manifest_path.read_text(encoding='utf-8'))
+        if self.manifest.get('format_version') != MANIFEST_FORMAT_VERSION:
+            raise ValueError(f"Unsupported shard manifest version: {self.manifest.get('format_version')}")
+
+    @classmethod
+    def create(cls, directory: Union[str, Path], num_shards: int) -> 'ShardedCorpus':
+        """
+        Create a sharded corpus with empty shard databases (an existing one
+        with the same number of shards is opened instead)
+
+        Args:
+            directory: Corpus directory (created if needed)
+            num_shards: Number of shard databases
+        """
+        if num_shards < 1:
+            raise ValueError(f"num_shards must be at least 1, got {num_shards}")
+        directory = Path(directory)
+        manifest_path = directory / MANIFEST_NAME
+        if manifest_path.exists():
+            corpus = cls(manifest_path)
+            if corpus.num_shards != num_shards:
+                raise ValueError(f"{directory} already has {corpus.num_shards} shards, not {num_shards}")
+            return corpus
+
+        directory.mkdir(parents=True, exist_ok=True)
+        shards = []
+        for index in range(num_shards):
+            name = f"shard-{index:03d}.db"
+            init_shard(directory / name, index)
+            shards.append({'index': index, 'path': name, 'id_start': index * SHARD_ID_STRIDE})
+
+        manifest = {
+            'format_version': MANIFEST_FORMAT_VERSION,
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'partition': 'doc_id',
+            'id_stride': SHARD_ID_STRIDE,
+            'assignment': 'crc32(file name) % num_shards',
+            'shards': shards,
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        logger.info(f"Created sharded corpus with {num_shards} shards: {directory}")
+        return cls(manifest_path)
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.manifest['shards'])
+
+    @property
+    def shard_paths(self) -> List[Path]:
+        """Shard database paths in shard order (which is also doc_id order)"""
+        return [self.directory / shard['path'] for shard in self.manifest['shards']]
+
+    def shard_for_file(self, file_path: Union[str, Path]) -> int:
+        """Shard a new file is ingested into"""
+        return zlib.crc32(Path(file_path).name.encode('utf-8')) % self.num_shards
+
+    def shard_for_doc_id(self, doc_id: int) -> int:
+        """Shard holding a document"""
+        return doc_id // self.manifest['id_stride']
+
+    def partition_files(self, files: List[Path]) -> List[List[Path]]:
+        """Files grouped by the shard they go to"""
+        groups: List[List[Path]] = [[] for _ in range(self.num_shards)]
+        for file_path in files:
+            groups[self.shard_for_file(file_path)].append(file_path)
+        return groups
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'directory': str(self.directory), 'num_shards': self.num_shards,
+                'shards': [str(path) for path in self.shard_paths]}
+
+
+def init_shard(db_path: Union[str, Path], index: int) -> None:
+    """Create a shard database and move its id sequences to the shard's range"""
+    db = CorpusDatabase(str(db_path))
+    db.connect()
+    try:
+        db.create_schema()
+        cursor = db.connection.cursor()
+        start = index * SHARD_ID_STRIDE
+        for table in SHARDED_ID_TABLES:
+            cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+            row = cursor.fetchone()
+            if row is None:
+                cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, start))
+            elif row[0] < start:
+                cursor.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = ?", (start, table))
+        db.connection.commit()
+    finally:
+        db.close()
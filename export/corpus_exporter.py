@@ -0,0 +1,412 @@
+"""
+Corpus Export Module
+
+Streams the whole corpus out of the database in constant memory:
+- Rows are pulled with fetchmany() in large chunks (no per-row round trips)
+- Output goes through large buffered writers
+- Formats: CoNLL-U, NDJSON, CSV and TEI XML
+- Optional gzip / zstd compression (zstd needs the `zstandard` package)
+- Progress callback and a background-thread helper for GUI use
+"""
+
+import csv
+import gzip
+import io
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Callable
+from xml.sax.saxutils import escape, quoteattr
+import logging
+
+from database.schema import CorpusDatabase
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# zstd compression is optional
+ZSTD_AVAILABLE = False
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    pass
+
+EXPORT_FORMATS = ('conllu', 'ndjson', 'csv', 'tei')
+DEFAULT_CHUNK_SIZE = 20000
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+# Column order of the rows produced by CorpusExporter.iter_rows()
+EXPORT_COLUMNS = [
+    'doc_id', 'doc_name', 'sent_id', 'sent_text', 'token_number', 'form', 'norm',
+    'lemma', 'upos', 'xpos', 'morph', 'dep_head', 'dep_rel', 'start_char',
+    'end_char', 'is_punctuation', 'token_id'
+]
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class CorpusExporter:
+    """Streams corpus tokens from the database into export files"""
+
+    def __init__(self, db_path: str = "corpus.db", chunk_size: int = DEFAULT_CHUNK_SIZE):
+        """
+        Initialize the exporter
+
+        Args:
+            db_path: Path to SQLite database
+            chunk_size: Rows fetched per fetchmany() call
+        """
+        self.db_path = db_path
+        self.chunk_size = chunk_size
+
+    def iter_rows(self, connection) -> Iterator[List[tuple]]:
+        """Yield chunks of token rows (EXPORT_COLUMNS) ordered by document, sentence and position"""
+        cursor = connection.cursor()
+        cursor.arraysize = self.chunk_size
+        cursor.execute("""
+            SELECT
+                t.doc_id, d.doc_name, t.sent_id, s.sent_text, t.token_number,
+                t.form, t.norm, t.lemma, t.upos, t.xpos, t.morph,
+                t.dep_head, t.dep_rel, t.start_char, t.end_char, t.is_punctuation,
+                t.token_id
+            FROM tokens t
+            JOIN sentences s ON t.sent_id = s.sent_id
+            JOIN documents d ON t.doc_id = d.doc_id
+            ORDER BY t.doc_id, t.sent_id, t.token_number
+        """)
+        while True:
+            rows = cursor.fetchmany(self.chunk_size)
+            if not rows:
+                break
+            yield rows
+
+    def export(self, output_path: str, fmt: Optional[str] = None,
+               compression: Optional[str] = 'auto',
+               progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+        """
+        Export the corpus to a file
+
+        Args:
+            output_path: Destination file
+            fmt: 'conllu', 'ndjson', 'csv' or 'tei' (default: guessed from extension)
+            compression: None, 'gzip', 'zstd' or 'auto' (from .gz / .zst extension)
+            progress_callback: Called as callback(tokens_written, total_tokens) per chunk
+
+        Returns:
+            Export statistics
+        """
+        output_path = Path(output_path)
+        fmt = fmt or guess_format(output_path)
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Invalid export format: {fmt}")
+        if compression == 'auto':
+            compression = guess_compression(output_path)
+
+        writer_cls = {
+            'conllu': ConlluWriter,
+            'ndjson': NdjsonWriter,
+            'csv': CsvWriter,
+            'tei': TeiWriter,
+        }[fmt]
+
+        start = time.perf_counter()
+        db = CorpusDatabase(self.db_path)
+        connection = db.connect()
+        # Plain tuples are cheaper than sqlite3.Row for millions of rows
+        connection.row_factory = None
+        try:
+            total = connection.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+            written = 0
+            sentences = 0
+            with open_output(output_path, compression) as stream:
+                writer = writer_cls(stream)
+                writer.begin()
+                for rows in self.iter_rows(connection):
+                    sentences += writer.write_rows(rows)
+                    written += len(rows)
+                    if progress_callback:
+                        progress_callback(written, total)
+                writer.end()
+        finally:
+            db.close()
+
+        elapsed = time.perf_counter() - start
+        stats = {
+            'output_path': str(output_path),
+            'format': fmt,
+            'compression': compression,
+            'tokens_written': written,
+            'sentences_written': sentences,
+            'elapsed_s': elapsed,
+            'tokens_per_sec': written / elapsed if elapsed else 0.0
+        }
+        logger.info(f"Exported {written} tokens to {output_path} ({fmt}) in {elapsed:.2f}s")
+        return stats
+
+    def export_in_background(self, output_path: str, fmt: Optional[str] = None,
+                             compression: Optional[str] = 'auto',
+                             progress_callback: Optional[ProgressCallback] = None,
+                             on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+                             on_error: Optional[Callable[[Exception], None]] = None) -> threading.Thread:
+        """
+        Run export() on a daemon thread
+
+        Callbacks run on the worker thread; GUI callers should marshal them back
+        to the UI thread (e.g. with root.after).
+        """
+        def worker():
+            try:
+                stats = self.export(output_path, fmt, compression, progress_callback)
+                if on_complete:
+                    on_complete(stats)
+            except Exception as e:
+                logger.error(f"Export failed: {e}")
+                if on_error:
+                    on_error(e)
+
+        thread = threading.Thread(target=worker, daemon=True)
+        thread.start()
+        return thread
+
+
+# ----------------------------------------------------------------------
+# Output streams
+# ----------------------------------------------------------------------
+
+def guess_format(path: Path) -> str:
+    """Guess the export format from a file name (compression suffix ignored)"""
+    suffixes = [s.lower() for s in path.suffixes if s.lower() not in ('.gz', '.zst')]
+    ext = suffixes[-1] if suffixes else ''
+    return {
+        '.conllu': 'conllu', '.conll': 'conllu',
+        '.ndjson': 'ndjson', '.jsonl': 'ndjson',
+        '.csv': 'csv',
+        '.xml': 'tei', '.tei': 'tei',
+    }.get(ext, 'conllu')
+
+
+def guess_compression(path: Path) -> Optional[str]:
+    """Guess the compression from a file name"""
+    suffix = path.suffix.lower()
+    if suffix == '.gz':
+        return 'gzip'
+    if suffix == '.zst':
+        return 'zstd'
+    return None
+
+
+def open_output(path: Path, compression: Optional[str] = None) -> io.TextIOBase:
+    """Open a buffered UTF-8 text stream, optionally compressed"""
+    if compression == 'gzip':
+        raw = gzip.open(path, 'wb', compresslevel=6)
+    elif compression == 'zstd':
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstd compression requires: pip install zstandard")
+        raw = zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'))
+    elif compression is None:
+        return open(path, 'w', encoding='utf-8', newline='\n', buffering=WRITE_BUFFER_SIZE)
+    else:
+        raise ValueError(f"Invalid compression: {compression}")
+
+    buffered = io.BufferedWriter(raw, buffer_size=WRITE_BUFFER_SIZE)
+    return io.TextIOWrapper(buffered, encoding='utf-8', newline='\n')
+
+
+# ----------------------------------------------------------------------
+# Format writers
+# ----------------------------------------------------------------------
+
+class ExportWriter:
+    """Base class for streaming format writers"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.current_sent_id = None
+        self.current_doc_id = None
+
+    def begin(self):
+        """Write the file header"""
+
+    def write_rows(self, rows: List[tuple]) -> int:
+        """Write a chunk of rows; returns the number of sentences started"""
+        raise NotImplementedError
+
+    def end(self):
+        """Write the file footer"""
+
+
+class ConlluWriter(ExportWriter):
+    """
+    CoNLL-U writer (same layout as the original GUI export)
+
+    IDs count from 1 in every sentence and HEAD is converted back from the
+    stored head token_id to the head's ID (0 for the root).
+    """
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.first_token_id = None
+
+    def begin(self):
+        self.stream.write("# global.columns = ID FORM LEMMA UPOS XPOS FEATS HEAD DEPREL DEPS MISC\n")
+
+    def write_rows(self, rows: List[tuple]) -> int:
+        lines = []
+        new_sentences = 0
+        for (doc_id, doc_name, sent_id, sent_text, _token_number, form, _norm, lemma,
+             upos, xpos, morph, dep_head, dep_rel, _start, _end, _punct, token_id) in rows:
+            if sent_id != self.current_sent_id:
+                if self.current_sent_id is not None:
+                    lines.append("")
+                self.current_sent_id = sent_id
+                self.first_token_id = token_id
+                new_sentences += 1
+                lines.append(f"# sent_id = {sent_id}")
+                lines.append(f"# text = {sent_text}")
+                lines.append(f"# doc = {doc_name}")
+            head = dep_head - self.first_token_id + 1 if dep_head is not None else 0
+            lines.append(f"{token_id - self.first_token_id + 1}\t{form or '_'}\t{lemma or '_'}\t{upos or '_'}\t"
+                         f"{xpos or '_'}\t{morph or '_'}\t{head}\t{dep_rel or '_'}\t_\t_")
+        if lines:
+            self.stream.write("\n".join(lines) + "\n")
+        return new_sentences
+
+    def end(self):
+        self.stream.write("\n")
+
+
+class NdjsonWriter(ExportWriter):
+    """One JSON object per token"""
+
+    def write_rows(self, rows: List[tuple]) -> int:
+        dumps = json.dumps
+        new_sentences = 0
+        out = []
+        for row in rows:
+            if row[2] != self.current_sent_id:
+                self.current_sent_id = row[2]
+                new_sentences += 1
+            out.append(dumps(dict(zip(EXPORT_COLUMNS, row)), ensure_ascii=False))
+        if out:
+            self.stream.write("\n".join(out) + "\n")
+        return new_sentences
+
+
+class CsvWriter(ExportWriter):
+    """CSV with a header row (sentence text omitted to keep rows small)"""
+
+    COLUMNS = [c for c in EXPORT_COLUMNS if c != 'sent_text']
+
+    def begin(self):
+        self.writer = csv.writer(self.stream)
+        self.writer.writerow(self.COLUMNS)
+
+    def write_rows(self, rows: List[tuple]) -> int:
+        new_sentences = 0
+        out = []
+        for row in rows:
+            if row[2] != self.current_sent_id:
+                self.current_sent_id = row[2]
+                new_sentences += 1
+            out.append(row[:3] + row[4:])
+        self.writer.writerows(out)
+        return new_sentences
+
+
+class TeiWriter(ExportWriter):
+    """TEI P5 XML: <div> per document, <s> per sentence, <w>/<pc> per token"""
+
+    def begin(self):
+        self.stream.write(
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<TEI xmlns="http://www.tei-c.org/ns/1.0">\n'
+            '<teiHeader><fileDesc>'
+            '<titleStmt><title>Corpus export</title></titleStmt>'
+            '<publicationStmt><p>Exported by Corpus Data Manipulator</p></publicationStmt>'
+            '<sourceDesc><p>Generated from corpus database</p></sourceDesc>'
+            '</fileDesc></teiHeader>\n'
+            '<text><body>\n'
+        )
+
+    def write_rows(self, rows: List[tuple]) -> int:
+        parts = []
+        new_sentences = 0
+        for (doc_id, doc_name, sent_id, _text, token_number, form, _norm, lemma,
+             upos, _xpos, morph, _head, _rel, _start, _end, is_punct, _token_id) in rows:
+            if doc_id != self.current_doc_id:
+                if self.current_sent_id is not None:
+                    parts.append('</s>\n')
+                    self.current_sent_id = None
+                if self.current_doc_id is not None:
+                    parts.append('</div>\n')
+                self.current_doc_id = doc_id
+                parts.append(f'<div type="document" n={quoteattr(str(doc_name))}>\n')
+            if sent_id != self.current_sent_id:
+                if self.current_sent_id is not None:
+                    parts.append('</s>\n')
+                self.current_sent_id = sent_id
+                new_sentences += 1
+                parts.append(f'<s n="{sent_id}">')
+
+            tag = 'pc' if is_punct else 'w'
+            attrs = ''
+            if lemma:
+                attrs += f' lemma={quoteattr(lemma)}'
+            if upos:
+                attrs += f' pos={quoteattr(upos)}'
+            if morph:
+                attrs += f' msd={quoteattr(morph)}'
+            parts.append(f'<{tag}{attrs}>{escape(form or "")}</{tag}> ')
+        if parts:
+            self.stream.write(''.join(parts))
+        return new_sentences
+
+    def end(self):
+        if self.current_sent_id is not None:
+            self.stream.write('</s>\n')
+        if self.current_doc_id is not None:
+            self.stream.write('</div>\n')
+        self.stream.write('</body></text>\n</TEI>\n')
+
+
+# Convenience function
+def export_corpus(db_path: str, output_path: str, fmt: Optional[str] = None,
+                  compression: Optional[str] = 'auto',
+                  progress_callback: Optional[ProgressCallback] = None) -> Dict[str, Any]:
+    """
+    Convenience function to export a corpus
+
+    Args:
+        db_path: Database path
+        output_path: Destination file
+        fmt: Export format (guessed from extension if omitted)
+        compression: None, 'gzip', 'zstd' or 'auto'
+        progress_callback: Progress callback(tokens_written, total_tokens)
+
+    Returns:
+        Export statistics
+    """
+    return CorpusExporter(db_path).export(output_path, fmt, compression, progress_callback)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Stream a corpus database to an export file")
+    parser.add_argument("db_path")
+    parser.add_argument("output_path")
+    parser.add_argument("--format", choices=EXPORT_FORMATS, default=None)
+    parser.add_argument("--compression", choices=['gzip', 'zstd', 'none', 'auto'], default='auto')
+    args = parser.parse_args()
+
+    def print_progress(done: int, total: int):
+        pct = (done / total * 100) if total else 100.0
+        print(f"\r{done:,}/{total:,} tokens ({pct:.1f}%)", end='', flush=True)
+
+    compression = None if args.compression == 'none' else args.compression
+    result = export_corpus(args.db_path, args.output_path, args.format, compression, print_progress)
+    print()
+    print(result)
@@ -53,6 +53,9 @@ from database.schema import CorpusDatabase
 from nlp.turkish_processor import TurkishNLPProcessor
 from ingestion.corpus_ingestor import CorpusIngestor
 from query.corpus_query import CorpusQuery
+from database.connection_pool import get_connection_pool
+from nlp.model_registry import get_model_registry
+from nlp.backends import registered_backends
 
 class CorpusGUI:
     """Main GUI application for Corpus Data Manipulator"""
@@ -70,8 +73,39 @@ class CorpusGUI:
         self.analysis_type = tk.StringVar(value="kwic")
         self.corpus_source_var = tk.StringVar(value="database")  # Default to database
         
+        # NLP processors per backend; the models behind them are shared
+        # through the process-wide model registry
+        self._nlp_processors = {}
+        
         # Components
         self.setup_ui()
+        
+        # Load the default real-time backend in the background, so the first
+        # analysis does not wait for the model
+        self._preload_backend(self.realtime_backend_var.get())
+    
+    def _preload_backend(self, backend):
+        """Load the model of a backend in a background thread"""
+        if backend == "simple" or get_model_registry().is_loaded(backend):
+            return
+        
+        def done(results):
+            failed = [label for label, error in results.items() if error]
+            message = f"{backend.upper()} modeli yüklenemedi" if failed else f"{backend.upper()} modeli hazır"
+            self.root.after(0, lambda: self.status_var.set(message))
+        
+        get_model_registry().preload([backend], callback=done)
+    
+    def _get_nlp_processor(self, backend):
+        """Get the NLP processor of a backend, creating it on first use"""
+        processor = self._nlp_processors.get(backend)
+        if processor is None:
+            from nlp.turkish_processor import TurkishNLPProcessor
+            processor = TurkishNLPProcessor(backend=backend)
+            # Do not keep a fallback processor: the backend may become available later
+            if processor.backend == backend:
+                self._nlp_processors[backend] = processor
+        return processor
     
     def _ensure_utf8_text(self, text):
         """Ensure text is properly encoded as UTF-8 for BERT processing"""
@@ -433,7 +467,7 @@ class CorpusGUI:
         ttk.Label(parent, text="NLP Backend:").grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
         self.backend_var = tk.StringVar(value="custom_bert")  # Default to BERT now
         backend_combo = ttk.Combobox(parent, textvariable=self.backend_var,
-                                    values=["custom_bert", "stanza", "spacy", "simple"], state="readonly")
+                                    values=registered_backends(), state="readonly")
         backend_combo.grid(row=1, column=1, sticky=tk.W, padx=(10, 5), pady=(10, 0))
 
         # File formats info
@@ -535,6 +569,8 @@ class CorpusGUI:
         
         ttk.Button(export_frame, text="CoNLL-U Formatında Dışa Aktar", 
                   command=self.export_conllu).pack(pady=10)
+        ttk.Button(export_frame, text="NDJSON / CSV / TEI XML Dışa Aktar", 
+                  command=self.export_corpus).pack(pady=(0, 10))
 
     def show_advanced_stats(self):
         """Show advanced corpus statistics"""
@@ -543,7 +579,7 @@ class CorpusGUI:
             return
             
         try:
-            query = CorpusQuery(self.db_path.get())
+            query = self._open_query()
             stats = query.get_advanced_stats()
             query.close()
             
@@ -565,7 +601,20 @@ class CorpusGUI:
             
             text.insert(tk.END, "DİLBİLİMSEL METRİKLER:\n")
             text.insert(tk.END, f"• TTR (Sözcük Çeşitliliği): %{stats['ttr']*100:.2f}\n")
-            text.insert(tk.END, "  (Yüksek TTR, zengin bir kelime dağarcığını gösterir)\n\n")
+            text.insert(tk.END, "  (TTR metin uzadıkça düşer; aşağıdaki ölçüler uzunluktan bağımsızdır)\n")
+            
+            def metric(value, fmt="{:.3f}"):
+                return fmt.format(value) if value is not None else "-"
+            
+            text.insert(tk.END, f"• MATTR:                    {metric(stats['mattr'])}\n")
+            text.insert(tk.END, f"• MTLD:                     {metric(stats['mtld'], '{:.1f}')}\n")
+            text.insert(tk.END, f"• HD-D:                     {metric(stats['hdd'])}\n")
+            text.insert(tk.END, f"• Yule K:                   {metric(stats['yules_k'], '{:.1f}')}\n\n")
+            
+            text.insert(tk.END, "OKUNABİLİRLİK:\n")
+            text.insert(tk.END, f"• Ateşman:                  {metric(stats['atesman'], '{:.1f}')}\n")
+            text.insert(tk.END, f"• Çetinkaya-Uzun:           {metric(stats['cetinkaya_uzun'], '{:.1f}')}\n")
+            text.insert(tk.END, f"• Bezirci-Yılmaz:           {metric(stats['bezirci_yilmaz'], '{:.1f}')}\n\n")
             
             text.insert(tk.END, f"• Ort. Cümle Uzunluğu:      {stats['avg_sent_len']:.2f} kelime\n\n")
             
@@ -582,70 +631,61 @@ class CorpusGUI:
 
     def export_conllu(self):
         """Export database to CoNLL-U format"""
+        self.export_corpus(default_format="conllu")
+
+    def export_corpus(self, default_format="ndjson"):
+        """Stream the whole corpus to a file in a background thread"""
         if not self.db_path.get():
             messagebox.showwarning("Uyarı", "Lütfen önce veritabanı dosyasını seçin!")
             return
-            
+        
+        filetypes = {
+            "conllu": ("CoNLL-U files", "*.conllu"),
+            "ndjson": ("NDJSON files", "*.ndjson"),
+            "csv": ("CSV files", "*.csv"),
+            "tei": ("TEI XML files", "*.xml"),
+        }
+        ordered = [filetypes[default_format]] + [ft for fmt, ft in filetypes.items() if fmt != default_format]
         filename = filedialog.asksaveasfilename(
-            title="CoNLL-U Olarak Kaydet",
-            defaultextension=".conllu",
-            filetypes=[("CoNLL-U files", "*.conllu"), ("All files", "*.*")]
+            title="Corpus'u Dışa Aktar",
+            defaultextension=filetypes[default_format][1][1:],
+            filetypes=ordered + [("Gzip compressed", "*.gz"), ("Zstandard compressed", "*.zst"),
+                                 ("All files", "*.*")]
         )
         
         if not filename:
             return
-            
-        try:
-            self.status_var.set("CoNLL-U export hazırlanıyor...")
-            self.root.update()
-            
-            query = CorpusQuery(self.db_path.get())
-            generator = query.get_all_tokens_for_export()
-            
-            with open(filename, 'w', encoding='utf-8') as f:
-                # Header info
-                f.write(f"# global.columns = ID FORM LEMMA UPOS XPOS FEATS HEAD DEPREL DEPS MISC\n")
-                
-                sent_count = 0
-                
-                for row, is_new_sent in generator:
-                    sent_id, token_num, form, lemma, upos, xpos, morph, head, dep, text, doc = row
-                    
-                    if is_new_sent:
-                        if sent_count > 0:
-                            f.write("\n") # Empty line between sentences
-                        
-                        sent_count += 1
-                        # Sentence headers
-                        f.write(f"# sent_id = {sent_id}\n")
-                        f.write(f"# text = {text}\n")
-                        f.write(f"# doc = {doc}\n")
-                    
-                    # CoNLL-U Fields (1-based index)
-                    # ID, FORM, LEMMA, UPOS, XPOS, FEATS, HEAD, DEPREL, DEPS, MISC
-                    
-                    # Handle None values
-                    form = form if form else "_"
-                    lemma = lemma if lemma else "_"
-                    upos = upos if upos else "_"
-                    xpos = xpos if xpos else "_"
-                    morph = morph if morph else "_"
-                    head = str(head) if head is not None else "0" # Root is usually 0
-                    dep = dep if dep else "_"
-                    
-                    # Write line
-                    # ID is token_num + 1 (1-based)
-                    f.write(f"{token_num + 1}\t{form}\t{lemma}\t{upos}\t{xpos}\t{morph}\t{head}\t{dep}\t_\t_\n")
-                
-                f.write("\n") # Final newline
-                
-            query.close()
-            self.status_var.set("CoNLL-U export tamamlandı")
-            messagebox.showinfo("Başarılı", f"CoNLL-U dosyası oluşturuldu:\n{filename}")
-            
-        except Exception as e:
-            messagebox.showerror("Hata", f"Export hatası: {e}")
-            self.status_var.set("Hata oluştu")
+        
+        from export.corpus_exporter import CorpusExporter
+        
+        self.status_var.set("Corpus dışa aktarılıyor...")
+        
+        def on_progress(done, total):
+            pct = (done / total * 100) if total else 100.0
+            self.root.after(0, self.status_var.set, f"Dışa aktarılıyor: {done:,}/{total:,} token (%{pct:.0f})")
+        
+        def on_complete(stats):
+            self.root.after(0, self._export_complete, stats)
+        
+        def on_error(error):
+            self.root.after(0, self._export_error, str(error))
+        
+        exporter = CorpusExporter(self.db_path.get())
+        exporter.export_in_background(filename, progress_callback=on_progress,
+                                      on_complete=on_complete, on_error=on_error)
+
+    def _export_complete(self, stats):
+        """Handle successful corpus export"""
+        self.status_var.set("Dışa aktarma tamamlandı")
+        messagebox.showinfo("Başarılı",
+                            f"Dosya oluşturuldu:\n{stats['output_path']}\n"
+                            f"Format: {stats['format']}\n"
+                            f"Token: {stats['tokens_written']:,}")
+
+    def _export_error(self, error_msg):
+        """Handle corpus export error"""
+        self.status_var.set("Hata oluştu")
+        messagebox.showerror("Hata", f"Export hatası: {error_msg}")
         
     def run_bert_retagging(self):
         """Run BERT re-tagging in background"""
@@ -753,7 +793,7 @@ class CorpusGUI:
         if not self.visualizer: return
         
         try:
-            query = CorpusQuery(self.db_path.get())
+            query = self._open_query()
             # Get top 20 words
             data = query.frequency_list(limit=20)
             query.close()
@@ -774,7 +814,7 @@ class CorpusGUI:
         if not self.visualizer: return
         
         try:
-            query = CorpusQuery(self.db_path.get())
+            query = self._open_query()
             # Get POS distribution
             data = query.get_pos_distribution()
             query.close()
@@ -795,7 +835,7 @@ class CorpusGUI:
         if not self.visualizer: return
         
         try:
-            query = CorpusQuery(self.db_path.get())
+            query = self._open_query()
             # Get top 100 words for word cloud
             data = query.frequency_list(limit=100)
             query.close()
@@ -817,6 +857,15 @@ class CorpusGUI:
             return False
         return True
 
+    def _open_query(self):
+        """
+        Open a CorpusQuery on the shared connection pool of the selected database
+        (FileNotFoundError if it does not exist; the pooled reader of a worker
+        thread is closed once the thread has finished)
+        """
+        db_path = self.db_path.get()
+        return CorpusQuery(db_path, pool=get_connection_pool(db_path))
+
     def setup_analysis_section(self, parent):
         """Setup analysis section"""
 
@@ -875,8 +924,10 @@ class CorpusGUI:
         ttk.Label(analysis_frame, text="NLP Backend:").grid(row=0, column=0, sticky=tk.W)
         self.realtime_backend_var = tk.StringVar(value="custom_bert")
         backend_combo = ttk.Combobox(analysis_frame, textvariable=self.realtime_backend_var,
-                                    values=["custom_bert", "stanza", "spacy", "simple"], state="readonly")
+                                    values=registered_backends(), state="readonly")
         backend_combo.grid(row=0, column=1, sticky=tk.W, padx=(10, 5))
+        backend_combo.bind("<<ComboboxSelected>>",
+                           lambda event: self._preload_backend(self.realtime_backend_var.get()))
         
         # Word selection
         ttk.Label(analysis_frame, text="Kelime Seç:").grid(row=1, column=0, sticky=tk.W, pady=(10, 0))
@@ -1003,7 +1054,11 @@ class CorpusGUI:
             self.root.update()
             
             ingestor = CorpusIngestor(self.db_path.get(), nlp_backend=self.backend_var.get())
-            stats = ingestor.ingest_directory(self.corpus_dir.get())
+            # Reading, annotation and database writes overlap; stage progress
+            # is shown in the status bar as it arrives
+            stats = ingestor.ingest_directory(
+                self.corpus_dir.get(), pipeline=True,
+                progress_callback=lambda progress: self.root.after(0, self._ingestion_progress, progress))
             ingestor.close()
             
             # Update UI in main thread
@@ -1012,6 +1067,14 @@ class CorpusGUI:
         except Exception as e:
             self.root.after(0, self._ingestion_error, str(e))
             
+    def _ingestion_progress(self, progress):
+        """Show live pipeline throughput in the status bar"""
+        stages = progress['stages']
+        self.status_var.set(
+            f"Corpus içeri aktarılıyor... {progress['files_written']}/{progress['files_total']} dosya, "
+            f"{stages['write']['tokens']} token ({stages['annotate']['tokens_per_second']:.0f} token/s, "
+            f"kuyruk: {stages['annotate']['queue_depth']})")
+        
     def _ingestion_complete(self, stats):
         """Handle successful ingestion"""
         self.status_var.set("Corpus içeri aktarımı tamamlandı")
@@ -1034,7 +1097,7 @@ class CorpusGUI:
                 messagebox.showwarning("Uyarı", "Lütfen veritabanı dosyasını belirtin!")
                 return
                 
-            query = CorpusQuery(self.db_path.get())
+            query = self._open_query()
             
             if self.analysis_type.get() == "kwic":
                 self._run_kwic_analysis(query)
@@ -1173,7 +1236,7 @@ class CorpusGUI:
             messagebox.showwarning("Uyarı", "Lütfen veritabanı dosyasını belirtin!")
             return
             
-        query = CorpusQuery(self.db_path.get())
+        query = self._open_query()
         
         if self.analysis_type.get() == "kwic":
             self._run_kwic_analysis(query)
@@ -1344,7 +1407,7 @@ class CorpusGUI:
     def show_stats(self):
         """Show database statistics"""
         try:
-            query = CorpusQuery(self.db_path.get())
+            query = self._open_query()
             stats = query.get_processing_stats()
             query.close()
             
@@ -1386,7 +1449,7 @@ class CorpusGUI:
                 
             self.status_var.set("Veritabanından kelimeler yükleniyor...")
             
-            query = CorpusQuery(self.db_path.get())
+            query = self._open_query()
             
             # Get frequency list to populate word list
             results = query.frequency_list(word_type='norm', limit=100)
@@ -1440,9 +1503,8 @@ class CorpusGUI:
             self.status_var.set(f"{backend.upper()} analizi yapılıyor...")
             self.root.update()
             
-            # Create NLP processor based on selected backend
-            from nlp.turkish_processor import TurkishNLPProcessor
-            processor = TurkishNLPProcessor(backend=backend)
+            # Reuse the processor of the selected backend (model loaded once)
+            processor = self._get_nlp_processor(backend)
             
             # Process text
             tokens = processor.process_text(text_to_process)
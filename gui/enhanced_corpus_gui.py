@@ -57,6 +57,7 @@ sys.path.insert(0, project_root)
 
 from database.schema import CorpusDatabase
 from nlp.turkish_processor import TurkishNLPProcessor
+from nlp.backends import registered_backends
 from ingestion.corpus_ingestor import CorpusIngestor
 from query.corpus_query import CorpusQuery
 from model_mapper import TurkishModelMapper
@@ -187,7 +188,7 @@ class EnhancedCorpusGUI:
         ttk.Label(ingest_frame, text="NLP Backend:").grid(row=1, column=0, sticky=tk.W, pady=(5, 10))
         self.backend_var = tk.StringVar(value="custom_bert")
         backend_combo = ttk.Combobox(ingest_frame, textvariable=self.backend_var, 
-                                    values=["custom_bert", "stanza", "spacy", "simple"], state="readonly")
+                                    values=registered_backends(), state="readonly")
         backend_combo.grid(row=1, column=1, sticky=tk.W, padx=(10, 5), pady=(5, 10))
         
         # File formats info
@@ -945,16 +946,18 @@ class EnhancedCorpusGUI:
                 messagebox.showerror("Eksik Kütüphane", error_msg)
                 return
             
-            # Create BERT processor
-            from nlp.custom_bert_processor import create_custom_bert_processor
+            # Shared BERT processor (loaded once per model path)
+            from nlp.model_registry import get_model_registry
             
             # Get selected model path
             model_path = self.bert_analysis_model_path.get().strip() or None
             
-            bert_processor = create_custom_bert_processor(model_path=model_path)
+            bert_processor = get_model_registry().get('custom_bert', model_path)
             
             # Check if model is loaded
             if not bert_processor.is_loaded:
+                # Drop the fallback processor so the next attempt retries the download
+                get_model_registry().unload('custom_bert', model_path)
                 self.status_var.set("BERT modeli yüklenemedi")
                 error_msg = (
                     "BERT modeli yüklenemedi.\n\n"
@@ -1009,8 +1012,9 @@ class EnhancedCorpusGUI:
         
         # Model info
         try:
-            from nlp.custom_bert_processor import create_custom_bert_processor
-            bert_processor = create_custom_bert_processor()
+            from nlp.model_registry import get_model_registry
+            model_path = self.bert_analysis_model_path.get().strip() or None
+            bert_processor = get_model_registry().get('custom_bert', model_path)
             info = bert_processor.get_model_info()
             self.bert_results_text.insert(tk.END, f"Model: {info['model_path']}\n")
             self.bert_results_text.insert(tk.END, f"Yüklendi: {'Evet' if info['is_loaded'] else 'Hayır'}\n\n")
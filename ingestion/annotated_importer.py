@@ -0,0 +1,488 @@
+"""
+Annotated Corpus Importer
+
+Fast path for corpora that arrive already annotated. No NLP backend is
+loaded; annotations are parsed straight into bulk sentence/token inserts:
+- CoNLL-U (.conllu / .conll), streamed line by line, `# newdoc` aware
+- Word/tag CSV in the `Cleaned-for-tags.csv` layout (Full_Sentence, Word, Tag)
+
+Token and sentence ids are allocated up front inside one write transaction,
+so CoNLL-U HEAD values (sentence-relative, 1-based) are resolved to absolute
+`tokens.token_id` values without a second pass. token_number is the
+sentence-relative position (CoNLL-U ID - 1), matching the CoNLL-U exporter.
+"""
+
+import csv
+import hashlib
+import time
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+import logging
+
+from database.schema import CorpusDatabase
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CONLLU_EXTENSIONS = ('.conllu', '.conll')
+CSV_EXTENSIONS = ('.csv',)
+
+# Tags used by Cleaned-for-tags.csv (and the fine-tuned BERT model) -> UPOS
+TAG_TO_UPOS = {
+    'AD-NOUN': 'NOUN',
+    'İSİM-NOUN': 'NOUN',
+    'AD-PROPN': 'PROPN',
+    'FİİL-VERB': 'VERB',
+    'FIIL-AUX': 'AUX',
+    'SIFAT-ADJECTIVE': 'ADJ',
+    'SIFAT-ADJ': 'ADJ',
+    'BELİRTEÇ-ADVERB': 'ADV',
+    'ZARF-ADV': 'ADV',
+    'ADIL-PRONOUN': 'PRON',
+    'ZAMİR-PRON': 'PRON',
+    'ZAMIR-PRON': 'PRON',
+    'BELİRLEYİCİ-DET': 'DET',
+    'BELIRTEÇ-DET': 'DET',
+    'İLGEÇ-PREPOS': 'ADP',
+    'EDAT-ADP': 'ADP',
+    'BAĞLAÇ-CONJ': 'CCONJ',
+    'BAGLAÇ-CCONJ': 'CCONJ',
+    'BAGLAÇ-SCONJ': 'SCONJ',
+    'NOKTALAMA-PUNCTUATION': 'PUNCT',
+    'NOKTALAMA-PUNC': 'PUNCT',
+    'NOKTALAMA-PUNCT': 'PUNCT',
+    'SAYI-NUM': 'NUM',
+    'SORU-QUESTION': 'INTJ',
+    'UNLEM-INTJ': 'INTJ',
+    'SIMGE-SYM': 'SYM',
+}
+
+TOKEN_INSERT_SQL = """
+    INSERT INTO tokens (
+        token_id, doc_id, sent_id, token_number, form, norm, lemma, upos, xpos,
+        morph, dep_head, dep_rel, start_char, end_char,
+        is_punctuation, is_space
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+SENTENCE_INSERT_SQL = """
+    INSERT INTO sentences (sent_id, doc_id, sent_number, sent_text, token_start, token_end)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+
+def next_row_id(cursor, table: str, column: str) -> int:
+    """
+    Next free AUTOINCREMENT id (never reuses ids of deleted rows)
+
+    Only safe to hand out ranges from while holding the write lock.
+    """
+    cursor.execute(f"SELECT COALESCE(MAX({column}), 0) FROM {table}")
+    max_id = cursor.fetchone()[0]
+    cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,))
+    row = cursor.fetchone()
+    seq = row[0] if row else 0
+    return max(max_id, seq) + 1
+
+
+# One parsed sentence: (sent_text or None, [(form, lemma, upos, xpos, feats, head, deprel, space_after)])
+ParsedSentence = Tuple[Optional[str], List[tuple]]
+
+
+def iter_conllu(path: Path) -> Iterator[Tuple[str, Any]]:
+    """
+    Stream a CoNLL-U file ('_' fields become None)
+
+    Yields ('newdoc', doc_id) for `# newdoc` comments and ('sentence', ParsedSentence)
+    for every sentence. Multiword-token ranges and empty nodes are skipped; their
+    syntactic words are kept.
+    """
+    text = None
+    words: List[tuple] = []
+
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.rstrip('\n').rstrip('\r')
+            if not line:
+                if words:
+                    yield 'sentence', (text, words)
+                text = None
+                words = []
+                continue
+
+            if line[0] == '#':
+                if line.startswith('# text ='):
+                    text = line[8:].strip()
+                elif line.startswith('# newdoc'):
+                    if words:
+                        yield 'sentence', (text, words)
+                        text = None
+                        words = []
+                    _, _, doc_name = line.partition('=')
+                    yield 'newdoc', doc_name.strip() or None
+                continue
+
+            cols = line.split('\t')
+            if len(cols) != 10:
+                raise ValueError(f"{path}: expected 10 columns, got {len(cols)}: {line[:80]!r}")
+
+            token_id = cols[0]
+            if '-' in token_id or '.' in token_id:
+                continue
+
+            _id, form, lemma, upos, xpos, feats, head, deprel, _deps, misc = cols
+            words.append((
+                form,
+                lemma if lemma != '_' else None,
+                upos if upos != '_' else None,
+                xpos if xpos != '_' else None,
+                feats if feats != '_' else None,
+                int(head) if head != '_' and head else None,
+                deprel if deprel != '_' else None,
+                misc == '_' or 'SpaceAfter=No' not in misc,
+            ))
+
+    if words:
+        yield 'sentence', (text, words)
+
+
+def iter_tagged_csv(path: Path) -> Iterator[Tuple[str, Any]]:
+    """
+    Stream a Full_Sentence,Word,Tag CSV (consecutive rows of one sentence are grouped)
+
+    Yields ('sentence', ParsedSentence) like iter_conllu.
+    """
+    with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        columns = {name.strip(): i for i, name in enumerate(header)}
+        try:
+            sent_col, word_col, tag_col = columns['Full_Sentence'], columns['Word'], columns['Tag']
+        except KeyError:
+            raise ValueError(f"{path}: expected columns Full_Sentence, Word, Tag; got {header}")
+
+        current = None
+        words: List[tuple] = []
+        for row in reader:
+            if len(row) <= max(sent_col, word_col, tag_col):
+                continue
+            sentence, word, tag = row[sent_col], row[word_col], row[tag_col].strip()
+            if sentence != current:
+                if words:
+                    yield 'sentence', (current, words)
+                current = sentence
+                words = []
+            upos = TAG_TO_UPOS.get(tag)
+            words.append((word, None, upos, tag or None, None, None, None, True))
+
+        if words:
+            yield 'sentence', (current, words)
+
+
+class AnnotatedCorpusImporter:
+    """Bulk-imports pre-annotated CoNLL-U and word/tag CSV files without NLP"""
+
+    def __init__(self, db_path: str = "corpus.db", batch_size: int = 50000,
+                 db: Optional[CorpusDatabase] = None, defer_indexes: bool = False):
+        """
+        Initialize the importer
+
+        Args:
+            db_path: Path to SQLite database
+            batch_size: Tokens per executemany() call
+            db: Existing connected CorpusDatabase to reuse (e.g. from CorpusIngestor)
+            defer_indexes: Drop secondary token indices for the duration of an
+                import and rebuild them afterwards. Much faster for large loads;
+                queries run without those indices until the import finishes.
+        """
+        self.owns_db = db is None
+        if db is None:
+            db = CorpusDatabase(db_path)
+            db.connect()
+            db.create_schema()
+        self.db = db
+        self.batch_size = batch_size
+        self.defer_indexes = defer_indexes
+        self._bulk_depth = 0
+
+        # A larger page cache keeps index pages hot during bulk inserts
+        self.db.connection.execute("PRAGMA cache_size = -262144")
+        self.db.connection.execute("PRAGMA temp_store = MEMORY")
+
+        self.stats = {
+            'documents_processed': 0,
+            'sentences_processed': 0,
+            'tokens_processed': 0,
+            'files_skipped': 0,
+            'errors': 0
+        }
+
+    def import_directory(self, directory_path: str,
+                         file_patterns: Optional[List[str]] = None) -> Dict[str, Any]:
+        """
+        Import all annotated files in a directory
+
+        Args:
+            directory_path: Directory to scan
+            file_patterns: Glob patterns (default: ['*.conllu', '*.conll'])
+
+        Returns:
+            Processing statistics
+        """
+        if file_patterns is None:
+            file_patterns = ['*.conllu', '*.conll']
+        directory = Path(directory_path)
+        if not directory.exists():
+            raise FileNotFoundError(f"Directory not found: {directory_path}")
+
+        files = sorted({p for pattern in file_patterns for p in directory.glob(pattern)})
+        logger.info(f"Found {len(files)} annotated files to import")
+        self._begin_bulk_load()
+        try:
+            for file_path in files:
+                try:
+                    self.import_file(file_path)
+                except Exception as e:
+                    logger.error(f"Error importing file {file_path}: {e}")
+                    self.stats['errors'] += 1
+        finally:
+            self._end_bulk_load()
+        return self.stats.copy()
+
+    def _begin_bulk_load(self):
+        """Drop secondary token indices when defer_indexes is enabled (re-entrant)"""
+        self._bulk_depth += 1
+        if self.defer_indexes and self._bulk_depth == 1:
+            cursor = self.db.connection.cursor()
+            self.db._drop_token_indices(cursor)
+            self.db.connection.commit()
+
+    def _end_bulk_load(self):
+        """Rebuild indices dropped by _begin_bulk_load"""
+        self._bulk_depth -= 1
+        if self.defer_indexes and self._bulk_depth == 0:
+            start = time.perf_counter()
+            cursor = self.db.connection.cursor()
+            self.db._create_indices(cursor)
+            self.db.connection.commit()
+            logger.info(f"Rebuilt token indices in {time.perf_counter() - start:.2f}s")
+
+    def import_file(self, file_path) -> Optional[int]:
+        """
+        Import a single CoNLL-U or word/tag CSV file
+
+        Returns:
+            doc_id of the first document created, or None if the file was skipped
+        """
+        file_path = Path(file_path)
+        ext = file_path.suffix.lower()
+        if ext in CONLLU_EXTENSIONS:
+            events = iter_conllu(file_path)
+        elif ext in CSV_EXTENSIONS:
+            events = iter_tagged_csv(file_path)
+        else:
+            raise ValueError(f"Unsupported annotated format: {ext}")
+
+        file_hash = self._hash_file(file_path)
+        cursor = self.db.connection.cursor()
+        cursor.execute("SELECT doc_id FROM documents WHERE file_hash = ?", (file_hash,))
+        if cursor.fetchone() is not None:
+            logger.info(f"Document already exists: {file_path.name}")
+            self.stats['files_skipped'] += 1
+            return None
+
+        start = time.perf_counter()
+        self._begin_bulk_load()
+        try:
+            first_doc_id, n_sents, n_tokens = self._write_events(file_path, file_hash, events)
+        finally:
+            self._end_bulk_load()
+        elapsed = time.perf_counter() - start
+
+        rate = n_tokens / elapsed if elapsed else 0.0
+        logger.info(f"Imported {file_path.name}: {n_sents} sentences, {n_tokens} tokens "
+                    f"in {elapsed:.2f}s ({rate:,.0f} tokens/s)")
+        return first_doc_id
+
+    @staticmethod
+    def _hash_file(file_path: Path) -> str:
+        """MD5 of the raw file bytes, read in 1 MiB blocks"""
+        md5 = hashlib.md5()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                md5.update(block)
+        return md5.hexdigest()
+
+    def _write_events(self, file_path: Path, file_hash: str,
+                      events: Iterator[Tuple[str, Any]]) -> Tuple[Optional[int], int, int]:
+        """Write all documents of one file in a single transaction"""
+        conn = self.db.connection
+        cursor = conn.cursor()
+
+        # Take the write lock now so the id ranges below cannot be handed out twice
+        if conn.in_transaction:
+            conn.commit()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Index FTS once per file instead of per row via the insert trigger
+            cursor.execute("DROP TRIGGER IF EXISTS tokens_ai")
+
+            next_token_id = next_row_id(cursor, 'tokens', 'token_id')
+            next_sent_id = next_row_id(cursor, 'sentences', 'sent_id')
+            first_token_id = next_token_id
+
+            token_rows: List[tuple] = []
+            sentence_rows: List[tuple] = []
+            doc_counts: List[list] = []   # [doc_id, sentences, tokens, text_length]
+            first_doc_id = None
+            doc_id = None
+            doc_index = 0
+            sent_number = 0
+            doc_token_count = 0
+
+            def open_document(name: Optional[str]):
+                nonlocal doc_id, doc_index, sent_number, doc_token_count, first_doc_id
+                doc_name = name or file_path.name
+                doc_hash = file_hash if doc_index == 0 else f"{file_hash}:{doc_index}"
+                cursor.execute("""
+                    INSERT INTO documents (doc_name, file_path, file_size, file_hash)
+                    VALUES (?, ?, ?, ?)
+                """, (doc_name, str(file_path), file_path.stat().st_size, doc_hash))
+                doc_id = cursor.lastrowid
+                if first_doc_id is None:
+                    first_doc_id = doc_id
+                doc_counts.append([doc_id, 0, 0, 0])
+                doc_index += 1
+                sent_number = 0
+                doc_token_count = 0
+
+            total_sents = 0
+            total_tokens = 0
+            for kind, payload in events:
+                if kind == 'newdoc':
+                    # A newdoc before any sentence just names the first document
+                    if doc_id is not None and doc_counts[-1][1] == 0:
+                        cursor.execute("UPDATE documents SET doc_name = ? WHERE doc_id = ?",
+                                       (payload or file_path.name, doc_id))
+                    else:
+                        open_document(payload)
+                    continue
+
+                if doc_id is None:
+                    open_document(None)
+
+                text, words = payload
+                sent_id = next_sent_id
+                next_sent_id += 1
+                sent_number += 1
+                base_token_id = next_token_id
+
+                offset = 0
+                forms = []
+                for i, (form, lemma, upos, xpos, feats, head, deprel, space_after) in enumerate(words):
+                    start_char = offset
+                    end_char = start_char + len(form)
+                    offset = end_char + (1 if space_after else 0)
+                    if head:
+                        dep_head = base_token_id + head - 1
+                    else:
+                        dep_head = None
+                    if head == 0 and deprel is None:
+                        deprel = 'root'
+                    token_rows.append((
+                        next_token_id, doc_id, sent_id, i, form, form.lower(), lemma,
+                        upos, xpos, feats, dep_head, deprel, start_char, end_char,
+                        int(upos == 'PUNCT'), 0
+                    ))
+                    next_token_id += 1
+                    forms.append(form)
+                    forms.append(' ' if space_after else '')
+
+                if text is None:
+                    text = ''.join(forms).strip()
+
+                sentence_rows.append((sent_id, doc_id, sent_number, text,
+                                      doc_token_count, doc_token_count + len(words)))
+                doc_token_count += len(words)
+                counts = doc_counts[-1]
+                counts[1] += 1
+                counts[2] += len(words)
+                counts[3] += len(text) + 1
+                total_sents += 1
+                total_tokens += len(words)
+
+                if len(token_rows) >= self.batch_size:
+                    cursor.executemany(SENTENCE_INSERT_SQL, sentence_rows)
+                    cursor.executemany(TOKEN_INSERT_SQL, token_rows)
+                    sentence_rows = []
+                    token_rows = []
+
+            if sentence_rows:
+                cursor.executemany(SENTENCE_INSERT_SQL, sentence_rows)
+            if token_rows:
+                cursor.executemany(TOKEN_INSERT_SQL, token_rows)
+
+            cursor.executemany("""
+                UPDATE documents SET sentence_count = ?, token_count = ?, text_length = ?
+                WHERE doc_id = ?
+            """, [(sents, toks, max(length - 1, 0), d_id) for d_id, sents, toks, length in doc_counts])
+
+            cursor.execute("""
+                INSERT INTO tokens_fts(rowid, form, norm, lemma)
+                SELECT token_id, form, norm, lemma FROM tokens
+                WHERE token_id >= ? AND token_id < ?
+            """, (first_token_id, next_token_id))
+
+            self.db._create_triggers(cursor)
+            conn.commit()
+
+        except Exception:
+            conn.rollback()
+            raise
+
+        self.stats['documents_processed'] += len(doc_counts)
+        self.stats['sentences_processed'] += total_sents
+        self.stats['tokens_processed'] += total_tokens
+        return first_doc_id, total_sents, total_tokens
+
+    def close(self):
+        """Close database connection (only if this importer opened it)"""
+        if self.owns_db:
+            self.db.close()
+
+
+# Convenience function for quick imports
+def import_annotated_corpus(path: str, db_path: str = "corpus.db",
+                            defer_indexes: bool = True) -> Dict[str, Any]:
+    """
+    Import a CoNLL-U / word-tag CSV file or a directory of CoNLL-U files
+
+    Args:
+        path: File or directory
+        db_path: Database path
+        defer_indexes: Rebuild token indices once at the end instead of per row
+
+    Returns:
+        Processing statistics
+    """
+    importer = AnnotatedCorpusImporter(db_path, defer_indexes=defer_indexes)
+    try:
+        if Path(path).is_dir():
+            return importer.import_directory(path)
+        importer.import_file(path)
+        return importer.stats.copy()
+    finally:
+        importer.close()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) < 2:
+        print("Usage: python -m ingestion.annotated_importer <file.conllu|file.csv|directory> [db_path]")
+        sys.exit(1)
+
+    db = sys.argv[2] if len(sys.argv) > 2 else "corpus.db"
+    print(import_annotated_corpus(sys.argv[1], db))
@@ -8,340 +8,631 @@ and storing the results in the database.
 import os
 import sqlite3
 import logging
-import json
-import xml.etree.ElementTree as ET
+from itertools import chain, islice, tee
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable
 from tqdm import tqdm
 import hashlib
+from datetime import datetime
 
 from database.schema import CorpusDatabase
 from nlp.turkish_processor import TurkishNLPProcessor
+from nlp.backends import Token, Sentence, CACHEABLE
+from ingestion.annotated_importer import (AnnotatedCorpusImporter, CONLLU_EXTENSIONS,
+                                          SENTENCE_INSERT_SQL, TOKEN_INSERT_SQL, next_row_id)
+from ingestion.streaming_readers import iter_file_chunks, DEFAULT_CHUNK_SIZE
+from ingestion.metadata import MetadataCollector
+from ingestion.pipeline import IngestionPipeline
+from ingestion.profiler import IngestionProfiler, profile_code, write_run_report, default_report_base
+from nlp.annotation_cache import default_cache_path
+from query.subcorpus import SubcorpusManager
+from analysis.dispersion import DispersionAnalyzer
+from analysis.lexical_diversity import LexicalStatsIndex
+
+try:
+    from config.config import (LOGS_DIR, INGESTION_RUN_REPORTS, INGESTION_CODE_PROFILER,
+                               DOCUMENT_METADATA_FIELDS, DISPERSION_AFTER_INGESTION)
+except ImportError:
+    LOGS_DIR = Path('logs')
+    INGESTION_RUN_REPORTS = False
+    INGESTION_CODE_PROFILER = 'none'
+    DISPERSION_AFTER_INGESTION = False
+    DOCUMENT_METADATA_FIELDS = ['author', 'title', 'date', 'year', 'category', 'genre', 'source']
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def find_corpus_files(directory_path: str, file_patterns: Optional[List[str]] = None,
+                      max_files: Optional[int] = None) -> List[Path]:
+    """
+    Files of a directory matching the patterns, sorted
+    
+    Args:
+        directory_path: Directory to search (not recursive)
+        file_patterns: Glob patterns (default: ['*.txt', '*.json', '*.xml', '*.conllu'])
+        max_files: Keep only the first max_files files
+    """
+    # Default file patterns if none provided
+    if file_patterns is None:
+        file_patterns = ['*.txt', '*.json', '*.xml', '*.conllu']
+    directory = Path(directory_path)
+    if not directory.exists():
+        raise FileNotFoundError(f"Directory not found: {directory_path}")
+    
+    # Find files matching patterns
+    text_files = []
+    for pattern in file_patterns:
+        text_files.extend(list(directory.glob(pattern)))
+    
+    # Remove duplicates and sort
+    text_files = sorted(list(set(text_files)))
+    
+    if max_files:
+        text_files = text_files[:max_files]
+    
+    logger.info(f"Found {len(text_files)} files to process from patterns: {file_patterns}")
+    return text_files
+
+
 class CorpusIngestor:
     """Handles corpus ingestion from text files to database"""
     
-    def __init__(self, db_path: str = "corpus.db", nlp_backend: str = 'auto'):
+    def __init__(self, db_path: str = "corpus.db", nlp_backend: str = 'auto',
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, annotation_cache: bool = True,
+                 annotation_cache_path: Optional[str] = None, code_profiler: Optional[str] = None,
+                 metadata_fields: Optional[List[str]] = None):
         """
         Initialize the corpus ingestor
         
         Args:
             db_path: Path to SQLite database
             nlp_backend: NLP backend to use ('auto', 'spacy', 'stanza', 'simple')
+            chunk_size: Characters of text read and annotated at a time; bounds
+                        memory for very large input files
+            annotation_cache: Reuse annotations of previously seen sentences
+                              (model backends only)
+            annotation_cache_path: Cache file (default: <db name>.annotations.db
+                                   next to the database)
+            code_profiler: Profile ingest_directory runs with 'cprofile' or
+                           'pyinstrument' (default: INGESTION_CODE_PROFILER
+                           from the config)
+            metadata_fields: JSON keys / XML attributes and elements stored as
+                             document metadata (default: DOCUMENT_METADATA_FIELDS
+                             from the config; empty to store none)
         """
+        self.chunk_size = chunk_size
         self.db = CorpusDatabase(db_path)
         self.db.connect()
         self.db.create_schema()
         
         # Initialize NLP processor
         self.nlp_processor = TurkishNLPProcessor(backend=nlp_backend)
+        if annotation_cache and self.nlp_processor.supports(CACHEABLE):
+            self.nlp_processor.enable_annotation_cache(
+                annotation_cache_path or str(default_cache_path(db_path)))
         
         # Track processing statistics
         self.stats = {
             'documents_processed': 0,
             'sentences_processed': 0,
             'tokens_processed': 0,
+            'files_skipped': 0,
             'errors': 0
         }
+        # Per-stage statistics of the last pipelined run
+        self.pipeline_stats: Optional[Dict[str, Any]] = None
+        # Wall/CPU time per ingestion stage and database latencies
+        self.profiler = IngestionProfiler()
+        self.code_profiler = (code_profiler or INGESTION_CODE_PROFILER).lower()
+        self.code_profile: Dict[str, Any] = {}
+        self.metadata_fields = list(DOCUMENT_METADATA_FIELDS if metadata_fields is None else metadata_fields)
         
     def ingest_directory(self, directory_path: str, 
                         file_patterns: Optional[List[str]] = None,
                         max_files: Optional[int] = None,
-                        batch_size: int = 1000) -> Dict[str, Any]:
+                        batch_size: int = 1000,
+                        pipeline: bool = False,
+                        reader_threads: int = 2,
+                        annotator_workers: Optional[int] = None,
+                        progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        report_path: Optional[str] = None) -> Dict[str, Any]:
         """
         Ingest all text files from a directory
         
         Args:
             directory_path: Path to directory containing text files
-            file_patterns: List of patterns to match files (default: ['*.txt', '*.json', '*.xml'])
+            file_patterns: List of patterns to match files (default: ['*.txt', '*.json', '*.xml', '*.conllu'])
             max_files: Maximum number of files to process
             batch_size: Number of tokens to insert per database batch
+            pipeline: Read, annotate and write concurrently (see ingestion.pipeline)
+            reader_threads: File reader threads of the pipeline
+            annotator_workers: Annotator processes of the pipeline (None: one per
+                               spare CPU; 0: annotate in a thread of this process)
+            progress_callback: Called with the pipeline's per-stage statistics
+                               about once a second
+            report_path: Write a JSON run report here (with
+                         INGESTION_RUN_REPORTS or a code profiler configured,
+                         one is written into LOGS_DIR anyway)
             
         Returns:
             Processing statistics
         """
+        text_files = find_corpus_files(directory_path, file_patterns, max_files)
+        return self.ingest_files(text_files, batch_size, pipeline, reader_threads, annotator_workers,
+                                 progress_callback, report_path, source=str(Path(directory_path)))
+    
+    def ingest_files(self, text_files: List[Path],
+                     batch_size: int = 1000,
+                     pipeline: bool = False,
+                     reader_threads: int = 2,
+                     annotator_workers: Optional[int] = None,
+                     progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                     report_path: Optional[str] = None,
+                     source: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Ingest a list of files (see ingest_directory for the arguments)
         
-        # Default file patterns if none provided
-        if file_patterns is None:
-            file_patterns = ['*.txt', '*.json', '*.xml']
-        directory = Path(directory_path)
-        if not directory.exists():
-            raise FileNotFoundError(f"Directory not found: {directory_path}")
-        
-        # Find files matching patterns
-        text_files = []
-        for pattern in file_patterns:
-            text_files.extend(list(directory.glob(pattern)))
-        
-        # Remove duplicates and sort
-        text_files = sorted(list(set(text_files)))
-        
-        if max_files:
-            text_files = text_files[:max_files]
-        
-        logger.info(f"Found {len(text_files)} files to process from patterns: {file_patterns}")
-        
-        total_files = len(text_files)
-        for i, file_path in enumerate(tqdm(text_files, desc="Processing files")):
-            try:
-                logger.info(f"Processing file {i+1}/{total_files}: {file_path.name}")
-                self.ingest_file(file_path, batch_size)
-                
-            except Exception as e:
-                logger.error(f"Error processing file {file_path}: {e}")
-                self.stats['errors'] += 1
+        Args:
+            source: Recorded as the run report's 'directory'
+            
+        Returns:
+            Processing statistics
+        """
+        # Code profiler output goes next to the run report
+        report_base = Path(report_path).with_suffix('') if report_path else default_report_base(LOGS_DIR)
+        started_at = datetime.now()
+        with profile_code(self.code_profiler, report_base) as code_profile:
+            if pipeline:
+                runner = IngestionPipeline(self, reader_threads=reader_threads,
+                                           annotator_workers=annotator_workers,
+                                           progress_callback=progress_callback)
+                self.pipeline_stats = runner.run(text_files, batch_size)
+            else:
+                total_files = len(text_files)
+                for i, file_path in enumerate(tqdm(text_files, desc="Processing files")):
+                    try:
+                        logger.info(f"Processing file {i+1}/{total_files}: {file_path.name}")
+                        self.ingest_file(file_path, batch_size)
+                        
+                    except Exception as e:
+                        logger.error(f"Error processing file {file_path}: {e}")
+                        self.stats['errors'] += 1
+        self.code_profile = code_profile
+        
+        # Subcorpora include the new documents that match their definitions
+        refreshed = SubcorpusManager(self.db.connection).refresh_all()
+        if refreshed:
+            logger.info(f"Refreshed {refreshed} subcorpora")
+        
+        # Documents stored without lexical statistics (CoNLL-U imports) get them
+        with self.profiler.stage('lexical') as timer:
+            timer.units = LexicalStatsIndex(self.db.connection).refresh()
+        
+        # Stored dispersion measures cover the new documents (otherwise they
+        # are stale until the next lookup recomputes them)
+        if DISPERSION_AFTER_INGESTION:
+            with self.profiler.stage('dispersion') as timer:
+                timer.units = DispersionAnalyzer(self.db.connection).refresh()
         
         # Final statistics
         logger.info("=== INGESTION COMPLETE ===")
         logger.info(f"Documents processed: {self.stats['documents_processed']}")
         logger.info(f"Sentences processed: {self.stats['sentences_processed']}")
         logger.info(f"Tokens processed: {self.stats['tokens_processed']}")
+        logger.info(f"Files skipped (unchanged): {self.stats['files_skipped']}")
         logger.info(f"Errors: {self.stats['errors']}")
         
+        cache = self.nlp_processor.annotation_cache
+        if cache is not None:
+            cache.flush()
+            cache_stats = cache.get_stats()
+            logger.info(f"Annotation cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+                        f"({cache_stats['hit_rate']:.1%} hit rate)")
+        
+        if report_path is None and (INGESTION_RUN_REPORTS or code_profile):
+            report_path = report_base.with_suffix('.json')
+        if report_path is not None:
+            report = self.get_run_report()
+            report.update({'directory': source, 'files': len(text_files),
+                           'started_at': started_at.isoformat(timespec='seconds'),
+                           'finished_at': datetime.now().isoformat(timespec='seconds')})
+            write_run_report(report, report_path)
+        
         return self.stats.copy()
     
     def ingest_file(self, file_path: Path, batch_size: int = 1000) -> None:
         """
-        Ingest a single file (TXT, JSON, or XML)
+        Ingest a single file (TXT, JSON, XML, or pre-annotated CoNLL-U)
+        
+        Each document is written in a single transaction and tracked in the
+        ingestion manifest, so an interrupted run can be resumed: unchanged files
+        are skipped by size/mtime alone and half-written documents never persist.
         
         Args:
             file_path: Path to file
             batch_size: Number of tokens per database batch
         """
-        file_extension = file_path.suffix.lower()
-        
-        try:
-            if file_extension == '.txt':
-                content = self._read_txt_file(file_path)
-            elif file_extension == '.json':
-                content = self._read_json_file(file_path)
-            elif file_extension == '.xml':
-                content = self._read_xml_file(file_path)
-            else:
-                raise ValueError(f"Unsupported file format: {file_extension}")
-                
-        except Exception as e:
-            logger.error(f"Error reading file {file_path}: {e}")
+        file_path = Path(file_path)
+        started = self._start_file(file_path)
+        if started is None:
             return
+        stat, previous_doc_id = started
         
-        if not content.strip():
-            logger.warning(f"Empty content in file: {file_path}")
+        # Pre-annotated files skip NLP entirely
+        if file_path.suffix.lower() in CONLLU_EXTENSIONS:
+            self._ingest_annotated_file(file_path, stat, previous_doc_id)
             return
         
-        # Generate document hash for duplicate detection
-        doc_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
-        
-        # Check if document already exists
-        if self._document_exists(doc_hash):
-            logger.info(f"Document already exists: {file_path.name}")
+        # Read ahead two chunks: a file that fits in one chunk can be hashed and
+        # de-duplicated before any NLP work, larger ones are hashed while streaming
+        metadata = self._metadata_collector()
+        chunks = iter_file_chunks(file_path, self.chunk_size, metadata)
+        try:
+            with self.profiler.stage('read'):
+                head = list(islice(chunks, 2))
+        except Exception as e:
+            logger.error(f"Error reading file {file_path}: {e}")
+            self._set_manifest_state(file_path, stat, 'pending', error=str(e))
             return
         
-        # Create document record
-        doc_id = self._create_document_record(file_path, content, doc_hash)
-        
-        # Process content with NLP
-        self._process_document_content(doc_id, content, batch_size)
+        doc_hash = None
+        if len(head) < 2:
+            content = head[0] if head else ''
+            if not content.strip():
+                logger.warning(f"Empty content in file: {file_path}")
+                self._set_manifest_state(file_path, stat, 'done')
+                return
+            
+            # Generate document hash for duplicate detection
+            doc_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+            if self._skip_duplicate(file_path, stat, doc_hash, previous_doc_id):
+                return
+        
+        self._set_manifest_state(file_path, stat, 'annotating', content_hash=doc_hash)
+        
+        hasher = hashlib.md5()
+        text_length = 0
+        
+        def hashed_chunks():
+            nonlocal text_length
+            for chunk in chain(head, chunks):
+                encoded = chunk.encode('utf-8')
+                hasher.update(encoded)
+                text_length += len(chunk)
+                self.profiler.count('read', len(encoded))
+                yield chunk
+        
+        self._store_document(file_path, stat, previous_doc_id, doc_hash,
+                             self._annotate_chunks(self.profiler.iterate('read', hashed_chunks())),
+                             batch_size,
+                             lambda: (hasher.hexdigest(), text_length),
+                             metadata)
+    
+    def _metadata_collector(self) -> Optional[MetadataCollector]:
+        """Collector for the metadata of one document (None if no fields are configured)"""
+        return MetadataCollector(self.metadata_fields) if self.metadata_fields else None
+    
+    def _start_file(self, file_path: Path) -> Optional[Tuple[os.stat_result, Optional[int]]]:
+        """
+        Check a file against the ingestion manifest and mark it pending
         
-        self.stats['documents_processed'] += 1
+        Returns:
+            (stat, doc_id of the previous version) if the file needs ingesting,
+            None if it is unchanged or only needed finalizing
+        """
+        stat = file_path.stat()
+        manifest = self._get_manifest_entry(file_path)
+        if self._is_unchanged(manifest, stat):
+            logger.info(f"Unchanged since last run, skipping: {file_path.name}")
+            self.stats['files_skipped'] += 1
+            return None
+        
+        # A 'written' entry means the document committed but was not finalized
+        if manifest and manifest['state'] == 'written' and manifest['doc_id'] is not None \
+                and manifest['file_size'] == stat.st_size and manifest['mtime_ns'] == stat.st_mtime_ns:
+            self._finalize_document(file_path, manifest['doc_id'])
+            self.stats['files_skipped'] += 1
+            return None
+        
+        previous_doc_id = manifest['doc_id'] if manifest else None
+        self._set_manifest_state(file_path, stat, 'pending')
+        return stat, previous_doc_id
     
-    def _read_txt_file(self, file_path: Path) -> str:
-        """Read and decode a text file"""
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except UnicodeDecodeError:
-            # Try different encodings
-            for encoding in ['latin-1', 'cp1254', 'iso-8859-9']:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        return f.read()
-                except UnicodeDecodeError:
-                    continue
-            else:
-                raise ValueError(f"Could not decode file: {file_path}")
+    def _skip_duplicate(self, file_path: Path, stat: os.stat_result, doc_hash: str,
+                        previous_doc_id: Optional[int] = None) -> bool:
+        """
+        Mark the file done if a document with this content already exists
+        
+        A changed file whose new content duplicates another document no longer
+        has a document of its own: the one from its previous version is deleted.
+        """
+        existing_doc_id = self._document_exists(doc_hash)
+        if not existing_doc_id:
+            return False
+        logger.info(f"Document already exists: {file_path.name}")
+        if previous_doc_id is not None and previous_doc_id != existing_doc_id:
+            self._delete_document(previous_doc_id)
+        self._set_manifest_state(file_path, stat, 'done', content_hash=doc_hash,
+                                 doc_id=existing_doc_id)
+        return True
     
-    def _read_json_file(self, file_path: Path) -> str:
-        """Read and parse a JSON file, extracting text content"""
+    def _store_document(self, file_path: Path, stat: os.stat_result, previous_doc_id: Optional[int],
+                        doc_hash: Optional[str], annotated: Iterable[Tuple[str, List[Token]]],
+                        batch_size: int, content_info: Callable[[], Tuple[str, int]],
+                        metadata: Optional[MetadataCollector] = None) -> None:
+        """
+        Write an annotated document in one transaction and finalize it
+        
+        Args:
+            annotated: (sentence text, tokens) pairs, consumed while writing
+            content_info: Called once `annotated` is exhausted; returns the
+                          content hash and text length of the whole document
+            metadata: Document metadata, complete once `annotated` is exhausted
+        """
+        connection = self.db.connection
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            # A changed file replaces the document from its previous version
+            if previous_doc_id is not None:
+                self._delete_document(previous_doc_id)
             
-            # Extract text from various JSON structures
-            text_content = self._extract_text_from_json(data)
-            return text_content
+            # Create document record
+            doc_id = self._create_document_record(file_path, doc_hash)
             
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON file {file_path}: {e}")
-    
-    def _read_xml_file(self, file_path: Path) -> str:
-        """Read and parse an XML file, extracting text content"""
-        try:
-            tree = ET.parse(file_path)
-            root = tree.getroot()
+            # Index FTS once per document instead of per row via the insert
+            # trigger (the trigger cost dominated the token inserts); the DROP is
+            # part of the transaction, so a rollback restores it
+            connection.execute("DROP TRIGGER IF EXISTS tokens_ai")
             
-            # Extract text from XML elements
-            text_content = self._extract_text_from_xml(root)
-            return text_content
+            # Lexical diversity and readability are counted as the sentences stream by
+            lexical_stats = LexicalStatsIndex(connection)
+            accumulator = lexical_stats.accumulator()
+            n_sentences, n_tokens = self._write_sentences(doc_id, accumulator.observe(annotated), batch_size)
             
-        except ET.ParseError as e:
-            raise ValueError(f"Invalid XML file {file_path}: {e}")
-    
-    def _extract_text_from_json(self, data) -> str:
-        """Recursively extract text content from JSON data"""
-        text_parts = []
-        
-        if isinstance(data, dict):
-            for value in data.values():
-                text_parts.append(self._extract_text_from_json(value))
-        elif isinstance(data, list):
-            for item in data:
-                text_parts.append(self._extract_text_from_json(item))
-        elif isinstance(data, str):
-            text_parts.append(data)
-        elif isinstance(data, (int, float, bool)):
-            text_parts.append(str(data))
-        
-        return ' '.join(filter(None, text_parts))
-    
-    def _extract_text_from_xml(self, element) -> str:
-        """Recursively extract text content from XML elements"""
-        text_parts = []
-        
-        # Add direct text content
-        if element.text:
-            text_parts.append(element.text)
-        
-        # Add text from child elements
-        for child in element:
-            text_parts.append(self._extract_text_from_xml(child))
-            if child.tail:
-                text_parts.append(child.tail)
-        
-        return ' '.join(filter(None, text_parts))
-    
-    def _document_exists(self, doc_hash: str) -> bool:
-        """Check if document already exists in database"""
+            doc_hash, text_length = content_info()
+            existing_doc_id = self._document_exists(doc_hash)
+            if existing_doc_id is not None and existing_doc_id != doc_id:
+                # Large duplicates are only recognised once fully read
+                connection.rollback()
+                self._skip_duplicate(file_path, stat, doc_hash, previous_doc_id)
+                return
+            
+            connection.execute(
+                "UPDATE documents SET file_hash = ?, text_length = ? WHERE doc_id = ?",
+                (doc_hash, text_length, doc_id))
+            if metadata is not None and metadata.values:
+                connection.executemany(
+                    "INSERT OR IGNORE INTO document_metadata (key, value, value_num, doc_id) VALUES (?, ?, ?, ?)",
+                    metadata.rows(doc_id))
+            lexical_stats.store(doc_id, accumulator)
+            with self.profiler.stage('fts', units=n_tokens):
+                connection.execute("""
+                    INSERT INTO tokens_fts(rowid, form, norm, lemma)
+                    SELECT token_id, form, norm, lemma FROM tokens WHERE doc_id = ?
+                """, (doc_id,))
+            self.db._create_triggers(connection.cursor())
+            self._set_manifest_state(file_path, stat, 'written', content_hash=doc_hash,
+                                     doc_id=doc_id, commit=False)
+            with self.profiler.stage('commit', units=1):
+                connection.commit()
+        except BaseException as e:
+            # Nothing of a half-written document survives
+            connection.rollback()
+            self._set_manifest_state(file_path, stat, 'pending', content_hash=doc_hash,
+                                     doc_id=previous_doc_id, error=str(e))
+            raise
+        
+        self._finalize_document(file_path, doc_id)
+        self.stats['documents_processed'] += 1
+        self.stats['sentences_processed'] += n_sentences
+        self.stats['tokens_processed'] += n_tokens
+    
+    def _ingest_annotated_file(self, file_path: Path, stat: os.stat_result,
+                               previous_doc_id: Optional[int]) -> None:
+        """Import a CoNLL-U file through the annotation-preserving bulk importer"""
+        importer = AnnotatedCorpusImporter(db=self.db)
+        self._set_manifest_state(file_path, stat, 'annotating')
+        try:
+            doc_id = importer.import_file(file_path)
+        except Exception as e:
+            self._set_manifest_state(file_path, stat, 'pending', error=str(e))
+            raise
+        
+        # The importer returns None for content it has already seen
+        if doc_id is None:
+            self._skip_duplicate(file_path, stat, importer._hash_file(file_path), previous_doc_id)
+        else:
+            if previous_doc_id is not None and doc_id != previous_doc_id:
+                self._delete_document(previous_doc_id)
+            self._set_manifest_state(file_path, stat, 'done', doc_id=doc_id)
+        for key in ('documents_processed', 'sentences_processed', 'tokens_processed'):
+            self.stats[key] += importer.stats[key]
+    
+    # ------------------------------------------------------------------
+    # Ingestion manifest
+    # ------------------------------------------------------------------
+    
+    def _get_manifest_entry(self, file_path: Path) -> Optional[sqlite3.Row]:
+        """Get the manifest row for a file, if any"""
+        cursor = self.db.connection.cursor()
+        cursor.execute("SELECT * FROM ingestion_manifest WHERE path = ?", (str(file_path.resolve()),))
+        return cursor.fetchone()
+    
+    @staticmethod
+    def _is_unchanged(manifest: Optional[sqlite3.Row], stat: os.stat_result) -> bool:
+        """True if the file was fully ingested and its size/mtime did not change"""
+        return (manifest is not None
+                and manifest['state'] == 'done'
+                and manifest['file_size'] == stat.st_size
+                and manifest['mtime_ns'] == stat.st_mtime_ns)
+    
+    def _set_manifest_state(self, file_path: Path, stat: os.stat_result, state: str,
+                            content_hash: Optional[str] = None, doc_id: Optional[int] = None,
+                            error: Optional[str] = None, commit: bool = True) -> None:
+        """Insert or update the manifest row for a file"""
+        cursor = self.db.connection.cursor()
+        cursor.execute("""
+            INSERT INTO ingestion_manifest (path, file_size, mtime_ns, content_hash, doc_id, state, error)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT(path) DO UPDATE SET
+                file_size = excluded.file_size,
+                mtime_ns = excluded.mtime_ns,
+                content_hash = COALESCE(excluded.content_hash, content_hash),
+                doc_id = COALESCE(excluded.doc_id, doc_id),
+                state = excluded.state,
+                error = excluded.error,
+                updated_at = CURRENT_TIMESTAMP
+        """, (str(file_path.resolve()), stat.st_size, stat.st_mtime_ns, content_hash,
+              doc_id, state, error))
+        if commit:
+            self.db.connection.commit()
+    
+    def _finalize_document(self, file_path: Path, doc_id: int) -> None:
+        """Fill in document counts and mark the manifest entry done"""
+        with self.profiler.stage('finalize', units=1):
+            cursor = self.db.connection.cursor()
+            cursor.execute("""
+                UPDATE documents SET
+                    sentence_count = (SELECT COUNT(*) FROM sentences WHERE doc_id = ?),
+                    token_count = (SELECT COUNT(*) FROM tokens WHERE doc_id = ?),
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE doc_id = ?
+            """, (doc_id, doc_id, doc_id))
+            cursor.execute("""
+                UPDATE ingestion_manifest SET state = 'done', error = NULL, updated_at = CURRENT_TIMESTAMP
+                WHERE path = ?
+            """, (str(file_path.resolve()),))
+            self.db.connection.commit()
+    
+    def _delete_document(self, doc_id: int) -> None:
+        """Delete a document with its sentences and tokens (caller commits)"""
+        cursor = self.db.connection.cursor()
+        # Metadata and lexical statistics first: they take the document's tokens
+        # off the facet counts and the corpus word frequencies
+        cursor.execute("DELETE FROM document_metadata WHERE doc_id = ?", (doc_id,))
+        LexicalStatsIndex(self.db.connection).delete(doc_id)
+        cursor.execute("DELETE FROM tokens WHERE doc_id = ?", (doc_id,))
+        cursor.execute("DELETE FROM sentences WHERE doc_id = ?", (doc_id,))
+        cursor.execute("DELETE FROM documents WHERE doc_id = ?", (doc_id,))
+    
+    def get_manifest_summary(self) -> Dict[str, int]:
+        """Count manifest entries per state"""
+        cursor = self.db.connection.cursor()
+        cursor.execute("SELECT state, COUNT(*) FROM ingestion_manifest GROUP BY state")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+    
+    def _document_exists(self, doc_hash: str) -> Optional[int]:
+        """Return the doc_id of an existing document with this hash, if any"""
         cursor = self.db.connection.cursor()
         cursor.execute("SELECT doc_id FROM documents WHERE file_hash = ?", (doc_hash,))
-        return cursor.fetchone() is not None
+        row = cursor.fetchone()
+        return row[0] if row else None
     
-    def _create_document_record(self, file_path: Path, content: str, doc_hash: str) -> int:
-        """Create document record in database"""
+    def _create_document_record(self, file_path: Path, doc_hash: Optional[str]) -> int:
+        """Create document record in database (text_length and a missing hash are filled in later)"""
         cursor = self.db.connection.cursor()
         
         # Get basic file info
-        file_size = file_path.stat().st_size if file_path.exists() else len(content.encode('utf-8'))
+        file_size = file_path.stat().st_size if file_path.exists() else None
         
         cursor.execute("""
             INSERT INTO documents (doc_name, file_path, file_size, text_length, file_hash)
             VALUES (?, ?, ?, ?, ?)
-        """, (file_path.name, str(file_path), file_size, len(content), doc_hash))
+        """, (file_path.name, str(file_path), file_size, 0, doc_hash))
         
+        # Committed together with the document content by ingest_file
         doc_id = cursor.lastrowid
-        self.db.connection.commit()
         
         return doc_id
     
-    def _process_document_content(self, doc_id: int, content: str, batch_size: int) -> None:
-        """Process document content and store in database"""
-        
-        # Split into sentences
-        sentences = self.nlp_processor.split_sentences(content)
-        self.stats['sentences_processed'] += len(sentences)
-        
-        # Process each sentence
-        tokens_batch = []
-        token_number = 0
+    def _iter_sentences(self, chunks: Iterable[str]) -> Iterator[str]:
+        """Split streamed text chunks into sentences, one chunk at a time"""
+        for chunk in chunks:
+            frame = self.profiler.start('split')
+            sentences = self.nlp_processor.split_sentences(chunk)
+            self.profiler.stop(frame, len(sentences))
+            yield from sentences
+    
+    def _annotate_chunks(self, chunks: Iterable[str]) -> Iterator[Tuple[str, List[Token]]]:
+        """Split chunks into sentences and annotate them as one stream of (text, tokens)"""
+        # The sentence stream is annotated in batches; tee pairs each sentence
+        # with its tokens again
+        texts, to_annotate = tee(self._iter_sentences(chunks))
+        return zip(texts, self.profiler.iterate('annotate', self.nlp_processor.annotate(to_annotate), len))
+    
+    def _process_document_content(self, doc_id: int, chunks: Iterable[str], batch_size: int) -> Tuple[int, int]:
+        """
+        Process document content and store in database (without committing)
         
-        for sent_number, sentence in enumerate(sentences, 1):
-            # Process sentence with NLP first to get accurate token count
-            tokens = self.nlp_processor.process_text(sentence)
-            
-            # Calculate token range
-            token_start = token_number
-            token_end = token_number + len(tokens)
-            
-            # Create sentence record with accurate counts
-            sent_id = self._create_sentence_record(doc_id, sent_number, sentence, token_start, token_end)
-            
-            # Add tokens to batch
-            for token in tokens:
-                token['doc_id'] = doc_id
-                token['sent_id'] = sent_id
-                token['token_number'] = token_number
-                tokens_batch.append(token)
-                token_number += 1
-                
-                # Insert batch when it reaches batch_size
-                if len(tokens_batch) >= batch_size:
-                    self._insert_tokens_batch(tokens_batch)
-                    tokens_batch = []
-            
-            self.stats['tokens_processed'] += len(tokens)
+        Args:
+            doc_id: Document ID
+            chunks: Text chunks ending on paragraph boundaries (a plain string
+                    is treated as a single chunk)
+            batch_size: Number of tokens per database batch
         
-        # Insert remaining tokens
-        if tokens_batch:
-            self._insert_tokens_batch(tokens_batch)
+        Returns:
+            (sentence count, token count)
+        """
+        if isinstance(chunks, str):
+            chunks = [chunks]
+        return self._write_sentences(doc_id, self._annotate_chunks(chunks), batch_size)
     
-    def _create_sentence_record(self, doc_id: int, sent_number: int, sentence_text: str, token_start: int, token_end: int) -> int:
-        """Create sentence record in database"""
+    def _write_sentences(self, doc_id: int, annotated: Iterable[Tuple[str, List[Token]]],
+                         batch_size: int) -> Tuple[int, int]:
+        """
+        Insert annotated sentences of a document in batches (without committing)
+        
+        Returns:
+            (sentence count, token count)
+        """
+        # The document record holds the write lock, so the sentence ids from
+        # here on are ours; sentences are then inserted in batches with their
+        # tokens instead of one INSERT (and lastrowid) per sentence; token ids
+        # are allocated the same way, so heads can be stored as token_ids
         cursor = self.db.connection.cursor()
+        next_sent_id = next_row_id(cursor, 'sentences', 'sent_id')
+        next_token_id = next_row_id(cursor, 'tokens', 'token_id')
         
-        cursor.execute("""
-            INSERT INTO sentences (doc_id, sent_number, sent_text, token_start, token_end)
-            VALUES (?, ?, ?, ?, ?)
-        """, (doc_id, sent_number, sentence_text, token_start, token_end))
+        sent_number = 0
+        token_number = 0
+        sentences_batch = []
+        batch_tokens = 0
+        
+        for sent_number, (text, tokens) in enumerate(annotated, 1):
+            sentences_batch.append(Sentence(text, tokens, doc_id, next_sent_id, sent_number, token_number,
+                                            next_token_id))
+            next_sent_id += 1
+            next_token_id += len(tokens)
+            token_number += len(tokens)
+            batch_tokens += len(tokens)
+            
+            # Insert batch when it reaches batch_size
+            if batch_tokens >= batch_size:
+                self._insert_tokens_batch(sentences_batch)
+                sentences_batch = []
+                batch_tokens = 0
         
-        sent_id = cursor.lastrowid
-        self.db.connection.commit()
+        # Insert remaining sentences
+        if sentences_batch:
+            self._insert_tokens_batch(sentences_batch)
         
-        return sent_id
+        return sent_number, token_number
     
-    def _insert_tokens_batch(self, tokens_batch: List[Dict[str, Any]]) -> None:
-        """Insert a batch of tokens into database"""
-        if not tokens_batch:
+    def _insert_tokens_batch(self, sentences_batch: List[Sentence]) -> None:
+        """Insert a batch of annotated sentences and their tokens into database"""
+        if not sentences_batch:
             return
             
-        cursor = self.db.connection.cursor()
-        
-        # Prepare INSERT statement
-        insert_query = """
-            INSERT INTO tokens (
-                doc_id, sent_id, token_number, form, norm, lemma, upos, xpos,
-                morph, dep_head, dep_rel, start_char, end_char,
-                is_punctuation, is_space
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-        """
+        n_tokens = sum(len(sentence.tokens) for sentence in sentences_batch)
+        with self.profiler.stage('insert', units=n_tokens):
+            cursor = self.db.connection.cursor()
+            cursor.executemany(SENTENCE_INSERT_SQL, [sentence.sentence_row() for sentence in sentences_batch])
+            
+            # Rows are generated from the token records as executemany consumes them
+            cursor.executemany(TOKEN_INSERT_SQL,
+                               chain.from_iterable(sentence.token_rows() for sentence in sentences_batch))
         
-        # Insert batch
-        token_data = []
-        for token in tokens_batch:
-            token_data.append((
-                token['doc_id'],
-                token['sent_id'],
-                token['token_number'],
-                token.get('word', token.get('form', '')),  # Use 'word' field, fallback to 'form'
-                token['norm'],
-                token.get('lemma'),  # May be None now
-                token['upos'],
-                token.get('xpos'),
-                token.get('morph'),
-                token.get('dep_head'),
-                token.get('dep_rel'),
-                token['start_char'],
-                token['end_char'],
-                int(token['is_punctuation']),
-                int(token['is_space'])
-            ))
-        
-        cursor.executemany(insert_query, token_data)
-        self.db.connection.commit()
-        
-        logger.debug(f"Inserted {len(token_data)} tokens")
+        logger.debug(f"Inserted {len(sentences_batch)} sentences")
     
     def get_processing_stats(self) -> Dict[str, Any]:
         """Get current processing statistics"""
@@ -360,7 +651,7 @@ class CorpusIngestor:
         cursor.execute("SELECT COUNT(DISTINCT norm) FROM tokens")
         unique_words = cursor.fetchone()[0]
         
-        return {
+        stats = {
             'database_stats': {
                 'total_documents': total_docs,
                 'total_sentences': total_sentences,
@@ -370,9 +661,34 @@ class CorpusIngestor:
             'processing_stats': self.stats,
             'nlp_info': self.nlp_processor.get_processing_info()
         }
+        stats['profile'] = self.profiler.get_stats()
+        if self.pipeline_stats is not None:
+            stats['pipeline_stats'] = self.pipeline_stats
+        return stats
+    
+    def get_run_report(self) -> Dict[str, Any]:
+        """
+        Machine-readable summary of the ingestion so far: counters, per-stage
+        profile, pipeline statistics, NLP setup and code profiler output
+        """
+        report = {
+            'database': str(self.db.db_path),
+            'processing_stats': self.stats.copy(),
+            'profile': self.profiler.get_stats(),
+            'nlp_info': self.nlp_processor.get_processing_info(),
+        }
+        cache = self.nlp_processor.annotation_cache
+        if cache is not None:
+            report['annotation_cache'] = cache.get_stats()
+        if self.pipeline_stats is not None:
+            report['pipeline_stats'] = self.pipeline_stats
+        if self.code_profile:
+            report['code_profile'] = self.code_profile
+        return report
     
     def close(self):
-        """Close database connection"""
+        """Close database connection and annotation cache"""
+        self.nlp_processor.close()
         self.db.close()
 
 # Convenience function for quick ingestion
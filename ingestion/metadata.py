@@ -0,0 +1,73 @@
+"""
+Document Metadata Extraction
+
+The JSON and XML readers hand every value they stream to a
+MetadataCollector together with its name: the nearest JSON object key, an
+XML attribute name or the tag of an XML element holding only text. Values
+of the configured fields (DOCUMENT_METADATA_FIELDS) are kept and stored in
+the document_metadata table with the document, so metadata costs no extra
+pass over the file.
+
+Values are typed: numbers (and strings that are numbers, like XML
+attributes) also get a numeric value for range conditions.
+"""
+
+import re
+import logging
+from typing import List, Dict, Any, Optional, Tuple, Iterable
+
+logger = logging.getLogger(__name__)
+
+# Values kept per field and document (e.g. a long 'tags' list)
+MAX_VALUES_PER_FIELD = 50
+
+# Longer values are text, not metadata
+MAX_VALUE_LENGTH = 200
+
+_NUMBER = re.compile(r'[-+]?\d+(?:\.\d+)?')
+
+
+def typed_value(value: Any) -> Tuple[str, Optional[float]]:
+    """(text, number or None) stored for a metadata value"""
+    if isinstance(value, bool):
+        return ('true' if value else 'false'), None
+    if isinstance(value, (int, float)):
+        return str(value), float(value)
+    text = str(value).strip()
+    if _NUMBER.fullmatch(text):
+        return text, float(text)
+    return text, None
+
+
+def local_name(name: str) -> str:
+    """XML tag or attribute name without its namespace"""
+    return name.rsplit('}', 1)[-1]
+
+
+class MetadataCollector:
+    """Keeps the values of the configured metadata fields of one document"""
+
+    def __init__(self, fields: Iterable[str]):
+        # Field names match case-insensitively and are stored as configured
+        self.fields = {field.lower(): field for field in fields}
+        self.values: Dict[str, List[Tuple[str, Optional[float]]]] = {}
+
+    def offer(self, name: Optional[str], value: Any) -> None:
+        """Record a value if its name is a metadata field"""
+        if name is None:
+            return
+        field = self.fields.get(name.lower())
+        if field is None:
+            return
+        typed = typed_value(value)
+        if not typed[0] or len(typed[0]) > MAX_VALUE_LENGTH:
+            return
+        values = self.values.setdefault(field, [])
+        if typed not in values and len(values) < MAX_VALUES_PER_FIELD:
+            values.append(typed)
+
+    def rows(self, doc_id: int) -> List[Tuple[str, str, Optional[float], int]]:
+        """(key, value, value_num, doc_id) rows for the document_metadata table"""
+        return [(field, text, number, doc_id)
+                for field, values in self.values.items()
+                for text, number in values]
@@ -0,0 +1,481 @@
+"""
+Staged Ingestion Pipeline
+
+Concurrent variant of CorpusIngestor.ingest_directory:
+
+    reader threads  ──►  annotator pool  ──►  single writer
+    (file I/O,           (sentence            (ids, batched inserts,
+     decoding,            splitting and        FTS indexing, commits)
+     hashing)             annotation)
+
+The stages are connected by bounded queues. At most `max_pending_documents`
+documents are read ahead of the writer, and each of them holds at most
+`queue_size` chunks that are being annotated or wait to be written. A full
+queue blocks the stage feeding it (backpressure), so memory stays bounded
+however much faster reading and annotation are than the database.
+
+The writer is the calling thread and uses the ingestor's own connection:
+documents are written in file order, one transaction each, with the same
+manifest states and de-duplication as CorpusIngestor.ingest_file, so a run
+can be interrupted and resumed by either path.
+
+Annotator processes are spawned, so scripts that use them need the usual
+`if __name__ == '__main__':` guard.
+"""
+
+import os
+import time
+import queue
+import hashlib
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import chain, islice
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, Callable
+from tqdm import tqdm
+
+from nlp.backends import Token, Sentence, CACHEABLE, pack_sentences, unpack_sentences
+from ingestion.annotated_importer import CONLLU_EXTENSIONS
+from ingestion.streaming_readers import iter_file_chunks
+from ingestion.metadata import MetadataCollector
+
+logger = logging.getLogger(__name__)
+
+# Characters per annotation task: smaller than the sequential chunk size so
+# that a single large file is spread over all annotator workers
+PIPELINE_CHUNK_SIZE = 64 * 1024
+
+# End of a document's chunk queue
+_END = object()
+
+
+# --- Annotator workers ------------------------------------------------------
+# Module-level so that spawned worker processes can import them
+
+_worker = threading.local()
+
+
+def _init_annotator(config: Dict[str, Any], cache_path: Optional[str], cache_size_mb: float) -> None:
+    """Start an NLP processor in a worker process (or thread)"""
+    from nlp.turkish_processor import TurkishNLPProcessor
+
+    processor = TurkishNLPProcessor(**config)
+    if cache_path and processor.supports(CACHEABLE):
+        processor.enable_annotation_cache(cache_path, max_size_mb=cache_size_mb)
+    _worker.processor = processor
+
+
+def _use_processor(processor) -> None:
+    """Annotate with an existing processor (in-process annotator thread)"""
+    _worker.processor = processor
+
+
+def _annotate_chunk(chunk: str, pack: bool) -> Tuple[Any, int, float]:
+    """
+    Split a text chunk into sentences and annotate them
+
+    Returns:
+        (sentences, token count, busy seconds); the sentences are packed into
+        columns when they cross a process boundary
+    """
+    start = time.perf_counter()
+    processor = _worker.processor
+    texts = processor.split_sentences(chunk)
+    sentences = [Sentence(text, tokens) for text, tokens in zip(texts, processor.annotate(texts))]
+    if processor.annotation_cache is not None:
+        # Other workers share the cache file
+        processor.annotation_cache.flush()
+    n_tokens = sum(len(sentence.tokens) for sentence in sentences)
+    result = pack_sentences(sentences) if pack else sentences
+    return result, n_tokens, time.perf_counter() - start
+
+
+# --- Statistics -------------------------------------------------------------
+
+class StageStats:
+    """Live counters of one pipeline stage (updated from several threads)"""
+
+    def __init__(self, name: str, unit: str, workers: int = 1):
+        self.name = name
+        self.unit = unit
+        self.workers = workers
+        self.items = 0
+        self.units = 0
+        self.busy_seconds = 0.0
+        self.stall_seconds = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, items: int = 0, units: int = 0, busy: float = 0.0, stall: float = 0.0) -> None:
+        with self._lock:
+            self.items += items
+            self.units += units
+            self.busy_seconds += busy
+            self.stall_seconds += stall
+
+    def snapshot(self, elapsed: float, queue_depth: int) -> Dict[str, Any]:
+        """
+        Counters at `elapsed` seconds into the run
+
+        stall_seconds is time spent blocked on a neighbouring stage: readers
+        waiting on full queues, the writer waiting for annotations, and idle
+        annotator capacity.
+        """
+        with self._lock:
+            return {
+                'items': self.items,
+                self.unit: self.units,
+                f'{self.unit}_per_second': round(self.units / elapsed, 1) if elapsed > 0 else 0.0,
+                'workers': self.workers,
+                'busy_seconds': round(self.busy_seconds, 3),
+                'stall_seconds': round(self.stall_seconds, 3),
+                'utilization': round(self.busy_seconds / (elapsed * self.workers), 3) if elapsed > 0 else 0.0,
+                'queue_depth': queue_depth,
+            }
+
+
+class _Stopped(Exception):
+    """The writer stopped the pipeline; a reader abandons its document"""
+
+
+class _Document:
+    """A file on its way through the pipeline"""
+
+    __slots__ = ('path', 'stat', 'previous_doc_id', 'chunks', 'content_hash',
+                 'doc_hash', 'text_length', 'empty', 'error', 'finished', 'metadata')
+
+    def __init__(self, path: Path, stat: os.stat_result, previous_doc_id: Optional[int], queue_size: int,
+                 metadata: Optional[MetadataCollector] = None):
+        self.path = path
+        self.stat = stat
+        self.previous_doc_id = previous_doc_id
+        # Annotation futures in text order, then _END
+        self.chunks = queue.Queue(maxsize=queue_size)
+        # Hash known before annotation (single-chunk files): duplicates are skipped early
+        self.content_hash = None
+        self.doc_hash = None
+        self.text_length = 0
+        self.empty = False
+        self.error = None
+        self.finished = False
+        # Filled by the reader, stored by the writer
+        self.metadata = metadata
+
+
+# --- Pipeline ---------------------------------------------------------------
+
+class IngestionPipeline:
+    """Reader threads -> annotator pool -> single database writer"""
+
+    def __init__(self, ingestor, reader_threads: int = 2, annotator_workers: Optional[int] = None,
+                 queue_size: int = 4, max_pending_documents: Optional[int] = None,
+                 chunk_size: int = PIPELINE_CHUNK_SIZE,
+                 progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 progress_interval: float = 1.0):
+        """
+        Args:
+            ingestor: CorpusIngestor whose database, processor configuration,
+                      manifest and statistics are used
+            reader_threads: Threads reading and decoding files
+            annotator_workers: Annotator processes (None: one per spare CPU,
+                               at most 4; 0: a single thread in this process,
+                               sharing the ingestor's loaded models)
+            queue_size: Chunks per document in flight between the stages
+            max_pending_documents: Documents read ahead of the writer
+                                   (default: 2 per reader thread)
+            chunk_size: Characters per annotation task
+            progress_callback: Called with get_stats() every `progress_interval`
+                               seconds (from the writer thread)
+            progress_interval: Seconds between progress callbacks
+        """
+        if annotator_workers is None:
+            annotator_workers = max(1, min(4, (os.cpu_count() or 1) - 1))
+        self.ingestor = ingestor
+        self.reader_threads = max(1, reader_threads)
+        self.annotator_workers = max(0, annotator_workers)
+        self.queue_size = max(1, queue_size)
+        self.max_pending_documents = max_pending_documents or 2 * self.reader_threads
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.progress_interval = progress_interval
+
+        self.read_stats = StageStats('read', 'bytes', self.reader_threads)
+        self.annotate_stats = StageStats('annotate', 'tokens', max(1, self.annotator_workers))
+        self.write_stats = StageStats('write', 'tokens')
+
+        self._documents: Optional[queue.Queue] = None
+        self._work: Iterator[_Document] = iter(())
+        self._claim_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor: Optional[Executor] = None
+        self._pack = False
+        self._files_total = 0
+        self._files_claimed = 0
+        self._files_written = 0
+        self._in_flight = 0
+        self._in_flight_lock = threading.Lock()
+        self._started = None
+        self._last_progress = 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Live per-stage throughput, queue depth and stall time"""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        idle = max(0.0, elapsed * self.annotate_stats.workers - self.annotate_stats.busy_seconds)
+        annotate = self.annotate_stats.snapshot(elapsed, self._in_flight)
+        annotate['stall_seconds'] = round(idle, 3)
+        return {
+            'elapsed_seconds': round(elapsed, 3),
+            'files_total': self._files_total,
+            'files_written': self._files_written,
+            'stages': {
+                'read': self.read_stats.snapshot(elapsed, self._files_total - self._files_claimed),
+                'annotate': annotate,
+                'write': self.write_stats.snapshot(elapsed,
+                                                   self._documents.qsize() if self._documents else 0),
+            },
+        }
+
+    def run(self, files: Iterable[Path], batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Ingest files through the pipeline
+
+        Returns:
+            Final per-stage statistics (see get_stats())
+        """
+        ingestor = self.ingestor
+        self._started = time.perf_counter()
+
+        # Manifest checks happen here, on the writer's connection: unchanged
+        # files are skipped and interrupted ones finalized before any reading
+        work = []
+        for file_path in files:
+            try:
+                started = ingestor._start_file(Path(file_path))
+            except Exception as e:
+                logger.error(f"Error processing file {file_path}: {e}")
+                ingestor.stats['errors'] += 1
+                continue
+            if started is not None:
+                work.append(_Document(Path(file_path), started[0], started[1], self.queue_size,
+                                      ingestor._metadata_collector()))
+
+        self._files_total = len(work)
+        if not work:
+            return self.get_stats()
+
+        self._documents = queue.Queue(maxsize=self.max_pending_documents)
+        self._work = iter(work)
+        self._executor = self._start_annotators()
+        readers = [threading.Thread(target=self._read_documents, name=f"corpus-reader-{i}", daemon=True)
+                   for i in range(min(self.reader_threads, len(work)))]
+        for reader in readers:
+            reader.start()
+
+        try:
+            for _ in tqdm(range(len(work)), desc="Processing files"):
+                start = time.perf_counter()
+                document = self._documents.get()
+                self.write_stats.add(stall=time.perf_counter() - start)
+                logger.info(f"Processing file {self._files_written + 1}/{len(work)}: {document.path.name}")
+                self._write_document(document, batch_size)
+                self._files_written += 1
+                self._report_progress()
+        finally:
+            self._stop.set()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            for reader in readers:
+                reader.join()
+
+        self._report_progress(force=True)
+        stats = self.get_stats()
+        for name, stage in stats['stages'].items():
+            logger.info(f"Pipeline stage '{name}': {stage['items']} items, "
+                        f"utilization {stage['utilization']:.0%}, stalled {stage['stall_seconds']:.1f}s")
+        return stats
+
+    def _start_annotators(self) -> Executor:
+        """Process pool of annotators, or one in-process thread"""
+        processor = self.ingestor.nlp_processor
+        if self.annotator_workers == 0:
+            self._pack = False
+            return ThreadPoolExecutor(1, thread_name_prefix="corpus-annotator",
+                                      initializer=_use_processor, initargs=(processor,))
+
+        cache = processor.annotation_cache
+        cache_path = str(cache.cache_path) if cache is not None else None
+        cache_size_mb = cache.max_bytes / (1024 * 1024) if cache is not None else 512
+        self._pack = True
+        # spawn: the writer thread's SQLite connection and loaded models are not forked
+        return ProcessPoolExecutor(self.annotator_workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=_init_annotator,
+                                   initargs=(processor.get_config(), cache_path, cache_size_mb))
+
+    # --- Readers --------------------------------------------------------------
+
+    def _put(self, target: queue.Queue, item: Any) -> float:
+        """
+        Blocking put that gives up when the pipeline stops
+
+        Returns:
+            Seconds blocked (counted as read stall)
+        """
+        start = time.perf_counter()
+        try:
+            while True:
+                try:
+                    target.put(item, timeout=0.1)
+                    break
+                except queue.Full:
+                    if self._stop.is_set():
+                        raise _Stopped()
+        finally:
+            stalled = time.perf_counter() - start
+            self.read_stats.add(stall=stalled)
+        return stalled
+
+    def _read_documents(self) -> None:
+        """Reader thread: claim documents in file order and feed their chunks"""
+        try:
+            while not self._stop.is_set():
+                # Claiming and registering under one lock keeps the writer's
+                # queue in file order
+                with self._claim_lock:
+                    document = next(self._work, None)
+                    if document is None:
+                        return
+                    self._files_claimed += 1
+                    self._put(self._documents, document)
+                self._read_document(document)
+        except _Stopped:
+            return
+
+    def _read_document(self, document: _Document) -> None:
+        """Read, hash and submit the chunks of one document"""
+        try:
+            if document.path.suffix.lower() in CONLLU_EXTENSIONS:
+                # Already annotated: the writer imports it directly
+                return
+
+            start = time.perf_counter()
+            stalled = 0.0
+            hasher = hashlib.md5()
+            profiler = self.ingestor.profiler
+            chunks = profiler.iterate('read', iter_file_chunks(document.path, self.chunk_size,
+                                                               document.metadata))
+            head = list(islice(chunks, 2))
+            if len(head) < 2:
+                content = head[0] if head else ''
+                if not content.strip():
+                    document.empty = True
+                    return
+                document.content_hash = hashlib.md5(content.encode('utf-8')).hexdigest()
+
+            for chunk in chain(head, chunks):
+                encoded = chunk.encode('utf-8')
+                hasher.update(encoded)
+                document.text_length += len(chunk)
+                future = self._executor.submit(_annotate_chunk, chunk, self._pack)
+                with self._in_flight_lock:
+                    self._in_flight += 1
+                self.read_stats.add(items=1, units=len(encoded))
+                profiler.count('read', len(encoded))
+                stalled += self._put(document.chunks, future)
+
+            document.doc_hash = hasher.hexdigest()
+            self.read_stats.add(busy=max(0.0, time.perf_counter() - start - stalled))
+        except _Stopped:
+            raise
+        except Exception as e:
+            document.error = e
+        finally:
+            if not self._stop.is_set():
+                self._put(document.chunks, _END)
+
+    # --- Writer ---------------------------------------------------------------
+
+    def _next_chunk(self, document: _Document) -> Any:
+        """Next item of a document's queue (counts as write stall)"""
+        start = time.perf_counter()
+        item = document.chunks.get()
+        self.write_stats.add(stall=time.perf_counter() - start)
+        if item is _END:
+            document.finished = True
+        return item
+
+    def _annotated(self, document: _Document, item: Any) -> Iterator[Tuple[str, List[Token]]]:
+        """(text, tokens) of a document's sentences as its annotations complete"""
+        while item is not _END:
+            start = time.perf_counter()
+            result, n_tokens, busy = item.result()
+            self.write_stats.add(stall=time.perf_counter() - start)
+            with self._in_flight_lock:
+                self._in_flight -= 1
+            self.annotate_stats.add(items=1, units=n_tokens, busy=busy)
+
+            sentences = unpack_sentences(result) if self._pack else result
+            for sentence in sentences:
+                yield sentence.text, sentence.tokens
+            self._report_progress()
+            item = self._next_chunk(document)
+
+        if document.error is not None:
+            raise document.error
+
+    def _drain(self, document: _Document, item: Any = None) -> None:
+        """Discard the rest of a document that will not be written"""
+        while True:
+            if item is not None and item is not _END:
+                item.cancel()
+                with self._in_flight_lock:
+                    self._in_flight -= 1
+            if document.finished:
+                return
+            item = self._next_chunk(document)
+
+    def _write_document(self, document: _Document, batch_size: int) -> None:
+        """Store one document in its own transaction, as CorpusIngestor.ingest_file does"""
+        ingestor = self.ingestor
+        file_path, stat = document.path, document.stat
+        try:
+            first = self._next_chunk(document)
+
+            if file_path.suffix.lower() in CONLLU_EXTENSIONS:
+                ingestor._ingest_annotated_file(file_path, stat, document.previous_doc_id)
+                return
+            if document.error is not None and first is _END:
+                raise document.error
+            if document.empty:
+                logger.warning(f"Empty content in file: {file_path}")
+                ingestor._set_manifest_state(file_path, stat, 'done')
+                return
+            if document.content_hash and ingestor._skip_duplicate(file_path, stat, document.content_hash):
+                self._drain(document, first)
+                return
+
+            ingestor._set_manifest_state(file_path, stat, 'annotating', content_hash=document.content_hash)
+            tokens_before = ingestor.stats['tokens_processed']
+            start = time.perf_counter()
+            stall_before = self.write_stats.stall_seconds
+            ingestor._store_document(file_path, stat, document.previous_doc_id, document.content_hash,
+                                     self._annotated(document, first), batch_size,
+                                     lambda: (document.doc_hash, document.text_length),
+                                     document.metadata)
+            stalled = self.write_stats.stall_seconds - stall_before
+            self.write_stats.add(items=1, units=ingestor.stats['tokens_processed'] - tokens_before,
+                                 busy=max(0.0, time.perf_counter() - start - stalled))
+        except Exception as e:
+            logger.error(f"Error processing file {file_path}: {e}")
+            ingestor.stats['errors'] += 1
+            self._drain(document)
+
+    def _report_progress(self, force: bool = False) -> None:
+        if self.progress_callback is None:
+            return
+        now = time.perf_counter()
+        if force or now - self._last_progress >= self.progress_interval:
+            self._last_progress = now
+            try:
+                self.progress_callback(self.get_stats())
+            except Exception as e:
+                logger.warning(f"Progress callback failed: {e}")
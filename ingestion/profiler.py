@@ -0,0 +1,341 @@
+"""
+Ingestion Profiler
+
+Per-stage instrumentation of corpus ingestion: wall and CPU time, units
+processed (bytes read, sentences split, tokens annotated/inserted) and
+latency histograms of the database operations.
+
+Stages of the sequential path are lazily chained generators (reading feeds
+sentence splitting, which feeds annotation, which feeds the inserts), so
+times are *exclusive*: a stage entered while another one is running on the
+same thread is subtracted from the outer stage. The stage times of a run
+therefore add up to the time spent in instrumented code, and show directly
+whether it was bound by reading, splitting, annotation, inserts, FTS indexing
+or commits.
+
+A code profiler (cProfile, or pyinstrument if installed) can additionally be
+wrapped around a run; see profile_code().
+"""
+
+import json
+import time
+import logging
+import pstats
+import threading
+import cProfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Iterable, Iterator, Callable, List, Union
+
+logger = logging.getLogger(__name__)
+
+# Optional statistical profiler
+PYINSTRUMENT_AVAILABLE = False
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+    PYINSTRUMENT_AVAILABLE = True
+except ImportError:
+    PyinstrumentProfiler = None
+
+# Stages in pipeline order, with the unit each one counts
+STAGE_UNITS = {
+    'read': 'bytes',
+    'split': 'sentences',
+    'annotate': 'tokens',
+    'insert': 'tokens',
+    'fts': 'tokens',
+    'commit': 'documents',
+    'finalize': 'documents',
+    'lexical': 'documents',
+    'dispersion': 'word types',
+}
+
+# Stages whose individual calls are recorded in a latency histogram
+HISTOGRAM_STAGES = ('insert', 'fts', 'commit')
+
+CODE_PROFILERS = ('none', 'cprofile', 'pyinstrument')
+
+
+class LatencyHistogram:
+    """Latencies in fixed log-spaced buckets (milliseconds)"""
+
+    BOUNDS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.min_ms = None
+        self.max_ms = 0.0
+
+    def record(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = 0
+        for bound in self.BOUNDS_MS:
+            if ms <= bound:
+                break
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.min_ms = ms if self.min_ms is None else min(self.min_ms, ms)
+        self.max_ms = max(self.max_ms, ms)
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Upper bound of the bucket holding the given fraction of calls (the maximum for the last bucket)"""
+        if not self.count:
+            return None
+        target = fraction * self.count
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                bound = self.BOUNDS_MS[index] if index < len(self.BOUNDS_MS) else self.max_ms
+                return round(min(bound, self.max_ms), 3)
+        return round(self.max_ms, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"<={bound}ms" for bound in self.BOUNDS_MS] + [f">{self.BOUNDS_MS[-1]}ms"]
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3) if self.count else None,
+            'min_ms': round(self.min_ms, 3) if self.min_ms is not None else None,
+            'max_ms': round(self.max_ms, 3),
+            'p50_ms': self.percentile(0.5),
+            'p90_ms': self.percentile(0.9),
+            'p99_ms': self.percentile(0.99),
+            'buckets': {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+
+class _Frame:
+    """A running stage on one thread"""
+
+    __slots__ = ('stage', 'wall', 'cpu', 'child_wall', 'child_cpu')
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.child_wall = 0.0
+        self.child_cpu = 0.0
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+
+class _StageTimer:
+    """Context manager returned by IngestionProfiler.stage()"""
+
+    __slots__ = ('profiler', 'stage', 'units', 'frame')
+
+    def __init__(self, profiler: 'IngestionProfiler', stage: str, units: int):
+        self.profiler = profiler
+        self.stage = stage
+        self.units = units
+
+    def __enter__(self) -> '_StageTimer':
+        self.frame = self.profiler.start(self.stage)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.profiler.stop(self.frame, self.units)
+
+
+class IngestionProfiler:
+    """Exclusive wall/CPU time, units and latency histograms per ingestion stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget all measurements"""
+        with self._lock:
+            self.stages = {stage: {'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'units': 0}
+                           for stage in STAGE_UNITS}
+            self.histograms = {stage: LatencyHistogram() for stage in HISTOGRAM_STAGES}
+            self.started = time.perf_counter()
+            self.started_cpu = time.process_time()
+
+    def _stack(self) -> List[_Frame]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def start(self, stage: str) -> _Frame:
+        """Enter a stage on the current thread"""
+        frame = _Frame(stage)
+        self._stack().append(frame)
+        return frame
+
+    def stop(self, frame: _Frame, units: int = 0) -> float:
+        """
+        Leave a stage; its time minus that of nested stages is recorded
+
+        Returns:
+            Inclusive wall seconds of the call
+        """
+        wall = time.perf_counter() - frame.wall
+        cpu = time.thread_time() - frame.cpu
+        stack = self._stack()
+        stack.pop()
+        if stack:
+            parent = stack[-1]
+            parent.child_wall += wall
+            parent.child_cpu += cpu
+
+        with self._lock:
+            record = self.stages.setdefault(frame.stage, {'calls': 0, 'wall_seconds': 0.0,
+                                                          'cpu_seconds': 0.0, 'units': 0})
+            record['calls'] += 1
+            record['wall_seconds'] += wall - frame.child_wall
+            record['cpu_seconds'] += cpu - frame.child_cpu
+            record['units'] += units
+            histogram = self.histograms.get(frame.stage)
+            if histogram is not None:
+                histogram.record(wall)
+        return wall
+
+    def stage(self, stage: str, units: int = 0) -> _StageTimer:
+        """Time a block: `with profiler.stage('commit', units=1): ...`"""
+        return _StageTimer(self, stage, units)
+
+    def count(self, stage: str, units: int) -> None:
+        """Add units to a stage without timing anything"""
+        with self._lock:
+            self.stages[stage]['units'] += units
+
+    def iterate(self, stage: str, iterable: Iterable, units: Optional[Callable[[Any], int]] = None) -> Iterator:
+        """
+        Yield from an iterable, timing each step as `stage`
+
+        Only the time spent producing items is measured, not the consumer's
+        work between them.
+        """
+        iterator = iter(iterable)
+        while True:
+            frame = self.start(stage)
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.stop(frame)
+                return
+            except BaseException:
+                self.stop(frame)
+                raise
+            self.stop(frame, units(item) if units is not None else 0)
+            yield item
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Per-stage times and throughput, and the latency histograms"""
+        elapsed = time.perf_counter() - self.started
+        with self._lock:
+            stages = {}
+            for stage, record in self.stages.items():
+                unit = STAGE_UNITS.get(stage, 'units')
+                wall = record['wall_seconds']
+                stages[stage] = {
+                    'calls': record['calls'],
+                    'wall_seconds': round(wall, 4),
+                    'cpu_seconds': round(record['cpu_seconds'], 4),
+                    unit: record['units'],
+                    f'{unit}_per_second': round(record['units'] / wall, 1) if wall > 0 else None,
+                    'share': round(wall / elapsed, 4) if elapsed > 0 else 0.0,
+                }
+            return {
+                'elapsed_seconds': round(elapsed, 3),
+                'process_cpu_seconds': round(time.process_time() - self.started_cpu, 3),
+                'stages': stages,
+                'latency_ms': {stage: histogram.to_dict() for stage, histogram in self.histograms.items()},
+            }
+
+
+def write_run_report(report: Dict[str, Any], path: Union[str, Path]) -> Path:
+    """Write a run report as JSON"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    logger.info(f"Ingestion run report written: {path}")
+    return path
+
+
+def _cprofile_summary(profile: cProfile.Profile, limit: int = 20) -> List[Dict[str, Any]]:
+    """Top functions of a cProfile run by cumulative time"""
+    stats = pstats.Stats(profile)
+    rows = []
+    for (filename, line, function), (_, calls, total, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': f"{Path(filename).name}:{line}({function})",
+            'calls': calls,
+            'total_seconds': round(total, 4),
+            'cumulative_seconds': round(cumulative, 4),
+        })
+    rows.sort(key=lambda row: row['cumulative_seconds'], reverse=True)
+    return rows[:limit]
+
+
+@contextmanager
+def profile_code(mode: Optional[str], output_base: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    """
+    Run the enclosed block under a code profiler
+
+    Args:
+        mode: 'cprofile', 'pyinstrument' or 'none'/None
+        output_base: Output path without suffix; cProfile writes <base>.prof
+                     (for pstats/snakeviz), pyinstrument <base>.html
+
+    Yields:
+        A dict filled in on exit with the profiler, its output file and, for
+        cProfile, the top functions by cumulative time
+    """
+    info: Dict[str, Any] = {}
+    mode = (mode or 'none').lower()
+    if mode == 'pyinstrument' and not PYINSTRUMENT_AVAILABLE:
+        logger.warning("pyinstrument not installed (pip install pyinstrument); using cProfile")
+        mode = 'cprofile'
+    if mode not in CODE_PROFILERS:
+        logger.warning(f"Unknown code profiler '{mode}'; profiling disabled")
+        mode = 'none'
+    if mode == 'none':
+        yield info
+        return
+
+    output_base = Path(output_base)
+    output_base.parent.mkdir(parents=True, exist_ok=True)
+
+    if mode == 'cprofile':
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Another profiler is already active on this thread
+            logger.warning(f"cProfile not started: {e}")
+            yield info
+            return
+        try:
+            yield info
+        finally:
+            profile.disable()
+            output = output_base.with_suffix('.prof')
+            profile.dump_stats(str(output))
+            info.update({'profiler': 'cprofile', 'output': str(output),
+                         'top_functions': _cprofile_summary(profile)})
+            logger.info(f"cProfile output written: {output}")
+    else:
+        profiler = PyinstrumentProfiler()
+        profiler.start()
+        try:
+            yield info
+        finally:
+            profiler.stop()
+            output = output_base.with_suffix('.html')
+            output.write_text(profiler.output_html(), encoding='utf-8')
+            info.update({'profiler': 'pyinstrument', 'output': str(output)})
+            logger.info(f"pyinstrument output written: {output}")
+
+
+def default_report_base(directory: Union[str, Path]) -> Path:
+    """<directory>/ingestion-<timestamp>: base name of a run's report files"""
+    return Path(directory) / f"ingestion-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
@@ -0,0 +1,139 @@
+"""
+Sharded Corpus Ingestion
+
+Ingests a directory into a sharded corpus (see database.sharding): files are
+partitioned over the shards, and every shard is written by its own
+CorpusIngestor, in a separate process, so the shards are written
+concurrently instead of queueing behind SQLite's single writer.
+
+Worker processes are spawned, so scripts that use them need the usual
+`if __name__ == "__main__":` guard.
+"""
+
+import os
+import time
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Union
+
+from database.sharding import ShardedCorpus
+from ingestion.corpus_ingestor import CorpusIngestor, find_corpus_files
+
+logger = logging.getLogger(__name__)
+
+# Counters of CorpusIngestor.stats summed over the shards
+STAT_KEYS = ('documents_processed', 'sentences_processed', 'tokens_processed', 'files_skipped', 'errors')
+
+
+def _ingest_shard(db_path: str, files: List[str], nlp_backend: str, annotation_cache: bool,
+                  batch_size: int) -> Dict[str, Any]:
+    """Ingest files into one shard (runs in a worker process)"""
+    start = time.perf_counter()
+    ingestor = CorpusIngestor(db_path, nlp_backend=nlp_backend, annotation_cache=annotation_cache)
+    try:
+        stats = ingestor.ingest_files([Path(f) for f in files], batch_size)
+        stats['profile'] = ingestor.profiler.get_stats()['stages']
+    finally:
+        ingestor.close()
+    stats.update({'shard': db_path, 'files': len(files),
+                  'elapsed_seconds': round(time.perf_counter() - start, 3)})
+    return stats
+
+
+class ShardedCorpusIngestor:
+    """Writes the shards of a sharded corpus concurrently"""
+
+    def __init__(self, corpus: Union[str, ShardedCorpus], nlp_backend: str = 'auto',
+                 annotation_cache: bool = True, workers: Optional[int] = None):
+        """
+        Args:
+            corpus: Sharded corpus or its directory / shards.json
+            nlp_backend: NLP backend of every shard's ingestor
+            annotation_cache: Reuse annotations of previously seen sentences
+                              (one cache per shard)
+            workers: Shards written at the same time (None: one per CPU, at
+                     most one per shard; 0: one shard after the other in this
+                     process)
+        """
+        self.corpus = corpus if isinstance(corpus, ShardedCorpus) else ShardedCorpus(corpus)
+        self.nlp_backend = nlp_backend
+        self.annotation_cache = annotation_cache
+        if workers is None:
+            workers = min(self.corpus.num_shards, os.cpu_count() or 1)
+        self.workers = workers
+        self.stats = {key: 0 for key in STAT_KEYS}
+        # Statistics of the last run, per shard
+        self.shard_stats: List[Dict[str, Any]] = []
+
+    def ingest_directory(self, directory_path: str,
+                         file_patterns: Optional[List[str]] = None,
+                         max_files: Optional[int] = None,
+                         batch_size: int = 1000) -> Dict[str, Any]:
+        """
+        Ingest all matching files of a directory into their shards
+
+        Args:
+            directory_path: Path to directory containing text files
+            file_patterns: List of patterns to match files (as CorpusIngestor)
+            max_files: Maximum number of files to process
+            batch_size: Number of tokens to insert per database batch
+
+        Returns:
+            Processing statistics summed over the shards
+        """
+        files = find_corpus_files(directory_path, file_patterns, max_files)
+        return self.ingest_files(files, batch_size)
+
+    def ingest_files(self, files: List[Path], batch_size: int = 1000) -> Dict[str, Any]:
+        """Ingest a list of files into their shards (see ingest_directory)"""
+        tasks = [(str(path), [str(f) for f in group])
+                 for path, group in zip(self.corpus.shard_paths, self.corpus.partition_files(files))
+                 if group]
+        logger.info(f"Ingesting {len(files)} files into {len(tasks)} shards with "
+                    f"{self.workers or 'no'} worker processes")
+
+        if self.workers == 0:
+            results = [_ingest_shard(path, group, self.nlp_backend, self.annotation_cache, batch_size)
+                       for path, group in tasks]
+        else:
+            # spawn: loaded NLP models and SQLite connections are not forked
+            with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                futures = [executor.submit(_ingest_shard, path, group, self.nlp_backend,
+                                           self.annotation_cache, batch_size)
+                           for path, group in tasks]
+                results = [future.result() for future in futures]
+
+        for result in results:
+            for key in STAT_KEYS:
+                self.stats[key] += result.get(key, 0)
+            logger.info(f"Shard {Path(result['shard']).name}: {result['documents_processed']} documents, "
+                        f"{result['tokens_processed']} tokens in {result['elapsed_seconds']:.1f}s")
+        self.shard_stats = results
+        return self.stats.copy()
+
+
+def ingest_sharded_corpus(corpus_path: str,
+                          shards_dir: str,
+                          num_shards: int = 4,
+                          nlp_backend: str = 'auto',
+                          max_files: Optional[int] = None,
+                          workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Convenience function to ingest a corpus into a (new or existing) sharded corpus
+
+    Args:
+        corpus_path: Path to directory with text files
+        shards_dir: Sharded corpus directory
+        num_shards: Number of shards of a new sharded corpus
+        nlp_backend: NLP backend to use
+        max_files: Maximum files to process
+        workers: Shards written at the same time
+
+    Returns:
+        Processing statistics
+    """
+    corpus = ShardedCorpus.create(shards_dir, num_shards)
+    ingestor = ShardedCorpusIngestor(corpus, nlp_backend=nlp_backend, workers=workers)
+    return ingestor.ingest_directory(corpus_path, max_files=max_files)
@@ -0,0 +1,411 @@
+"""
+Streaming Readers Module
+
+Incremental readers for TXT, JSON and XML inputs. Each reader yields text
+chunks that end on paragraph (or, failing that, sentence/line) boundaries,
+so multi-GB files are ingested with memory bounded by the chunk size rather
+than the file size.
+
+Concatenating the chunks of a reader gives exactly the text the old
+whole-file readers produced, so document hashes stay comparable.
+"""
+
+import re
+import json
+import codecs
+import logging
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Iterator, Iterable, Optional, Tuple
+
+from ingestion.metadata import MetadataCollector, local_name
+
+logger = logging.getLogger(__name__)
+
+# Target size of a yielded chunk in characters
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+# Bytes read from disk per I/O call
+READ_SIZE = 1 << 16
+
+# Fallback encodings for non-UTF-8 Turkish text, tried in order
+FALLBACK_ENCODINGS = ('cp1254', 'iso-8859-9', 'latin-1')
+
+# Last boundary inside a buffer, best first
+_PARAGRAPH_BREAK = re.compile(r'\n[ \t]*\n')
+_SENTENCE_BREAK = re.compile(r'[.!?…]["\'»”)]*\s')
+
+
+def detect_encoding(sample: bytes) -> str:
+    """
+    Pick an encoding from a leading sample of the file
+
+    A BOM wins; otherwise UTF-8 if the sample decodes (ignoring a multi-byte
+    sequence cut off at the end of the sample), else the first fallback
+    encoding that decodes it.
+    """
+    if sample.startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig'
+    if sample.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return 'utf-16'
+
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(sample, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        pass
+
+    for encoding in FALLBACK_ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def iter_decoded(file_path: Path, read_size: int = READ_SIZE) -> Iterator[str]:
+    """
+    Decode a file incrementally in a single pass
+
+    The encoding is detected from the first block. If UTF-8 was detected but a
+    later block turns out not to be UTF-8, decoding switches to the Turkish
+    fallback encoding at the first undecodable byte instead of re-reading the
+    file. Newlines are normalized like text-mode ``open``.
+    """
+    with open(file_path, 'rb') as f:
+        block = f.read(read_size)
+        encoding = detect_encoding(block)
+        decoder = codecs.getincrementaldecoder(encoding)()
+        pending_cr = False
+
+        while block:
+            try:
+                text = decoder.decode(block)
+            except UnicodeDecodeError as e:
+                # The decoder still buffers the bytes of a character split by
+                # the previous block (e.start counts them): decode up to the
+                # bad byte, then everything from there with the fallback
+                pending = decoder.getstate()[0]
+                good = e.start - len(pending)
+                if good > 0:
+                    text = decoder.decode(block[:good])
+                    rest = block[good:]
+                else:
+                    text = ''
+                    rest = pending + block
+                if encoding.startswith('utf-8'):
+                    logger.warning(f"{file_path.name}: not UTF-8 past byte offset "
+                                   f"{f.tell() - len(rest)}, switching to {FALLBACK_ENCODINGS[0]}")
+                encoding = FALLBACK_ENCODINGS[0] if encoding != FALLBACK_ENCODINGS[0] else 'latin-1'
+                decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+                text += decoder.decode(rest)
+
+            text, pending_cr = _normalize_newlines(text, pending_cr)
+            if text:
+                yield text
+            block = f.read(read_size)
+
+        tail = decoder.decode(b'', final=True)
+        tail, pending_cr = _normalize_newlines(tail, pending_cr)
+        if pending_cr:
+            tail += '\n'
+        if tail:
+            yield tail
+
+
+def _normalize_newlines(text: str, pending_cr: bool) -> Tuple[str, bool]:
+    """Translate \\r\\n and \\r to \\n across block boundaries"""
+    if pending_cr:
+        text = '\r' + text
+    pending_cr = text.endswith('\r')
+    if pending_cr:
+        text = text[:-1]
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return text, pending_cr
+
+
+def _split_point(buffer: str, start: int, end: int) -> int:
+    """Index just after the last paragraph, sentence or line break in buffer[start:end]"""
+    for pattern in (_PARAGRAPH_BREAK, _SENTENCE_BREAK):
+        last = None
+        for last in pattern.finditer(buffer, start, end):
+            pass
+        if last is not None:
+            return last.end()
+    newline = buffer.rfind('\n', start, end)
+    if newline != -1:
+        return newline + 1
+    space = buffer.rfind(' ', start, end)
+    return space + 1 if space != -1 else end
+
+
+def iter_text_chunks(file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Yield chunks of a plain text file split on paragraph boundaries
+
+    Boundaries are searched in the second half of each ``chunk_size`` window,
+    so chunks are between half and all of ``chunk_size`` unless the file ends
+    first.
+    """
+    pieces = []
+    size = 0
+    for text in iter_decoded(Path(file_path)):
+        pieces.append(text)
+        size += len(text)
+        if size < chunk_size:
+            continue
+        buffer = ''.join(pieces)
+        while len(buffer) >= chunk_size:
+            cut = _split_point(buffer, chunk_size // 2, chunk_size)
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+        pieces = [buffer]
+        size = len(buffer)
+    if size:
+        yield ''.join(pieces)
+
+
+def group_text_parts(parts: Iterable[str], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """
+    Join non-empty text parts with spaces into chunks of about chunk_size
+
+    Every chunk after the first starts with the joining space, so the chunks
+    concatenate to ``' '.join(parts)``.
+    """
+    chunk = []
+    size = 0
+    first = True
+    for part in parts:
+        if not part:
+            continue
+        chunk.append(part)
+        size += len(part) + 1
+        if size >= chunk_size:
+            yield ('' if first else ' ') + ' '.join(chunk)
+            first = False
+            chunk = []
+            size = 0
+    if chunk:
+        yield ('' if first else ' ') + ' '.join(chunk)
+
+
+# ----------------------------------------------------------------------
+# JSON
+# ----------------------------------------------------------------------
+
+_JSON_WHITESPACE = ' \t\n\r'
+_JSON_DELIMITER = re.compile(r'[\s,\]}]')
+_JSON_SCALAR = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?|true|false|null')
+
+
+def iter_json_strings(file_path: Path, read_size: int = READ_SIZE,
+                      metadata: Optional[MetadataCollector] = None) -> Iterator[str]:
+    """
+    Yield the scalar values of a JSON document in document order, keys excluded
+
+    A small pull tokenizer over incrementally decoded text; only the current
+    token and the container nesting (one flag per level) are held in memory.
+    Numbers and booleans are yielded the way ``str()`` renders the parsed
+    value, matching the previous ``json.load`` based extraction.
+
+    With a metadata collector, every value is also offered to it under the
+    nearest enclosing object key.
+
+    Raises:
+        ValueError: If the document is not valid JSON
+    """
+    blocks = iter_decoded(Path(file_path), read_size)
+    buffer = ''
+    pos = 0
+    eof = False
+    # One entry per open container: True for objects, False for arrays
+    stack = []
+    # In an object: whether the next string is a key
+    expect_key = False
+    # Per open container: the object key its values belong to
+    keys = []
+    decode_string = json.decoder.scanstring
+
+    def fill() -> bool:
+        nonlocal buffer, pos, eof
+        block = next(blocks, None)
+        if block is None:
+            eof = True
+            return False
+        buffer = buffer[pos:] + block
+        pos = 0
+        return True
+
+    while True:
+        # Skip whitespace and separators
+        while True:
+            while pos < len(buffer) and buffer[pos] in _JSON_WHITESPACE:
+                pos += 1
+            if pos < len(buffer) or not fill():
+                break
+        if pos >= len(buffer):
+            break
+
+        char = buffer[pos]
+        if char == '{':
+            stack.append(True)
+            keys.append(None)
+            expect_key = True
+            pos += 1
+        elif char == '[':
+            stack.append(False)
+            keys.append(keys[-1] if keys else None)
+            expect_key = False
+            pos += 1
+        elif char in '}]':
+            if not stack or stack[-1] != (char == '}'):
+                raise ValueError(f"Invalid JSON file {file_path}: unexpected '{char}'")
+            stack.pop()
+            keys.pop()
+            expect_key = False
+            pos += 1
+        elif char == ',':
+            expect_key = bool(stack) and stack[-1]
+            pos += 1
+        elif char == ':':
+            expect_key = False
+            pos += 1
+        elif char == '"':
+            while True:
+                try:
+                    value, end = decode_string(buffer, pos + 1)
+                    break
+                except json.JSONDecodeError:
+                    if eof or not fill():
+                        raise ValueError(f"Invalid JSON file {file_path}: unterminated string")
+            pos = end
+            if expect_key:
+                keys[-1] = value
+            else:
+                if metadata is not None:
+                    metadata.offer(keys[-1] if keys else None, value)
+                yield value
+        else:
+            # A scalar can straddle a block boundary; make sure it is complete
+            while not eof and not _JSON_DELIMITER.search(buffer, pos, pos + 64) \
+                    and len(buffer) - pos < 64 and fill():
+                pass
+            match = _JSON_SCALAR.match(buffer, pos)
+            if not match:
+                raise ValueError(f"Invalid JSON file {file_path}: unexpected '{char}'")
+            pos = match.end()
+            literal = match.group()
+            if literal != 'null':
+                value = json.loads(literal)
+                if metadata is not None:
+                    metadata.offer(keys[-1] if keys else None, value)
+                yield str(value)
+
+        # Drop consumed text once the buffer has grown
+        if pos > READ_SIZE:
+            buffer = buffer[pos:]
+            pos = 0
+
+    if stack:
+        raise ValueError(f"Invalid JSON file {file_path}: unexpected end of file")
+
+
+def iter_json_chunks(file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     metadata: Optional[MetadataCollector] = None) -> Iterator[str]:
+    """Yield the text of a JSON file in chunks"""
+    return group_text_parts(iter_json_strings(file_path, metadata=metadata), chunk_size)
+
+
+# ----------------------------------------------------------------------
+# XML
+# ----------------------------------------------------------------------
+
+def iter_xml_strings(file_path: Path, metadata: Optional[MetadataCollector] = None) -> Iterator[str]:
+    """
+    Yield element text and tails of an XML document in document order
+
+    Uses ``iterparse`` and frees every element as soon as its tail has been
+    read, so memory is bounded by nesting depth rather than document size.
+
+    With a metadata collector, attributes are offered to it under their
+    names and the text of elements without children under their tags.
+
+    Raises:
+        ValueError: If the document is not well-formed
+    """
+    # Per open element: [element, text emitted, last closed child or None]
+    stack = []
+
+    def flush_last_child(frame):
+        child = frame[2]
+        if child is not None:
+            if child.tail:
+                yield child.tail
+            frame[0].remove(child)
+            frame[2] = None
+
+    try:
+        for event, element in ET.iterparse(str(file_path), events=('start', 'end')):
+            if event == 'start':
+                if metadata is not None:
+                    for name, value in element.attrib.items():
+                        metadata.offer(local_name(name), value)
+                if stack:
+                    parent = stack[-1]
+                    if not parent[1]:
+                        parent[1] = True
+                        if parent[0].text:
+                            yield parent[0].text
+                    yield from flush_last_child(parent)
+                stack.append([element, False, None])
+            else:
+                frame = stack.pop()
+                if not frame[1] and element.text:
+                    if metadata is not None:
+                        metadata.offer(local_name(element.tag), element.text)
+                    yield element.text
+                yield from flush_last_child(frame)
+                # Keep the tail, which the parser fills in later
+                tail = element.tail
+                element.clear()
+                element.tail = tail
+                if stack:
+                    stack[-1][2] = element
+    except ET.ParseError as e:
+        raise ValueError(f"Invalid XML file {file_path}: {e}")
+
+
+def iter_xml_chunks(file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                    metadata: Optional[MetadataCollector] = None) -> Iterator[str]:
+    """Yield the text of an XML file in chunks"""
+    return group_text_parts(iter_xml_strings(file_path, metadata), chunk_size)
+
+
+READERS = {
+    '.txt': iter_text_chunks,
+    '.json': iter_json_chunks,
+    '.xml': iter_xml_chunks,
+}
+
+
+def iter_file_chunks(file_path: Path, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     metadata: Optional[MetadataCollector] = None) -> Iterator[str]:
+    """
+    Yield text chunks of a TXT, JSON or XML file
+
+    Args:
+        metadata: Filled with the document metadata of a JSON or XML file
+                  while its chunks are read
+
+    Raises:
+        ValueError: For unsupported formats or malformed JSON/XML
+    """
+    file_path = Path(file_path)
+    reader = READERS.get(file_path.suffix.lower())
+    if reader is None:
+        raise ValueError(f"Unsupported file format: {file_path.suffix.lower()}")
+    if metadata is None or reader is iter_text_chunks:
+        return reader(file_path, chunk_size)
+    return reader(file_path, chunk_size, metadata)
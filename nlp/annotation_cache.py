@@ -0,0 +1,289 @@
+"""
+Annotation Cache
+
+Persistent cache of NLP annotations keyed by (backend, model version,
+normalized sentence hash), stored in a side SQLite file next to the corpus.
+Web-scraped corpora repeat the same sentences (boilerplate, headers, quotes)
+many times; with the cache each distinct sentence is annotated once per model.
+
+The file is bounded in size: entries are evicted least-recently-used first
+once the stored annotations exceed ``max_size_mb``.
+"""
+
+import re
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+import unicodedata
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Callable, Union
+
+logger = logging.getLogger(__name__)
+
+# Bump when the stored token layout changes
+CACHE_FORMAT_VERSION = 1
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def default_cache_path(db_path: Union[str, Path]) -> Path:
+    """Side file next to a corpus database: corpus.db -> corpus.annotations.db"""
+    db_path = Path(db_path)
+    return db_path.with_name(db_path.stem + '.annotations.db')
+
+
+def normalize_sentence(sentence: str) -> str:
+    """NFC-normalize and collapse whitespace, so trivially different copies share an entry"""
+    return _WHITESPACE.sub(' ', unicodedata.normalize('NFC', sentence)).strip()
+
+
+class AnnotationCache:
+    """SQLite-backed, size-bounded cache of per-sentence token annotations"""
+
+    def __init__(self, cache_path: Union[str, Path], backend: str, model_version: str,
+                 max_size_mb: float = 512, flush_every: int = 1000):
+        """
+        Open (or create) an annotation cache
+
+        Args:
+            cache_path: Path to the side SQLite file
+            backend: Backend name ('spacy', 'stanza', 'custom_bert', ...)
+            model_version: Identifies the model and its version; a new version
+                           never sees annotations made by an older one
+            max_size_mb: Upper bound for stored annotation payloads
+            flush_every: Pending writes buffered before they are committed
+        """
+        self.cache_path = Path(cache_path)
+        self.backend = backend
+        self.model_version = model_version
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.flush_every = flush_every
+
+        self._lock = threading.RLock()
+        self._pending = {}
+        self._touched = set()
+        self._key_prefix = f"{CACHE_FORMAT_VERSION}\x1f{backend}\x1f{model_version}\x1f".encode('utf-8')
+
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(self.cache_path), timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        self._total_bytes = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM annotations").fetchone()[0]
+
+    def _create_schema(self):
+        """Create cache tables"""
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS annotations (
+                key BLOB PRIMARY KEY,
+                backend TEXT NOT NULL,
+                model_version TEXT NOT NULL,
+                sentence TEXT NOT NULL,
+                tokens TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_annotations_last_used ON annotations(last_used)")
+        self.conn.commit()
+
+    def _key(self, normalized: str) -> bytes:
+        """Cache key for a normalized sentence under this backend and model version"""
+        return hashlib.sha1(self._key_prefix + normalized.encode('utf-8')).digest()
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def get(self, sentence: str) -> Optional[List[Dict[str, Any]]]:
+        """
+        Look up the annotation of a sentence
+
+        Returns:
+            Token dictionaries (offsets relative to ``sentence``), or None on a miss
+        """
+        normalized = normalize_sentence(sentence)
+        key = self._key(normalized)
+
+        with self._lock:
+            pending = self._pending.get(key)
+            payload = pending[1] if pending else None
+            if payload is None:
+                row = self.conn.execute("SELECT tokens FROM annotations WHERE key = ?", (key,)).fetchone()
+                payload = row[0] if row else None
+                if payload is not None:
+                    self._touched.add(key)
+
+            if payload is None:
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+
+        tokens = self._decode(payload)
+        if sentence != normalized:
+            self._realign_offsets(tokens, sentence)
+        return tokens
+
+    def put(self, sentence: str, tokens: List[Dict[str, Any]]) -> None:
+        """Store the annotation of a sentence (offsets relative to ``sentence``)"""
+        normalized = normalize_sentence(sentence)
+        if sentence != normalized:
+            # Stored offsets always refer to the normalized text
+            tokens = [dict(token) for token in tokens]
+            self._realign_offsets(tokens, normalized)
+
+        with self._lock:
+            self._pending[self._key(normalized)] = (normalized, self._encode(tokens))
+            if len(self._pending) >= self.flush_every:
+                self.flush()
+
+    def annotate(self, sentence: str, annotator: Callable[[str], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """
+        Return the cached annotation of a sentence, running annotator on a miss
+
+        Results marked as fallbacks (a ``fallback`` attribute, see
+        nlp.backends.FallbackTokens) are returned but not stored.
+        """
+        tokens = self.get(sentence)
+        if tokens is None:
+            tokens = annotator(sentence)
+            if not getattr(tokens, 'fallback', False):
+                self.put(sentence, tokens)
+        return tokens
+
+    # ------------------------------------------------------------------
+    # Serialization
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _encode(tokens: List[Dict[str, Any]]) -> str:
+        """Column-oriented JSON: the keys once, then one value row per token"""
+        keys = sorted({key for token in tokens for key in token})
+        return json.dumps({'k': keys, 'v': [[token.get(key) for key in keys] for token in tokens]},
+                          ensure_ascii=False, separators=(',', ':'))
+
+    @staticmethod
+    def _decode(payload: str) -> List[Dict[str, Any]]:
+        """Inverse of _encode"""
+        data = json.loads(payload)
+        keys = data['k']
+        return [dict(zip(keys, values)) for values in data['v']]
+
+    @staticmethod
+    def _realign_offsets(tokens: List[Dict[str, Any]], text: str) -> None:
+        """Recompute start/end offsets by locating each token form in text, in order"""
+        position = 0
+        for token in tokens:
+            form = token.get('word', token.get('form'))
+            if not form:
+                continue
+            start = text.find(form, position)
+            if start == -1:
+                continue
+            token['start_char'] = start
+            token['end_char'] = start + len(form)
+            position = token['end_char']
+
+    # ------------------------------------------------------------------
+    # Persistence and eviction
+    # ------------------------------------------------------------------
+
+    def flush(self) -> None:
+        """Write pending entries and recency updates, then evict if over budget"""
+        with self._lock:
+            if not self._pending and not self._touched:
+                return
+            now = time.time()
+            rows = [(key, self.backend, self.model_version, sentence, payload, len(payload), now)
+                    for key, (sentence, payload) in self._pending.items()]
+            cursor = self.conn.cursor()
+            if rows:
+                # Sizes of replaced entries are subtracted before the new ones are added
+                replaced = 0
+                for i in range(0, len(rows), 500):
+                    keys = [row[0] for row in rows[i:i + 500]]
+                    replaced += cursor.execute(
+                        f"SELECT COALESCE(SUM(size), 0) FROM annotations "
+                        f"WHERE key IN ({','.join('?' * len(keys))})", keys).fetchone()[0]
+                cursor.executemany("""
+                    INSERT OR REPLACE INTO annotations
+                        (key, backend, model_version, sentence, tokens, size, last_used)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                """, rows)
+                self._total_bytes += sum(row[5] for row in rows) - replaced
+                self.stats['writes'] += len(rows)
+            if self._touched:
+                cursor.executemany("UPDATE annotations SET last_used = ? WHERE key = ?",
+                                   [(now, key) for key in self._touched])
+            self.conn.commit()
+            self._pending.clear()
+            self._touched.clear()
+
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self) -> None:
+        """Delete least recently used entries until 90% of the size budget is free"""
+        target = int(self.max_bytes * 0.9)
+        cursor = self.conn.cursor()
+        while self._total_bytes > target:
+            rows = cursor.execute(
+                "SELECT key, size FROM annotations ORDER BY last_used LIMIT 1000").fetchall()
+            if not rows:
+                self._total_bytes = 0
+                break
+            freed = 0
+            victims = []
+            for key, size in rows:
+                victims.append((key,))
+                freed += size
+                if self._total_bytes - freed <= target:
+                    break
+            cursor.executemany("DELETE FROM annotations WHERE key = ?", victims)
+            self._total_bytes -= freed
+            self.stats['evictions'] += len(victims)
+        self.conn.commit()
+        logger.info(f"Annotation cache evicted to {self._total_bytes / 1024 / 1024:.1f} MB")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters, hit rate and stored size"""
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses']
+            return {
+                **self.stats,
+                'hit_rate': self.stats['hits'] / lookups if lookups else 0.0,
+                'size_mb': round(self._total_bytes / 1024 / 1024, 2),
+                'backend': self.backend,
+                'model_version': self.model_version,
+                'cache_path': str(self.cache_path),
+            }
+
+    def clear(self) -> None:
+        """Remove every entry, for all backends and models"""
+        with self._lock:
+            self._pending.clear()
+            self._touched.clear()
+            self.conn.execute("DELETE FROM annotations")
+            self.conn.commit()
+            self._total_bytes = 0
+
+    def close(self) -> None:
+        """Flush pending entries and close the cache file"""
+        with self._lock:
+            if self.conn is None:
+                return
+            self.flush()
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,555 @@
+"""
+NLP Backends
+
+Plugin interface of the annotation backends behind TurkishNLPProcessor.
+A backend is a class registered under a name with capability flags; it
+annotates a stream of sentences and yields one list of compact ``Token``
+records per sentence:
+
+    @register_backend
+    class MyBackend(NLPBackend):
+        name = 'my_backend'
+        capabilities = frozenset({POS, MORPH, CACHEABLE})
+
+        def annotate_sentence(self, sentence):
+            ...
+
+Ingestion consumes this stream directly; ``TurkishNLPProcessor.process_text``
+still returns plain dicts (``Token.to_dict``) for the GUI and scripts.
+"""
+
+import logging
+import unicodedata
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Type
+
+try:
+    from nlp.turkish_tokenizer import get_tokenizer, is_punctuation
+    from nlp.turkish_morphology import get_morph_analyzer
+    from nlp.model_registry import get_model_registry
+except ImportError:
+    from turkish_tokenizer import get_tokenizer, is_punctuation
+    from turkish_morphology import get_morph_analyzer
+    from model_registry import get_model_registry
+
+logger = logging.getLogger(__name__)
+
+# Capability flags
+POS = 'pos'
+LEMMA = 'lemma'
+MORPH = 'morph'
+DEPENDENCY = 'dependency'
+CONFIDENCE = 'confidence'
+# Annotations are worth keeping in the annotation cache (model backends)
+CACHEABLE = 'cacheable'
+
+UPOS_TR = {
+    'NOUN': 'İsim',
+    'VERB': 'Fiil',
+    'ADJ': 'Sıfat',
+    'ADV': 'Zarf',
+    'PRON': 'Zamirler',
+    'DET': 'Belirteç',
+    'ADP': 'Edat',
+    'CONJ': 'Bağlaç',
+    'CCONJ': 'Bağlaç',
+    'SCONJ': 'Bağlaç',
+    'PART': 'Ek',
+    'INTJ': 'Ünlem',
+    'NUM': 'Sayı',
+    'PROPN': 'Özel İsim',
+    'AUX': 'Yardımcı Fiil',
+    'PUNCT': 'Noktalama',
+    'SYM': 'Sembol',
+    'X': 'Bilinmeyen'
+}
+
+
+def map_pos_to_turkish(upos: Optional[str]) -> Optional[str]:
+    """Universal POS tag -> Turkish POS tag name"""
+    return UPOS_TR.get(upos, upos)
+
+
+class FallbackTokens(list):
+    """
+    Tokens from a rule-based fallback after the model failed
+
+    Marked so they are never stored in the annotation cache under the
+    model's key; checked by attribute (see is_fallback), as the nlp modules
+    are imported both as a package and from the nlp directory.
+    """
+
+    fallback = True
+
+
+def is_fallback(tokens: Any) -> bool:
+    """True for a FallbackTokens result"""
+    return getattr(tokens, 'fallback', False)
+
+
+class Token:
+    """
+    One annotated token: a fixed-slot record instead of a 13-key dict
+
+    dep_head is the 1-based position of the head in the sentence (None for
+    the root), as in CoNLL-U; ingestion stores it as the head's token_id.
+    """
+
+    __slots__ = ('word', 'norm', 'lemma', 'upos', 'upos_tr', 'xpos', 'morph',
+                 'dep_head', 'dep_rel', 'start_char', 'end_char',
+                 'is_punctuation', 'is_space', 'bert_confidence')
+
+    # Left out of to_dict() when unset, as the backends never produced them
+    OPTIONAL_FIELDS = ('lemma', 'bert_confidence')
+
+    def __init__(self, word: str, norm: Optional[str] = None, lemma: Optional[str] = None,
+                 upos: Optional[str] = None, upos_tr: Optional[str] = None,
+                 xpos: Optional[str] = None, morph: Optional[str] = None,
+                 dep_head: Optional[int] = None, dep_rel: Optional[str] = None,
+                 start_char: int = 0, end_char: int = 0, is_punctuation: bool = False,
+                 is_space: bool = False, bert_confidence: Optional[float] = None):
+        self.word = word
+        self.norm = norm if norm is not None else word.lower()
+        self.lemma = lemma
+        self.upos = upos
+        self.upos_tr = upos_tr
+        self.xpos = xpos
+        self.morph = morph
+        self.dep_head = dep_head
+        self.dep_rel = dep_rel
+        self.start_char = start_char
+        self.end_char = end_char
+        self.is_punctuation = is_punctuation
+        self.is_space = is_space
+        self.bert_confidence = bert_confidence
+
+    # Read access by key, so code written against the token dicts keeps working
+    def __getitem__(self, key: str) -> Any:
+        try:
+            return getattr(self, key)
+        except (AttributeError, TypeError):
+            raise KeyError(key) from None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return getattr(self, key, default)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Token):
+            return NotImplemented
+        return all(getattr(self, field) == getattr(other, field) for field in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"Token({self.word!r}, upos={self.upos!r}, {self.start_char}-{self.end_char})"
+
+    def __reduce__(self):
+        # Positional fields pickle about twice as fast as the default slot state
+        return (Token, tuple(getattr(self, field) for field in self.__slots__))
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Token dict as returned by process_text"""
+        return {field: getattr(self, field) for field in self.__slots__
+                if field not in self.OPTIONAL_FIELDS or getattr(self, field) is not None}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Token':
+        """Token from a token dict (backend output, annotation cache entry)"""
+        return cls(data.get('word', data.get('form', '')), data.get('norm'), data.get('lemma'),
+                   data.get('upos'), data.get('upos_tr'), data.get('xpos'), data.get('morph'),
+                   data.get('dep_head'), data.get('dep_rel'), data.get('start_char', 0),
+                   data.get('end_char', 0), bool(data.get('is_punctuation')),
+                   bool(data.get('is_space')), data.get('bert_confidence'))
+
+
+class Sentence:
+    """One annotated sentence and its place in the corpus (ids are set by ingestion)"""
+
+    __slots__ = ('text', 'tokens', 'doc_id', 'sent_id', 'sent_number', 'token_start', 'token_id')
+
+    def __init__(self, text: str, tokens: List[Token], doc_id: Optional[int] = None,
+                 sent_id: Optional[int] = None, sent_number: Optional[int] = None,
+                 token_start: int = 0, token_id: Optional[int] = None):
+        self.text = text
+        self.tokens = tokens
+        self.doc_id = doc_id
+        self.sent_id = sent_id
+        self.sent_number = sent_number
+        # Document-level token_number of the first token
+        self.token_start = token_start
+        # tokens.token_id of the first token
+        self.token_id = token_id
+
+    @property
+    def token_end(self) -> int:
+        return self.token_start + len(self.tokens)
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __repr__(self) -> str:
+        return f"Sentence({self.text[:40]!r}, {len(self.tokens)} tokens)"
+
+    def sentence_row(self) -> tuple:
+        """(sent_id, doc_id, sent_number, sent_text, token_start, token_end)"""
+        return (self.sent_id, self.doc_id, self.sent_number, self.text,
+                self.token_start, self.token_start + len(self.tokens))
+
+    def token_rows(self) -> Iterator[tuple]:
+        """
+        Rows of the tokens table, in column order (token_id, doc_id, sent_id,
+        token_number, form, norm, lemma, upos, xpos, morph, dep_head, dep_rel,
+        start_char, end_char, is_punctuation, is_space), built straight from the
+        records (sqlite3 stores the bool flags as 0/1)
+
+        Token heads (sentence-relative, 1-based) become absolute token_ids.
+        """
+        doc_id = self.doc_id
+        sent_id = self.sent_id
+        head_base = self.token_id - 1
+        for i, token in enumerate(self.tokens):
+            dep_head = head_base + token.dep_head if token.dep_head else None
+            yield (self.token_id + i, doc_id, sent_id, self.token_start + i, token.word, token.norm,
+                   token.lemma, token.upos, token.xpos, token.morph, dep_head, token.dep_rel,
+                   token.start_char, token.end_char, token.is_punctuation, token.is_space)
+
+
+def pack_sentences(sentences: List[Sentence]) -> tuple:
+    """
+    Column layout of annotated sentences (ids are not kept)
+
+    Used to send annotations between processes: one list per Token field
+    pickles much faster and smaller than the records themselves.
+    """
+    tokens = [token for sentence in sentences for token in sentence.tokens]
+    columns = [[getattr(token, field) for token in tokens] for field in Token.__slots__]
+    return [sentence.text for sentence in sentences], [len(sentence.tokens) for sentence in sentences], columns
+
+
+def unpack_sentences(packed: tuple) -> List[Sentence]:
+    """Sentences from pack_sentences()"""
+    texts, lengths, columns = packed
+    tokens = list(map(Token, *columns))
+    sentences = []
+    start = 0
+    for text, length in zip(texts, lengths):
+        sentences.append(Sentence(text, tokens[start:start + length]))
+        start += length
+    return sentences
+
+
+# ----------------------------------------------------------------------
+# Registration
+# ----------------------------------------------------------------------
+
+BACKENDS: Dict[str, Type['NLPBackend']] = {}
+
+
+def register_backend(cls: Type['NLPBackend']) -> Type['NLPBackend']:
+    """Class decorator: make a backend available to TurkishNLPProcessor by its name"""
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} has no backend name")
+    if cls.name in BACKENDS and BACKENDS[cls.name] is not cls:
+        logger.info(f"Backend '{cls.name}' replaced by {cls.__name__}")
+    BACKENDS[cls.name] = cls
+    return cls
+
+
+def get_backend_class(name: str) -> Type['NLPBackend']:
+    """Registered backend class by name"""
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown NLP backend '{name}' (registered: {', '.join(BACKENDS)})") from None
+
+
+def registered_backends() -> List[str]:
+    """Names of the registered backends, in registration order"""
+    return list(BACKENDS)
+
+
+def auto_detect_order() -> List[str]:
+    """Backends tried by auto-detection, best first"""
+    candidates = [cls for cls in BACKENDS.values() if cls.auto_priority is not None]
+    return [cls.name for cls in sorted(candidates, key=lambda cls: -cls.auto_priority)]
+
+
+# ----------------------------------------------------------------------
+# Interface
+# ----------------------------------------------------------------------
+
+class NLPBackend:
+    """Base class of the annotation backends"""
+
+    name: str = ''
+    capabilities: FrozenSet[str] = frozenset()
+    # Position in auto-detection (higher is tried first); None: only on request
+    auto_priority: Optional[int] = None
+
+    def __init__(self, model_name: Optional[str] = None, allow_download: bool = True, **options):
+        """
+        Args:
+            model_name: Model to load (None for the backend's default)
+            allow_download: Allow fetching a missing model
+            **options: Backend-specific loader options
+        """
+        self.model_name = model_name
+        self.allow_download = allow_download
+        self.options = options
+        # Rule-based tokenization and morphology shared by every backend
+        self.tokenizer = get_tokenizer()
+        self.morph_analyzer = get_morph_analyzer()
+
+    def load(self) -> None:
+        """Load the models; raises (ImportError, OSError, ...) if the backend is unavailable"""
+
+    def supports(self, capability: str) -> bool:
+        return capability in self.capabilities
+
+    def annotate(self, sentences: Iterable[str]) -> Iterator[List[Token]]:
+        """
+        Annotate a stream of sentences
+
+        Yields one token list per sentence, in input order. Backends that can
+        run several sentences through a model at once override this; the
+        default annotates sentence by sentence.
+        """
+        for sentence in sentences:
+            yield self.annotate_sentence(sentence)
+
+    def annotate_sentence(self, sentence: str) -> List[Token]:
+        raise NotImplementedError
+
+    def rule_based_tokens(self, sentence: str) -> List[Token]:
+        """Tokenization with rule-based morphology only (no tagging)"""
+        # Turkish characters (ç, ğ, ı, İ, ö, ş, ü) are matched as letters and
+        # offsets point into the original text
+        tokens = []
+        for form, start_char, end_char in self.tokenizer.tokenize(sentence):
+            if is_punctuation(form):
+                tokens.append(Token(form, form.lower(), None, 'PUNCT', 'Noktalama', None, None,
+                                    None, None, start_char, end_char, True))
+            else:
+                tokens.append(Token(form, form.lower(), None, None, None, None,
+                                    self.morph_analyzer.features(form),
+                                    None, None, start_char, end_char))
+        return tokens
+
+    def model_version(self) -> str:
+        """Identity of the model behind the annotations (annotation cache key)"""
+        return f"{self.name}-rules"
+
+    def get_info(self) -> Dict[str, Any]:
+        """Backend-specific entries for TurkishNLPProcessor.get_processing_info"""
+        return {}
+
+
+# ----------------------------------------------------------------------
+# Built-in backends
+# ----------------------------------------------------------------------
+
+@register_backend
+class SpacyBackend(NLPBackend):
+    """spaCy pipeline on top of the rule-based tokenization"""
+
+    name = 'spacy'
+    capabilities = frozenset({POS, LEMMA, MORPH, DEPENDENCY, CACHEABLE})
+    auto_priority = 30
+
+    def load(self) -> None:
+        self.model_name = self.model_name or 'tr_core_news_sm'
+        self.nlp = get_model_registry().get('spacy', self.model_name)
+
+    def annotate_sentence(self, sentence: str) -> List[Token]:
+        from spacy.tokens import Doc
+
+        spans = self.tokenizer.tokenize(sentence)
+        if not spans:
+            return []
+        words = [form for form, _, _ in spans]
+        spaces = [spans[i + 1][1] > spans[i][2] for i in range(len(spans) - 1)] + [False]
+
+        doc = Doc(self.nlp.vocab, words=words, spaces=spaces)
+        for _, component in self.nlp.pipeline:
+            doc = component(doc)
+
+        tokens = []
+        for token in doc:
+            if token.is_space:
+                continue
+            _, start_char, end_char = spans[token.i]
+            morph = "|".join(f"{key}={value}" for key, value in token.morph) or None
+            tokens.append(Token(
+                token.text,
+                norm=token.lemma_.lower() if token.lemma_ else token.text.lower(),
+                upos=token.pos_,
+                upos_tr=map_pos_to_turkish(token.pos_),
+                xpos=token.tag_,
+                morph=morph or self.morph_analyzer.features(token.text, token.pos_),
+                dep_head=token.head.i + 1 if token.head.i != token.i else None,
+                dep_rel=token.dep_ if token.dep_ != 'ROOT' else 'root',
+                start_char=start_char,
+                end_char=end_char,
+                is_punctuation=token.is_punct,
+            ))
+        return tokens
+
+    def model_version(self) -> str:
+        meta = getattr(self.nlp, 'meta', {}) or {}
+        return f"{meta.get('lang', 'tr')}_{meta.get('name', self.model_name)}-{meta.get('version', 'unknown')}"
+
+
+@register_backend
+class StanzaBackend(NLPBackend):
+    """Stanza pipeline on pretokenized input"""
+
+    name = 'stanza'
+    capabilities = frozenset({POS, LEMMA, MORPH, DEPENDENCY, CACHEABLE})
+    auto_priority = 20
+
+    def load(self) -> None:
+        self.nlp = get_model_registry().get('stanza', self.model_name,
+                                            allow_download=self.allow_download)
+
+    def annotate(self, sentences: Iterable[str]) -> Iterator[List[Token]]:
+        # Stanza batches pretokenized sentences itself: one pipeline call per
+        # group of sentences instead of one per sentence
+        batch = []
+        for sentence in sentences:
+            batch.append((sentence, self.tokenizer.tokenize(sentence)))
+            if len(batch) >= self.options.get('batch_size', 32):
+                yield from self._annotate_batch(batch)
+                batch = []
+        if batch:
+            yield from self._annotate_batch(batch)
+
+    def annotate_sentence(self, sentence: str) -> List[Token]:
+        return next(self._annotate_batch([(sentence, self.tokenizer.tokenize(sentence))]))
+
+    def _annotate_batch(self, batch) -> Iterator[List[Token]]:
+        words = [[form for form, _, _ in spans] for _, spans in batch if spans]
+        sentences = iter(self.nlp(words).sentences if words else [])
+        for _, spans in batch:
+            if not spans:
+                yield []
+                continue
+            tokens = []
+            for word in next(sentences).words:
+                _, start_char, end_char = spans[word.id - 1]
+                tokens.append(Token(
+                    word.text,
+                    norm=word.lemma.lower() if word.lemma else word.text.lower(),
+                    upos=word.upos,
+                    upos_tr=map_pos_to_turkish(word.upos),
+                    xpos=word.xpos,
+                    # Stanza features are already in "Key=Value|Key=Value" format
+                    morph=word.feats or self.morph_analyzer.features(word.text, word.upos),
+                    dep_head=word.head if word.head != 0 else None,
+                    dep_rel=word.deprel,
+                    start_char=start_char,
+                    end_char=end_char,
+                    is_punctuation=word.upos == 'PUNCT' or is_punctuation(word.text),
+                ))
+            yield tokens
+
+    def model_version(self) -> str:
+        import stanza
+        return f"stanza-{stanza.__version__}-{self.model_name or 'tr'}"
+
+
+@register_backend
+class SimpleBackend(NLPBackend):
+    """Rule-based tokenizer and morphology, no tagging; always available"""
+
+    name = 'simple'
+    capabilities = frozenset({MORPH})
+    auto_priority = 0
+
+    def annotate_sentence(self, sentence: str) -> List[Token]:
+        return self.rule_based_tokens(sentence)
+
+
+@register_backend
+class CustomBertBackend(NLPBackend):
+    """
+    Fine-tuned Turkish BERT POS tagger (CustomBERTProcessor)
+
+    annotate() encodes up to ``batch_size`` sentences (option, default 32) at
+    once and shares the model calls between their windows; the remaining
+    options go to the processor.
+    """
+
+    name = 'custom_bert'
+    capabilities = frozenset({POS, MORPH, CONFIDENCE, CACHEABLE})
+
+    def load(self) -> None:
+        options = dict(self.options)
+        # Sentences run through the model together by annotate()
+        self.batch_size = max(1, options.pop('batch_size', 32))
+        # Shared BERT processor, loaded once per model path and options
+        self.bert = get_model_registry().get('custom_bert', self.model_name,
+                                             allow_download=self.allow_download, **options)
+
+    def annotate(self, sentences: Iterable[str]) -> Iterator[List[Token]]:
+        # One tokenizer call per group of sentences, whose windows share the
+        # model calls; tokens are built straight from the predictions
+        if not (getattr(self.bert, 'is_loaded', False) and hasattr(self.bert, 'nlp_pipeline')):
+            yield from super().annotate(sentences)
+            return
+        batch = []
+        for sentence in sentences:
+            # The same Unicode normalization as process_text
+            sentence = unicodedata.normalize('NFC', str(sentence))
+            batch.append((sentence, self.tokenizer.tokenize(sentence)))
+            if len(batch) >= self.batch_size:
+                yield from self._annotate_batch(batch)
+                batch = []
+        if batch:
+            yield from self._annotate_batch(batch)
+
+    def annotate_sentence(self, sentence: str) -> List[Token]:
+        try:
+            result = self.bert.process_text(sentence)
+            tokens = [Token.from_dict(token) for token in result]
+            logger.debug(f"Custom BERT processed {len(tokens)} tokens")
+            return FallbackTokens(tokens) if is_fallback(result) else tokens
+        except Exception as e:
+            logger.error(f"Custom BERT processing error: {e}")
+            return FallbackTokens(self.rule_based_tokens(sentence))
+
+    def _annotate_batch(self, batch) -> Iterator[List[Token]]:
+        try:
+            predictions = iter(self.bert._predict_batch([[form for form, _, _ in spans]
+                                                         for _, spans in batch if spans]))
+            id2label = self.bert.model.config.id2label
+            annotated = []
+            for _, spans in batch:
+                if not spans:
+                    annotated.append([])
+                    continue
+                tokens = []
+                for (word, start_char, end_char), label_id, confidence in zip(spans, *next(predictions)):
+                    label = None if label_id is None else id2label[label_id]
+                    punctuation = is_punctuation(word)
+                    # Words without any sub-token (e.g. unknown characters dropped by the tokenizer)
+                    upos = 'PUNCT' if punctuation and label is None \
+                        else self.bert._map_bert_label_to_pos(label, word)
+                    tokens.append(Token(word, word.lower(), None, upos, self.bert._map_pos_to_turkish(upos),
+                                        upos, self.bert._extract_morph_features(word, upos), None, None,
+                                        start_char, end_char, punctuation, False, confidence))
+                annotated.append(tokens)
+        except Exception as e:
+            logger.error(f"Custom BERT processing error: {e}")
+            annotated = [FallbackTokens(self.rule_based_tokens(sentence)) for sentence, _ in batch]
+        yield from annotated
+
+    def model_version(self) -> str:
+        return self.bert.get_model_version()
+
+    def get_info(self) -> Dict[str, Any]:
+        return {'bert_model_info': self.bert.get_model_info()}
+
+
+def create_backend(name: str, model_name: Optional[str] = None, allow_download: bool = True,
+                   **options) -> NLPBackend:
+    """Instantiate and load a registered backend"""
+    backend = get_backend_class(name)(model_name, allow_download=allow_download, **options)
+    backend.load()
+    return backend
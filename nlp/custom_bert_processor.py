@@ -5,9 +5,23 @@ Bu modül kullanıcının fine-tuned BERT POS tagging modelini
 proje ile entegre eder.
 """
 
+import time
 import logging
+from pathlib import Path
 from typing import List, Dict, Any, Optional
-import re
+
+import numpy as np
+
+try:
+    from nlp.turkish_tokenizer import get_tokenizer, is_punctuation
+    from nlp.turkish_morphology import get_morph_analyzer
+    from nlp.model_store import get_model_store, DEFAULT_BERT_MODEL
+    from nlp.backends import FallbackTokens
+except ImportError:
+    from turkish_tokenizer import get_tokenizer, is_punctuation
+    from turkish_morphology import get_morph_analyzer
+    from model_store import get_model_store, DEFAULT_BERT_MODEL
+    from backends import FallbackTokens
 
 logger = logging.getLogger(__name__)
 
@@ -16,30 +30,85 @@ TRANSFORMERS_AVAILABLE = False
 try:
     import torch
     from transformers import AutoTokenizer, AutoModelForTokenClassification, pipeline
-    import numpy as np
     TRANSFORMERS_AVAILABLE = True
 except ImportError as e:
     logger = logging.getLogger(__name__)
     logger.warning(f"Transformers library not available: {e}")
     logger.warning("Please install with: pip install transformers torch")
 
+# Optional ONNX Runtime for the 'onnx' / 'onnx-int8' inference paths
+ONNXRUNTIME_AVAILABLE = False
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ort = None
+
+try:
+    from config.config import BERT_INFERENCE, BERT_WINDOW_SIZE, BERT_WINDOW_STRIDE
+except ImportError:
+    BERT_INFERENCE = 'pytorch'
+    BERT_WINDOW_SIZE = None
+    BERT_WINDOW_STRIDE = None
+
+# Varsayılan adımda ardışık pencerelerin örtüşen alt-token sayısı
+DEFAULT_WINDOW_OVERLAP = 64
+
+# 'pytorch': FP32 PyTorch modeli
+# 'int8': PyTorch dinamik int8 quantization (Linear katmanları)
+# 'onnx': ONNX Runtime, FP32
+# 'onnx-int8': ONNX Runtime, dinamik int8 quantize edilmiş ONNX modeli
+INFERENCE_BACKENDS = ('pytorch', 'int8', 'onnx', 'onnx-int8')
+
 class CustomBERTProcessor:
     """
     Fine-tuned BERT model ile Türkçe POS tagging ve diğer NLP görevleri
     """
     
-    def __init__(self, model_path: Optional[str] = None, tokenizer_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, tokenizer_path: Optional[str] = None,
+                 allow_download: bool = True, inference: Optional[str] = None,
+                 window_size: Optional[int] = None, window_stride: Optional[int] = None,
+                 window_batch_size: int = 16):
         """
         Initialize Custom BERT processor
         
         Args:
-            model_path: Fine-tuned BERT model dosya yolu
+            model_path: Fine-tuned BERT model dosya yolu veya Hugging Face model adı
             tokenizer_path: Tokenizer dosya yolu
+            allow_download: Model deposunda olmayan modeli indirmeye izin ver
+            inference: 'pytorch', 'int8', 'onnx' veya 'onnx-int8' (varsayılan: BERT_INFERENCE)
+            window_size: Uzun girdiler için pencere uzunluğu, alt-token
+                         (varsayılan: BERT_WINDOW_SIZE, yoksa modelin maksimumu)
+            window_stride: Ardışık pencerelerin başlangıçları arasındaki alt-token sayısı
+                           (varsayılan: BERT_WINDOW_STRIDE, yoksa 64 alt-token örtüşme)
+            window_batch_size: Modele tek seferde verilen pencere sayısı
         """
+        inference = inference or BERT_INFERENCE
+        if inference not in INFERENCE_BACKENDS:
+            raise ValueError(f"Unknown BERT inference backend: {inference}")
+        self.requested_inference = inference
+        # Gerçekte kullanılan yol; seçilen yol kurulamazsa 'pytorch' olur
+        self.inference = 'pytorch'
+        self.onnx_session = None
+        self.requested_window_size = window_size or BERT_WINDOW_SIZE
+        self.requested_window_stride = window_stride or BERT_WINDOW_STRIDE
+        self.window_size = None
+        self.window_stride = None
+        self._window_overlap = 0
+        self.window_batch_size = max(1, window_batch_size)
         self.model_path = model_path
         self.tokenizer_path = tokenizer_path
+        self.allow_download = allow_download
         self.model = None
         self.tokenizer = None
+        self.local_model_path = None
+        self.load_seconds = 0.0
+        
+        # Rule-based word tokenizer; BERT sees pre-split words so every
+        # prediction maps back to a real span of the input
+        self.word_tokenizer = get_tokenizer()
+        # Paylaşılan morfolojik çözümleyici (yüzey biçimi başına önbellekli)
+        self.morph_analyzer = get_morph_analyzer()
         
         # Model yükleme durumu
         self.is_loaded = False
@@ -47,7 +116,8 @@ class CustomBERTProcessor:
         self._load_model()
     
     def _load_model(self):
-        """Fine-tuned BERT modelini Hugging Face'den yükle"""
+        """Fine-tuned BERT modelini yerel model deposundan yükle (yoksa bir kez indir)"""
+        start = time.perf_counter()
         try:
             # Check if transformers is available
             if not TRANSFORMERS_AVAILABLE:
@@ -57,13 +127,23 @@ class CustomBERTProcessor:
                 return
             
             # Use provided model path or fallback to default
-            model_path = self.model_path if self.model_path else "LiProject/Bert-turkish-pos-trained"
+            model_path = self.model_path if self.model_path else DEFAULT_BERT_MODEL
+            tokenizer_path = self.tokenizer_path or model_path
+            
+            # Hub model adları yerel, checksum'ı doğrulanmış kopyaya çözülür;
+            # model zaten depodaysa hiçbir ağ isteği yapılmaz
+            store = get_model_store()
+            if not Path(model_path).is_dir():
+                model_path = str(store.resolve('custom_bert', model_path, self.allow_download))
+            if not Path(tokenizer_path).is_dir():
+                tokenizer_path = str(store.resolve('custom_bert', tokenizer_path, self.allow_download))
+            self.local_model_path = model_path
             
-            logger.info(f"Hugging Face modeli yükleniyor: {model_path}")
+            logger.info(f"BERT modeli yükleniyor: {model_path}")
             
             # Model ve tokenizer yükle
-            self.tokenizer = AutoTokenizer.from_pretrained(model_path)
-            self.model = AutoModelForTokenClassification.from_pretrained(model_path)
+            self.tokenizer = AutoTokenizer.from_pretrained(tokenizer_path, local_files_only=True)
+            self.model = AutoModelForTokenClassification.from_pretrained(model_path, local_files_only=True)
             
             # Pipeline oluştur - aggregation olmadan kullan
             self.nlp_pipeline = pipeline(
@@ -73,14 +153,226 @@ class CustomBERTProcessor:
                 aggregation_strategy=None  # No aggregation for proper token handling
             )
             
+            self.model.eval()
+            self._configure_windows()
+            if self.requested_inference != 'pytorch':
+                self._setup_inference(self.requested_inference)
+            
             self.is_loaded = True
-            logger.info("Hugging Face BERT modeli başarıyla yüklendi")
+            self.load_seconds = time.perf_counter() - start
+            logger.info(f"BERT modeli {self.load_seconds:.2f} saniyede yüklendi ({self.inference})")
             
         except Exception as e:
             logger.error(f"BERT model yüklenemedi: {e}")
             logger.info("Fallback olarak basit işleme kullanılıyor")
             self.is_loaded = False
     
+    def _setup_inference(self, inference: str):
+        """CPU inference yolunu hazırla; başarısız olursa FP32 PyTorch ile devam et"""
+        try:
+            if inference == 'int8':
+                # Linear katmanlarının ağırlıkları int8, aktivasyonlar çalışma anında quantize edilir
+                self.model = torch.quantization.quantize_dynamic(
+                    self.model, {torch.nn.Linear}, dtype=torch.qint8)
+            else:
+                if not ONNXRUNTIME_AVAILABLE:
+                    raise ImportError("onnxruntime not installed (pip install onnxruntime)")
+                onnx_path = self._export_onnx(quantize=inference == 'onnx-int8')
+                options = ort.SessionOptions()
+                options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+                self.onnx_session = ort.InferenceSession(str(onnx_path), options,
+                                                         providers=['CPUExecutionProvider'])
+            self.inference = inference
+        except Exception as e:
+            logger.warning(f"'{inference}' inference kurulamadı, FP32 PyTorch kullanılıyor: {e}")
+            self.inference = 'pytorch'
+            self.onnx_session = None
+    
+    def _export_onnx(self, quantize: bool = False) -> Path:
+        """
+        Modeli ONNX'e aktar (model içeriği başına bir kez); gerekirse int8 quantize et
+        
+        Export model klasörüne değil, deponun modelin içeriğine göre anahtarlanmış
+        önbellek klasörüne yazılır: ağırlıklar değişince eski export kullanılmaz.
+        """
+        onnx_dir = get_model_store().export_dir(self.local_model_path, 'onnx')
+        fp32_path = onnx_dir / 'model.onnx'
+        int8_path = onnx_dir / 'model.int8.onnx'
+        
+        if not fp32_path.exists():
+            onnx_dir.mkdir(parents=True, exist_ok=True)
+            sample = self.tokenizer(["örnek", "cümle"], is_split_into_words=True, return_tensors="pt")
+            input_names = list(sample.keys())
+            dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+            dynamic_axes['logits'] = {0: 'batch', 1: 'sequence'}
+            
+            # Geçici dosyaya yaz, sonra taşı: yarım kalmış export kullanılmaz
+            partial = fp32_path.with_suffix('.partial')
+            torch.onnx.export(self.model, tuple(sample[name] for name in input_names), str(partial),
+                              input_names=input_names, output_names=['logits'],
+                              dynamic_axes=dynamic_axes, opset_version=14)
+            partial.replace(fp32_path)
+            logger.info(f"ONNX modeli oluşturuldu: {fp32_path}")
+        
+        if not quantize:
+            return fp32_path
+        
+        if not int8_path.exists():
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            partial = int8_path.with_suffix('.partial')
+            quantize_dynamic(str(fp32_path), str(partial), weight_type=QuantType.QInt8)
+            partial.replace(int8_path)
+            logger.info(f"int8 ONNX modeli oluşturuldu: {int8_path}")
+        return int8_path
+    
+    def _configure_windows(self):
+        """Pencere uzunluğu ve adımını modelin maksimum uzunluğuna göre ayarla"""
+        # model_max_length is a huge sentinel value when the tokenizer does not define it
+        limits = [getattr(self.model.config, 'max_position_embeddings', None), self.tokenizer.model_max_length]
+        model_max = min([limit for limit in limits if limit and limit < 100000] or [512])
+        self.window_size = min(self.requested_window_size or model_max, model_max)
+        
+        # [CLS] ve [SEP] dışında pencereye sığan alt-token sayısı
+        content = self.window_size - self.tokenizer.num_special_tokens_to_add()
+        if content < 2:
+            raise ValueError(f"BERT window size too small: {self.window_size}")
+        stride = self.requested_window_stride or max(1, content - DEFAULT_WINDOW_OVERLAP)
+        self.window_stride = min(stride, content)
+        # Hugging Face 'stride' ardışık pencerelerin örtüşen alt-token sayısıdır
+        self._window_overlap = min(content - self.window_stride, content - 1)
+    
+    def _run_model(self, inputs) -> tuple:
+        """Bir pencere grubu için (tahmin id'leri, güven skorları) dizileri, pencere x alt-token"""
+        if self.onnx_session is not None:
+            feed_names = {i.name for i in self.onnx_session.get_inputs()}
+            feed = {name: np.asarray(value, dtype=np.int64) for name, value in inputs.items()
+                    if name in feed_names}
+            logits = self.onnx_session.run(['logits'], feed)[0]
+            # Softmax (sayısal kararlılık için maksimum çıkarılır)
+            exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+            probabilities = exp / exp.sum(axis=-1, keepdims=True)
+            return probabilities.argmax(axis=-1), probabilities.max(axis=-1)
+        
+        with torch.no_grad():
+            outputs = self.model(**inputs)
+            confidences, predictions = torch.max(torch.softmax(outputs.logits, dim=-1), dim=-1)
+        return predictions.numpy(), confidences.numpy()
+    
+    def _predict(self, words: List[str]) -> tuple:
+        """
+        Önceden bölünmüş kelimeler için kelime başına tahmin
+        
+        Returns:
+            (label id'leri, güven skorları) - kelime başına; tahmin yoksa None / 0.0
+        """
+        return self._predict_batch([words])[0]
+    
+    def _predict_batch(self, sentences: List[List[str]]) -> List[tuple]:
+        """
+        Önceden bölünmüş kelimelerden oluşan cümleler için kelime başına tahmin
+        
+        Cümleler tek tokenizer çağrısıyla kodlanır ve pencereleri birlikte,
+        ``window_batch_size`` pencerelik gruplar halinde modele verilir.
+        Modelin maksimum uzunluğunu aşan cümleler, ``window_stride`` alt-token
+        arayla kayan ve örtüşen ``window_size`` uzunluğunda pencerelere bölünür;
+        bir kelime birden fazla pencerede görünürse, kelimenin ilk alt-token'ını
+        içeren ve ortalama güveni en yüksek olan pencerenin tahmini kullanılır.
+        
+        Alt-token -> kelime eşlemesi word_ids/offset_mapping ile, toplama ise
+        Python döngüsü olmadan dizi işlemleriyle yapılır.
+        
+        Returns:
+            Cümle başına (label id'leri, güven skorları); tahmin yoksa None / 0.0
+        """
+        return_tensors = "np" if self.onnx_session is not None else "pt"
+        encoding = self.tokenizer(sentences, is_split_into_words=True, return_tensors=return_tensors,
+                                  truncation=True, max_length=self.window_size,
+                                  stride=self._window_overlap, return_overflowing_tokens=True,
+                                  return_offsets_mapping=True, padding=True)
+        # Alt-token'ın kelime içindeki başlangıcı; 0 ise kelimenin ilk alt-token'ı
+        offset_starts = np.asarray(encoding.pop('offset_mapping'))[..., 0]
+        n_windows = offset_starts.shape[0]
+        # Pencerenin ait olduğu cümle
+        sample = np.asarray(encoding.pop('overflow_to_sample_mapping', np.zeros(n_windows)), dtype=np.int64)
+        
+        # Özel token'lar ([CLS], [SEP], [PAD]) -1; None -> nan -> -1 dönüşümü C tarafında yapılır
+        word_index = np.nan_to_num(
+            np.array([encoding.word_ids(window) for window in range(n_windows)], dtype=float),
+            nan=-1).astype(np.int64)
+        
+        if n_windows == 1:
+            return [self._aggregate_window(self._run_model(encoding), word_index[0], len(sentences[0]))]
+        
+        # Kelimeler tüm cümleler boyunca tek sırada numaralanır
+        lengths = [len(words) for words in sentences]
+        word_starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+        word_index = np.where(word_index >= 0, word_index + word_starts[sample][:, None], -1)
+        n_words = sum(lengths)
+        
+        best_scores = np.full(n_words, -1.0)
+        best_labels = np.full(n_words, -1, dtype=np.int64)
+        best_confidences = np.zeros(n_words)
+        
+        for batch_start in range(0, n_windows, self.window_batch_size):
+            batch_end = min(batch_start + self.window_batch_size, n_windows)
+            batch = {name: value[batch_start:batch_end] for name, value in encoding.items()}
+            predictions, confidences = self._run_model(batch)
+            
+            words_in = word_index[batch_start:batch_end]
+            n_batch = batch_end - batch_start
+            valid = words_in >= 0
+            # (pencere, kelime) çiftleri düz indekse; özel token'lar her pencerenin 0. hücresine düşer
+            cells = (np.arange(n_batch)[:, None] * (n_words + 1) + words_in + 1)[valid]
+            size = n_batch * (n_words + 1)
+            
+            counts = np.bincount(cells, minlength=size)
+            sums = np.bincount(cells, weights=confidences[valid], minlength=size)
+            
+            # Kelimeler pencere içinde bitişiktir: kelimenin penceredeki ilk alt-token'ı,
+            # bir önceki konumdan farklı kelime id'sine sahip olandır
+            previous = np.pad(words_in[:, :-1], ((0, 0), (1, 0)), constant_values=-1)
+            first = valid & (words_in != previous)
+            first_cells = (np.arange(n_batch)[:, None] * (n_words + 1) + words_in + 1)[first]
+            labels = np.zeros(size, dtype=np.int64)
+            labels[first_cells] = predictions[first]
+            # Pencere kelimenin ortasından başlamadıysa bu gerçek ilk alt-token'dır
+            starts = np.zeros(size, dtype=bool)
+            starts[first_cells] = offset_starts[batch_start:batch_end][first] == 0
+            
+            counts = counts.reshape(n_batch, n_words + 1)[:, 1:]
+            means = sums.reshape(n_batch, n_words + 1)[:, 1:] / np.maximum(counts, 1)
+            # Önce ilk alt-token'ı içeren pencereler, sonra ortalama güven (güven <= 1)
+            scores = np.where(counts > 0, starts.reshape(n_batch, n_words + 1)[:, 1:] * 2.0 + means, -1.0)
+            
+            winner = scores.argmax(axis=0)
+            columns = np.arange(n_words)
+            winner_scores = scores[winner, columns]
+            improved = winner_scores > best_scores
+            best_scores = np.where(improved, winner_scores, best_scores)
+            best_labels = np.where(improved, labels.reshape(n_batch, n_words + 1)[:, 1:][winner, columns],
+                                   best_labels)
+            best_confidences = np.where(improved, means[winner, columns], best_confidences)
+        
+        labels = [None if label < 0 else label for label in best_labels.tolist()]
+        confidences = best_confidences.tolist()
+        return [(labels[start:start + length], confidences[start:start + length])
+                for start, length in zip(word_starts.tolist(), lengths)]
+    
+    @staticmethod
+    def _aggregate_window(outputs: tuple, word_index, n_words: int) -> tuple:
+        """Tek pencere: ilk alt-token'ın etiketi, alt-token'ların ortalama güveni (kelime başına)"""
+        predictions, confidences = outputs[0][0], outputs[1][0]
+        valid = word_index >= 0
+        words_in = word_index[valid]
+        counts = np.bincount(words_in, minlength=n_words)
+        means = np.bincount(words_in, weights=confidences[valid], minlength=n_words) / np.maximum(counts, 1)
+        
+        labels = np.full(n_words, -1, dtype=np.int64)
+        # Kelimeler bitişik olduğundan ilk alt-token kelime id'sinin değiştiği konumdur
+        first = valid & (word_index != np.concatenate(([-1], word_index[:-1])))
+        labels[word_index[first]] = predictions[first]
+        return [None if label < 0 else label for label in labels.tolist()], means.tolist()
+    
     def process_text(self, text: str) -> List[Dict[str, Any]]:
         """
         Fine-tuned BERT ile text işleme
@@ -89,7 +381,8 @@ class CustomBERTProcessor:
             text: İşlenecek metin
             
         Returns:
-            Token bilgileri listesi
+            Token bilgileri listesi (model çalışmadığında kural tabanlı sonuç,
+            FallbackTokens olarak işaretli; önbelleğe yazılmaz)
         """
         # Ensure proper UTF-8 encoding before processing
         if not isinstance(text, str):
@@ -104,7 +397,7 @@ class CustomBERTProcessor:
         
         if not self.is_loaded:
             logger.warning("Model yüklenmemiş, basit tokenizasyon kullanılıyor")
-            return self._simple_processing(text)
+            return FallbackTokens(self._simple_processing(text))
         
         try:
             # Hugging Face model ile işleme
@@ -112,31 +405,28 @@ class CustomBERTProcessor:
                 return self._process_with_bert(text)
             else:
                 # Fallback
-                return self._enhanced_processing(text)
+                return FallbackTokens(self._enhanced_processing(text))
             
         except Exception as e:
             logger.error(f"BERT processing hatası: {e}")
-            return self._simple_processing(text)
+            return FallbackTokens(self._simple_processing(text))
     
     def _enhanced_processing(self, text: str) -> List[Dict[str, Any]]:
         """Enhanced basit processing (BERT yoksa kullanılır)"""
         
-        # Türkçe text preprocessing
-        text = self._preprocess_turkish_text(text)
-        
-        # Regex-based tokenization - NOW INCLUDES TURKISH CHARACTERS
-        # Turkish characters: ç, ğ, ı, İ, ö, ş, ü, Ç, Ğ, İ, Ö, Ş, Ü
-        tokens = re.findall(r'\b[\wçğıöşüÇĞIİÖŞÜ]+\b', text)
+        # Kural tabanlı tokenizasyon - gerçek karakter ofsetleri ile
+        spans = self.word_tokenizer.tokenize(text)
+        tokens = [form for form, _, _ in spans]
         
         # POS mapping (basit heuristic)
         pos_mapping = self._simple_pos_mapping(tokens)
         
-        # Morphological features (basit)
-        morph_features = self._simple_morph_features(tokens)
+        # Morphological features
+        morph_features = self._simple_morph_features(tokens, pos_mapping)
         
         # Token data
         token_data_list = []
-        for i, (token, pos, morph) in enumerate(zip(tokens, pos_mapping, morph_features)):
+        for (token, start_char, end_char), pos, morph in zip(spans, pos_mapping, morph_features):
             pos_tr = self._map_pos_to_turkish(pos)
             token_data = {
                 'word': token,
@@ -147,9 +437,9 @@ class CustomBERTProcessor:
                 'morph': morph,
                 'dep_head': None,
                 'dep_rel': None,
-                'start_char': i * (len(token) + 1),
-                'end_char': (i + 1) * (len(token) + 1),
-                'is_punctuation': False,
+                'start_char': start_char,
+                'end_char': end_char,
+                'is_punctuation': pos == 'PUNCT',
                 'is_space': False
             }
             token_data_list.append(token_data)
@@ -159,191 +449,71 @@ class CustomBERTProcessor:
     def _simple_processing(self, text: str) -> List[Dict[str, Any]]:
         """En basit processing fallback"""
         
-        # Turkish characters: ç, ğ, ı, İ, ö, ş, ü, Ç, Ğ, İ, Ö, Ş, Ü
-        tokens = re.findall(r'\b[\wçğıöşüÇĞIİÖŞÜ]+\b', text.lower())
-        
+        # Orijinal metin üzerinde tokenize et; küçük harfe çevirmek ('İ' -> 'i̇')
+        # ofsetleri kaydırırdı
         return [
             {
-                'word': token,
-                'norm': token,
+                'word': token.lower(),
+                'norm': token.lower(),
                 'upos': None,
                 'upos_tr': None,  # Turkish POS label
                 'xpos': None,
                 'morph': None,
                 'dep_head': None,
                 'dep_rel': None,
-                'start_char': i * (len(token) + 1),
-                'end_char': (i + 1) * (len(token) + 1),
-                'is_punctuation': False,
+                'start_char': start_char,
+                'end_char': end_char,
+                'is_punctuation': is_punctuation(token),
                 'is_space': False
             }
-            for i, token in enumerate(tokens)
+            for token, start_char, end_char in self.word_tokenizer.tokenize(text)
         ]
     
-    def _preprocess_turkish_text(self, text: str) -> str:
-        """Türkçe text preprocessing - PRESERVE Turkish characters"""
-        
-        # NOTE: Turkish characters are PRESERVED, not converted to ASCII
-        # This ensures proper handling of Turkish text including ş, ç, ğ, ı, ö, ü, İ, Ç, Ğ, Ö, Ş, Ü
-        
-        # Only perform basic cleanup while preserving Turkish characters
-        # Remove control characters but keep Turkish special characters
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
-        
-        return text
-    
     def _simple_pos_mapping(self, tokens: List[str]) -> List[str]:
-        """Basit POS mapping heuristic"""
-        
-        pos_list = []
-        for token in tokens:
-            
-            # Basit heuristic rules
-            if token.endswith(('ler', 'lar')):
-                pos = 'NOUN'  # Plural markers
-            elif token.endswith(('da', 'de', 'ta', 'te')):
-                pos = 'ADP'   # Locative case
-            elif token.endswith(('in', 'un', 'ın', 'ün')):
-                pos = 'ADP'   # Genitive case
-            elif token.endswith(('i', 'ı', 'u', 'ü')):
-                pos = 'ADP'   # Accusative case
-            elif token in ('ve', 'veya', 'ama', 'fakat'):
-                pos = 'CCONJ'
-            elif token in ('bu', 'şu', 'o', 'bir', 'her', 'hiç'):
-                pos = 'DET'
-            elif token in ('çok', 'daha', 'güzel', 'iyi', 'büyük'):
-                pos = 'ADJ'
-            elif token in ('git', 'gel', 'ol', 'yap', 'ver', 'al'):
-                pos = 'VERB'
-            else:
-                pos = 'NOUN'  # Default
-            
-            pos_list.append(pos)
-        
-        return pos_list
+        """Kural tabanlı POS: kapalı sınıf sözlüğü, ardından morfolojik çözümleme"""
+        return [self.morph_analyzer.guess_pos(token) for token in tokens]
     
-    def _simple_morph_features(self, tokens: List[str]) -> List[str]:
-        """Basit morphological features"""
-        
-        morph_list = []
-        for token in tokens:
-            features = []
-            
-            # Number
-            if token.endswith(('ler', 'lar')):
-                features.append('Number=Plur')
-            else:
-                features.append('Number=Sing')
-            
-            # Case (basit heuristic)
-            if token.endswith(('da', 'de', 'ta', 'te')):
-                features.append('Case=Loc')
-            elif token.endswith(('in', 'un', 'ın', 'ün')):
-                features.append('Case=Gen')
-            elif token.endswith(('i', 'ı', 'u', 'ü')):
-                features.append('Case=Acc')
-            
-            morph_list.append('|'.join(features) if features else None)
-        
-        return morph_list
+    def _simple_morph_features(self, tokens: List[str], pos_list: Optional[List[str]] = None) -> List[str]:
+        """Morfolojik özellikler (paylaşılan çözümleyiciden)"""
+        pos_list = pos_list or [None] * len(tokens)
+        return [self.morph_analyzer.features(token, pos) for token, pos in zip(tokens, pos_list)]
     
     def _process_with_bert(self, text: str) -> List[Dict[str, Any]]:
-        """Hugging Face BERT modeli ile metin işleme - FIXED"""
+        """Hugging Face BERT modeli ile metin işleme (önceden tokenize edilmiş kelimeler)"""
         try:
-            # Tokenize the text first to get proper alignment
-            inputs = self.tokenizer(text, return_tensors="pt", add_special_tokens=True)
-            all_tokens = self.tokenizer.convert_ids_to_tokens(inputs['input_ids'][0])
-
-            # Get model predictions
-            with torch.no_grad():
-                outputs = self.model(**inputs)
-                
-                # Get probabilities and predictions
-                probabilities = torch.softmax(outputs.logits, dim=2)
-                predictions = torch.argmax(outputs.logits, dim=2)
-                
-                # Get max probabilities (confidence scores)
-                confidences = torch.max(probabilities, dim=2).values
-
-            # Convert predictions to labels
-            all_predicted_labels = [self.model.config.id2label[pred.item()] for pred in predictions[0]]
-            all_confidences = confidences[0].tolist()
-
-            # Remove special tokens ([CLS], [SEP], [PAD])
-            tokens = []
-            predicted_labels = []
-            token_confidences = []
-
-            for token, label, conf in zip(all_tokens, all_predicted_labels, all_confidences):
-                if token not in ['[CLS]', '[SEP]', '[PAD]']:
-                    tokens.append(token)
-                    predicted_labels.append(label)
-                    token_confidences.append(conf)
+            spans = self.word_tokenizer.tokenize(text)
+            if not spans:
+                return []
+            words = [form for form, _, _ in spans]
+            
+            # Kelimeler BERT'e ayrı ayrı verilir; uzun cümleler pencerelere bölünür
+            label_ids, word_confidences = self._predict(words)
+            id2label = self.model.config.id2label
+            word_labels = [None if label_id is None else id2label[label_id] for label_id in label_ids]
 
-            # Now aggregate subtokens properly
             aggregated_tokens = []
-            current_word = ""
-            current_label = None
-            current_score = 0.0
-            subtoken_count = 0
-
-            for token, label, conf in zip(tokens, predicted_labels, token_confidences):
-                if token.startswith("##"):
-                    # This is a continuation of the previous word
-                    current_word += token[2:]  # Remove ## prefix
-                    # Use the label with highest confidence (keep first label for simplicity)
-                    current_score += conf
-                    subtoken_count += 1
-                else:
-                    # Save previous word if exists
-                    if current_word:
-                        pos = self._map_bert_label_to_pos(current_label, current_word)
-                        pos_tr = self._map_pos_to_turkish(pos)
-                        morph = self._extract_morph_features(current_word, current_label)
-
-                        token_data = {
-                            'word': current_word,
-                            'norm': current_word.lower(),
-                            'upos': pos,
-                            'upos_tr': pos_tr,  # Turkish POS label
-                            'xpos': pos,
-                            'morph': morph,
-                            'dep_head': None,
-                            'dep_rel': None,
-                            'start_char': len(aggregated_tokens) * (len(current_word) + 1),  # Approximate
-                            'end_char': (len(aggregated_tokens) + 1) * (len(current_word) + 1),
-                            'is_punctuation': current_word in '.,;:!?"()[]{}',
-                            'is_space': False,
-                            'bert_confidence': current_score / max(subtoken_count, 1)
-                        }
-                        aggregated_tokens.append(token_data)
-
-                    # Start new word
-                    current_word = token
-                    current_label = label
-                    current_score = conf
-                    subtoken_count = 1
-
-            # Don't forget the last word
-            if current_word:
-                pos = self._map_bert_label_to_pos(current_label, current_word)
+            for (word, start_char, end_char), label, confidence in zip(
+                    spans, word_labels, word_confidences):
+                # Words without any sub-token (e.g. unknown characters dropped by the tokenizer)
+                pos = 'PUNCT' if is_punctuation(word) and label is None \
+                    else self._map_bert_label_to_pos(label, word)
                 pos_tr = self._map_pos_to_turkish(pos)
-                morph = self._extract_morph_features(current_word, current_label)
+                morph = self._extract_morph_features(word, pos)
 
                 token_data = {
-                    'word': current_word,
-                    'norm': current_word.lower(),
+                    'word': word,
+                    'norm': word.lower(),
                     'upos': pos,
                     'upos_tr': pos_tr,  # Turkish POS label
                     'xpos': pos,
                     'morph': morph,
                     'dep_head': None,
                     'dep_rel': None,
-                    'start_char': len(aggregated_tokens) * (len(current_word) + 1),
-                    'end_char': (len(aggregated_tokens) + 1) * (len(current_word) + 1),
-                    'is_punctuation': current_word in '.,;:!?"()[]{}',
+                    'start_char': start_char,
+                    'end_char': end_char,
+                    'is_punctuation': is_punctuation(word),
                     'is_space': False,
-                    'bert_confidence': current_score / max(subtoken_count, 1)
+                    'bert_confidence': confidence
                 }
                 aggregated_tokens.append(token_data)
 
@@ -353,7 +523,7 @@ class CustomBERTProcessor:
             logger.error(f"BERT processing hatası: {e}")
             import traceback
             traceback.print_exc()
-            return self._enhanced_processing(text)
+            return FallbackTokens(self._enhanced_processing(text))
     
     def _map_bert_label_to_pos(self, bert_label: str, word: str = '') -> str:
         """BERT model label'larını POS tag'lerine çevir (trust model output)"""
@@ -463,39 +633,32 @@ class CustomBERTProcessor:
         }
         return pos_mapping.get(pos, pos)
     
-    def _extract_morph_features(self, word: str, label: str) -> str:
-        """Word ve label'dan morfolojik özellikler çıkar"""
-        features = []
-        
-        # Basit morfolojik analiz
-        if word.endswith(('ler', 'lar')):
-            features.append('Number=Plur')
-        else:
-            features.append('Number=Sing')
-            
-        # Case analysis (Türkçe için)
-        if word.endswith(('da', 'de', 'ta', 'te')):
-            features.append('Case=Loc')
-        elif word.endswith(('in', 'un', 'ın', 'ün')):
-            features.append('Case=Gen')
-        elif word.endswith(('i', 'ı', 'u', 'ü')):
-            features.append('Case=Acc')
-            
-        # POS specific features
-        if label == 'VERB':
-            features.append('Mood=Ind')
-            features.append('Tense=Pres')
-        elif label == 'ADJ':
-            features.append('Degree=Pos')
-            
-        return '|'.join(features) if features else None
+    def _extract_morph_features(self, word: str, pos: str) -> str:
+        """Kelime ve POS etiketinden morfolojik özellikler (paylaşılan çözümleyiciden)"""
+        return self.morph_analyzer.features(word, pos)
+    
+    def get_model_version(self) -> str:
+        """Model identity and revision; heuristic fallback results get their own version"""
+        if not self.is_loaded or self.model is None:
+            return "heuristic-rules"
+        config = self.model.config
+        revision = getattr(config, '_commit_hash', None) or getattr(config, 'transformers_version', 'unknown')
+        # Quantized paths and window settings change predictions, so they are versioned separately
+        suffix = '' if self.inference == 'pytorch' else f"+{self.inference}"
+        suffix += f"+w{self.window_size}s{self.window_stride}"
+        return f"{config._name_or_path}@{revision}{suffix}"
     
     def get_model_info(self) -> Dict[str, Any]:
         """Model bilgilerini döndür"""
         return {
             'model_type': 'huggingface_bert',
-            'model_path': 'LiProject/Bert-turkish-pos-trained',
-            'tokenizer_path': 'LiProject/Bert-turkish-pos-trained',
+            'model_path': self.model_path or DEFAULT_BERT_MODEL,
+            'tokenizer_path': self.tokenizer_path or self.model_path or DEFAULT_BERT_MODEL,
+            'local_model_path': self.local_model_path,
+            'load_seconds': round(self.load_seconds, 3),
+            'inference': self.inference,
+            'window_size': self.window_size,
+            'window_stride': self.window_stride,
             'is_loaded': self.is_loaded,
             'supported_features': ['tokenization', 'pos_tagging', 'morphology', 'bert_confidence'],
             'language': 'Turkish',
@@ -504,18 +667,24 @@ class CustomBERTProcessor:
         }
 
 def create_custom_bert_processor(model_path: Optional[str] = None, 
-                               tokenizer_path: Optional[str] = None) -> CustomBERTProcessor:
+                               tokenizer_path: Optional[str] = None,
+                               allow_download: bool = True,
+                               inference: Optional[str] = None,
+                               **window_options) -> CustomBERTProcessor:
     """
     Custom BERT processor oluştur
     
     Args:
         model_path: Fine-tuned BERT model yolu
         tokenizer_path: Tokenizer yolu
+        allow_download: Model deposunda olmayan modeli indirmeye izin ver
+        inference: 'pytorch', 'int8', 'onnx' veya 'onnx-int8'
+        **window_options: window_size, window_stride, window_batch_size
         
     Returns:
         CustomBERTProcessor instance
     """
-    return CustomBERTProcessor(model_path, tokenizer_path)
+    return CustomBERTProcessor(model_path, tokenizer_path, allow_download, inference, **window_options)
 
 # BERT model integration için TurkishNLPProcessor güncelleme
 def integrate_bert_with_turkish_processor():
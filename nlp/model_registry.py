@@ -0,0 +1,259 @@
+"""
+Model Registry
+
+Process-wide, thread-safe registry of loaded NLP models. Each (backend,
+model) pair is loaded once on first use and shared by every
+TurkishNLPProcessor, so creating a processor per GUI click or per ingestion
+run no longer reloads spaCy, rebuilds the Stanza pipeline or fetches the BERT
+model again.
+
+Models can be warmed up explicitly, preloaded in a background thread at
+application start, and unloaded to free memory.
+"""
+
+import gc
+import time
+import logging
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Callable, Tuple
+
+try:
+    from nlp.model_store import get_model_store, DEFAULT_STANZA_LANGUAGE
+except ImportError:
+    from model_store import get_model_store, DEFAULT_STANZA_LANGUAGE
+
+logger = logging.getLogger(__name__)
+
+# (backend, model name, loader options)
+ModelKey = Tuple[str, Optional[str], Tuple[Tuple[str, Any], ...]]
+
+STANZA_PROCESSORS = 'tokenize,pos,lemma,depparse'
+
+
+def _load_spacy(model_name: Optional[str], allow_download: bool) -> Any:
+    import spacy
+    return spacy.load(model_name or 'tr_core_news_sm')
+
+
+def _load_stanza(model_name: Optional[str], allow_download: bool) -> Any:
+    import stanza
+    # Resources come from the local model store; the pipeline itself never
+    # touches the network
+    language = model_name or DEFAULT_STANZA_LANGUAGE
+    model_dir = str(get_model_store().resolve('stanza', language, allow_download))
+    return stanza.Pipeline(language, dir=model_dir, processors=STANZA_PROCESSORS,
+                           tokenize_pretokenized=True, download_method=None)
+
+
+def _load_custom_bert(model_name: Optional[str], allow_download: bool, **options) -> Any:
+    try:
+        from nlp.custom_bert_processor import create_custom_bert_processor
+    except ImportError:
+        from custom_bert_processor import create_custom_bert_processor
+    # options: inference, window_size, window_stride, window_batch_size
+    return create_custom_bert_processor(model_path=model_name, tokenizer_path=model_name,
+                                        allow_download=allow_download, **options)
+
+
+LOADERS: Dict[str, Callable[..., Any]] = {
+    'spacy': _load_spacy,
+    'stanza': _load_stanza,
+    'custom_bert': _load_custom_bert,
+}
+
+
+class ModelRegistry:
+    """Loads each backend/model once and shares it across processors"""
+
+    def __init__(self):
+        self._models: Dict[ModelKey, Any] = {}
+        self._load_times: Dict[ModelKey, float] = {}
+        # Failed loads: whether download was allowed, and the error
+        self._failures: Dict[ModelKey, Tuple[bool, Exception]] = {}
+        self._key_locks: Dict[ModelKey, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key: ModelKey) -> threading.Lock:
+        """Per-model lock, so different models can load concurrently"""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = self._key_locks[key] = threading.Lock()
+            return lock
+
+    def get(self, backend: str, model_name: Optional[str] = None, allow_download: bool = True,
+            **options) -> Any:
+        """
+        Get a loaded model, loading it on first use
+
+        Concurrent callers asking for the same model wait for a single load.
+        A failed load is remembered and re-raised without retrying until the
+        model is warmed up again or unloaded; a failure without download
+        allowed is retried by a request that allows it. A custom_bert
+        processor that could not load its model is returned (it falls back
+        to rule-based processing) but not kept, so the next request retries.
+
+        Args:
+            backend: 'spacy', 'stanza' or 'custom_bert'
+            model_name: Model name or path (None for the backend default)
+            allow_download: Allow fetching missing model files
+            **options: Backend loader options (e.g. inference='int8' for custom_bert);
+                       each combination is a separate model
+
+        Raises:
+            ValueError: For unknown backends
+            Exception: Whatever the backend raised while loading
+        """
+        if backend not in LOADERS:
+            raise ValueError(f"Unknown NLP backend: {backend}")
+        key = self._make_key(backend, model_name, options)
+
+        model = self._models.get(key)
+        if model is not None:
+            return model
+
+        with self._key_lock(key):
+            model = self._models.get(key)
+            if model is not None:
+                return model
+            failure = self._failures.get(key)
+            if failure is not None and (failure[0] or not allow_download):
+                raise failure[1]
+
+            start = time.perf_counter()
+            try:
+                model = LOADERS[backend](model_name, allow_download, **options)
+            except Exception as e:
+                self._failures[key] = (allow_download, e)
+                raise
+            elapsed = time.perf_counter() - start
+            self._failures.pop(key, None)
+
+            if getattr(model, 'is_loaded', True) is False:
+                logger.warning(f"{backend} model '{model_name or 'default'}' did not load; "
+                               f"not keeping it, the next request retries")
+                return model
+
+            self._models[key] = model
+            self._load_times[key] = elapsed
+            logger.info(f"Loaded {backend} model '{model_name or 'default'}' in {elapsed:.2f}s")
+            return model
+
+    def is_loaded(self, backend: str, model_name: Optional[str] = None, **options) -> bool:
+        """True if the model is already in memory"""
+        return self._make_key(backend, model_name, options) in self._models
+
+    def warm_up(self, specs: Iterable, allow_download: bool = True) -> Dict[str, Optional[str]]:
+        """
+        Load models now, retrying earlier failures
+
+        Args:
+            specs: Backend names, (backend, model_name) pairs or
+                   (backend, model_name, options) triples
+
+        Returns:
+            Mapping of 'backend:model' to None on success or the error message
+        """
+        results = {}
+        for backend, model_name, options in self._normalize_specs(specs):
+            key = self._make_key(backend, model_name, options)
+            with self._key_lock(key):
+                self._failures.pop(key, None)
+            label = f"{backend}:{model_name or 'default'}"
+            if options:
+                label += ':' + ','.join(f"{k}={v}" for k, v in sorted(options.items()))
+            try:
+                self.get(backend, model_name, allow_download=allow_download, **options)
+                results[label] = None
+            except Exception as e:
+                logger.warning(f"Warm-up of {label} failed: {e}")
+                results[label] = str(e)
+        return results
+
+    def preload(self, specs: Iterable, allow_download: bool = True,
+                callback: Optional[Callable[[Dict[str, Optional[str]]], None]] = None) -> threading.Thread:
+        """
+        Warm up models in a background daemon thread
+
+        Args:
+            specs: Backend names or (backend, model_name) pairs
+            callback: Called with the warm_up results when done (from the worker thread)
+
+        Returns:
+            The started thread
+        """
+        specs = list(specs)
+
+        def worker():
+            results = self.warm_up(specs, allow_download=allow_download)
+            if callback is not None:
+                callback(results)
+
+        thread = threading.Thread(target=worker, name="model-preload", daemon=True)
+        thread.start()
+        return thread
+
+    def unload(self, backend: Optional[str] = None, model_name: Optional[str] = None) -> int:
+        """
+        Drop loaded models (all of them, one backend, or one model) and free memory
+
+        Processors still holding a reference keep their model alive until released.
+
+        Returns:
+            Number of models unloaded
+        """
+        with self._lock:
+            keys = [key for key in list(self._models) + list(self._failures)
+                    if (backend is None or key[0] == backend)
+                    and (model_name is None or key[1] == model_name)]
+            unloaded = 0
+            for key in keys:
+                if self._models.pop(key, None) is not None:
+                    unloaded += 1
+                self._load_times.pop(key, None)
+                self._failures.pop(key, None)
+
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+        return unloaded
+
+    def get_info(self) -> List[Dict[str, Any]]:
+        """Loaded models with their load times, and remembered failures"""
+        info = [{'backend': key[0], 'model': key[1], 'options': dict(key[2]), 'loaded': True,
+                 'load_seconds': round(self._load_times.get(key, 0.0), 3)}
+                for key in list(self._models)]
+        info.extend({'backend': key[0], 'model': key[1], 'options': dict(key[2]), 'loaded': False,
+                     'error': str(error)}
+                    for key, (_, error) in list(self._failures.items()))
+        return info
+
+    @staticmethod
+    def _make_key(backend: str, model_name: Optional[str], options: Dict[str, Any]) -> ModelKey:
+        """Registry key; options left at None do not create separate entries"""
+        return backend, model_name, tuple(sorted((k, v) for k, v in options.items() if v is not None))
+
+    @staticmethod
+    def _normalize_specs(specs: Iterable) -> List[Tuple[str, Optional[str], Dict[str, Any]]]:
+        """Accept 'spacy', ('spacy', 'tr_core_news_md') and ('custom_bert', None, {'inference': 'int8'})"""
+        if isinstance(specs, str):
+            specs = [specs]
+        normalized = []
+        for spec in specs:
+            if isinstance(spec, str):
+                spec = (spec,)
+            normalized.append((spec[0], spec[1] if len(spec) > 1 else None,
+                               dict(spec[2]) if len(spec) > 2 else {}))
+        return normalized
+
+
+_registry = ModelRegistry()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry"""
+    return _registry
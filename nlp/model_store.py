@@ -0,0 +1,331 @@
+"""
+Model Store
+
+Offline-first local store for the custom BERT and Stanza models. Every model
+lives in its own directory under the configured store path (``MODEL_STORE_DIR``
+in config/config.py, or the ``CORPUS_MODEL_STORE`` environment variable)
+together with a ``manifest.json`` listing the SHA-256 checksum of each file.
+
+Models that exist locally are loaded without any network call. Missing
+models are fetched into the store once, unless offline mode is on
+(``CORPUS_MODELS_OFFLINE=1``), in which case loading fails with a clear
+error. For air-gapped workers, install the models on a connected machine and
+copy the store directory:
+
+    python nlp/model_store.py install custom_bert
+    python nlp/model_store.py install stanza
+    python nlp/model_store.py verify
+"""
+
+import os
+import re
+import json
+import time
+import shutil
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+try:
+    from config.config import (MODEL_STORE_DIR, MODEL_STORE_OFFLINE,
+                               DEFAULT_BERT_MODEL, DEFAULT_STANZA_LANGUAGE)
+except ImportError:
+    MODEL_STORE_DIR = Path(os.environ.get("CORPUS_MODEL_STORE",
+                                          Path(__file__).resolve().parent.parent / "models"))
+    MODEL_STORE_OFFLINE = os.environ.get("CORPUS_MODELS_OFFLINE", "0").lower() in ("1", "true", "yes")
+    DEFAULT_BERT_MODEL = "LiProject/Bert-turkish-pos-trained"
+    DEFAULT_STANZA_LANGUAGE = "tr"
+
+MANIFEST_NAME = 'manifest.json'
+# Size/mtime of the files when their checksums were last verified
+VERIFIED_NAME = '.verified.json'
+# Files derived from models (e.g. ONNX exports), keyed by the model's content
+EXPORTS_NAME = '.exports'
+
+DEFAULT_MODELS = {
+    'custom_bert': DEFAULT_BERT_MODEL,
+    'stanza': DEFAULT_STANZA_LANGUAGE,
+}
+
+
+class ModelStoreError(Exception):
+    """Raised when a model is missing in offline mode or fails verification"""
+
+
+def file_checksum(path: Union[str, Path], block_size: int = 1 << 20) -> str:
+    """SHA-256 of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ModelStore:
+    """Local, checksummed model directories with download-on-miss"""
+
+    def __init__(self, root: Optional[Union[str, Path]] = None, offline: Optional[bool] = None):
+        """
+        Open a model store
+
+        Args:
+            root: Store directory (defaults to MODEL_STORE_DIR)
+            offline: Never touch the network (defaults to MODEL_STORE_OFFLINE)
+        """
+        self.root = Path(root) if root is not None else Path(MODEL_STORE_DIR)
+        self.offline = MODEL_STORE_OFFLINE if offline is None else offline
+        self._lock = threading.Lock()
+
+    def model_dir(self, backend: str, name: Optional[str] = None) -> Path:
+        """Directory of a model: <root>/<backend>/<name with '/' replaced>"""
+        name = name or DEFAULT_MODELS[backend]
+        return self.root / backend / re.sub(r'[^\w.-]+', '--', name)
+
+    def has_model(self, backend: str, name: Optional[str] = None) -> bool:
+        """True if the model is installed (has a manifest)"""
+        return (self.model_dir(backend, name) / MANIFEST_NAME).exists()
+
+    # ------------------------------------------------------------------
+    # Resolution
+    # ------------------------------------------------------------------
+
+    def resolve(self, backend: str, name: Optional[str] = None, allow_download: bool = True) -> Path:
+        """
+        Local directory of a verified model, installing it on a miss
+
+        Args:
+            backend: 'custom_bert' or 'stanza'
+            name: Hugging Face model id / Stanza language (None for the default)
+            allow_download: Allow fetching a missing model (ignored in offline mode)
+
+        Returns:
+            Path to the model directory
+
+        Raises:
+            ModelStoreError: If the model is missing and cannot be downloaded,
+                             or its files do not match the manifest
+        """
+        name = name or DEFAULT_MODELS[backend]
+        directory = self.model_dir(backend, name)
+
+        with self._lock:
+            if not (directory / MANIFEST_NAME).exists():
+                if self.offline or not allow_download:
+                    raise ModelStoreError(
+                        f"{backend} model '{name}' is not in the model store ({directory}) "
+                        f"and downloads are disabled; install it with "
+                        f"'python nlp/model_store.py install {backend} {name}'")
+                self.install(backend, name)
+
+            problems = self.verify(backend, name)
+            if problems:
+                raise ModelStoreError(f"{backend} model '{name}' failed verification: "
+                                      + '; '.join(problems[:5]))
+        return directory
+
+    # ------------------------------------------------------------------
+    # Installation
+    # ------------------------------------------------------------------
+
+    def install(self, backend: str, name: Optional[str] = None) -> Path:
+        """Download a model into the store and write its manifest"""
+        name = name or DEFAULT_MODELS[backend]
+        directory = self.model_dir(backend, name)
+        staging = directory.with_name(directory.name + '.partial')
+        if staging.exists():
+            shutil.rmtree(staging)
+        staging.mkdir(parents=True)
+
+        start = time.perf_counter()
+        logger.info(f"Downloading {backend} model '{name}' into {directory}")
+        if backend == 'custom_bert':
+            from transformers import AutoTokenizer, AutoModelForTokenClassification
+            AutoTokenizer.from_pretrained(name).save_pretrained(staging)
+            AutoModelForTokenClassification.from_pretrained(name).save_pretrained(staging)
+        elif backend == 'stanza':
+            import stanza
+            stanza.download(name, model_dir=str(staging), processors='tokenize,pos,lemma,depparse')
+        else:
+            raise ValueError(f"Model store does not manage '{backend}' models")
+
+        self.write_manifest(staging, backend, name)
+        # Swap in atomically so an interrupted download never looks installed
+        if directory.exists():
+            shutil.rmtree(directory)
+        staging.rename(directory)
+        logger.info(f"Installed {backend} model '{name}' in {time.perf_counter() - start:.1f}s")
+        return directory
+
+    def add_local(self, backend: str, name: str, source: Union[str, Path]) -> Path:
+        """Copy an existing model directory into the store"""
+        directory = self.model_dir(backend, name)
+        if directory.exists():
+            shutil.rmtree(directory)
+        shutil.copytree(source, directory, ignore=shutil.ignore_patterns(MANIFEST_NAME, VERIFIED_NAME))
+        self.write_manifest(directory, backend, name)
+        return directory
+
+    @staticmethod
+    def write_manifest(directory: Path, backend: str, name: str) -> Dict[str, Any]:
+        """Checksum every file of a model directory into manifest.json"""
+        files = {}
+        for path in sorted(directory.rglob('*')):
+            if path.is_file() and path.name not in (MANIFEST_NAME, VERIFIED_NAME):
+                files[path.relative_to(directory).as_posix()] = {
+                    'sha256': file_checksum(path), 'size': path.stat().st_size}
+        manifest = {'backend': backend, 'name': name, 'created': time.time(), 'files': files}
+        (directory / MANIFEST_NAME).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        (directory / VERIFIED_NAME).unlink(missing_ok=True)
+        return manifest
+
+    # ------------------------------------------------------------------
+    # Verification
+    # ------------------------------------------------------------------
+
+    def verify(self, backend: str, name: Optional[str] = None, full: bool = False) -> List[str]:
+        """
+        Check a model's files against its manifest
+
+        Checksums are computed when a file is new or its size/mtime changed
+        since the last successful verification (always with ``full=True``),
+        so unchanged models start without re-hashing hundreds of megabytes.
+
+        Returns:
+            List of problems (empty if the model is intact)
+        """
+        directory = self.model_dir(backend, name)
+        try:
+            manifest = json.loads((directory / MANIFEST_NAME).read_text(encoding='utf-8'))
+        except (OSError, ValueError) as e:
+            return [f"unreadable manifest: {e}"]
+
+        verified_path = directory / VERIFIED_NAME
+        try:
+            verified = {} if full else json.loads(verified_path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            verified = {}
+
+        problems = []
+        signatures = {}
+        for relative, expected in manifest['files'].items():
+            path = directory / relative
+            try:
+                stat = path.stat()
+            except OSError:
+                problems.append(f"missing {relative}")
+                continue
+            signature = [stat.st_size, stat.st_mtime_ns]
+            if stat.st_size != expected['size']:
+                problems.append(f"size mismatch {relative}")
+            elif verified.get(relative) != signature and file_checksum(path) != expected['sha256']:
+                problems.append(f"checksum mismatch {relative}")
+            else:
+                signatures[relative] = signature
+
+        if not problems and signatures != verified:
+            try:
+                verified_path.write_text(json.dumps(signatures), encoding='utf-8')
+            except OSError:
+                # Read-only stores just verify again next time
+                pass
+        return problems
+
+    # ------------------------------------------------------------------
+    # Derived files
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def model_fingerprint(directory: Union[str, Path]) -> str:
+        """
+        Key of a model directory's content
+
+        Store models are keyed by their manifest checksums; other directories
+        by the relative path, size and mtime of every file.
+        """
+        directory = Path(directory)
+        try:
+            files = json.loads((directory / MANIFEST_NAME).read_text(encoding='utf-8'))['files']
+            entries = sorted((relative, entry['sha256']) for relative, entry in files.items())
+        except (OSError, ValueError, KeyError):
+            entries = []
+            for path in sorted(directory.rglob('*')):
+                if path.is_file() and path.name not in (MANIFEST_NAME, VERIFIED_NAME):
+                    stat = path.stat()
+                    entries.append((path.relative_to(directory).as_posix(), stat.st_size, stat.st_mtime_ns))
+        return hashlib.sha256(json.dumps(entries).encode('utf-8')).hexdigest()[:16]
+
+    def export_dir(self, directory: Union[str, Path], kind: str) -> Path:
+        """
+        Cache directory for files derived from a model, e.g. its ONNX export
+
+        Lives outside the model directory (so manifests stay complete) under
+        <root>/.exports/<kind>/<model fingerprint>; changed weights get a new
+        directory instead of reusing a stale export.
+        """
+        return self.root / EXPORTS_NAME / kind / self.model_fingerprint(directory)
+
+    def list_models(self) -> List[Dict[str, Any]]:
+        """Installed models with their size"""
+        models = []
+        for manifest_path in sorted(self.root.glob(f'*/*/{MANIFEST_NAME}')):
+            try:
+                manifest = json.loads(manifest_path.read_text(encoding='utf-8'))
+            except (OSError, ValueError):
+                continue
+            models.append({
+                'backend': manifest['backend'],
+                'name': manifest['name'],
+                'path': str(manifest_path.parent),
+                'size_mb': round(sum(f['size'] for f in manifest['files'].values()) / 1024 / 1024, 1),
+            })
+        return models
+
+
+_default_store = None
+
+
+def get_model_store() -> ModelStore:
+    """Get the store configured in config/config.py"""
+    global _default_store
+    if _default_store is None:
+        _default_store = ModelStore()
+    return _default_store
+
+
+def main():
+    """Command line: install, verify or list models"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Manage the local NLP model store")
+    parser.add_argument('command', choices=['install', 'verify', 'list'])
+    parser.add_argument('backend', nargs='?', choices=sorted(DEFAULT_MODELS))
+    parser.add_argument('name', nargs='?', help="Model id or language (default per backend)")
+    parser.add_argument('--store', help="Store directory (default from config)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    store = ModelStore(args.store, offline=False)
+
+    if args.command == 'install':
+        for backend in [args.backend] if args.backend else sorted(DEFAULT_MODELS):
+            print(f"{backend}: {store.install(backend, args.name)}")
+    elif args.command == 'verify':
+        ok = True
+        for model in store.list_models():
+            if args.backend and model['backend'] != args.backend:
+                continue
+            problems = store.verify(model['backend'], model['name'], full=True)
+            ok = ok and not problems
+            print(f"{model['backend']} {model['name']}: {'OK' if not problems else '; '.join(problems)}")
+        raise SystemExit(0 if ok else 1)
+    else:
+        for model in store.list_models():
+            print(f"{model['backend']:<12} {model['name']:<40} {model['size_mb']:>8} MB  {model['path']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,428 @@
+"""
+Turkish Morphological Analyzer
+
+Rule-based analyzer for Turkish inflection, shared by every NLP backend.
+Suffixes are written with archiphonemes (A: a/e, I: ı/i/u/ü, D: d/t, optional
+buffer letters in parentheses) and expanded once into all surface
+allomorphs. The allomorphs are compiled into a trie over reversed strings,
+so all suffixes ending at a position are found in a single walk from the end
+of the word. Vowel harmony, consonant assimilation, buffer letters and suffix
+order (morphotactics) are checked while stripping suffixes right to left.
+
+Analyses are memoized per surface form in a bounded LRU cache, so repeated
+forms cost a dictionary lookup.
+"""
+
+import threading
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple, Iterable, NamedTuple
+
+try:
+    from nlp.turkish_tokenizer import is_punctuation
+except ImportError:
+    from turkish_tokenizer import is_punctuation
+
+VOWELS = frozenset('aeıioöuüâîû')
+BACK_VOWELS = frozenset('aıouâû')
+ROUNDED_VOWELS = frozenset('oöuü')
+VOICELESS = frozenset('çfhkpsşt')
+
+# Circumflex vowels harmonize like their plain counterparts
+_PLAIN_VOWEL = {'â': 'a', 'î': 'i', 'û': 'u'}
+_APOSTROPHES = "'’"
+
+# Final consonants softened before a vowel-initial suffix: kitabı -> kitap, ağacı -> ağaç
+_SOFTENING = {'b': 'p', 'c': 'ç', 'ğ': 'k'}
+
+# Closed-class words are never stripped
+CLOSED_CLASS = {
+    'CCONJ': ('ve', 'veya', 'veyahut', 'ya', 'yahut', 'ama', 'fakat', 'ancak', 'lakin', 'ki',
+              'çünkü', 'oysa', 'halbuki', 'hem', 'ne', 'da', 'de', 'ise'),
+    'DET': ('bu', 'şu', 'o', 'bir', 'her', 'hiç', 'bazı', 'birkaç', 'tüm', 'bütün', 'hangi',
+            'kimi', 'öbür', 'diğer', 'öteki'),
+    'PRON': ('ben', 'sen', 'biz', 'siz', 'onlar', 'bunlar', 'şunlar', 'kendi', 'kim', 'ne',
+             'hepsi', 'herkes', 'kimse', 'biri', 'birisi', 'beni', 'seni', 'bana', 'sana',
+             'onu', 'ona', 'onun', 'benim', 'senin', 'bizim', 'sizin', 'onların'),
+    'ADP': ('için', 'gibi', 'kadar', 'göre', 'ile', 'sonra', 'önce', 'karşı', 'doğru',
+            'beri', 'dolayı', 'rağmen', 'üzere', 'hakkında', 'boyunca'),
+    'ADV': ('çok', 'daha', 'en', 'az', 'artık', 'hep', 'şimdi', 'bile', 'dün', 'bugün',
+            'yarın', 'hemen', 'henüz', 'belki', 'sadece', 'yalnız', 'zaten', 'hâlâ', 'yine',
+            'tekrar', 'bazen', 'asla', 'burada', 'orada', 'şöyle', 'böyle', 'öyle'),
+    'ADJ': ('güzel', 'iyi', 'kötü', 'büyük', 'küçük', 'yeni', 'eski', 'uzun', 'kısa',
+            'genç', 'yaşlı', 'zor', 'kolay', 'önemli', 'hızlı', 'yavaş'),
+    'PART': ('mi', 'mı', 'mu', 'mü', 'değil'),
+}
+CLOSED_CLASS_POS = {}
+for _pos, _words in CLOSED_CLASS.items():
+    for _word in _words:
+        CLOSED_CLASS_POS.setdefault(_word, _pos)
+
+# Consonant pairs a Turkish word (or loanword) may end in; a stem ending in
+# any other pair is not a root (çalışm-a, türkç-e)
+FINAL_CLUSTERS = frozenset([
+    'lç', 'lf', 'lk', 'lm', 'lp', 'ls', 'lt', 'mp', 'nç', 'nd', 'nk', 'ns', 'nt', 'nz',
+    'rç', 'rd', 'rf', 'rg', 'rk', 'rm', 'rp', 'rs', 'rt', 'rz', 'ft', 'ht', 'ks', 'kt',
+    'sk', 'st', 'şt',
+])
+# Frequent roots whose endings are also suffixes (mas-a, ked-i, kale-m, insa-n):
+# without a lexicon the longest suffix split would win, so these are known
+# roots of every analyzer
+COMMON_ROOTS = frozenset("""
+    abla ada adam aile akraba araba arı asker ayı baba balkon banka başkan beden beyin biber
+    bilim boyun burun cuma cümle çanta çorba dayı dede defter deri doktor düşman ekim ekmek
+    fatura gece gemi göl gövde hafta hakim hala hasta hava haziran insan istasyon kadın kafa
+    kahraman kalem kanun kaptan kapı kara karın kasa kasım kelime kedi kişi koca konu kova
+    kredi kültür kutu kuzu lamba limon liman mahkeme masa memur metin mimar misafir motor
+    müdür müzisyen nehir nine nisan oda orman ordu oyun oyuncu öğrenci öğretmen para parmak
+    pasta patron peynir resim ressam sakin salata salı sayı sene seçim sıra sınır soğan soru
+    spor sporcu şair şeker şişe şoför tabla tahta tren torun tüccar ülke üzüm vatan vergi
+    yakın yolcu yumurta zafer zaman zeytin
+""".split())
+
+# Open-syllable (consonant + vowel) roots of two letters; other stems that
+# short are leftovers of a word, not roots (ke-di, te-miz, de-niz)
+SHORT_OPEN_ROOTS = {'N': frozenset(['su']), 'V': frozenset(['de', 'ye'])}
+
+# (name, template, category, slot, features, allowed left neighbours)
+# Slots give the order within a category; 'after' restricts the suffix
+# directly to the left (None: any suffix of a lower slot, or the stem).
+_TAM = frozenset(['Prog', 'Fut', 'Past', 'Evid', 'Aor', 'NegAor', 'Nec', 'Cond'])
+_POSS3 = frozenset(['P3sg', 'P3pl'])
+SUFFIXES = [
+    # Nominal inflection: plural, possessive, case
+    ('Plur', 'lAr', 'N', 1, 'Number=Plur', None),
+    ('P1sg', '(I)m', 'N', 2, 'Number[psor]=Sing|Person[psor]=1', None),
+    ('P2sg', '(I)n', 'N', 2, 'Number[psor]=Sing|Person[psor]=2', None),
+    ('P3sg', '(s)I', 'N', 2, 'Number[psor]=Sing|Person[psor]=3', None),
+    ('P1pl', '(I)mIz', 'N', 2, 'Number[psor]=Plur|Person[psor]=1', None),
+    ('P2pl', '(I)nIz', 'N', 2, 'Number[psor]=Plur|Person[psor]=2', None),
+    ('P3pl', 'lArI', 'N', 2, 'Number[psor]=Plur|Person[psor]=3', None),
+    ('Acc', '(y)I', 'N', 3, 'Case=Acc', None),
+    ('Gen', '(n)In', 'N', 3, 'Case=Gen', None),
+    ('Dat', '(y)A', 'N', 3, 'Case=Dat', None),
+    ('Loc', 'DA', 'N', 3, 'Case=Loc', None),
+    ('Abl', 'DAn', 'N', 3, 'Case=Abl', None),
+    ('Ins', '(y)lA', 'N', 3, 'Case=Ins', None),
+    # Pronominal n between a 3rd person possessive and a case: evinde, kitabını
+    ('Acc', 'nI', 'N', 3, 'Case=Acc', _POSS3),
+    ('Dat', 'nA', 'N', 3, 'Case=Dat', _POSS3),
+    ('Loc', 'ndA', 'N', 3, 'Case=Loc', _POSS3),
+    ('Abl', 'ndAn', 'N', 3, 'Case=Abl', _POSS3),
+    # Verbal inflection: negation, tense/aspect/mood, person
+    ('Neg', 'mA', 'V', 1, 'Polarity=Neg', None),
+    ('Neg', 'mI', 'V', 1, 'Polarity=Neg', None),          # gelmiyor
+    ('Prog', '(I)yor', 'V', 2, 'Aspect=Prog|Mood=Ind|Tense=Pres', None),
+    ('Fut', '(y)AcAk', 'V', 2, 'Aspect=Perf|Mood=Ind|Tense=Fut', None),
+    ('Fut', '(y)AcAğ', 'V', 2, 'Aspect=Perf|Mood=Ind|Tense=Fut', None),   # geleceğim
+    ('Past', 'DI', 'V', 2, 'Aspect=Perf|Evident=Fh|Mood=Ind|Tense=Past', None),
+    ('Evid', 'mIş', 'V', 2, 'Aspect=Perf|Evident=Nfh|Mood=Ind|Tense=Past', None),
+    ('Aor', '(A)r', 'V', 2, 'Aspect=Hab|Mood=Ind|Tense=Pres', None),
+    ('Aor', 'Ir', 'V', 2, 'Aspect=Hab|Mood=Ind|Tense=Pres', None),
+    ('NegAor', 'mAz', 'V', 2, 'Aspect=Hab|Mood=Ind|Polarity=Neg|Tense=Pres', None),
+    ('Nec', 'mAlI', 'V', 2, 'Mood=Nec', None),
+    ('Inf', 'mAk', 'V', 2, 'VerbForm=Inf', None),
+    ('Part', '(y)An', 'V', 2, 'VerbForm=Part', None),
+    # Conditional, on the stem (gelse) or after a tense (gelirse, geldiyse)
+    ('Cond', '(y)sA', 'V', 3, 'Mood=Cnd', None),
+    ('A1sg', '(y)Im', 'V', 4, 'Number=Sing|Person=1', _TAM - {'Past', 'Cond'}),
+    ('A2sg', 'sIn', 'V', 4, 'Number=Sing|Person=2', _TAM - {'Past', 'Cond'}),
+    ('A1pl', '(y)Iz', 'V', 4, 'Number=Plur|Person=1', _TAM - {'Past', 'Cond'}),
+    ('A2pl', 'sInIz', 'V', 4, 'Number=Plur|Person=2', _TAM - {'Past', 'Cond'}),
+    ('A1sg', 'm', 'V', 4, 'Number=Sing|Person=1', frozenset(['Past', 'Cond'])),
+    ('A2sg', 'n', 'V', 4, 'Number=Sing|Person=2', frozenset(['Past', 'Cond'])),
+    ('A1pl', 'k', 'V', 4, 'Number=Plur|Person=1', frozenset(['Past', 'Cond'])),
+    ('A2pl', 'nIz', 'V', 4, 'Number=Plur|Person=2', frozenset(['Past', 'Cond'])),
+    ('A3pl', 'lAr', 'V', 4, 'Number=Plur|Person=3', _TAM),
+]
+
+
+class Suffix(NamedTuple):
+    """One surface allomorph of a suffix"""
+    name: str
+    surface: str
+    category: str
+    slot: int
+    features: str
+    after: Optional[frozenset]
+    # Condition on the text to the left
+    needs_vowel: Optional[bool]      # buffer letter / optional vowel: left ends in a vowel (True) or not (False)
+    voiceless: Optional[bool]        # initial D: left ends in a voiceless consonant (True) or not (False)
+    harmony: Optional[frozenset]     # allowed last vowels of the left text
+
+
+class Analysis(NamedTuple):
+    """Best analysis of a surface form within one category"""
+    lemma: str
+    category: str                    # 'N' nominal, 'V' verbal
+    suffixes: Tuple[str, ...]        # suffix names, left to right
+    features: str                    # UD feature string
+
+
+def _harmony_for(vowel: str) -> Dict[str, str]:
+    """Realization of the archiphonemes A and I after a vowel"""
+    back = vowel in BACK_VOWELS
+    rounded = vowel in ROUNDED_VOWELS
+    return {'A': 'a' if back else 'e',
+            'I': ('u' if rounded else 'ı') if back else ('ü' if rounded else 'i')}
+
+
+def _expand(name: str, template: str, category: str, slot: int, features: str,
+            after: Optional[frozenset]) -> List[Suffix]:
+    """All surface allomorphs of a suffix template with their left-context conditions"""
+    optional = None
+    if template.startswith('('):
+        optional, template = template[1], template[3:]
+
+    variants = []
+    for with_optional in ([True, False] if optional else [None]):
+        body = (optional if with_optional else '') + template
+        # Buffer consonants appear after vowels, optional vowels after consonants
+        needs_vowel = None if with_optional is None else (with_optional == (optional not in 'AI'))
+
+        for left_vowel in 'aeıioöuü':
+            harmony_vowel = left_vowel
+            surface = []
+            for char in body:
+                if char in 'AI':
+                    char = _harmony_for(harmony_vowel)[char]
+                if char in VOWELS:
+                    harmony_vowel = char
+                surface.append(char)
+            surface = ''.join(surface)
+            for voiceless in ([True, False] if surface[0] == 'D' else [None]):
+                concrete = surface.replace('D', 't' if voiceless else 'd', 1) if voiceless is not None else surface
+                variants.append((concrete, needs_vowel, voiceless, left_vowel))
+
+    # Merge variants that only differ in the left vowel
+    merged = {}
+    for concrete, needs_vowel, voiceless, left_vowel in variants:
+        merged.setdefault((concrete, needs_vowel, voiceless), set()).add(left_vowel)
+    uses_harmony = any(char in 'AI' for char in template + (optional or ''))
+    return [Suffix(name, concrete, category, slot, features, after, needs_vowel, voiceless,
+                   frozenset(vowels) if uses_harmony else None)
+            for (concrete, needs_vowel, voiceless), vowels in merged.items()]
+
+
+def _build_trie(suffixes: Iterable[Suffix]) -> dict:
+    """Trie over reversed surface strings; entries are stored under the key None"""
+    root = {}
+    for suffix in suffixes:
+        node = root
+        for char in reversed(suffix.surface):
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(suffix)
+    return root
+
+
+def turkish_lower(text: str) -> str:
+    """Lowercase with Turkish dotted/dotless I"""
+    return text.replace('I', 'ı').replace('İ', 'i').lower()
+
+
+class TurkishMorphAnalyzer:
+    """Suffix-trie Turkish morphological analyzer with a per-form LRU cache"""
+
+    def __init__(self, cache_size: int = 100000, roots: Optional[Iterable[str]] = None,
+                 min_stem_length: int = 2):
+        """
+        Initialize the analyzer
+
+        Args:
+            cache_size: Surface forms kept in the LRU cache
+            roots: Known roots, in addition to COMMON_ROOTS; analyses ending
+                   in a known root are preferred
+            min_stem_length: Shortest stem left after stripping suffixes
+        """
+        self.roots = COMMON_ROOTS.union(turkish_lower(root) for root in roots or ())
+        self.min_stem_length = min_stem_length
+        self._trie = _build_trie(s for spec in SUFFIXES for s in _expand(*spec))
+        self._lock = threading.Lock()
+
+        self.analyze = lru_cache(maxsize=cache_size)(self._analyze)
+        self.features = lru_cache(maxsize=cache_size)(self._features)
+
+    # ------------------------------------------------------------------
+    # Analysis
+    # ------------------------------------------------------------------
+
+    def _analyze(self, form: str) -> Tuple[Optional[Analysis], Optional[Analysis]]:
+        """
+        Best nominal and best verbal analysis of a surface form
+
+        Returns:
+            (nominal, verbal); either is None when no parse of that category exists.
+            Uninflected forms get a nominal analysis without suffixes.
+        """
+        word = turkish_lower(form)
+        if not word or not word[0].isalpha() or word in CLOSED_CLASS_POS:
+            return None, None
+
+        best = {'N': (self._score(word, ()), Analysis(word, 'N', (), '')), 'V': None}
+        for stem, chain in self._parses(word):
+            category = chain[0].category
+            # Verbs need a tense/aspect/mood or verb form suffix, or a conditional
+            # with a person ending (gelsem); a bare -sA is too ambiguous (masa)
+            if category == 'V' and not any(s.slot == 2 for s in chain) and \
+                    not (len(chain) > 1 and chain[-2].name == 'Cond'):
+                continue
+            lemma = self._lemma(stem, chain[0])
+            # The unsegmented form wins over a split leaving an impossible root
+            if not self._root_shaped(lemma, category):
+                continue
+            score = self._score(lemma, chain)
+            if best[category] is None or score > best[category][0]:
+                features = '|'.join(s.features for s in chain)
+                best[category] = (score, Analysis(lemma, category, tuple(s.name for s in chain), features))
+
+        return tuple(best[c][1] if best[c] else None for c in ('N', 'V'))
+
+    def _parses(self, word: str):
+        """All (stem, suffix chain) splits, stripping suffixes right to left"""
+        stack = [(len(word), (), None)]
+        while stack:
+            end, chain, right = stack.pop()
+            # A suffix restricted to follow certain suffixes cannot attach to the stem
+            if chain and chain[0].after is None:
+                yield word[:end].rstrip(_APOSTROPHES), chain
+            node = self._trie
+            position = end
+            while position > self.min_stem_length and word[position - 1] in node:
+                position -= 1
+                node = node[word[position]]
+                for suffix in node.get(None, ()):
+                    if self._fits(word, position, suffix, right):
+                        stack.append((position, (suffix,) + chain, suffix))
+
+    def _fits(self, word: str, start: int, suffix: Suffix, right: Optional[Suffix]) -> bool:
+        """Morphotactic and phonological check of a suffix at word[start:]"""
+        if right is not None:
+            if suffix.category != right.category or suffix.slot >= right.slot:
+                return False
+            if right.after is not None and suffix.name not in right.after:
+                return False
+
+        # Proper names keep their suffixes behind an apostrophe: Ankara'ya
+        left = word[:start].rstrip(_APOSTROPHES)
+        if not any(c in VOWELS for c in left):
+            return False
+        last = left[-1]
+        if suffix.needs_vowel is not None and suffix.needs_vowel != (last in VOWELS):
+            return False
+        # D is t after voiceless consonants, d elsewhere
+        if suffix.voiceless is not None and suffix.voiceless != (last in VOICELESS):
+            return False
+        if suffix.harmony is not None:
+            last_vowel = next(c for c in reversed(left) if c in VOWELS)
+            if _PLAIN_VOWEL.get(last_vowel, last_vowel) not in suffix.harmony:
+                return False
+        return True
+
+    def _root_shaped(self, lemma: str, category: str) -> bool:
+        """Whether a stem could be a Turkish root: word-final consonants and length"""
+        if lemma in self.roots:
+            return True
+        if len(lemma) < 2:
+            return False
+        if len(lemma) == 2 and lemma[0] not in VOWELS and lemma[1] in VOWELS:
+            return lemma in SHORT_OPEN_ROOTS[category]
+        return lemma[-1] in VOWELS or lemma[-2] in VOWELS or lemma[-2:] in FINAL_CLUSTERS
+
+    def _lemma(self, stem: str, first: Suffix) -> str:
+        """Undo consonant softening before vowel-initial suffixes"""
+        if first.surface[0] in VOWELS:
+            if stem[-1] in _SOFTENING:
+                return stem[:-1] + _SOFTENING[stem[-1]]
+            if stem.endswith('ng'):
+                return stem[:-1] + 'k'     # rengi -> renk
+        return stem
+
+    def _score(self, lemma: str, chain: Tuple[Suffix, ...]) -> tuple:
+        """
+        Known roots first, then the most material explained by suffixes, then
+        fewer suffixes, then later slots (kitabı: accusative over possessive)
+        """
+        return (lemma in self.roots, sum(len(s.surface) for s in chain), -len(chain),
+                sum(s.slot for s in chain))
+
+    # ------------------------------------------------------------------
+    # Public helpers
+    # ------------------------------------------------------------------
+
+    def analysis(self, form: str, upos: Optional[str] = None) -> Optional[Analysis]:
+        """The analysis matching a part of speech (verbal for VERB/AUX, nominal otherwise)"""
+        nominal, verbal = self.analyze(form)
+        if upos in ('VERB', 'AUX'):
+            return verbal or nominal
+        if upos is None and verbal is not None:
+            # Without a tag, a parse ending in a known root wins, then a verbal
+            # parse when it explains more of the word
+            if nominal is None or (verbal.lemma in self.roots, self._coverage(verbal)) > \
+                    (nominal.lemma in self.roots, self._coverage(nominal)):
+                return verbal
+        return nominal or (verbal if upos is None else None)
+
+    @staticmethod
+    def _coverage(analysis: Analysis) -> int:
+        return -len(analysis.lemma)
+
+    def _features(self, form: str, upos: Optional[str] = None) -> Optional[str]:
+        """UD feature string of a form, e.g. 'Case=Loc|Number=Plur'"""
+        if upos in ('PUNCT', 'SYM', 'NUM') or is_punctuation(form):
+            return None
+        result = self.analysis(form, upos)
+        if result is None:
+            return None
+
+        features = dict(item.split('=', 1) for item in result.features.split('|') if item)
+        if result.category == 'N' and upos not in ('ADV', 'ADP', 'CCONJ', 'SCONJ', 'DET', 'PART', 'INTJ'):
+            features.setdefault('Number', 'Sing')
+            features.setdefault('Case', 'Nom')
+            if upos == 'ADJ':
+                features = {'Degree': 'Pos'} if not result.suffixes else features
+        elif result.category == 'V' and 'VerbForm' not in features:
+            features.setdefault('Polarity', 'Pos')
+            features.setdefault('Number', 'Sing')
+            features.setdefault('Person', '3')
+        return '|'.join(f"{key}={value}" for key, value in sorted(features.items())) or None
+
+    def lemma(self, form: str, upos: Optional[str] = None) -> str:
+        """Lemma of a form (the lowercased form itself when nothing is stripped)"""
+        result = self.analysis(form, upos)
+        return result.lemma if result else turkish_lower(form)
+
+    def guess_pos(self, form: str) -> str:
+        """Rule-based UPOS for untagged text: closed-class lexicon, then morphology"""
+        if is_punctuation(form):
+            return 'PUNCT'
+        word = turkish_lower(form)
+        if word in CLOSED_CLASS_POS:
+            return CLOSED_CLASS_POS[word]
+        if word[:1].isdigit():
+            return 'NUM'
+        result = self.analysis(form)
+        if result is not None and result.category == 'V':
+            return 'VERB'
+        return 'NOUN'
+
+    def cache_info(self) -> Dict[str, Dict[str, int]]:
+        """Hit/miss counters of the analysis and feature caches"""
+        stats = {}
+        for name, cached in (('analyze', self.analyze), ('features', self.features)):
+            info = cached.cache_info()
+            stats[name] = {'hits': info.hits, 'misses': info.misses,
+                           'size': info.currsize, 'max_size': info.maxsize}
+        return stats
+
+
+_default_analyzer = None
+_default_lock = threading.Lock()
+
+
+def get_morph_analyzer() -> TurkishMorphAnalyzer:
+    """Get the process-wide analyzer shared by all backends"""
+    global _default_analyzer
+    if _default_analyzer is None:
+        with _default_lock:
+            if _default_analyzer is None:
+                _default_analyzer = TurkishMorphAnalyzer()
+    return _default_analyzer
@@ -5,9 +5,10 @@ This module provides NLP processing capabilities for Turkish text using
 multiple backends with fallback strategies.
 """
 
-import re
+import time
 import logging
-from typing import List, Tuple, Optional, Dict, Any
+from itertools import islice
+from typing import List, Optional, Dict, Any, Iterable, Iterator
 from pathlib import Path
 import sys
 import os
@@ -15,6 +16,21 @@ import os
 # Add the nlp module to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
+from turkish_tokenizer import get_tokenizer
+from turkish_morphology import get_morph_analyzer
+from annotation_cache import AnnotationCache
+# Import through the package when possible so the GUI and the processors share
+# one registry module (and therefore one set of loaded models) and one set of
+# registered backends
+try:
+    from nlp.backends import (Token, NLPBackend, BACKENDS, CACHEABLE, POS, LEMMA, MORPH,
+                              DEPENDENCY, CONFIDENCE, auto_detect_order, create_backend,
+                              map_pos_to_turkish, is_fallback)
+except ImportError:
+    from backends import (Token, NLPBackend, BACKENDS, CACHEABLE, POS, LEMMA, MORPH,
+                          DEPENDENCY, CONFIDENCE, auto_detect_order, create_backend,
+                          map_pos_to_turkish, is_fallback)
+
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -22,124 +38,106 @@ logger = logging.getLogger(__name__)
 class TurkishNLPProcessor:
     """Main NLP processor with fallback strategies for Turkish text"""
     
-    def __init__(self, backend='spacy', model_name='tr_core_news_sm', bert_model_path=None):
+    def __init__(self, backend='spacy', model_name='tr_core_news_sm', bert_model_path=None,
+                 bert_inference=None, backend_options: Optional[Dict[str, Dict[str, Any]]] = None):
         """
         Initialize NLP processor
         
         Args:
-            backend: 'spacy', 'stanza', 'simple', 'custom_bert', or 'fallback'
-            model_name: Name of the model to load
+            backend: A registered backend ('spacy', 'stanza', 'simple', 'custom_bert',
+                     or a plugin registered with nlp.backends.register_backend);
+                     anything else auto-detects
+            model_name: Name of the spaCy model to load
             bert_model_path: Path to custom BERT model (for 'custom_bert' backend)
+            bert_inference: 'pytorch', 'int8', 'onnx' or 'onnx-int8' for 'custom_bert'
+                            (None uses BERT_INFERENCE from the config)
+            backend_options: Extra constructor arguments per backend name,
+                             e.g. {'stanza': {'batch_size': 64}}
         """
         self.backend = backend
         self.model_name = model_name
         self.bert_model_path = bert_model_path
-        self.nlp = None
-        self.custom_bert_processor = None
+        self.bert_inference = bert_inference
+        self.annotator: Optional[NLPBackend] = None
         self.available_backends = []
+        self.annotation_cache = None
+        
+        self.backend_options = {
+            'spacy': {'model_name': model_name},
+            'custom_bert': {'model_name': bert_model_path, 'inference': bert_inference},
+        }
+        for name, options in (backend_options or {}).items():
+            self.backend_options[name] = {**self.backend_options.get(name, {}), **options}
         
-        # Initialize processor
+        # Rule-based tokenizer: the sentence splitter for every backend
+        self.tokenizer = get_tokenizer()
+        # Shared rule-based morphology: the morph features of the 'simple' and
+        # 'custom_bert' backends, and the fallback where a model has none
+        self.morph_analyzer = get_morph_analyzer()
+        
+        # Initialize processor; startup time covers model resolution,
+        # verification and loading (near zero when the model is already shared)
+        start = time.perf_counter()
         self._initialize_backend()
+        self.startup_seconds = time.perf_counter() - start
+        logger.info(f"NLP backend '{self.backend}' started in {self.startup_seconds:.2f}s")
         
     def _initialize_backend(self):
         """Initialize the selected NLP backend"""
-        if self.backend == 'spacy':
-            self._init_spacy()
-        elif self.backend == 'stanza':
-            self._init_stanza()
-        elif self.backend == 'simple':
-            self._init_simple()
-        elif self.backend == 'custom_bert':
-            self._init_custom_bert()
-        else:
+        if self.backend not in BACKENDS:
             # Try to find best available backend
             self._auto_detect_backend()
-    
-    def _init_spacy(self):
-        """Initialize spaCy Turkish model"""
-        try:
-            import spacy
-            self.nlp = spacy.load(self.model_name)
-            self.available_backends.append('spacy')
-            logger.info(f"spaCy Turkish model '{self.model_name}' loaded successfully")
-        except ImportError:
-            logger.warning("spaCy not installed")
-            self._auto_detect_backend()
-        except OSError:
-            logger.warning(f"spaCy model '{self.model_name}' not found")
-            self._auto_detect_backend()
-    
-    def _init_stanza(self):
-        """Initialize Stanza Turkish model"""
-        try:
-            import stanza
-            stanza.download('tr')
-            self.nlp = stanza.Pipeline('tr', processors='tokenize,pos,lemma,depparse')
-            self.available_backends.append('stanza')
-            logger.info("Stanza Turkish model loaded successfully")
-        except ImportError:
-            logger.warning("Stanza not installed")
-            self._auto_detect_backend()
-        except Exception as e:
-            logger.warning(f"Error loading Stanza model: {e}")
-            self._auto_detect_backend()
-    
-    def _init_simple(self):
-        """Initialize simple tokenizer as fallback"""
-        self.available_backends.append('simple')
-        logger.info("Simple Turkish tokenizer initialized")
-    
-    def _init_custom_bert(self):
-        """Initialize custom BERT model from Hugging Face"""
+            return
+        
         try:
-            from custom_bert_processor import create_custom_bert_processor
-            
-            # Create BERT processor with Hugging Face model
-            self.custom_bert_processor = create_custom_bert_processor(
-                model_path=self.bert_model_path,
-                tokenizer_path=self.bert_model_path
-            )
-            
-            self.available_backends.append('custom_bert')
-            logger.info("Custom BERT processor initialized with Hugging Face model")
-            
+            self._start_backend(self.backend)
+            logger.info(f"NLP backend '{self.backend}' ready")
         except ImportError as e:
-            logger.warning(f"Custom BERT processor not available: {e}")
+            logger.warning(f"Backend '{self.backend}' not installed: {e}")
             self._auto_detect_backend()
         except Exception as e:
-            logger.warning(f"Error loading custom BERT model: {e}")
+            logger.warning(f"Error loading backend '{self.backend}': {e}")
             self._auto_detect_backend()
     
+    def _start_backend(self, name: str, allow_download: bool = True):
+        """Create and load a registered backend and make it the active one"""
+        self.annotator = create_backend(name, allow_download=allow_download,
+                                        **self.backend_options.get(name, {}))
+        self.backend = name
+        self.available_backends.append(name)
+    
     def _auto_detect_backend(self):
         """Automatically detect the best available backend"""
-        backends = ['spacy', 'stanza', 'simple']
-        
-        for backend in backends:
+        for backend in auto_detect_order():
             try:
-                self.backend = backend
-                if backend == 'spacy':
-                    import spacy
-                    self.nlp = spacy.load(self.model_name)
-                    self.available_backends.append('spacy')
-                    logger.info(f"Auto-selected spaCy as backend")
-                    return
-                elif backend == 'stanza':
-                    import stanza
-                    stanza.download('tr')
-                    self.nlp = stanza.Pipeline('tr', processors='tokenize,pos,lemma,depparse')
-                    self.available_backends.append('stanza')
-                    logger.info("Auto-selected Stanza as backend")
-                    return
-                elif backend == 'simple':
-                    self.available_backends.append('simple')
-                    logger.info("Auto-selected simple tokenizer as backend")
-                    return
-            except:
+                # Probing must not trigger a model download
+                self._start_backend(backend, allow_download=False)
+                logger.info(f"Auto-selected {backend} as backend")
+                return
+            except Exception:
                 continue
         
         logger.error("No NLP backend available")
         raise RuntimeError("No NLP backend available. Install spaCy or Stanza.")
     
+    @property
+    def capabilities(self) -> frozenset:
+        """Capability flags of the active backend (see nlp.backends)"""
+        return self.annotator.capabilities
+    
+    def supports(self, capability: str) -> bool:
+        return self.annotator.supports(capability)
+    
+    @property
+    def nlp(self):
+        """spaCy / Stanza pipeline of the active backend (None for the others)"""
+        return getattr(self.annotator, 'nlp', None)
+    
+    @property
+    def custom_bert_processor(self):
+        """Shared CustomBERTProcessor of the 'custom_bert' backend"""
+        return getattr(self.annotator, 'bert', None)
+    
     def process_text(self, text: str) -> List[Dict[str, Any]]:
         """
         Process a text and return token information
@@ -152,226 +150,154 @@ class TurkishNLPProcessor:
         """
         if not text.strip():
             return []
-        
-        tokens = []
-        
-        if self.backend == 'spacy':
-            tokens = self._process_with_spacy(text)
-        elif self.backend == 'stanza':
-            tokens = self._process_with_stanza(text)
-        elif self.backend == 'custom_bert':
-            tokens = self._process_with_custom_bert(text)
-        else:
-            tokens = self._process_simple(text)
-        
-        return tokens
+        return [token.to_dict() for token in next(self.annotate([text]))]
     
-    def _process_with_spacy(self, text: str) -> List[Dict[str, Any]]:
-        """Process text using spaCy"""
-        doc = self.nlp(text)
-        tokens = []
-        
-        for token in doc:
-            if token.is_space:
-                continue
-                
-            token_data = {
-                'word': token.text,
-                'norm': token.lemma_.lower() if token.lemma_ else token.text.lower(),
-                'upos': token.pos_,
-                'upos_tr': self._map_pos_to_turkish(token.pos_),
-                'xpos': token.tag_,
-                'morph': self._format_morph_features(token.morph),
-                'dep_head': token.head.i if token.head.i != token.i else None,
-                'dep_rel': token.dep_ if token.dep_ != 'ROOT' else 'root',
-                'start_char': token.idx,
-                'end_char': token.idx + len(token.text),
-                'is_punctuation': token.is_punct,
-                'is_space': token.is_space
-            }
-            tokens.append(token_data)
+    def annotate(self, sentences: Iterable[str], batch_size: int = 64) -> Iterator[List[Token]]:
+        """
+        Annotate a stream of sentences
         
-        return tokens
+        Args:
+            sentences: Sentences (e.g. from split_sentences), consumed lazily
+            batch_size: Sentences looked up in the annotation cache and sent to
+                        the backend together
+            
+        Yields:
+            One list of Token records per sentence, in input order
+        """
+        # The rule-based tokenizer is faster than a cache lookup
+        if self.annotation_cache is None or not self.supports(CACHEABLE):
+            return self.annotator.annotate(sentences)
+        return self._annotate_cached(iter(sentences), batch_size)
     
-    def _process_with_stanza(self, text: str) -> List[Dict[str, Any]]:
-        """Process text using Stanza"""
-        doc = self.nlp(text)
-        tokens = []
-        
-        for sent in doc.sentences:
-            for word in sent.words:
-                token_data = {
-                    'word': word.text,
-                    'norm': word.lemma.lower() if word.lemma else word.text.lower(),
-                    'upos': word.upos,
-                    'upos_tr': self._map_pos_to_turkish(word.upos),
-                    'xpos': word.xpos,
-                    'morph': self._format_stanza_morph(word.feats),
-                    'dep_head': word.head if word.head != 0 else None,
-                    'dep_rel': word.deprel if word.deprel != 'root' else 'root',
-                    'start_char': word.start_char,
-                    'end_char': word.end_char,
-                    'is_punctuation': word.text in '.,;:!?"()[]{}',
-                    'is_space': False
-                }
-                tokens.append(token_data)
-        
-        return tokens
+    def _annotate_cached(self, sentences: Iterator[str], batch_size: int) -> Iterator[List[Token]]:
+        """Serve cached sentences from the cache and send only the misses to the backend"""
+        cache = self.annotation_cache
+        while True:
+            batch = list(islice(sentences, batch_size))
+            if not batch:
+                return
+            
+            cached = [cache.get(sentence) for sentence in batch]
+            misses = [sentence for sentence, tokens in zip(batch, cached) if tokens is None]
+            annotated = iter(self.annotator.annotate(misses))
+            
+            for sentence, tokens in zip(batch, cached):
+                if tokens is None:
+                    result = next(annotated)
+                    # A fallback after a model error is not the model's annotation
+                    if not is_fallback(result):
+                        cache.put(sentence, [token.to_dict() for token in result])
+                    yield result
+                else:
+                    yield [Token.from_dict(token) for token in tokens]
     
-    def _process_simple(self, text: str) -> List[Dict[str, Any]]:
-        """Process text using simple tokenization"""
-        # Simple Turkish text normalization
-        text = self._normalize_turkish_text(text)
-        
-        # Basic tokenization using regex - NOW INCLUDES TURKISH CHARACTERS
-        # Turkish characters: ç, ğ, ı, İ, ö, ş, ü, Ç, Ğ, İ, Ö, Ş, Ü
-        tokens = re.findall(r'\b[\wçğıöşüÇĞIİÖŞÜ]+\b', text)
-        
-        token_data_list = []
-        for i, token in enumerate(tokens):
-            token_data = {
-                'word': token,
-                'norm': token.lower(),
-                'upos': None,  # No POS tagging
-                'upos_tr': None,  # No Turkish POS tagging
-                'xpos': None,
-                'morph': None,  # No morphology
-                'dep_head': None,  # No dependency parsing
-                'dep_rel': None,
-                'start_char': i * (len(token) + 1),  # Rough estimation
-                'end_char': (i + 1) * (len(token) + 1),
-                'is_punctuation': False,
-                'is_space': False
-            }
-            token_data_list.append(token_data)
+    def _map_pos_to_turkish(self, upos: str) -> str:
+        """
+        Map Universal POS tags to Turkish POS tag names
         
-        return token_data_list
+        Args:
+            upos: Universal POS tag (NOUN, VERB, ADJ, etc.)
+            
+        Returns:
+            Turkish POS tag name
+        """
+        return map_pos_to_turkish(upos)
     
-    def _process_with_custom_bert(self, text: str) -> List[Dict[str, Any]]:
-        """Process text using custom BERT model"""
-        if self.custom_bert_processor is None:
-            logger.warning("Custom BERT processor not available")
-            return self._process_simple(text)
+    def split_sentences(self, text: str) -> List[str]:
+        """
+        Split text into sentences
         
-        try:
-            tokens = self.custom_bert_processor.process_text(text)
-            logger.info(f"Custom BERT processed {len(tokens)} tokens")
-            return tokens
-        except Exception as e:
-            logger.error(f"Custom BERT processing error: {e}")
-            return self._process_simple(text)
+        All backends use the rule-based splitter (abbreviation-aware, keeps the
+        final punctuation); running a full spaCy/Stanza pipeline just to find
+        sentence boundaries doubled the annotation cost.
+        """
+        return self.tokenizer.split_sentences(text)
     
-    def _normalize_turkish_text(self, text: str) -> str:
-        """Basic Turkish text normalization - PRESERVE Turkish characters"""
-        # Remove extra whitespace
-        text = re.sub(r'\s+', ' ', text.strip())
-        
-        # NOTE: Turkish characters are PRESERVED, not converted to ASCII
-        # This ensures proper handling of Turkish text including ş, ç, ğ, ı, ö, ü, İ, Ç, Ğ, Ö, Ş, Ü
-        
-        # Only perform basic cleanup while preserving Turkish characters
-        # Remove control characters but keep Turkish special characters
-        text = re.sub(r'[\x00-\x08\x0B\x0C\x0E-\x1F\x7F]', '', text)
+    def get_model_version(self) -> str:
+        """
+        Identify the model behind the active backend
         
-        return text
+        Used in annotation cache keys, so changing or upgrading a model never
+        returns annotations made by another one.
+        """
+        return self.annotator.model_version()
     
-    def _format_stanza_morph(self, feats: str) -> str:
-        """Format Stanza morphological features"""
-        if not feats:
-            return None
-        
-        # Stanza features are already in "Key=Value|Key=Value" format
-        return feats
+    def get_config(self) -> Dict[str, Any]:
+        """
+        Constructor arguments that recreate this processor
 
-    def _format_morph_features(self, morph) -> str:
-        """Format spaCy morphological features"""
-        if not morph:
-            return None
-        
-        features = []
-        for key, value in morph:
-            features.append(f"{key}={value}")
-        
-        return "|".join(features) if features else None
-    
-    def _map_pos_to_turkish(self, upos: str) -> str:
+        Used to start equivalent processors in worker processes (the resolved
+        backend, so workers do not auto-detect again).
         """
-        Map Universal POS tags to Turkish POS tag names
+        return {
+            'backend': self.backend,
+            'model_name': self.model_name,
+            'bert_model_path': self.bert_model_path,
+            'bert_inference': self.bert_inference,
+            'backend_options': {name: dict(options) for name, options in self.backend_options.items()},
+        }
+
+    def enable_annotation_cache(self, cache_path: str, max_size_mb: float = 512) -> AnnotationCache:
+        """
+        Cache annotations per sentence in a side SQLite file
         
         Args:
-            upos: Universal POS tag (NOUN, VERB, ADJ, etc.)
+            cache_path: Path to the cache file
+            max_size_mb: Size bound; least recently used entries are evicted beyond it
             
         Returns:
-            Turkish POS tag name
+            The opened cache (its get_stats() reports the hit rate)
         """
-        pos_mapping = {
-            'NOUN': 'İsim',
-            'VERB': 'Fiil',
-            'ADJ': 'Sıfat',
-            'ADV': 'Zarf',
-            'PRON': 'Zamirler',
-            'DET': 'Belirteç',
-            'ADP': 'Edat',
-            'CONJ': 'Bağlaç',
-            'CCONJ': 'Bağlaç',
-            'SCONJ': 'Bağlaç',
-            'PART': 'Ek',
-            'INTJ': 'Ünlem',
-            'NUM': 'Sayı',
-            'PROPN': 'Özel İsim',
-            'AUX': 'Yardımcı Fiil',
-            'PUNCT': 'Noktalama',
-            'SYM': 'Sembol',
-            'X': 'Bilinmeyen'
-        }
-        
-        return pos_mapping.get(upos, upos)
+        if self.annotation_cache is not None:
+            self.annotation_cache.close()
+        self.annotation_cache = AnnotationCache(cache_path, self.backend, self.get_model_version(),
+                                                max_size_mb=max_size_mb)
+        return self.annotation_cache
     
-    def split_sentences(self, text: str) -> List[str]:
-        """Split text into sentences"""
-        if self.backend == 'spacy':
-            doc = self.nlp(text)
-            return [sent.text.strip() for sent in doc.sents if sent.text.strip()]
-        elif self.backend == 'stanza':
-            doc = self.nlp(text)
-            return [sent.text.strip() for sent in doc.sentences if sent.text.strip()]
-        else:
-            # Simple sentence splitting
-            sentences = re.split(r'[.!?]+', text)
-            return [sent.strip() for sent in sentences if sent.strip()]
+    def close(self):
+        """Flush and close the annotation cache, if any"""
+        if self.annotation_cache is not None:
+            self.annotation_cache.close()
+            self.annotation_cache = None
     
     def get_processing_info(self) -> Dict[str, Any]:
         """Get information about the current processing setup"""
+        capabilities = self.capabilities
         info = {
             'backend': self.backend,
             'available_backends': self.available_backends,
             'model_name': self.model_name,
+            'startup_seconds': round(self.startup_seconds, 3),
+            'capabilities': sorted(capabilities),
             'features_available': {
                 'tokenization': True,
-                'pos_tagging': self.backend in ['spacy', 'stanza', 'custom_bert'],
-                'lemmatization': self.backend in ['spacy', 'stanza', 'custom_bert'],
-                'morphology': self.backend in ['spacy', 'stanza', 'custom_bert'],
-                'dependency_parsing': self.backend in ['spacy', 'stanza'],
-                'bert_confidence': self.backend == 'custom_bert'
+                'pos_tagging': POS in capabilities,
+                'lemmatization': LEMMA in capabilities,
+                'morphology': MORPH in capabilities,
+                'dependency_parsing': DEPENDENCY in capabilities,
+                'bert_confidence': CONFIDENCE in capabilities
             }
         }
         
-        # Add BERT-specific info if available
-        if self.backend == 'custom_bert' and self.custom_bert_processor:
-            bert_info = self.custom_bert_processor.get_model_info()
-            info['bert_model_info'] = bert_info
+        # Backend-specific info (e.g. the BERT model)
+        info.update(self.annotator.get_info())
+        
+        if self.annotation_cache is not None:
+            info['annotation_cache'] = self.annotation_cache.get_stats()
         
         return info
 
 # Factory function for easy processor creation
-def create_turkish_processor(backend='auto', model_name='tr_core_news_sm', bert_model_path=None) -> TurkishNLPProcessor:
+def create_turkish_processor(backend='auto', model_name='tr_core_news_sm', bert_model_path=None,
+                             bert_inference=None) -> TurkishNLPProcessor:
     """
     Create a Turkish NLP processor with automatic backend detection
     
     Args:
-        backend: 'auto', 'spacy', 'stanza', 'simple', or 'custom_bert'
+        backend: 'auto' or a registered backend ('spacy', 'stanza', 'simple', 'custom_bert', ...)
         model_name: spaCy model name (ignored for other backends)
         bert_model_path: Path to custom BERT model (for 'custom_bert' backend)
+        bert_inference: BERT inference path ('pytorch', 'int8', 'onnx', 'onnx-int8')
         
     Returns:
         Configured TurkishNLPProcessor instance
@@ -379,7 +305,8 @@ def create_turkish_processor(backend='auto', model_name='tr_core_news_sm', bert_
     if backend == 'auto':
         return TurkishNLPProcessor()
     else:
-        return TurkishNLPProcessor(backend=backend, model_name=model_name, bert_model_path=bert_model_path)
+        return TurkishNLPProcessor(backend=backend, model_name=model_name, bert_model_path=bert_model_path,
+                                   bert_inference=bert_inference)
 
 # Example usage
 if __name__ == "__main__":
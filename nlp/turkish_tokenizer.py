@@ -0,0 +1,216 @@
+"""
+Rule-based Turkish Tokenizer
+
+Fast sentence splitter and tokenizer for Turkish text. Both are single
+compiled regular expressions driven by ``re.finditer``, so every token keeps
+its true character offsets into the input and punctuation is emitted as
+tokens of its own.
+
+Used directly by the ``simple`` backend and as the pre-tokenizer for the
+spaCy, Stanza and custom BERT backends.
+"""
+
+import re
+from typing import List, Tuple, Iterable, Optional, Iterator
+
+# (form, start_char, end_char)
+TokenSpan = Tuple[str, int, int]
+
+# Common Turkish abbreviations that end in a period (without the final period)
+TURKISH_ABBREVIATIONS = frozenset([
+    # Titles
+    'Dr', 'Prof', 'Doç', 'Yrd', 'Öğr', 'Gör', 'Arş', 'Uzm', 'Av', 'Müh', 'Ecz',
+    'Sn', 'Hz', 'Org', 'Korg', 'Tümg', 'Tuğg', 'Alb', 'Yb',
+    'Bnb', 'Yzb', 'Ütğm', 'Tğm', 'Asb', 'Bşk', 'Gn', 'Gen', 'Ord',
+    # Addresses
+    'Mah', 'Cad', 'Sok', 'Sk', 'Bul', 'Blv', 'Apt', 'No', 'Tel', 'Faks',
+    # Organisations
+    'Ltd', 'Şti', 'Koll', 'Üniv', 'Fak', 'Böl', 'Enst', 'Bkz',
+    # Running text
+    'vb', 'vs', 'vd', 'bkz', 'krş', 'örn', 'yy', 'agm', 'çev',
+    'ed', 'sy', 'sf', 'St',
+])
+
+# Abbreviations that are also ordinary words (yay 'bow', haz 'pleasure', kur
+# 'exchange rate', age, s): abbreviations only before a lowercase word or a
+# number, as in 'İletişim Yay. 2005' or 'age. s. 45'
+TURKISH_AMBIGUOUS_ABBREVIATIONS = frozenset(['yay', 'Yay', 'haz', 'Haz', 'Kur', 'age', 's'])
+
+# Characters that may follow sentence-final punctuation inside the sentence
+_CLOSERS = '"\'»”’)\\]'
+
+_UPPER = 'A-ZÇĞİÖŞÜÂÎÛ'
+
+# Plain words and numbers come first and only fall through to the rarer
+# alternatives when followed by '.', '@' or ':' (abbreviations, URLs, e-mails).
+# The joiners in the first lookahead stop it from backtracking into a word.
+_TOKEN_PATTERN = r"""
+    [^\W\d_]+(?:['’-][^\W\d_]+)*\d*(?![.@:\w'’-])           # ev, Ankara'da, Türk-İslam
+  | \d+(?:[.,:/]\d+)*(?:\.(?=\s+[a-zçğıöşü])|['’][^\W\d_]+)?(?![\w@])
+                                                            # 3,14 12.05.2023 19. 2023'te
+  | (?=[^\W\d_])(?:
+        (?:https?://|www\.)[^\s<>"]+[^\s<>".,;:!?)\]'»”]     # URLs
+      | [\w.+-]+@[\w-]+(?:\.[\w-]+)+                         # e-mail addresses
+      | (?:[^\W\d_]\.){{2,}}                                 # T.C. A.Ş. M.Ö.
+      | (?<![\w.])(?:{abbreviations})\.                      # Dr. vb. Cad.
+      | (?<![\w.])(?:{ambiguous})\.(?=\s+[a-zçğıöşü\d])        # yay. 2005
+      | (?<![\w.])[{upper}]\.(?=\s+[{upper}])                # A. Kaya
+      | [^\W\d_]+(?:['’-][^\W\d_]+)*\d*
+    )
+  | [\w.+-]+@[\w-]+(?:\.[\w-]+)+
+  | \w+
+  | \.{{2,}}|[!?]+|[^\w\s\x00-\x1f\x7f]                       # punctuation
+"""
+
+_SENTENCE_END = re.compile(
+    r'(?:\.{2,}|[.!?…])[!?]*[' + _CLOSERS + r']*(?=\s|$)'
+    r'|\n[ \t]*\n'
+)
+_NEXT_CHAR = re.compile(r'\s*(\S)')
+_LAST_WORD = re.compile(r'([^\W\d_]+)\.$')
+_INITIAL = re.compile(r'(?:^|\s)[' + _UPPER + r']\.$')
+# A sentence that so far is only an ordinal: '1. Madde ...'
+_ORDINAL = re.compile(r'\s*\d{1,3}$')
+
+
+class TurkishTokenizer:
+    """Regex-based Turkish tokenizer and sentence splitter with exact offsets"""
+
+    def __init__(self, abbreviations: Optional[Iterable[str]] = None,
+                 ambiguous_abbreviations: Optional[Iterable[str]] = None):
+        """
+        Initialize the tokenizer
+
+        Args:
+            abbreviations: Abbreviations (without the final period) that do not
+                           end a sentence; defaults to TURKISH_ABBREVIATIONS
+            ambiguous_abbreviations: Abbreviations that are also words, only
+                                     taken as abbreviations before a lowercase
+                                     word or a number; defaults to
+                                     TURKISH_AMBIGUOUS_ABBREVIATIONS
+        """
+        self.abbreviations = frozenset(abbreviations if abbreviations is not None
+                                       else TURKISH_ABBREVIATIONS)
+        self.ambiguous_abbreviations = frozenset(ambiguous_abbreviations if ambiguous_abbreviations is not None
+                                                 else TURKISH_AMBIGUOUS_ABBREVIATIONS)
+
+        def alternation(words):
+            # Longest first, so 'Prof' is tried before 'P'
+            return '|'.join(re.escape(a) for a in sorted(words, key=len, reverse=True)) or '(?!)'
+
+        self._token_re = re.compile(_TOKEN_PATTERN.format(abbreviations=alternation(self.abbreviations),
+                                                          ambiguous=alternation(self.ambiguous_abbreviations),
+                                                          upper=_UPPER),
+                                    re.VERBOSE)
+
+    def tokenize(self, text: str, offset: int = 0) -> List[TokenSpan]:
+        """
+        Tokenize text
+
+        Args:
+            text: Input text
+            offset: Added to every character offset (for text taken from a larger string)
+
+        Returns:
+            List of (form, start_char, end_char) tuples
+        """
+        return [(m.group(), m.start() + offset, m.end() + offset)
+                for m in self._token_re.finditer(text)]
+
+    def iter_tokens(self, text: str, start: int = 0, end: Optional[int] = None) -> Iterator[TokenSpan]:
+        """Tokenize text[start:end] lazily, with offsets into the full text"""
+        for m in self._token_re.finditer(text, start, len(text) if end is None else end):
+            yield m.group(), m.start(), m.end()
+
+    def sentence_spans(self, text: str) -> List[Tuple[int, int]]:
+        """
+        Find sentence boundaries
+
+        A sentence ends at '.', '!', '?', '…' or '...' (plus closing quotes and
+        brackets) when the next word does not start in lowercase, and at every
+        blank line. A period after a known abbreviation, a single capital
+        initial or an ordinal starting the sentence ('1. Madde') does not end
+        a sentence; one after an ambiguous abbreviation only when a number
+        follows.
+
+        Returns:
+            List of (start, end) character spans with surrounding whitespace trimmed
+        """
+        spans = []
+        start = 0
+        length = len(text)
+
+        for m in _SENTENCE_END.finditer(text):
+            end = m.end()
+            if m.group()[0] != '\n':
+                # Lowercase continuation: ordinal, abbreviation or mid-sentence ellipsis
+                following = _NEXT_CHAR.match(text, end)
+                if following and following.group(1).islower():
+                    continue
+                if m.group() == '.' and (self._is_abbreviation(text, m.start() + 1,
+                                                               following and following.group(1))
+                                         or _ORDINAL.match(text, start, m.start())):
+                    continue
+            self._add_span(text, start, end, spans)
+            start = end
+
+        self._add_span(text, start, length, spans)
+        return spans
+
+    def split_sentences(self, text: str) -> List[str]:
+        """Split text into sentence strings"""
+        return [text[start:end] for start, end in self.sentence_spans(text)]
+
+    def tokenize_sentences(self, text: str) -> List[List[TokenSpan]]:
+        """Split text into sentences of tokens, with offsets into text"""
+        return [list(self.iter_tokens(text, start, end)) for start, end in self.sentence_spans(text)]
+
+    def _is_abbreviation(self, text: str, end: int, following: Optional[str] = None) -> bool:
+        """
+        True if the period ending at text[end - 1] belongs to an abbreviation
+        or initial (an ambiguous abbreviation only when a digit follows)
+        """
+        window = text[max(0, end - 16):end]
+        match = _LAST_WORD.search(window)
+        if match and (match.group(1) in self.abbreviations
+                      or match.group(1) in self.ambiguous_abbreviations and bool(following)
+                      and following.isdigit()):
+            return True
+        return _INITIAL.search(window) is not None
+
+    @staticmethod
+    def _add_span(text: str, start: int, end: int, spans: List[Tuple[int, int]]) -> None:
+        """Append text[start:end] with whitespace trimmed, if non-empty"""
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        if start < end:
+            spans.append((start, end))
+
+
+def is_punctuation(form: str) -> bool:
+    """True for tokens made only of punctuation or symbols"""
+    # Words start with a letter or digit, so they return on the first check
+    return not form[:1].isalnum() and not any(c.isalnum() for c in form)
+
+
+_default_tokenizer = None
+
+
+def get_tokenizer() -> TurkishTokenizer:
+    """Get the shared tokenizer with the default abbreviation lexicon"""
+    global _default_tokenizer
+    if _default_tokenizer is None:
+        _default_tokenizer = TurkishTokenizer()
+    return _default_tokenizer
+
+
+def tokenize(text: str) -> List[TokenSpan]:
+    """Tokenize text with the default tokenizer"""
+    return get_tokenizer().tokenize(text)
+
+
+def split_sentences(text: str) -> List[str]:
+    """Split text into sentences with the default tokenizer"""
+    return get_tokenizer().split_sentences(text)
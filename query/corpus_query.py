@@ -8,45 +8,225 @@ This module provides query functionality for corpus analysis including:
 - Word sketches based on dependency relations
 - CQL (Corpus Query Language) search
 - Advanced Statistics
+
+Every query method takes an optional `subcorpus` name restricting it to the
+documents of a subcorpus (see query.subcorpus).
+
+Document metadata extracted at ingestion (author, date, genre, ...) can be
+filtered and broken down by facet (see query.metadata).
+
+Dispersion measures (range, Juilland's D, DP, ARF) are stored per word and
+looked up rather than computed per query; the first lookup after documents
+changed recomputes them (see analysis.dispersion).
 """
 
 import sqlite3
 import math
-from typing import List, Dict, Any, Optional, Tuple
+from typing import List, Dict, Any, Optional, Tuple, Iterator
 from collections import Counter, defaultdict
 import logging
 
 from database.schema import CorpusDatabase
 from analysis.stats import CorpusStatistics
+from analysis.dispersion import DispersionAnalyzer
+from analysis.lexical_diversity import LexicalStatsIndex, MEASURES as LEXICAL_MEASURES
 from query.cql_parser import CQLParser
+from query.tracing import QueryTracer, TracingConnection, traced
+from query.subcorpus import SubcorpusManager, range_condition, range_scan
+from query.metadata import MetadataIndex
+
+try:
+    from config.config import LOGS_DIR, QUERY_TRACING, QUERY_TRACE_EXPLAIN
+except ImportError:
+    LOGS_DIR = None
+    QUERY_TRACING = False
+    QUERY_TRACE_EXPLAIN = False
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Frequency list rows fetched per batch
+FREQUENCY_FETCH_SIZE = 5000
+
 class CorpusQuery:
     """Main class for corpus querying and analysis"""
     
-    def __init__(self, db_path: str = "corpus.db"):
+    def __init__(self, db_path: str = "corpus.db", pool=None, tracer: Optional[QueryTracer] = None):
         """
         Initialize corpus query interface
         
         Args:
             db_path: Path to SQLite database
+            pool: Optional CorpusConnectionPool; when given, the calling thread's
+                  pooled read-only connection is reused instead of opening a new one
+            tracer: Record the SQL of every public call in this QueryTracer
+                    (shared between instances, e.g. by the query server); with
+                    QUERY_TRACING in the config, a tracer logging to
+                    LOGS_DIR/query_trace.jsonl is created
         """
         self.db_path = db_path
-        self.db = CorpusDatabase(db_path)
-        self.db.connect()
-        self.conn = self.db.connection
+        self.pool = pool
+        if pool is not None:
+            self.db = None
+            self.conn = pool.reader()
+        else:
+            self.db = CorpusDatabase(db_path)
+            self.db.connect()
+            self.conn = self.db.connection
         self.cql_parser = CQLParser()
         
+        self.tracer: Optional[QueryTracer] = None
+        if tracer is not None:
+            self.enable_tracing(tracer=tracer)
+        elif QUERY_TRACING:
+            self.enable_tracing(explain=QUERY_TRACE_EXPLAIN,
+                                log_path=LOGS_DIR / "query_trace.jsonl" if LOGS_DIR else None)
+    
+    def enable_tracing(self, explain: bool = False, log_path: Optional[str] = None,
+                       slow_ms: Optional[float] = None,
+                       tracer: Optional[QueryTracer] = None) -> QueryTracer:
+        """
+        Trace the SQL statements of every public method (see query.tracing)
+        
+        Args:
+            explain: Capture EXPLAIN QUERY PLAN and flag full table scans
+            log_path: Append one JSON line per call to this file
+            slow_ms: Log calls slower than this as warnings
+            tracer: Use an existing tracer instead of creating one
+            
+        Returns:
+            The tracer; its summary() / format_summary() / dump() report the calls
+        """
+        if tracer is None:
+            tracer = QueryTracer(explain=explain, log_path=log_path, slow_ms=slow_ms)
+        self.disable_tracing()
+        self.tracer = tracer
+        self.conn = TracingConnection(self.conn, tracer)
+        return tracer
+    
+    def disable_tracing(self) -> None:
+        """Stop tracing; the tracer keeps what it recorded"""
+        if isinstance(self.conn, TracingConnection):
+            self.conn = self.conn._connection
+        self.tracer = None
+    
+    @property
+    def subcorpora(self) -> SubcorpusManager:
+        """Subcorpus definitions of this database"""
+        return SubcorpusManager(self.conn)
+    
+    def define_subcorpus(self, name: str, definition: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Define (or redefine) a named subcorpus by document attributes and materialize it
+        
+        Example: query.define_subcorpus('haberler', {'file_path': '*/haber/*'})
+        
+        Returns:
+            The subcorpus with its sizes
+        """
+        return self.subcorpora.define(name, definition)
+    
+    def drop_subcorpus(self, name: str) -> bool:
+        """Delete a subcorpus; returns whether it existed"""
+        return self.subcorpora.drop(name)
+    
+    def list_subcorpora(self) -> List[Dict[str, Any]]:
+        """All subcorpora with their definitions and sizes"""
+        return self.subcorpora.list()
+    
+    def subcorpus_size(self, name: str) -> Dict[str, int]:
+        """Stored size of a subcorpus: documents, sentences, tokens and words (tokens without punctuation)"""
+        info = self.subcorpora.get(name)
+        return {key: info[key] for key in ('doc_count', 'sentence_count', 'token_count', 'word_count')}
+    
+    @property
+    def metadata(self) -> MetadataIndex:
+        """Document metadata of this database"""
+        return MetadataIndex(self.conn)
+    
+    def metadata_keys(self) -> Dict[str, int]:
+        """Document metadata keys with their number of distinct values"""
+        return self.metadata.keys()
+    
+    def compute_dispersion(self, word_type: str = 'norm') -> Dict[str, Any]:
+        """
+        Compute and store the dispersion measures of the whole vocabulary
+        (lookups compute them when missing or stale; see analysis.dispersion)
+        
+        Returns:
+            The run record: documents, tokens and types covered
+        """
+        if self.pool is not None:
+            # Pooled readers are read-only
+            with self.pool.writer() as connection:
+                DispersionAnalyzer(connection).compute(word_type)
+            return DispersionAnalyzer(self.conn).status(word_type)
+        return DispersionAnalyzer(self.conn).compute(word_type)
+    
+    def compute_lexical_stats(self) -> int:
+        """
+        Compute and store the lexical statistics of documents that have none
+        (ingestion stores them; see analysis.lexical_diversity)
+        
+        Returns:
+            Number of documents computed
+        """
+        return LexicalStatsIndex(self.conn).refresh()
+    
+    def _dispersion_analyzer(self, word_type: str) -> DispersionAnalyzer:
+        """Analyzer for lookups; computes the measures first if they are missing or stale"""
+        analyzer = DispersionAnalyzer(self.conn)
+        status = analyzer.status(word_type)
+        if status is None or status['stale']:
+            logger.info(f"Dispersion measures for '{word_type}' are "
+                        f"{'missing' if status is None else 'stale'}; computing them")
+            self.compute_dispersion(word_type)
+        return analyzer
+    
+    def _subcorpus_info(self, subcorpus: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Subcorpus record for a query (None for the whole corpus)"""
+        if subcorpus is None:
+            return None
+        info = self.subcorpora.get(subcorpus)
+        if info['stale']:
+            logger.warning(f"Subcorpus '{subcorpus}' is stale: documents changed after it was "
+                           f"materialized (refresh with define_subcorpus or ingest again)")
+        return info
+    
+    @staticmethod
+    def _subcorpus_condition(info: Optional[Dict[str, Any]], column: str,
+                             kind: str = 'token') -> Tuple[str, list]:
+        """
+        ' AND <column in the subcorpus>' and its params ('' for the whole corpus)
+        
+        Args:
+            kind: 'token' for token_id columns, 'doc' for doc_id columns
+        """
+        if info is None:
+            return "", []
+        sql, params = range_condition(column, info['subcorpus_id'], kind)
+        return f" AND {sql}", params
+    
+    @staticmethod
+    def _token_source(info: Optional[Dict[str, Any]]) -> Tuple[str, str, list]:
+        """
+        FROM clause for the tokens table as `t`, a WHERE condition and its
+        params; with a subcorpus only its token ranges are read
+        """
+        if info is None:
+            return "tokens t", "1", []
+        return range_scan('t', info['subcorpus_id'])
+        
+    @traced
     def kwic_concordance(self, 
                         search_term: str,
                         search_type: str = 'form',  # 'form', 'norm', 'lemma'
                         case_sensitive: bool = False,
                         window_size: int = 5,
                         limit: int = 100,
-                        pos_filter: Optional[str] = None) -> List[Dict[str, Any]]:
+                        pos_filter: Optional[str] = None,
+                        subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Generate KWIC (Key Word In Context) concordance
         """
@@ -92,6 +272,10 @@ class CorpusQuery:
             query += f" AND LOWER(t1.{search_field}) LIKE LOWER(?)"
             params.append(f"%{search_term}%")
         
+        subcorpus_sql, subcorpus_params = self._subcorpus_condition(self._subcorpus_info(subcorpus), 't1.token_id')
+        query += subcorpus_sql
+        params.extend(subcorpus_params)
+        
         query += """
             GROUP BY t1.token_id
             ORDER BY t1.doc_id, t1.sent_id, t1.token_number
@@ -159,14 +343,45 @@ class CorpusQuery:
         
         return concordance_results
     
+    @traced
     def frequency_list(self, 
                       word_type: str = 'norm',  # 'form', 'norm', 'lemma'
                       pos_filter: Optional[str] = None,
                       min_freq: int = 1,
-                      limit: int = 1000) -> List[Dict[str, Any]]:
+                      limit: int = 1000,
+                      subcorpus: Optional[str] = None,
+                      dispersion: bool = False) -> List[Dict[str, Any]]:
         """
         Generate frequency list
+        
+        With a subcorpus, each entry also has its frequency per million words
+        of the subcorpus ('per_million').
+        
+        With dispersion, each entry also has the word's stored dispersion
+        measures ('range', 'juilland_d', 'dp', 'dp_norm', 'arf'; see
+        analysis.dispersion), computed over the whole corpus.
         """
+        return list(self._frequency_rows(word_type, pos_filter, min_freq, limit, subcorpus, dispersion))
+    
+    @traced
+    def iter_frequency_list(self,
+                            word_type: str = 'norm',
+                            pos_filter: Optional[str] = None,
+                            min_freq: int = 1,
+                            limit: int = 1000,
+                            subcorpus: Optional[str] = None,
+                            dispersion: bool = False) -> Iterator[Dict[str, Any]]:
+        """
+        Frequency list entries as they are fetched, for results too large to
+        hold in memory (see frequency_list; a negative limit means no limit)
+        """
+        yield from self._frequency_rows(word_type, pos_filter, min_freq, limit, subcorpus, dispersion)
+    
+    def _frequency_rows(self, word_type: str, pos_filter: Optional[str], min_freq: int, limit: int,
+                        subcorpus: Optional[str], dispersion: bool) -> Iterator[Dict[str, Any]]:
+        """Frequency list entries, fetched (and given dispersion measures) batch by batch"""
+        if dispersion and subcorpus is not None:
+            raise ValueError("Dispersion measures are stored for the whole corpus, not per subcorpus")
         cursor = self.conn.cursor()
         
         # Build query
@@ -182,16 +397,17 @@ class CorpusQuery:
         else:
             raise ValueError(f"Invalid word_type: {word_type}")
         
+        info = self._subcorpus_info(subcorpus)
+        source, condition, params = self._token_source(info)
         query = f"""
             SELECT {select_field}, upos, COUNT(*) as frequency
-            FROM tokens
-            WHERE {select_field} IS NOT NULL 
+            FROM {source}
+            WHERE {condition}
+                AND {select_field} IS NOT NULL 
                 AND {select_field} != ''
                 AND is_punctuation = 0
         """
         
-        params = []
-        
         # Add POS filter
         if pos_filter:
             query += " AND upos = ?"
@@ -206,18 +422,34 @@ class CorpusQuery:
         params.extend([min_freq, limit])
         
         cursor.execute(query, params)
-        results = cursor.fetchall()
+        analyzer = self._dispersion_analyzer(word_type) if dispersion else None
         
-        return [
-            {
-                'word': row[0],
-                'pos': row[1],
-                'frequency': row[2]
-            }
-            for row in results
-        ]
+        while True:
+            rows = cursor.fetchmany(FREQUENCY_FETCH_SIZE)
+            if not rows:
+                break
+            frequencies = [
+                {
+                    'word': row[0],
+                    'pos': row[1],
+                    'frequency': row[2]
+                }
+                for row in rows
+            ]
+            if info is not None:
+                for entry in frequencies:
+                    entry['per_million'] = (entry['frequency'] * 1_000_000 / info['word_count']
+                                            if info['word_count'] else 0.0)
+            if analyzer is not None:
+                stored = analyzer.lookup([entry['word'] for entry in frequencies], word_type)
+                for entry in frequencies:
+                    measures = stored.get(entry['word'], {})
+                    for name in ('range', 'juilland_d', 'dp', 'dp_norm', 'arf'):
+                        entry[name] = measures.get(name)
+            yield from frequencies
 
-    def cql_search(self, query_string: str, limit: int = 100):
+    @traced
+    def cql_search(self, query_string: str, limit: int = 100, subcorpus: Optional[str] = None):
         """
         Execute a CQL search
         Example: [pos="ADJ"] [lemma="insan"]
@@ -229,10 +461,11 @@ class CorpusQuery:
         sequence_len = len(parsed_query)
         
         # 1. Find candidates for the first token
-        sql, params = self.cql_parser.generate_sql(parsed_query)
+        condition, condition_params = self._subcorpus_condition(self._subcorpus_info(subcorpus), 'token_id')
+        sql, params = self.cql_parser.generate_sql(parsed_query, condition, condition_params)
         
         cursor = self.conn.cursor()
-        cursor.execute(sql + f" LIMIT {limit * 10}") # Fetch more candidates than limit
+        cursor.execute(sql + f" LIMIT {int(limit) * 10}", params) # Fetch more candidates than limit
         candidates = cursor.fetchall()
         
         results = []
@@ -314,6 +547,7 @@ class CorpusQuery:
                 
         return results
 
+    @traced
     def collocation_analysis(self,
                            target_word: str,
                            word_type: str = 'norm',
@@ -321,51 +555,64 @@ class CorpusQuery:
                            min_freq: int = 2,
                            colloc_min_freq: int = 2,
                            measure: str = 'pmi',  # 'pmi', 'log_likelihood', 't_score'
-                           limit: int = 100) -> List[Dict[str, Any]]:
+                           limit: int = 100,
+                           subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Perform collocation analysis
         """
-        cursor = self.conn.cursor()
-        
-        # Build search field
-        if word_type == 'form':
-            search_field = 'form'
-        elif word_type == 'norm':
-            search_field = 'norm'
-        elif word_type == 'lemma':
-            search_field = 'lemma'
-        else:
+        if word_type not in ('form', 'norm', 'lemma'):
             raise ValueError(f"Invalid word_type: {word_type}")
         
+        counts = self._collocation_counts(target_word, word_type, window_size, min_freq, subcorpus)
+        if counts['target_freq'] < min_freq:
+            return []
+        
+        candidates = [collocate for collocate, n in counts['collocates'].items() if n >= colloc_min_freq]
+        return self._score_collocations(counts['target_freq'], counts['total_tokens'], counts['collocates'],
+                                        self._form_frequencies(candidates, subcorpus), colloc_min_freq,
+                                        measure, limit)
+    
+    def _collocation_counts(self, target_word: str, word_type: str, window_size: int,
+                            min_freq: int = 0, subcorpus: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Contingency counts of a collocation analysis, before any scoring
+        
+        Returns:
+            {'target_freq', 'total_tokens', 'collocates': Counter of co-occurrences}
+            (the window scan is skipped when target_freq < min_freq)
+        """
+        cursor = self.conn.cursor()
+        info = self._subcorpus_info(subcorpus)
+        subcorpus_sql, subcorpus_params = self._subcorpus_condition(info, 'token_id')
+        
         # Get target word frequency
         cursor.execute(f"""
             SELECT COUNT(*) FROM tokens
-            WHERE {search_field} = ? AND is_punctuation = 0
-        """, [target_word])
+            WHERE {word_type} = ? AND is_punctuation = 0{subcorpus_sql}
+        """, [target_word, *subcorpus_params])
         
         target_freq = cursor.fetchone()[0]
+        collocate_counts = Counter()
         if target_freq < min_freq:
-            return []
-        
-        # Get total tokens
-        cursor.execute("SELECT COUNT(*) FROM tokens WHERE is_punctuation = 0")
-        total_tokens = cursor.fetchone()[0]
+            return {'target_freq': target_freq, 'total_tokens': 0, 'collocates': collocate_counts}
         
-        # Find collocations
-        collocations = []
+        # Get total tokens (stored with a subcorpus)
+        if info is not None:
+            total_tokens = info['word_count']
+        else:
+            cursor.execute("SELECT COUNT(*) FROM tokens WHERE is_punctuation = 0")
+            total_tokens = cursor.fetchone()[0]
         
         # Get all occurrences of target word
         cursor.execute(f"""
             SELECT sent_id, token_number 
             FROM tokens 
-            WHERE {search_field} = ? AND is_punctuation = 0
-        """, [target_word])
+            WHERE {word_type} = ? AND is_punctuation = 0{subcorpus_sql}
+        """, [target_word, *subcorpus_params])
         
         target_occurrences = cursor.fetchall()
         
         # Count collocates
-        collocate_counts = Counter()
-        
         for sent_id, token_num in target_occurrences:
             # Get words in window
             cursor.execute("""
@@ -380,25 +627,37 @@ class CorpusQuery:
                 ORDER BY token_number
             """, [sent_id, token_num, window_size, sent_id, token_num])
             
-            window_words = [row[0] for row in cursor.fetchall()]
-            
             # Add to collocate counts
-            for word in window_words:
-                collocate_counts[word] += 1
+            for row in cursor.fetchall():
+                collocate_counts[row[0]] += 1
         
-        # Calculate association measures
+        return {'target_freq': target_freq, 'total_tokens': total_tokens, 'collocates': collocate_counts}
+    
+    def _form_frequencies(self, forms: List[str], subcorpus: Optional[str] = None) -> Dict[str, int]:
+        """Corpus frequency of each word form (punctuation excluded), looked up in batches"""
+        cursor = self.conn.cursor()
+        subcorpus_sql, subcorpus_params = self._subcorpus_condition(self._subcorpus_info(subcorpus), 'token_id')
+        frequencies = {}
+        for start in range(0, len(forms), 500):
+            batch = forms[start:start + 500]
+            cursor.execute(f"""
+                SELECT form, COUNT(*) FROM tokens
+                WHERE form IN ({','.join('?' * len(batch))}) AND is_punctuation = 0{subcorpus_sql}
+                GROUP BY form
+            """, [*batch, *subcorpus_params])
+            frequencies.update({row[0]: row[1] for row in cursor.fetchall()})
+        return frequencies
+    
+    def _score_collocations(self, target_freq: int, total_tokens: int, collocate_counts: Dict[str, int],
+                            collocate_freqs: Dict[str, int], colloc_min_freq: int, measure: str,
+                            limit: int) -> List[Dict[str, Any]]:
+        """Association scores of collocates from their contingency counts, best first"""
+        collocations = []
         for collocate, co_occurrence_count in collocate_counts.items():
             if co_occurrence_count < colloc_min_freq:
                 continue
             
-            # Get collocate frequency
-            cursor.execute("""
-                SELECT COUNT(*) FROM tokens
-                WHERE form = ? AND is_punctuation = 0
-            """, [collocate])
-            
-            collocate_freq = cursor.fetchone()[0]
-            
+            collocate_freq = collocate_freqs.get(collocate, 0)
             if collocate_freq == 0:
                 continue
             
@@ -464,13 +723,20 @@ class CorpusQuery:
         t_score = (co_occurrence_count - expected_co_occurrence) / math.sqrt(co_occurrence_count)
         return t_score
     
+    @traced
     def word_sketch(self, 
                    lemma: str,
                    relation_type: Optional[str] = None,
-                   limit: int = 100) -> Dict[str, List[Dict[str, Any]]]:
+                   limit: int = 100,
+                   subcorpus: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
         """
         Generate word sketch based on dependency relations
         """
+        return self._group_sketch(self._word_sketch_rows(lemma, relation_type, limit * 10, subcorpus), limit)
+    
+    def _word_sketch_rows(self, lemma: str, relation_type: Optional[str], row_limit: int,
+                          subcorpus: Optional[str] = None) -> List[Tuple[str, str, str, str, int]]:
+        """(relation, related lemma, related form, head lemma, frequency), most frequent first (-1: no limit)"""
         cursor = self.conn.cursor()
         
         # Get dependency relations for the lemma
@@ -495,19 +761,25 @@ class CorpusQuery:
             query += " AND t1.dep_rel = ?"
             params.append(relation_type)
         
+        subcorpus_sql, subcorpus_params = self._subcorpus_condition(self._subcorpus_info(subcorpus), 't1.token_id')
+        query += subcorpus_sql
+        params.extend(subcorpus_params)
+        
         query += """
             GROUP BY t1.dep_rel, t2.lemma, t2.form, t1.lemma
             ORDER BY frequency DESC
             LIMIT ?
         """
-        params.append(limit * 10) 
+        params.append(row_limit)
         
         cursor.execute(query, params)
-        results = cursor.fetchall()
-        
-        # Group by relation type
+        return [tuple(row) for row in cursor.fetchall()]
+    
+    @staticmethod
+    def _group_sketch(rows: List[tuple], limit: int) -> Dict[str, List[Dict[str, Any]]]:
+        """Group word sketch rows by relation type"""
         sketch = defaultdict(list)
-        for row in results:
+        for row in rows:
             relation = row[0]
             if relation and len(sketch[relation]) < limit:
                 sketch[relation].append({
@@ -519,51 +791,241 @@ class CorpusQuery:
         
         return sketch
 
-    def get_pos_distribution(self):
+    @traced
+    def dispersion(self, word: str, word_type: str = 'norm') -> Optional[Dict[str, Any]]:
+        """
+        Stored dispersion measures of a word: frequency, range (documents),
+        Juilland's D, DP, normalized DP and ARF (None if not in the corpus)
+        """
+        return self._dispersion_analyzer(word_type).get(word, word_type)
+    
+    @traced
+    def dispersion_ranking(self,
+                           measure: str = 'dp',
+                           word_type: str = 'norm',
+                           min_freq: int = 5,
+                           limit: int = 100,
+                           descending: bool = False) -> List[Dict[str, Any]]:
+        """
+        Words ordered by a stored dispersion measure, e.g. the most evenly
+        spread words (lowest 'dp') or the most clumped ones (descending)
+        
+        Args:
+            measure: 'range', 'juilland_d', 'dp', 'dp_norm', 'arf' or 'frequency'
+            min_freq: Leave out rarer words (dispersion of rare words is noise)
+        """
+        return self._dispersion_analyzer(word_type).ranked(measure, word_type, min_freq, limit, descending)
+
+    @traced
+    def facet_counts(self,
+                     key: str,
+                     filters: Optional[Dict[str, Any]] = None,
+                     limit: int = -1,
+                     subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Documents and tokens per value of a metadata key, most documents first
+        
+        Without filters and subcorpus the stored facet counts are returned;
+        otherwise only the matching documents are counted.
+        
+        Example: query.facet_counts('author', filters={'genre': 'roman'})
+        
+        Args:
+            key: Metadata key
+            filters: Document conditions, as in subcorpus definitions
+            limit: Maximum number of values (negative: all)
+        """
+        return self._facet_counts(key, filters, limit, self._subcorpus_info(subcorpus))
+    
+    def _facet_counts(self, key: str, filters: Optional[Dict[str, Any]], limit: int,
+                      info: Optional[Dict[str, Any]], strict: bool = True) -> List[Dict[str, Any]]:
+        if not filters and info is None:
+            return self.metadata.facets(key, limit)
+        where, params = self.subcorpora.compile_definition(filters or {}, strict)
+        if not self.metadata.has_tables():
+            return []
+        subcorpus_sql, subcorpus_params = self._subcorpus_condition(info, 'd.doc_id', 'doc')
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT m.value, COUNT(*), COALESCE(SUM(d.token_count), 0)
+            FROM document_metadata m
+            JOIN documents d ON d.doc_id = m.doc_id
+            WHERE m.key = ? AND {where}{subcorpus_sql}
+            GROUP BY m.value
+            ORDER BY 2 DESC, m.value
+            LIMIT ?
+        """, [key, *params, *subcorpus_params, limit])
+        return [{'value': row[0], 'doc_count': row[1], 'token_count': row[2]} for row in cursor.fetchall()]
+    
+    @traced
+    def filter_documents(self,
+                         filters: Dict[str, Any],
+                         limit: int = -1,
+                         subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Documents matching metadata and document conditions, with their metadata
+        
+        Example: query.filter_documents({'genre': 'haber', 'year': {'min': 2020}})
+        
+        Args:
+            filters: Document conditions, as in subcorpus definitions
+            limit: Maximum number of documents (negative: all)
+        """
+        return self._filter_documents(filters, limit, self._subcorpus_info(subcorpus))
+    
+    def _filter_documents(self, filters: Dict[str, Any], limit: int, info: Optional[Dict[str, Any]],
+                          strict: bool = True) -> List[Dict[str, Any]]:
+        where, params = self.subcorpora.compile_definition(filters, strict)
+        subcorpus_sql, subcorpus_params = self._subcorpus_condition(info, 'd.doc_id', 'doc')
+        cursor = self.conn.cursor()
+        cursor.execute(f"""
+            SELECT d.doc_id, d.doc_name, d.file_path, d.sentence_count, d.token_count
+            FROM documents d
+            WHERE {where}{subcorpus_sql}
+            ORDER BY d.doc_id
+            LIMIT ?
+        """, [*params, *subcorpus_params, limit])
+        rows = cursor.fetchall()
+        metadata = self.metadata.document_metadata(row[0] for row in rows)
+        return [{
+            'doc_id': row[0],
+            'doc_name': row[1],
+            'file_path': row[2],
+            'sentence_count': row[3],
+            'token_count': row[4],
+            'metadata': metadata.get(row[0], {}),
+        } for row in rows]
+    
+    @traced
+    def facet_frequency(self,
+                        word: str,
+                        key: str,
+                        word_type: str = 'norm',
+                        limit: int = -1,
+                        subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Frequency of a word per value of a metadata key
+        
+        Each entry has the word's frequency in the documents with that value,
+        their document and token counts (from the stored facet counts) and the
+        frequency per million of their tokens; values where the word does not
+        occur have frequency 0. Highest relative frequency first.
+        
+        Example: query.facet_frequency('ekonomi', 'genre')
+        """
+        if word_type not in ('form', 'norm', 'lemma'):
+            raise ValueError(f"Invalid word_type: {word_type}")
+        info = self._subcorpus_info(subcorpus)
+        sizes = self._facet_counts(key, None, -1, info)
+        if not sizes:
+            return []
+        
+        subcorpus_sql, subcorpus_params = self._subcorpus_condition(info, 't.token_id')
+        cursor = self.conn.cursor()
+        # Occurrences first (word index), then one metadata lookup each
+        cursor.execute(f"""
+            SELECT m.value, COUNT(*)
+            FROM tokens t
+            CROSS JOIN document_metadata m ON m.doc_id = t.doc_id AND m.key = ?
+            WHERE t.{word_type} = ?{subcorpus_sql}
+            GROUP BY m.value
+        """, [key, word, *subcorpus_params])
+        frequencies = dict(cursor.fetchall())
+        
+        results = []
+        for size in sizes:
+            frequency = frequencies.get(size['value'], 0)
+            results.append({
+                'value': size['value'],
+                'frequency': frequency,
+                'doc_count': size['doc_count'],
+                'token_count': size['token_count'],
+                'per_million': frequency * 1_000_000 / size['token_count'] if size['token_count'] else 0.0,
+            })
+        results.sort(key=lambda r: (-r['per_million'], r['value']))
+        return results if limit < 0 else results[:limit]
+
+    @traced
+    def get_pos_distribution(self, subcorpus: Optional[str] = None):
         """Get distribution of POS tags"""
         cursor = self.conn.cursor()
+        source, condition, params = self._token_source(self._subcorpus_info(subcorpus))
         
-        query = """
+        query = f"""
             SELECT upos, COUNT(*) as count 
-            FROM tokens 
-            WHERE upos IS NOT NULL 
+            FROM {source} 
+            WHERE {condition} AND upos IS NOT NULL 
             GROUP BY upos 
             ORDER BY count DESC
         """
         
-        cursor.execute(query)
+        cursor.execute(query, params)
         return [{'pos': row[0], 'count': row[1]} for row in cursor.fetchall()]
 
-    def get_advanced_stats(self):
-        """Calculate advanced corpus statistics"""
+    @traced
+    def get_advanced_stats(self, subcorpus: Optional[str] = None):
+        """
+        Calculate advanced corpus statistics
+        
+        Types, TTR, lexical diversity (MATTR, MTLD, HD-D, Yule's K) and
+        readability (Ateşman, Çetinkaya-Uzun, Bezirci-Yılmaz) are over words,
+        i.e. tokens without punctuation, and come from the statistics stored
+        per document at ingestion (see analysis.lexical_diversity)
+        """
         cursor = self.conn.cursor()
         stats = {}
+        info = self._subcorpus_info(subcorpus)
+        source, condition, params = self._token_source(info)
         
-        cursor.execute("SELECT COUNT(*) FROM tokens")
-        total_tokens = cursor.fetchone()[0]
+        if info is not None:
+            total_tokens = info['token_count']
+        else:
+            cursor.execute("SELECT COUNT(*) FROM tokens")
+            total_tokens = cursor.fetchone()[0]
         
-        cursor.execute("SELECT COUNT(DISTINCT norm) FROM tokens")
-        unique_types = cursor.fetchone()[0]
+        lexical = LexicalStatsIndex(self.conn).corpus_stats(None if info is None else info['subcorpus_id'])
         
         stats['total_tokens'] = total_tokens
-        stats['unique_types'] = unique_types
-        stats['ttr'] = (unique_types / total_tokens) if total_tokens > 0 else 0
+        stats['word_tokens'] = lexical['word_count']
+        stats['unique_types'] = lexical['type_count']
+        stats['ttr'] = lexical['ttr'] or 0
+        for name in LEXICAL_MEASURES:
+            stats[name] = lexical[name]
         
-        cursor.execute("SELECT COUNT(*) FROM sentences")
-        total_sentences = cursor.fetchone()[0]
+        if info is not None:
+            total_sentences = info['sentence_count']
+        else:
+            cursor.execute("SELECT COUNT(*) FROM sentences")
+            total_sentences = cursor.fetchone()[0]
         stats['total_sentences'] = total_sentences
         stats['avg_sent_len'] = (total_tokens / total_sentences) if total_sentences > 0 else 0
         
-        cursor.execute("SELECT upos, COUNT(*) as cnt FROM tokens GROUP BY upos ORDER BY cnt DESC LIMIT 5")
+        cursor.execute(f"SELECT upos, COUNT(*) as cnt FROM {source} WHERE {condition} "
+                       f"GROUP BY upos ORDER BY cnt DESC LIMIT 5", params)
         stats['top_pos'] = cursor.fetchall()
         
         return stats
 
-    def get_all_tokens_for_export(self):
+    @traced
+    def document_lexical_stats(self, doc_ids: Optional[List[int]] = None,
+                               subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Lexical diversity and readability of each document, as stored at
+        ingestion (see get_advanced_stats)
+        
+        Args:
+            doc_ids: Only these documents (default: all)
+        """
+        info = self._subcorpus_info(subcorpus)
+        return LexicalStatsIndex(self.conn).documents(doc_ids, None if info is None else info['subcorpus_id'])
+
+    @traced
+    def get_all_tokens_for_export(self, subcorpus: Optional[str] = None):
         """Yields all tokens for CoNLL-U export"""
         cursor = self.conn.cursor()
+        subcorpus_sql, params = self._subcorpus_condition(self._subcorpus_info(subcorpus), 't.token_id')
         
-        query = """
+        query = f"""
             SELECT 
                 t.sent_id,
                 t.token_number,
@@ -579,28 +1041,46 @@ class CorpusQuery:
             FROM tokens t
             JOIN sentences s ON t.sent_id = s.sent_id
             JOIN documents d ON t.doc_id = d.doc_id
+            WHERE 1{subcorpus_sql}
             ORDER BY t.doc_id, t.sent_id, t.token_number
         """
         
-        cursor.execute(query)
+        cursor.execute(query, params)
         
         current_sent_id = None
         
+        # Fetch in large chunks instead of one row per round trip
         while True:
-            row = cursor.fetchone()
-            if row is None:
+            rows = cursor.fetchmany(10000)
+            if not rows:
                 break
-                
-            sent_id = row[0]
-            is_new_sentence = (sent_id != current_sent_id)
-            current_sent_id = sent_id
             
-            yield row, is_new_sentence
+            for row in rows:
+                sent_id = row[0]
+                is_new_sentence = (sent_id != current_sent_id)
+                current_sent_id = sent_id
+                
+                yield row, is_new_sentence
 
-    def get_processing_stats(self) -> Dict[str, Any]:
+    @traced
+    def get_processing_stats(self, subcorpus: Optional[str] = None) -> Dict[str, Any]:
         """Get basic processing stats"""
         try:
             cursor = self.conn.cursor()
+            info = self._subcorpus_info(subcorpus)
+            if info is not None:
+                source, condition, params = self._token_source(info)
+                cursor.execute(f"SELECT COUNT(DISTINCT norm) FROM {source} WHERE {condition} "
+                               f"AND norm IS NOT NULL", params)
+                return {
+                    'database_stats': {
+                        'total_documents': info['doc_count'],
+                        'total_sentences': info['sentence_count'],
+                        'total_tokens': info['token_count'],
+                        'unique_words': cursor.fetchone()[0] or 0
+                    }
+                }
+            
             cursor.execute("SELECT COUNT(DISTINCT doc_id) FROM tokens")
             total_documents = cursor.fetchone()[0] or 0
             
@@ -626,5 +1106,6 @@ class CorpusQuery:
             return {'error': str(e)}
 
     def close(self):
-        """Close database connection"""
-        self.db.close()
+        """Close database connection (pooled connections stay open for reuse)"""
+        if self.db is not None:
+            self.db.close()
@@ -73,10 +73,13 @@ class CQLParser:
         }
         return mapping.get(attr.lower(), attr)
 
-    def generate_sql(self, parsed_query):
+    def generate_sql(self, parsed_query, extra_condition: str = "", extra_params=()):
         """
         Generates optimized SQL for the first token in the sequence.
         (We use SQL for the first token to filter candidates, then Python for the sequence)
+        
+        extra_condition (starting with ' AND ') and extra_params further
+        restrict the candidates, e.g. to a subcorpus.
         """
         if not parsed_query:
             return None, []
@@ -86,7 +89,7 @@ class CQLParser:
         if not first_token:
             # If first token is wildcard [], we can't optimize much
             # Return a query that selects everything (limit applied later)
-            return "SELECT sent_id, token_number FROM tokens", []
+            return f"SELECT sent_id, token_number FROM tokens WHERE 1{extra_condition}", list(extra_params)
             
         conditions = []
         params = []
@@ -96,6 +99,7 @@ class CQLParser:
             params.append(value)
             
         where_clause = " AND ".join(conditions)
-        sql = f"SELECT sent_id, token_number FROM tokens WHERE {where_clause}"
+        sql = f"SELECT sent_id, token_number FROM tokens WHERE {where_clause}{extra_condition}"
+        params.extend(extra_params)
         
         return sql, params
\ No newline at end of file
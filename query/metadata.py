@@ -0,0 +1,183 @@
+"""
+Document Metadata
+
+Metadata fields extracted at ingestion (see ingestion.metadata) are stored
+as typed key/value rows in document_metadata. Its primary key is
+(key, value, doc_id), so the documents with a given value are one index
+range, and numeric values have a (key, value_num) index for ranges. The
+metadata_facets table holds the number of documents and tokens per value;
+triggers keep it current as documents are added, replaced or deleted, so
+facet counts are read rather than computed.
+
+Metadata keys can be used like document columns in subcorpus definitions
+and document filters:
+
+    query.define_subcorpus('roman_2000', {'genre': 'roman', 'year': {'min': 2000, 'max': 2009}})
+    query.facet_counts('author', filters={'genre': 'roman'})
+
+A plain value matches exactly (numbers numerically), a string with * ? or [
+is a GLOB pattern, a list matches any of its values and a dict combines
+'min', 'max', 'like', 'glob', 'in' and 'not'. None selects documents
+without the key. A document with several values of a key (e.g. tags)
+matches if any of them does.
+"""
+
+import logging
+from collections import defaultdict
+from typing import List, Dict, Any, Tuple, Iterable
+
+from database.schema import METADATA_TABLES_SQL
+
+logger = logging.getLogger(__name__)
+
+# Operators of dict conditions on the text value (min/max compare numbers
+# numerically and anything else as text, e.g. ISO dates)
+TEXT_OPERATORS = {'like': 'LIKE', 'glob': 'GLOB'}
+RANGE_OPERATORS = {'min': '>=', 'max': '<='}
+
+# Document ids looked up per statement
+ID_BATCH_SIZE = 500
+
+
+def _is_number(value: Any) -> bool:
+    return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+
+def _text(value: Any) -> str:
+    """Stored text of a condition value (see ingestion.metadata.typed_value)"""
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    return str(value)
+
+
+class MetadataIndex:
+    """Document metadata and facet counts of one database"""
+
+    def __init__(self, connection):
+        self.conn = connection
+
+    def ensure_tables(self) -> None:
+        """Create the metadata tables of databases made before they existed"""
+        cursor = self.conn.cursor()
+        for sql in METADATA_TABLES_SQL:
+            cursor.execute(sql)
+
+    def has_tables(self) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'metadata_facets'")
+        return cursor.fetchone() is not None
+
+    # --- Facets ----------------------------------------------------------------
+
+    def keys(self) -> Dict[str, int]:
+        """Metadata keys with their number of distinct values"""
+        if not self.has_tables():
+            return {}
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT key, COUNT(*) FROM metadata_facets GROUP BY key ORDER BY key")
+        return {row[0]: row[1] for row in cursor.fetchall()}
+
+    def values(self, key: str) -> List[str]:
+        """Distinct values of a key"""
+        if not self.has_tables():
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT value FROM metadata_facets WHERE key = ? ORDER BY value", (key,))
+        return [row[0] for row in cursor.fetchall()]
+
+    def facets(self, key: str, limit: int = -1) -> List[Dict[str, Any]]:
+        """Stored document and token counts per value of a key, most documents first"""
+        if not self.has_tables():
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT value, doc_count, token_count FROM metadata_facets
+            WHERE key = ? ORDER BY doc_count DESC, value LIMIT ?
+        """, (key, limit))
+        return [{'value': row[0], 'doc_count': row[1], 'token_count': row[2]}
+                for row in cursor.fetchall()]
+
+    def document_metadata(self, doc_ids: Iterable[int]) -> Dict[int, Dict[str, List[str]]]:
+        """Metadata of documents: doc_id -> key -> values"""
+        doc_ids = list(doc_ids)
+        metadata: Dict[int, Dict[str, List[str]]] = defaultdict(dict)
+        if not doc_ids or not self.has_tables():
+            return metadata
+        cursor = self.conn.cursor()
+        for start in range(0, len(doc_ids), ID_BATCH_SIZE):
+            batch = doc_ids[start:start + ID_BATCH_SIZE]
+            cursor.execute(f"""
+                SELECT doc_id, key, value FROM document_metadata
+                WHERE doc_id IN ({','.join('?' * len(batch))})
+                ORDER BY doc_id, key, value
+            """, batch)
+            for doc_id, key, value in cursor.fetchall():
+                metadata[doc_id].setdefault(key, []).append(value)
+        return metadata
+
+    # --- Conditions ------------------------------------------------------------
+
+    def compile_condition(self, key: str, condition: Any, doc_column: str = 'd.doc_id') -> Tuple[str, list]:
+        """
+        SQL condition on a document id column: the document's `key` metadata
+        matches `condition` (see module docstring)
+
+        Raises:
+            ValueError: unknown operator
+        """
+        if condition is None:
+            return (f"{doc_column} NOT IN (SELECT doc_id FROM document_metadata WHERE key = ?)", [key])
+
+        parts = []
+        params: list = []
+        if isinstance(condition, dict):
+            positive = {op: value for op, value in condition.items() if op != 'not'}
+            if 'not' in condition:
+                sql, values = self.compile_condition(key, condition['not'], doc_column)
+                parts.append(f"NOT ({sql})")
+                params.extend(values)
+            if not positive and parts:
+                return parts[0], params
+            condition = positive
+
+        row_sql, row_params = self._row_condition(condition)
+        parts.insert(0, f"""{doc_column} IN (
+                SELECT m.doc_id FROM document_metadata m WHERE m.key = ? AND {row_sql})""")
+        return " AND ".join(parts), [key, *row_params, *params]
+
+    def _row_condition(self, condition: Any) -> Tuple[str, list]:
+        """Condition on one document_metadata row (alias m)"""
+        if isinstance(condition, (list, tuple)):
+            numbers = [value for value in condition if _is_number(value)]
+            texts = [_text(value) for value in condition if not _is_number(value)]
+            parts = []
+            if texts:
+                parts.append(f"m.value IN ({','.join('?' * len(texts))})")
+            if numbers:
+                parts.append(f"m.value_num IN ({','.join('?' * len(numbers))})")
+            if not parts:
+                return "0", []
+            return f"({' OR '.join(parts)})", texts + numbers
+        if isinstance(condition, dict):
+            parts = []
+            params: list = []
+            for operator, value in condition.items():
+                if operator in RANGE_OPERATORS:
+                    column = 'm.value_num' if _is_number(value) else 'm.value'
+                    parts.append(f"{column} {RANGE_OPERATORS[operator]} ?")
+                    params.append(value if _is_number(value) else _text(value))
+                elif operator in TEXT_OPERATORS:
+                    parts.append(f"m.value {TEXT_OPERATORS[operator]} ?")
+                    params.append(_text(value))
+                elif operator == 'in':
+                    sql, values = self._row_condition(list(value))
+                    parts.append(sql)
+                    params.extend(values)
+                else:
+                    raise ValueError(f"Unknown metadata condition operator: {operator}")
+            return " AND ".join(parts) or "1", params
+        if _is_number(condition):
+            return "m.value_num = ?", [condition]
+        if isinstance(condition, str) and any(c in condition for c in '*?['):
+            return "m.value GLOB ?", [condition]
+        return "m.value = ?", [_text(condition)]
@@ -0,0 +1,520 @@
+"""
+Corpus Query HTTP Service
+
+A small asyncio-based HTTP/JSON server that exposes CorpusQuery to remote
+clients (e.g. analysts working from notebooks):
+- KWIC, frequency, collocation, CQL and word sketch endpoints
+- Blocking SQLite work runs on a bounded thread pool (pooled read-only connections)
+- Identical concurrent requests are coalesced into a single query
+- Results can be sent as NDJSON (chunked transfer encoding); the frequency
+  list is streamed from the database as it is fetched, other endpoints send
+  their complete result in chunks
+- Per-request timing headers (Server-Timing, X-Query-Time-Ms, ...)
+- Optional query tracing (--trace): per-method SQL statements, latency
+  histograms and full-scan / N+1 flags at /trace
+
+Usage:
+    python -m query.query_server corpus.db --port 8765
+
+    curl "http://127.0.0.1:8765/kwic?term=ev&window_size=5"
+    curl "http://127.0.0.1:8765/frequency?limit=50000&format=ndjson"
+"""
+
+import asyncio
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from http import HTTPStatus
+from typing import Dict, Any, List, Optional, Tuple, AsyncIterator
+from urllib.parse import urlsplit, parse_qsl
+import logging
+
+from database.connection_pool import get_connection_pool
+from query.corpus_query import CorpusQuery
+from query.tracing import QueryTracer
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MAX_HEADER_BYTES = 64 * 1024
+MAX_BODY_BYTES = 1024 * 1024
+NDJSON_CHUNK_ROWS = 500
+# Encoded NDJSON chunks a streaming query may produce ahead of the client
+STREAM_QUEUE_CHUNKS = 4
+
+# endpoint -> (CorpusQuery method, {param: type}, required params)
+ENDPOINTS = {
+    'kwic': ('kwic_concordance',
+             {'search_term': str, 'search_type': str, 'case_sensitive': bool,
+              'window_size': int, 'limit': int, 'pos_filter': str},
+             ('search_term',)),
+    'frequency': ('frequency_list',
+                  {'word_type': str, 'pos_filter': str, 'min_freq': int, 'limit': int},
+                  ()),
+    'collocation': ('collocation_analysis',
+                    {'target_word': str, 'word_type': str, 'window_size': int,
+                     'min_freq': int, 'colloc_min_freq': int, 'measure': str, 'limit': int},
+                    ('target_word',)),
+    'cql': ('cql_search',
+            {'query_string': str, 'limit': int},
+            ('query_string',)),
+    'word_sketch': ('word_sketch',
+                    {'lemma': str, 'relation_type': str, 'limit': int},
+                    ('lemma',)),
+    'stats': ('get_processing_stats', {}, ()),
+}
+
+# endpoint -> CorpusQuery generator method whose rows are streamed as NDJSON
+# while they are fetched (instead of materializing the result first)
+STREAMING_METHODS = {
+    'frequency': 'iter_frequency_list',
+}
+
+# Short aliases accepted in query strings
+PARAM_ALIASES = {
+    'term': 'search_term',
+    'q': 'query_string',
+    'word': 'target_word',
+    'pos': 'pos_filter',
+    'window': 'window_size',
+}
+
+
+class RequestError(Exception):
+    """Raised for client errors (HTTP 4xx)"""
+
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class StreamAborted(Exception):
+    """Raised when a streamed query fails after the response has started"""
+
+
+class CorpusQueryServer:
+    """Asyncio HTTP server exposing CorpusQuery methods as JSON endpoints"""
+
+    def __init__(self, db_path: str = "corpus.db", host: str = "127.0.0.1",
+                 port: int = 8765, max_workers: int = 4,
+                 request_timeout: float = 300.0, tracer: Optional[QueryTracer] = None):
+        """
+        Initialize the query server
+
+        Args:
+            db_path: Path to SQLite database
+            host: Interface to bind (defaults to localhost only)
+            port: TCP port (0 picks a free port)
+            max_workers: Size of the thread pool running SQLite queries
+            request_timeout: Seconds before a running query is reported as timed out
+            tracer: Trace every query in this QueryTracer (summary at /trace)
+        """
+        self.db_path = db_path
+        self.host = host
+        self.port = port
+        self.max_workers = max_workers
+        self.request_timeout = request_timeout
+        self.tracer = tracer
+
+        self.pool = get_connection_pool(db_path)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="corpus-query")
+        self._inflight: Dict[Tuple, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+        self.stats = {
+            'requests': 0,
+            'queries_executed': 0,
+            'coalesced': 0,
+            'errors': 0
+        }
+
+    # ------------------------------------------------------------------
+    # Query execution
+    # ------------------------------------------------------------------
+
+    def _run_query(self, method_name: str, kwargs: Dict[str, Any]) -> Tuple[Any, float]:
+        """Run a CorpusQuery method on a worker thread; returns (result, seconds)"""
+        start = time.perf_counter()
+        query = CorpusQuery(self.db_path, pool=self.pool, tracer=self.tracer)
+        try:
+            result = getattr(query, method_name)(**kwargs)
+        finally:
+            query.close()
+        return result, time.perf_counter() - start
+
+    def _produce_chunks(self, method_name: str, kwargs: Dict[str, Any], chunks: asyncio.Queue,
+                        loop: asyncio.AbstractEventLoop, cancelled: threading.Event):
+        """
+        Consume a generator method on a worker thread and queue its rows as
+        encoded NDJSON chunks, then None (or the exception that stopped it)
+        """
+        def put(item) -> bool:
+            # Blocks while the queue is full (the client is slower), until the
+            # request is cancelled
+            future = asyncio.run_coroutine_threadsafe(chunks.put(item), loop)
+            while not cancelled.is_set():
+                try:
+                    future.result(timeout=0.1)
+                    return True
+                except FutureTimeoutError:
+                    pass
+            future.cancel()
+            return False
+
+        query = CorpusQuery(self.db_path, pool=self.pool, tracer=self.tracer)
+        try:
+            lines = []
+            for row in getattr(query, method_name)(**kwargs):
+                lines.append(json.dumps(row, ensure_ascii=False, default=str) + "\n")
+                if len(lines) >= NDJSON_CHUNK_ROWS:
+                    if not put("".join(lines).encode('utf-8')):
+                        return
+                    lines = []
+            if lines and not put("".join(lines).encode('utf-8')):
+                return
+            put(None)
+        except Exception as e:
+            put(e)
+        finally:
+            query.close()
+
+    def _forget_inflight(self, key: Tuple, future: asyncio.Future):
+        """Drop a finished query from the coalescing table"""
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    async def execute(self, endpoint: str, kwargs: Dict[str, Any]) -> Tuple[Any, float, bool]:
+        """
+        Execute an endpoint query, coalescing identical concurrent requests
+
+        Returns:
+            (result, query seconds, whether this request joined an in-flight query)
+        """
+        method_name = ENDPOINTS[endpoint][0]
+        key = (endpoint, tuple(sorted(kwargs.items())))
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats['coalesced'] += 1
+            result, elapsed = await asyncio.wait_for(asyncio.shield(future),
+                                                     timeout=self.request_timeout)
+            return result, elapsed, True
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, self._run_query, method_name, kwargs)
+        self._inflight[key] = future
+        future.add_done_callback(lambda f: self._forget_inflight(key, f))
+        self.stats['queries_executed'] += 1
+
+        # shield() keeps the shared query alive if this particular client times out
+        result, elapsed = await asyncio.wait_for(asyncio.shield(future),
+                                                 timeout=self.request_timeout)
+        return result, elapsed, False
+
+    # ------------------------------------------------------------------
+    # HTTP handling
+    # ------------------------------------------------------------------
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, Dict[str, str], bytes]:
+        """Read one HTTP request; returns (method, target, headers, body)"""
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.LimitOverrunError:
+            raise RequestError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, "Headers too large")
+
+        lines = head.decode('latin-1').split("\r\n")
+        try:
+            method, target, _version = lines[0].split(" ", 2)
+        except ValueError:
+            raise RequestError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        for line in lines[1:]:
+            if ':' in line:
+                name, value = line.split(':', 1)
+                headers[name.strip().lower()] = value.strip()
+
+        body = b""
+        length = int(headers.get('content-length', 0) or 0)
+        if length > MAX_BODY_BYTES:
+            raise RequestError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "Body too large")
+        if length:
+            body = await reader.readexactly(length)
+        return method.upper(), target, headers, body
+
+    def _parse_params(self, endpoint: str, target: str, body: bytes) -> Dict[str, Any]:
+        """Merge query string and JSON body parameters and coerce their types"""
+        _method, param_types, required = ENDPOINTS[endpoint]
+
+        raw: Dict[str, Any] = dict(parse_qsl(urlsplit(target).query))
+        if body:
+            try:
+                payload = json.loads(body.decode('utf-8'))
+            except (UnicodeDecodeError, json.JSONDecodeError) as e:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid JSON body: {e}")
+            if not isinstance(payload, dict):
+                raise RequestError(HTTPStatus.BAD_REQUEST, "JSON body must be an object")
+            raw.update(payload)
+
+        raw.pop('format', None)
+        kwargs = {}
+        for name, value in raw.items():
+            name = PARAM_ALIASES.get(name, name)
+            if name not in param_types:
+                raise RequestError(HTTPStatus.BAD_REQUEST, f"Unknown parameter: {name}")
+            kwargs[name] = self._coerce(name, value, param_types[name])
+
+        missing = [name for name in required if not kwargs.get(name)]
+        if missing:
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Missing parameter(s): {', '.join(missing)}")
+        return kwargs
+
+    @staticmethod
+    def _coerce(name: str, value: Any, expected: type) -> Any:
+        """Convert a query-string value to the parameter's type"""
+        if expected is bool:
+            if isinstance(value, bool):
+                return value
+            return str(value).lower() in ('1', 'true', 'yes', 'on')
+        try:
+            return expected(value)
+        except (TypeError, ValueError):
+            raise RequestError(HTTPStatus.BAD_REQUEST, f"Invalid value for {name}: {value!r}")
+
+    @staticmethod
+    def _result_rows(endpoint: str, result: Any) -> List[Dict[str, Any]]:
+        """Flatten a result into rows for NDJSON"""
+        if endpoint == 'word_sketch':
+            return [dict(item, relation=relation)
+                    for relation, items in result.items() for item in items]
+        if isinstance(result, dict):
+            return [result]
+        return list(result)
+
+    def _timing_headers(self, received: float, query_s: float, coalesced: bool) -> Dict[str, str]:
+        """Build per-request timing headers"""
+        total_ms = (time.perf_counter() - received) * 1000
+        query_ms = query_s * 1000
+        wait_ms = max(total_ms - query_ms, 0.0)
+        return {
+            'Server-Timing': f"query;dur={query_ms:.2f}, wait;dur={wait_ms:.2f}, total;dur={total_ms:.2f}",
+            'X-Query-Time-Ms': f"{query_ms:.2f}",
+            'X-Total-Time-Ms': f"{total_ms:.2f}",
+            'X-Coalesced': 'true' if coalesced else 'false',
+        }
+
+    async def _write_head(self, writer: asyncio.StreamWriter, status: HTTPStatus,
+                          headers: Dict[str, str]):
+        """Write status line and headers"""
+        lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+        lines.extend(f"{name}: {value}" for name, value in headers.items())
+        lines.append("Connection: close")
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode('latin-1'))
+
+    async def _send_json(self, writer: asyncio.StreamWriter, status: HTTPStatus,
+                         payload: Any, headers: Optional[Dict[str, str]] = None):
+        """Send a complete JSON response"""
+        body = json.dumps(payload, ensure_ascii=False, default=str).encode('utf-8')
+        all_headers = {'Content-Type': 'application/json; charset=utf-8',
+                       'Content-Length': str(len(body))}
+        all_headers.update(headers or {})
+        await self._write_head(writer, status, all_headers)
+        writer.write(body)
+        await writer.drain()
+
+    @staticmethod
+    async def _encoded_chunks(rows: List[Dict[str, Any]]) -> AsyncIterator[bytes]:
+        """NDJSON chunks of a materialized result"""
+        for start in range(0, len(rows), NDJSON_CHUNK_ROWS):
+            yield "".join(
+                json.dumps(row, ensure_ascii=False, default=str) + "\n"
+                for row in rows[start:start + NDJSON_CHUNK_ROWS]
+            ).encode('utf-8')
+
+    async def _queued_chunks(self, first: Optional[bytes], chunks: asyncio.Queue) -> AsyncIterator[bytes]:
+        """NDJSON chunks of a streaming query, as its worker thread produces them"""
+        chunk = first
+        while chunk is not None:
+            if isinstance(chunk, Exception):
+                logger.error(f"Streamed query failed: {chunk}")
+                raise StreamAborted(str(chunk))
+            yield chunk
+            chunk = await chunks.get()
+
+    async def _send_ndjson(self, writer: asyncio.StreamWriter, chunks: AsyncIterator[bytes],
+                           headers: Dict[str, str]):
+        """Send NDJSON chunks using chunked transfer encoding"""
+        all_headers = {'Content-Type': 'application/x-ndjson; charset=utf-8',
+                       'Transfer-Encoding': 'chunked'}
+        all_headers.update(headers)
+        await self._write_head(writer, HTTPStatus.OK, all_headers)
+
+        async for chunk in chunks:
+            writer.write(f"{len(chunk):x}\r\n".encode('ascii') + chunk + b"\r\n")
+            # Backpressure: wait for the client to consume before the next chunk
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _stream_ndjson(self, writer: asyncio.StreamWriter, endpoint: str,
+                             kwargs: Dict[str, Any], received: float):
+        """
+        Run an endpoint's generator method on a worker thread and send its
+        rows while they are fetched; only a bounded number of chunks is held
+        in memory. Streamed queries are not coalesced.
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_CHUNKS)
+        cancelled = threading.Event()
+        start = time.perf_counter()
+        loop.run_in_executor(self.executor, self._produce_chunks, STREAMING_METHODS[endpoint],
+                             kwargs, chunks, loop, cancelled)
+        self.stats['queries_executed'] += 1
+        try:
+            # Errors before the first rows (e.g. invalid arguments) still get
+            # a proper error response
+            first = await asyncio.wait_for(chunks.get(), timeout=self.request_timeout)
+            if isinstance(first, Exception):
+                raise first
+            headers = self._timing_headers(received, time.perf_counter() - start, False)
+            await self._send_ndjson(writer, self._queued_chunks(first, chunks), headers)
+        finally:
+            # Stops the producer if the client went away or the query failed
+            cancelled.set()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """Handle a single HTTP request"""
+        received = time.perf_counter()
+        self.stats['requests'] += 1
+        try:
+            method, target, headers, body = await self._read_request(reader)
+            if method not in ('GET', 'POST'):
+                raise RequestError(HTTPStatus.METHOD_NOT_ALLOWED, f"Method not allowed: {method}")
+
+            endpoint = urlsplit(target).path.strip('/')
+            if endpoint == 'health':
+                await self._send_json(writer, HTTPStatus.OK, {'status': 'ok', 'stats': self.stats})
+                return
+            if endpoint == 'trace':
+                if self.tracer is None:
+                    raise RequestError(HTTPStatus.NOT_FOUND, "Tracing is not enabled (start with --trace)")
+                await self._send_json(writer, HTTPStatus.OK, {'summary': self.tracer.summary(),
+                                                              'recent_calls': self.tracer.recent_calls()})
+                return
+            if endpoint not in ENDPOINTS:
+                raise RequestError(HTTPStatus.NOT_FOUND, f"Unknown endpoint: /{endpoint}")
+
+            query_params = dict(parse_qsl(urlsplit(target).query))
+            wants_ndjson = (query_params.get('format') == 'ndjson'
+                            or 'application/x-ndjson' in headers.get('accept', ''))
+
+            kwargs = self._parse_params(endpoint, target, body)
+            if wants_ndjson and endpoint in STREAMING_METHODS:
+                await self._stream_ndjson(writer, endpoint, kwargs, received)
+                return
+
+            result, query_s, coalesced = await self.execute(endpoint, kwargs)
+            timing = self._timing_headers(received, query_s, coalesced)
+
+            if wants_ndjson:
+                rows = self._result_rows(endpoint, result)
+                timing['X-Result-Count'] = str(len(rows))
+                await self._send_ndjson(writer, self._encoded_chunks(rows), timing)
+            else:
+                await self._send_json(writer, HTTPStatus.OK, {'endpoint': endpoint, 'results': result},
+                                      timing)
+
+        except RequestError as e:
+            self.stats['errors'] += 1
+            await self._send_json(writer, e.status, {'error': str(e)})
+        except asyncio.TimeoutError:
+            self.stats['errors'] += 1
+            await self._send_json(writer, HTTPStatus.GATEWAY_TIMEOUT, {'error': 'Query timed out'})
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except StreamAborted:
+            # The response has started: closing without the final chunk tells
+            # the client it is incomplete
+            self.stats['errors'] += 1
+        except ValueError as e:
+            # CorpusQuery raises ValueError for invalid search/word types
+            self.stats['errors'] += 1
+            await self._send_json(writer, HTTPStatus.BAD_REQUEST, {'error': str(e)})
+        except Exception as e:
+            self.stats['errors'] += 1
+            logger.error(f"Error handling request: {e}")
+            await self._send_json(writer, HTTPStatus.INTERNAL_SERVER_ERROR, {'error': str(e)})
+        finally:
+            try:
+                writer.close()
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+
+    async def start(self):
+        """Start listening"""
+        self._server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                                  limit=MAX_HEADER_BYTES)
+        self.port = self._server.sockets[0].getsockname()[1]
+        logger.info(f"Corpus query server listening on http://{self.host}:{self.port}")
+
+    async def serve_forever(self):
+        """Start and serve until cancelled"""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def stop(self):
+        """Stop the server and release worker threads"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        self.executor.shutdown(wait=True)
+
+
+def run_server(db_path: str = "corpus.db", host: str = "127.0.0.1",
+               port: int = 8765, max_workers: int = 4, tracer: Optional[QueryTracer] = None):
+    """
+    Convenience function to run the query server until interrupted
+
+    Args:
+        db_path: Database path
+        host: Interface to bind
+        port: TCP port
+        max_workers: Query thread pool size
+        tracer: Optional query tracer (summary at /trace)
+    """
+    server = CorpusQueryServer(db_path, host, port, max_workers, tracer=tracer)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        logger.info("Server stopped")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Corpus query HTTP service")
+    parser.add_argument("db_path", nargs="?", default="corpus.db")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--trace", action="store_true", help="Trace queries (summary at /trace)")
+    parser.add_argument("--explain", action="store_true", help="Capture EXPLAIN QUERY PLAN when tracing")
+    parser.add_argument("--trace-log", help="Append one JSON line per traced query to this file")
+    parser.add_argument("--slow-ms", type=float, help="Log traced queries slower than this")
+    args = parser.parse_args()
+
+    tracer = None
+    if args.trace or args.explain or args.trace_log:
+        tracer = QueryTracer(explain=args.explain, log_path=args.trace_log, slow_ms=args.slow_ms)
+    run_server(args.db_path, args.host, args.port, args.workers, tracer=tracer)
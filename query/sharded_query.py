@@ -0,0 +1,659 @@
+"""
+Sharded Corpus Query
+
+ShardedCorpusQuery has the API of CorpusQuery but runs every query on all
+shards of a sharded corpus (see database.sharding) in parallel worker
+processes and merges the results:
+- KWIC and CQL hits are merged in doc_id order (shards hold disjoint doc_id
+  ranges, so this is the order a single database returns)
+- frequency lists, POS distributions and word sketches sum the shards'
+  counts before min_freq, sorting and limits are applied
+- collocations sum the contingency counts (target, collocate and
+  co-occurrence frequencies, corpus size) before scoring
+- type counts are taken over the union of the shards' vocabularies, and
+  lexical diversity and readability from the shards' summed totals and
+  word frequencies
+- dispersion measures combine the shards' per-document sums and the
+  positions of every word's first and last occurrence in each shard (see
+  analysis.dispersion); they are computed on the first lookup and kept in
+  memory until the shards change
+
+Subcorpora are defined on every shard with the same definition; their sizes
+are the sums of the shards' sizes. Definitions and document filters may use
+metadata keys that only some shards have; a key none of them has is an error.
+Facet counts and per-facet frequencies are summed over the shards.
+
+A sharded query has no connection of its own, so it cannot be traced and has
+no `subcorpora` or `metadata` accessor; use the methods above instead. With
+QUERY_TRACING in the config, each shard's CorpusQuery traces its own calls.
+
+The results are the same as those of one database holding all documents.
+
+Worker processes are spawned, so scripts that use them need the usual
+`if __name__ == "__main__":` guard.
+"""
+
+import os
+import time
+import heapq
+import sqlite3
+import logging
+import multiprocessing
+from collections import Counter
+from datetime import datetime, timezone
+from itertools import islice
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Optional, Union
+
+import numpy as np
+
+from database.sharding import ShardedCorpus
+from query.corpus_query import CorpusQuery
+from query.tracing import QueryTracer
+from query.subcorpus import corpus_state
+from analysis.dispersion import (DispersionAnalyzer, partial_measures, combine_measures, measure_entries,
+                                 rank_entries, check_measure)
+from analysis.lexical_diversity import (LexicalStatsIndex, TOTAL_COLUMNS, MEASURES as LEXICAL_MEASURES,
+                                        lexical_measures, frequency_spectrum)
+
+logger = logging.getLogger(__name__)
+
+# --- Shard workers ------------------------------------------------------------
+# Module-level so that spawned worker processes can import them
+
+# Open CorpusQuery per shard in this process
+_shard_queries: Dict[str, CorpusQuery] = {}
+
+
+def _shard_query(db_path: str) -> CorpusQuery:
+    query = _shard_queries.get(db_path)
+    if query is None:
+        query = _shard_queries[db_path] = CorpusQuery(db_path)
+    return query
+
+
+def _shard_call(db_path: str, method: str, args: tuple, kwargs: Dict[str, Any]) -> Any:
+    """Run a CorpusQuery method on one shard"""
+    return getattr(_shard_query(db_path), method)(*args, **kwargs)
+
+
+def _shard_fetch(db_path: str, sql: str, subcorpus: Optional[str] = None) -> List[tuple]:
+    """
+    Run a read-only statement on one shard
+
+    `{source}` and `{condition}` in the statement are replaced by the FROM
+    clause (tokens as t) and WHERE condition of the shard's subcorpus.
+    """
+    query = _shard_query(db_path)
+    source, condition, params = query._token_source(query._subcorpus_info(subcorpus))
+    cursor = query.conn.cursor()
+    cursor.execute(sql.format(source=source, condition=condition), params)
+    return [tuple(row) for row in cursor.fetchall()]
+
+
+def _shard_definition_keys(db_path: str) -> List[str]:
+    """Document columns and metadata keys usable in definitions on one shard"""
+    query = _shard_query(db_path)
+    return query.subcorpora._document_columns() + list(query.metadata_keys())
+
+
+def _shard_define_subcorpus(db_path: str, name: str, definition: Dict[str, Any]) -> Dict[str, Any]:
+    """Define a subcorpus on one shard (metadata keys may be missing there)"""
+    return _shard_query(db_path).subcorpora.define(name, definition, strict=False)
+
+
+def _shard_facet_counts(db_path: str, key: str, filters: Optional[Dict[str, Any]],
+                        subcorpus: Optional[str]) -> List[Dict[str, Any]]:
+    query = _shard_query(db_path)
+    return query._facet_counts(key, filters, -1, query._subcorpus_info(subcorpus), strict=False)
+
+
+def _shard_filter_documents(db_path: str, filters: Dict[str, Any], limit: int,
+                            subcorpus: Optional[str]) -> List[Dict[str, Any]]:
+    query = _shard_query(db_path)
+    return query._filter_documents(filters, limit, query._subcorpus_info(subcorpus), strict=False)
+
+
+def _shard_lexical_stats(db_path: str, subcorpus: Optional[str]) -> tuple:
+    """Lexical statistics totals and word frequencies of one shard"""
+    query = _shard_query(db_path)
+    info = query._subcorpus_info(subcorpus)
+    return LexicalStatsIndex(query.conn).combinable_stats(None if info is None else info['subcorpus_id'])
+
+
+def _shard_corpus_state(db_path: str) -> str:
+    """Changes whenever documents of one shard change"""
+    return corpus_state(_shard_query(db_path).conn)
+
+
+def _shard_word_frequencies(db_path: str, word_type: str) -> tuple:
+    """Word frequencies and word token count of one shard"""
+    return DispersionAnalyzer(_shard_query(db_path).conn).word_frequencies(word_type)
+
+
+def _shard_dispersion(db_path: str, word_type: str, words: List[str], frequency: np.ndarray,
+                      total: int) -> tuple:
+    """
+    partial_measures of one shard over the corpus vocabulary, for the words
+    the shard has
+
+    Returns:
+        (partial measures, type ids they are for)
+    """
+    vocabulary = {word: i for i, word in enumerate(words)}
+    _, type_ids, doc_ids = DispersionAnalyzer(_shard_query(db_path).conn).word_tokens(word_type, vocabulary)
+    # Words added since the corpus frequencies were counted have none
+    type_ids = np.where(type_ids < len(words), type_ids, -1)
+    partial = partial_measures(type_ids, doc_ids, frequency, total)
+    present = np.flatnonzero(partial['first'] >= 0)
+    return {name: value[present] if isinstance(value, np.ndarray) else value
+            for name, value in partial.items()}, present
+
+
+def _expand_partial(partial: Dict[str, Any], present: np.ndarray, n_types: int) -> Dict[str, Any]:
+    """A _shard_dispersion result as arrays over the whole vocabulary"""
+    expanded = {}
+    for name, value in partial.items():
+        if isinstance(value, np.ndarray):
+            expanded[name] = np.full(n_types, -1 if name in ('first', 'last') else 0, dtype=value.dtype)
+            expanded[name][present] = value
+        else:
+            expanded[name] = value
+    return expanded
+
+
+def _limited(items: List[Any], limit: int) -> List[Any]:
+    """First `limit` items; a negative limit means no limit, as in SQLite"""
+    return items if limit < 0 else items[:limit]
+
+
+def _close_shard_queries() -> None:
+    for query in _shard_queries.values():
+        query.close()
+    _shard_queries.clear()
+
+
+_NOT_TRACEABLE = ("Sharded queries cannot be traced (the shards are queried in worker processes); "
+                  "trace a CorpusQuery on a single shard")
+
+
+class ShardedCorpusQuery(CorpusQuery):
+    """CorpusQuery over all shards of a sharded corpus"""
+
+    def __init__(self, corpus: Union[str, ShardedCorpus], workers: Optional[int] = None,
+                 tracer: Optional[QueryTracer] = None):
+        """
+        Initialize the sharded query interface
+
+        Args:
+            corpus: Sharded corpus or its directory / shards.json
+            workers: Worker processes querying the shards (None: one per CPU,
+                     at most one per shard; 0: query the shards one after the
+                     other in this process)
+            tracer: Not supported; a tracer raises TypeError (sharded queries
+                    cannot be traced)
+        """
+        if tracer is not None:
+            raise TypeError(_NOT_TRACEABLE)
+        self.corpus = corpus if isinstance(corpus, ShardedCorpus) else ShardedCorpus(corpus)
+        self.shard_paths = [str(path) for path in self.corpus.shard_paths]
+        self.db_path = str(self.corpus.manifest_path)
+        self.pool = None
+        self.db = None
+        self.conn = None
+        self.tracer = None
+        if workers is None:
+            workers = min(len(self.shard_paths), os.cpu_count() or 1)
+        self.workers = workers
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Dispersion measures per word type: (shard states, run record, {word: measures})
+        self._dispersion: Dict[str, tuple] = {}
+
+    def enable_tracing(self, *args, **kwargs):
+        """Sharded queries cannot be traced; raises TypeError"""
+        raise TypeError(_NOT_TRACEABLE)
+
+    @property
+    def subcorpora(self):
+        """Not available: subcorpora are defined per shard; raises TypeError"""
+        raise TypeError("ShardedCorpusQuery has no subcorpus manager; use define_subcorpus, "
+                        "drop_subcorpus, list_subcorpora and subcorpus_size")
+
+    @property
+    def metadata(self):
+        """Not available: metadata is indexed per shard; raises TypeError"""
+        raise TypeError("ShardedCorpusQuery has no metadata index; use metadata_keys, "
+                        "facet_counts, filter_documents and facet_frequency")
+
+    # --- Fan-out --------------------------------------------------------------
+
+    def _map(self, function, *args) -> List[Any]:
+        """function(shard_path, *args) for every shard, results in shard order"""
+        if self.workers == 0:
+            return [function(path, *args) for path in self.shard_paths]
+        if self._executor is None:
+            # spawn: worker processes open their own SQLite connections
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context('spawn'))
+        futures = [self._executor.submit(function, path, *args) for path in self.shard_paths]
+        return [future.result() for future in futures]
+
+    def _fan_out(self, method: str, *args, **kwargs) -> List[Any]:
+        """Call a CorpusQuery method on every shard"""
+        return self._map(_shard_call, method, args, kwargs)
+
+    def _fetch(self, sql: str, subcorpus: Optional[str] = None) -> List[List[tuple]]:
+        """Run a statement on every shard (see _shard_fetch)"""
+        return self._map(_shard_fetch, sql, subcorpus)
+
+    def _sum(self, sql: str, subcorpus: Optional[str] = None) -> int:
+        """Sum of a COUNT(*) statement over the shards"""
+        return sum(rows[0][0] or 0 for rows in self._fetch(sql, subcorpus))
+
+    def _count_distinct(self, column: str, subcorpus: Optional[str] = None) -> int:
+        """COUNT(DISTINCT column) over all shards together (NULL not counted)"""
+        values = set()
+        for rows in self._fetch(f"SELECT DISTINCT t.{column} FROM {{source}} WHERE {{condition}}", subcorpus):
+            values.update(row[0] for row in rows)
+        values.discard(None)
+        return len(values)
+
+    # --- Subcorpora -----------------------------------------------------------
+
+    @staticmethod
+    def _combine_subcorpora(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """One subcorpus record from the shards' records of it"""
+        combined = dict(records[0])
+        del combined['subcorpus_id']
+        for key in ('doc_count', 'sentence_count', 'token_count', 'word_count', 'range_count'):
+            combined[key] = sum(record[key] for record in records)
+        combined['stale'] = any(record['stale'] for record in records)
+        combined['materialized_at'] = min(record['materialized_at'] for record in records)
+        return combined
+
+    def _check_definition(self, definition: Dict[str, Any]) -> None:
+        """Reject keys that are neither document columns nor metadata keys of any shard"""
+        known = set()
+        for keys in self._map(_shard_definition_keys):
+            known.update(keys)
+        for key in definition:
+            if key not in known:
+                raise ValueError(f"Unknown document attribute in subcorpus definition: {key}")
+
+    def define_subcorpus(self, name: str, definition: Dict[str, Any]) -> Dict[str, Any]:
+        """Define and materialize a subcorpus on every shard"""
+        self._check_definition(definition)
+        return self._combine_subcorpora(self._map(_shard_define_subcorpus, name, definition))
+
+    def drop_subcorpus(self, name: str) -> bool:
+        """Delete a subcorpus from every shard; returns whether it existed"""
+        return any(self._fan_out('drop_subcorpus', name))
+
+    def list_subcorpora(self) -> List[Dict[str, Any]]:
+        """All subcorpora with their definitions and sizes"""
+        records: Dict[str, List[Dict[str, Any]]] = {}
+        for shard in self._fan_out('list_subcorpora'):
+            for record in shard:
+                records.setdefault(record['name'], []).append(record)
+        return [self._combine_subcorpora(records[name]) for name in sorted(records)]
+
+    def subcorpus_size(self, name: str) -> Dict[str, int]:
+        """Stored size of a subcorpus, summed over the shards"""
+        sizes = Counter()
+        for shard in self._fan_out('subcorpus_size', name):
+            sizes.update(shard)
+        return dict(sizes)
+
+    # --- Document metadata ----------------------------------------------------
+
+    def metadata_keys(self) -> Dict[str, int]:
+        """Document metadata keys with their number of distinct values"""
+        keys = set()
+        for shard in self._fan_out('metadata_keys'):
+            keys.update(shard)
+        return {key: len(self.facet_counts(key)) for key in sorted(keys)}
+
+    def facet_counts(self,
+                     key: str,
+                     filters: Optional[Dict[str, Any]] = None,
+                     limit: int = -1,
+                     subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Documents and tokens per value of a metadata key, most documents first
+        """
+        if filters:
+            self._check_definition(filters)
+        totals: Dict[str, Counter] = {}
+        for shard in self._map(_shard_facet_counts, key, filters, subcorpus):
+            for row in shard:
+                totals.setdefault(row['value'], Counter()).update(
+                    doc_count=row['doc_count'], token_count=row['token_count'])
+        results = [{'value': value, 'doc_count': total['doc_count'], 'token_count': total['token_count']}
+                   for value, total in totals.items()]
+        results.sort(key=lambda r: (-r['doc_count'], r['value']))
+        return _limited(results, limit)
+
+    def filter_documents(self,
+                         filters: Dict[str, Any],
+                         limit: int = -1,
+                         subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Documents matching metadata and document conditions, with their metadata
+        """
+        self._check_definition(filters)
+        results = []
+        for shard in self._map(_shard_filter_documents, filters, limit, subcorpus):
+            results.extend(shard)
+        return _limited(results, limit)
+
+    def facet_frequency(self,
+                        word: str,
+                        key: str,
+                        word_type: str = 'norm',
+                        limit: int = -1,
+                        subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Frequency of a word per value of a metadata key
+        """
+        totals: Dict[str, Counter] = {}
+        for shard in self._fan_out('facet_frequency', word, key, word_type, -1, subcorpus):
+            for row in shard:
+                totals.setdefault(row['value'], Counter()).update(
+                    {name: row[name] for name in ('frequency', 'doc_count', 'token_count')})
+        results = [{
+            'value': value,
+            'frequency': total['frequency'],
+            'doc_count': total['doc_count'],
+            'token_count': total['token_count'],
+            'per_million': total['frequency'] * 1_000_000 / total['token_count'] if total['token_count'] else 0.0,
+        } for value, total in totals.items()]
+        results.sort(key=lambda r: (-r['per_million'], r['value']))
+        return _limited(results, limit)
+
+    # --- Dispersion -----------------------------------------------------------
+
+    def compute_dispersion(self, word_type: str = 'norm') -> Dict[str, Any]:
+        """
+        Compute the dispersion measures of the whole vocabulary from the shards
+
+        Every shard sums over its documents and the distances between its
+        occurrences of each word (analysis.dispersion.partial_measures) for
+        the corpus-wide word frequencies counted first; with the shards in
+        doc_id order, the sums combine to the measures of one database
+        holding all documents. Each shard holds its tokens' arrays while
+        computing (see DispersionAnalyzer.compute); the results are kept in
+        memory, one entry per word.
+
+        Returns:
+            The run record: documents, tokens and types covered
+        """
+        DispersionAnalyzer._check_word_type(word_type)
+        start = time.perf_counter()
+        states = tuple(self._map(_shard_corpus_state))
+        frequencies = Counter()
+        total = 0
+        for shard_frequencies, shard_total in self._map(_shard_word_frequencies, word_type):
+            frequencies.update(shard_frequencies)
+            total += shard_total
+        words = list(frequencies)
+        frequency = np.array([frequencies[word] for word in words], dtype=np.int64)
+
+        partials = [_expand_partial(partial, present, len(words))
+                    for partial, present in self._map(_shard_dispersion, word_type, words, frequency, total)]
+        measures = combine_measures(partials, frequency, total)
+        run = {
+            'word_type': word_type,
+            'doc_count': sum(partial['parts'] for partial in partials),
+            'token_count': total,
+            'type_count': len(words),
+            'computed_at': datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S'),
+            'stale': False,
+        }
+        self._dispersion[word_type] = (states, run, {entry['word']: entry
+                                                     for entry in measure_entries(words, measures)})
+        logger.info(f"Dispersion ({word_type}): {len(words)} types over {run['doc_count']} documents "
+                    f"in {len(self.shard_paths)} shards, {total} tokens in {time.perf_counter() - start:.2f}s")
+        return dict(run)
+
+    def _dispersion_entries(self, word_type: str) -> Dict[str, Dict[str, Any]]:
+        """Measures of every word; computed first if missing or if a shard changed"""
+        cached = self._dispersion.get(word_type)
+        if cached is None or cached[0] != tuple(self._map(_shard_corpus_state)):
+            self.compute_dispersion(word_type)
+        return self._dispersion[word_type][2]
+
+    def dispersion(self, word: str, word_type: str = 'norm') -> Optional[Dict[str, Any]]:
+        """
+        Dispersion measures of a word: frequency, range (documents),
+        Juilland's D, DP, normalized DP and ARF (None if not in the corpus)
+        """
+        entry = self._dispersion_entries(word_type).get(word)
+        return dict(entry) if entry is not None else None
+
+    def dispersion_ranking(self,
+                           measure: str = 'dp',
+                           word_type: str = 'norm',
+                           min_freq: int = 5,
+                           limit: int = 100,
+                           descending: bool = False) -> List[Dict[str, Any]]:
+        """
+        Words ordered by a dispersion measure, e.g. the most evenly spread
+        words (lowest 'dp') or the most clumped ones (descending)
+        """
+        check_measure(measure)
+        return [dict(entry) for entry in rank_entries(self._dispersion_entries(word_type).values(),
+                                                      measure, min_freq, limit, descending)]
+
+    # --- Queries --------------------------------------------------------------
+
+    def kwic_concordance(self,
+                         search_term: str,
+                         search_type: str = 'form',
+                         case_sensitive: bool = False,
+                         window_size: int = 5,
+                         limit: int = 100,
+                         pos_filter: Optional[str] = None,
+                         subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Generate KWIC (Key Word In Context) concordance
+        """
+        shards = self._fan_out('kwic_concordance', search_term, search_type, case_sensitive,
+                               window_size, limit, pos_filter, subcorpus)
+        merged = heapq.merge(*shards, key=lambda r: (r['doc_id'], r['sent_id'], r['token_number']))
+        return list(islice(merged, None if limit < 0 else limit))
+
+    def frequency_list(self,
+                       word_type: str = 'norm',
+                       pos_filter: Optional[str] = None,
+                       min_freq: int = 1,
+                       limit: int = 1000,
+                       subcorpus: Optional[str] = None,
+                       dispersion: bool = False) -> List[Dict[str, Any]]:
+        """
+        Generate frequency list
+        """
+        if dispersion and subcorpus is not None:
+            raise ValueError("Dispersion measures are computed for the whole corpus, not per subcorpus")
+        # Complete per-shard lists: a word can miss a shard's top `limit` and
+        # still make the corpus-wide one
+        frequencies = Counter()
+        pos = {}
+        for shard in self._fan_out('frequency_list', word_type, pos_filter, 1, -1, subcorpus):
+            for row in shard:
+                frequencies[row['word']] += row['frequency']
+                # POS of the shard where the word is most frequent
+                if row['word'] not in pos or row['frequency'] > pos[row['word']][1]:
+                    pos[row['word']] = (row['pos'], row['frequency'])
+
+        results = _limited([
+            {'word': word, 'pos': pos[word][0], 'frequency': frequency}
+            for word, frequency in frequencies.most_common()
+            if frequency >= min_freq
+        ], limit)
+        if subcorpus is not None:
+            words = self.subcorpus_size(subcorpus)['word_count']
+            for entry in results:
+                entry['per_million'] = entry['frequency'] * 1_000_000 / words if words else 0.0
+        if dispersion:
+            entries = self._dispersion_entries(word_type)
+            for entry in results:
+                measures = entries.get(entry['word'], {})
+                for name in ('range', 'juilland_d', 'dp', 'dp_norm', 'arf'):
+                    entry[name] = measures.get(name)
+        return results
+
+    def iter_frequency_list(self, *args, **kwargs):
+        """Frequency list entries (merged from complete per-shard lists, so not streamed)"""
+        yield from self.frequency_list(*args, **kwargs)
+
+    def cql_search(self, query_string: str, limit: int = 100, subcorpus: Optional[str] = None):
+        """
+        Execute a CQL search
+        Example: [pos="ADJ"] [lemma="insan"]
+        """
+        results = []
+        for shard in self._fan_out('cql_search', query_string, limit, subcorpus):
+            results.extend(shard)
+        return _limited(results, limit)
+
+    def collocation_analysis(self,
+                             target_word: str,
+                             word_type: str = 'norm',
+                             window_size: int = 5,
+                             min_freq: int = 2,
+                             colloc_min_freq: int = 2,
+                             measure: str = 'pmi',
+                             limit: int = 100,
+                             subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Perform collocation analysis
+        """
+        if word_type not in ('form', 'norm', 'lemma'):
+            raise ValueError(f"Invalid word_type: {word_type}")
+
+        target_freq = 0
+        total_tokens = 0
+        collocate_counts = Counter()
+        for counts in self._fan_out('_collocation_counts', target_word, word_type, window_size, 0, subcorpus):
+            target_freq += counts['target_freq']
+            total_tokens += counts['total_tokens']
+            collocate_counts.update(counts['collocates'])
+        if target_freq < min_freq:
+            return []
+
+        # Collocate frequencies count in every shard, not only where they co-occur
+        candidates = [collocate for collocate, n in collocate_counts.items() if n >= colloc_min_freq]
+        collocate_freqs = Counter()
+        for shard in self._fan_out('_form_frequencies', candidates, subcorpus):
+            collocate_freqs.update(shard)
+
+        return self._score_collocations(target_freq, total_tokens, collocate_counts, collocate_freqs,
+                                        colloc_min_freq, measure, limit)
+
+    def word_sketch(self,
+                    lemma: str,
+                    relation_type: Optional[str] = None,
+                    limit: int = 100,
+                    subcorpus: Optional[str] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Generate word sketch based on dependency relations
+        """
+        frequencies = Counter()
+        for shard in self._fan_out('_word_sketch_rows', lemma, relation_type, -1, subcorpus):
+            for *key, frequency in shard:
+                frequencies[tuple(key)] += frequency
+        rows = [(*key, frequency) for key, frequency in frequencies.most_common(limit * 10)]
+        return self._group_sketch(rows, limit)
+
+    def get_pos_distribution(self, subcorpus: Optional[str] = None):
+        """Get distribution of POS tags"""
+        counts = Counter()
+        for shard in self._fan_out('get_pos_distribution', subcorpus):
+            for row in shard:
+                counts[row['pos']] += row['count']
+        return [{'pos': pos, 'count': count} for pos, count in counts.most_common()]
+
+    def get_advanced_stats(self, subcorpus: Optional[str] = None):
+        """Calculate advanced corpus statistics"""
+        stats = {}
+
+        total_tokens = self._sum("SELECT COUNT(*) FROM {source} WHERE {condition}", subcorpus)
+        totals = dict.fromkeys(TOTAL_COLUMNS, 0)
+        frequencies = Counter()
+        for shard_totals, shard_frequencies in self._map(_shard_lexical_stats, subcorpus):
+            for column, value in shard_totals.items():
+                totals[column] += value
+            for word, frequency in shard_frequencies:
+                frequencies[word] += frequency
+        lexical = lexical_measures(totals, frequency_spectrum(frequencies.values()))
+
+        stats['total_tokens'] = total_tokens
+        stats['word_tokens'] = lexical['word_count']
+        stats['unique_types'] = lexical['type_count']
+        stats['ttr'] = lexical['ttr'] or 0
+        for name in LEXICAL_MEASURES:
+            stats[name] = lexical[name]
+
+        if subcorpus is not None:
+            total_sentences = self.subcorpus_size(subcorpus)['sentence_count']
+        else:
+            total_sentences = self._sum("SELECT COUNT(*) FROM sentences")
+        stats['total_sentences'] = total_sentences
+        stats['avg_sent_len'] = (total_tokens / total_sentences) if total_sentences > 0 else 0
+
+        counts = Counter()
+        for rows in self._fetch("SELECT t.upos, COUNT(*) FROM {source} WHERE {condition} GROUP BY t.upos",
+                                subcorpus):
+            for upos, count in rows:
+                counts[upos] += count
+        stats['top_pos'] = counts.most_common(5)
+
+        return stats
+
+    def document_lexical_stats(self, doc_ids: Optional[List[int]] = None,
+                               subcorpus: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Lexical diversity and readability of each document, in doc_id order"""
+        return [row for shard in self._fan_out('document_lexical_stats', doc_ids, subcorpus) for row in shard]
+
+    def compute_lexical_stats(self) -> int:
+        """Compute and store the lexical statistics of documents that have none, on every shard"""
+        return sum(self._fan_out('compute_lexical_stats'))
+
+    def get_all_tokens_for_export(self, subcorpus: Optional[str] = None):
+        """Yields all tokens for CoNLL-U export, shard after shard (i.e. in doc_id order)"""
+        for path in self.shard_paths:
+            query = CorpusQuery(path)
+            try:
+                yield from query.get_all_tokens_for_export(subcorpus)
+            finally:
+                query.close()
+
+    def get_processing_stats(self, subcorpus: Optional[str] = None) -> Dict[str, Any]:
+        """Get basic processing stats"""
+        try:
+            if subcorpus is not None:
+                size = self.subcorpus_size(subcorpus)
+                stats = {
+                    'total_documents': size['doc_count'],
+                    'total_sentences': size['sentence_count'],
+                    'total_tokens': size['token_count'],
+                }
+            else:
+                stats = {
+                    'total_documents': self._sum("SELECT COUNT(DISTINCT doc_id) FROM tokens"),
+                    'total_sentences': self._sum("SELECT COUNT(DISTINCT sent_id) FROM tokens"),
+                    'total_tokens': self._sum("SELECT COUNT(*) FROM tokens"),
+                }
+            stats['unique_words'] = self._count_distinct('norm', subcorpus)
+            stats['shards'] = len(self.shard_paths)
+            return {'database_stats': stats}
+        except (sqlite3.Error, OSError, ValueError) as e:
+            logger.error(f"Error getting stats: {e}")
+            return {'error': str(e)}
+
+    def close(self):
+        """Stop the worker processes (and close shard connections opened in this process)"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self.workers == 0:
+            _close_shard_queries()
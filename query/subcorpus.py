@@ -0,0 +1,342 @@
+"""
+Subcorpora
+
+Named subsets of the corpus defined by document attributes, e.g.
+
+    query.define_subcorpus('haberler', {'file_path': '*/haber/*'})
+    query.define_subcorpus('kisa', {'token_count': {'max': 500}})
+    query.kwic_concordance('ev', subcorpus='haberler')
+
+A definition maps document columns or document metadata keys (see
+query.metadata) to conditions:
+- a plain value matches exactly; a string with * ? or [ is a GLOB pattern
+- a list matches any of its values
+- a dict combines operators: {'min': .., 'max': .., 'like': .., 'glob': .., 'in': [..], 'not': ..}
+All conditions must hold; an empty definition selects the whole corpus.
+
+Definitions are materialized into the subcorpus_ranges table as sorted,
+non-overlapping id ranges, once for doc_ids and once for token_ids (the
+tokens of a document are one contiguous id range, so a subcorpus of N
+documents takes at most N token ranges, usually far fewer). Queries apply a
+subcorpus as a range check against that table, one primary key seek per
+candidate row, or scan the tokens table range by range when they would read
+all of it anyway. The sizes of each subcorpus (documents, sentences, tokens,
+words) are stored with it for normalized frequencies.
+
+A subcorpus is refreshed after every ingestion run; one whose documents
+changed in between is reported as stale.
+"""
+
+import json
+import logging
+from typing import List, Dict, Any, Tuple, Iterable
+
+from database.schema import SUBCORPUS_TABLES_SQL
+from query.metadata import MetadataIndex
+
+logger = logging.getLogger(__name__)
+
+# Operators of dict conditions
+CONDITION_OPERATORS = {'min': '>=', 'max': '<=', 'like': 'LIKE', 'glob': 'GLOB'}
+
+# Document ids looked up per statement
+ID_BATCH_SIZE = 500
+
+
+def to_ranges(ids: Iterable[int]) -> List[Tuple[int, int]]:
+    """Sorted ids as inclusive (start, end) runs"""
+    ranges: List[Tuple[int, int]] = []
+    for value in ids:
+        if ranges and value == ranges[-1][1] + 1:
+            ranges[-1] = (ranges[-1][0], value)
+        else:
+            ranges.append((value, value))
+    return ranges
+
+
+def merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Sort and join overlapping or adjacent ranges"""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(end, merged[-1][1]))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def corpus_state(connection) -> str:
+    """Changes whenever documents are added, replaced or deleted"""
+    cursor = connection.cursor()
+    cursor.execute("SELECT COUNT(*), COALESCE(MAX(doc_id), 0) FROM documents")
+    count, max_id = cursor.fetchone()
+    return f"{count}:{max_id}"
+
+
+def range_condition(column: str, subcorpus_id: int, kind: str = 'token') -> Tuple[str, list]:
+    """
+    SQL condition: column lies in one of the subcorpus ranges
+
+    The last range starting at or before the value is found with one seek on
+    the primary key of subcorpus_ranges.
+    """
+    return (f"""{column} <= (
+                SELECT sc.range_end FROM subcorpus_ranges sc
+                WHERE sc.subcorpus_id = ? AND sc.kind = ? AND sc.range_start <= {column}
+                ORDER BY sc.range_start DESC LIMIT 1)""", [subcorpus_id, kind])
+
+
+def range_scan(alias: str, subcorpus_id: int) -> Tuple[str, str, list]:
+    """
+    FROM clause and condition reading only the tokens of a subcorpus
+
+    Returns:
+        (from_sql, condition, params); the tokens table is visited range by
+        range through its rowid instead of being scanned
+    """
+    return (f"subcorpus_ranges sc CROSS JOIN tokens {alias}",
+            f"sc.subcorpus_id = ? AND sc.kind = 'token' "
+            f"AND {alias}.token_id BETWEEN sc.range_start AND sc.range_end",
+            [subcorpus_id])
+
+
+class SubcorpusManager:
+    """Defines, materializes and looks up the subcorpora of one database"""
+
+    def __init__(self, connection):
+        self.conn = connection
+        self.metadata = MetadataIndex(connection)
+
+    def ensure_tables(self) -> None:
+        """Create the subcorpus tables of databases made before they existed"""
+        cursor = self.conn.cursor()
+        for sql in SUBCORPUS_TABLES_SQL:
+            cursor.execute(sql)
+
+    def _has_tables(self) -> bool:
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'subcorpora'")
+        return cursor.fetchone() is not None
+
+    # --- Definitions -----------------------------------------------------------
+
+    def _document_columns(self) -> List[str]:
+        cursor = self.conn.cursor()
+        cursor.execute("PRAGMA table_info(documents)")
+        return [row[1] for row in cursor.fetchall()]
+
+    def compile_definition(self, definition: Dict[str, Any], strict: bool = True) -> Tuple[str, list]:
+        """
+        WHERE clause over the documents table (alias d) for a definition
+
+        Args:
+            strict: Reject keys that are neither document columns nor metadata
+                    keys of this database (otherwise they are metadata keys
+                    that no document has yet)
+
+        Raises:
+            ValueError: unknown column, metadata key or operator
+        """
+        columns = self._document_columns()
+        metadata_keys = None
+        conditions = []
+        params: list = []
+        for key, condition in definition.items():
+            if key in columns:
+                sql, values = self._compile_condition(f"d.{key}", condition)
+            else:
+                if strict and metadata_keys is None:
+                    metadata_keys = self.metadata.keys()
+                if strict and key not in metadata_keys:
+                    raise ValueError(f"Unknown document attribute in subcorpus definition: {key}")
+                sql, values = self.metadata.compile_condition(key, condition)
+            conditions.append(sql)
+            params.extend(values)
+        return (" AND ".join(conditions) or "1"), params
+
+    def _compile_condition(self, column: str, condition: Any) -> Tuple[str, list]:
+        if isinstance(condition, (list, tuple)):
+            if not condition:
+                return "0", []
+            return f"{column} IN ({','.join('?' * len(condition))})", list(condition)
+        if isinstance(condition, dict):
+            parts = []
+            params: list = []
+            for operator, value in condition.items():
+                if operator in CONDITION_OPERATORS:
+                    parts.append(f"{column} {CONDITION_OPERATORS[operator]} ?")
+                    params.append(value)
+                elif operator == 'in':
+                    sql, values = self._compile_condition(column, list(value))
+                    parts.append(sql)
+                    params.extend(values)
+                elif operator == 'not':
+                    sql, values = self._compile_condition(column, value)
+                    parts.append(f"NOT ({sql})")
+                    params.extend(values)
+                else:
+                    raise ValueError(f"Unknown subcorpus condition operator: {operator}")
+            return " AND ".join(parts) or "1", params
+        if condition is None:
+            return f"{column} IS NULL", []
+        if isinstance(condition, str) and any(c in condition for c in '*?['):
+            return f"{column} GLOB ?", [condition]
+        return f"{column} = ?", [condition]
+
+    def define(self, name: str, definition: Dict[str, Any], strict: bool = True) -> Dict[str, Any]:
+        """
+        Create (or redefine) a subcorpus and materialize it
+
+        Args:
+            name: Subcorpus name
+            definition: Document conditions (see module docstring)
+            strict: Reject unknown keys (see compile_definition)
+
+        Returns:
+            The subcorpus record with its sizes
+        """
+        self.compile_definition(definition, strict)  # validate before writing
+        self.ensure_tables()
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            INSERT INTO subcorpora (name, definition) VALUES (?, ?)
+            ON CONFLICT(name) DO UPDATE SET definition = excluded.definition
+        """, (name, json.dumps(definition, ensure_ascii=False, sort_keys=True)))
+        return self.refresh(name)
+
+    def drop(self, name: str) -> bool:
+        """Delete a subcorpus; returns whether it existed"""
+        if not self._has_tables():
+            return False
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT subcorpus_id FROM subcorpora WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        if row is None:
+            return False
+        cursor.execute("DELETE FROM subcorpus_ranges WHERE subcorpus_id = ?", (row[0],))
+        cursor.execute("DELETE FROM subcorpora WHERE subcorpus_id = ?", (row[0],))
+        self.conn.commit()
+        return True
+
+    # --- Materialization -------------------------------------------------------
+
+    def _corpus_state(self) -> str:
+        return corpus_state(self.conn)
+
+    def refresh(self, name: str) -> Dict[str, Any]:
+        """Materialize a subcorpus again from its definition"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT subcorpus_id, definition FROM subcorpora WHERE name = ?", (name,))
+        row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Unknown subcorpus: {name}")
+        subcorpus_id, definition = row[0], json.loads(row[1])
+
+        # Metadata keys may have disappeared with their documents
+        where, params = self.compile_definition(definition, strict=False)
+        cursor.execute(f"SELECT d.doc_id FROM documents d WHERE {where} ORDER BY d.doc_id", params)
+        doc_ids = [r[0] for r in cursor.fetchall()]
+
+        token_ranges = []
+        token_count = word_count = sentence_count = 0
+        for start in range(0, len(doc_ids), ID_BATCH_SIZE):
+            batch = doc_ids[start:start + ID_BATCH_SIZE]
+            placeholders = ','.join('?' * len(batch))
+            cursor.execute(f"""
+                SELECT doc_id, MIN(token_id), MAX(token_id), COUNT(*), SUM(is_punctuation = 0)
+                FROM tokens WHERE doc_id IN ({placeholders})
+                GROUP BY doc_id
+            """, batch)
+            for doc_id, first, last, count, words in cursor.fetchall():
+                token_count += count
+                word_count += words or 0
+                if last - first + 1 == count:
+                    token_ranges.append((first, last))
+                else:
+                    # Ids of a document with gaps (only after partial edits)
+                    ids = self.conn.cursor()
+                    ids.execute("SELECT token_id FROM tokens WHERE doc_id = ? ORDER BY token_id", (doc_id,))
+                    token_ranges.extend(to_ranges(r[0] for r in ids.fetchall()))
+            cursor.execute(f"SELECT COUNT(*) FROM sentences WHERE doc_id IN ({placeholders})", batch)
+            sentence_count += cursor.fetchone()[0]
+        token_ranges = merge_ranges(token_ranges)
+        doc_ranges = to_ranges(doc_ids)
+
+        cursor.execute("DELETE FROM subcorpus_ranges WHERE subcorpus_id = ?", (subcorpus_id,))
+        cursor.executemany(
+            "INSERT INTO subcorpus_ranges (subcorpus_id, kind, range_start, range_end) VALUES (?, ?, ?, ?)",
+            [(subcorpus_id, 'doc', s, e) for s, e in doc_ranges] +
+            [(subcorpus_id, 'token', s, e) for s, e in token_ranges])
+        cursor.execute("""
+            UPDATE subcorpora SET doc_count = ?, sentence_count = ?, token_count = ?, word_count = ?,
+                range_count = ?, corpus_state = ?, materialized_at = CURRENT_TIMESTAMP
+            WHERE subcorpus_id = ?
+        """, (len(doc_ids), sentence_count, token_count, word_count, len(token_ranges),
+              self._corpus_state(), subcorpus_id))
+        self.conn.commit()
+        logger.info(f"Subcorpus '{name}': {len(doc_ids)} documents, {token_count} tokens "
+                    f"in {len(token_ranges)} ranges")
+        return self.get(name)
+
+    def refresh_all(self) -> int:
+        """Materialize all stale subcorpora again; returns how many were refreshed"""
+        if not self._has_tables():
+            return 0
+        state = self._corpus_state()
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT name FROM subcorpora WHERE corpus_state IS NOT ?", (state,))
+        names = [row[0] for row in cursor.fetchall()]
+        for name in names:
+            self.refresh(name)
+        return len(names)
+
+    # --- Lookup ----------------------------------------------------------------
+
+    def get(self, name: str) -> Dict[str, Any]:
+        """
+        Subcorpus record: id, definition, sizes and whether it is stale
+
+        Raises:
+            ValueError: no such subcorpus
+        """
+        row = None
+        if self._has_tables():
+            cursor = self.conn.cursor()
+            cursor.execute("""
+                SELECT subcorpus_id, name, definition, doc_count, sentence_count, token_count,
+                       word_count, range_count, corpus_state, materialized_at
+                FROM subcorpora WHERE name = ?
+            """, (name,))
+            row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Unknown subcorpus: {name}")
+        return {
+            'subcorpus_id': row[0],
+            'name': row[1],
+            'definition': json.loads(row[2]),
+            'doc_count': row[3],
+            'sentence_count': row[4],
+            'token_count': row[5],
+            'word_count': row[6],
+            'range_count': row[7],
+            'materialized_at': row[9],
+            'stale': row[8] != self._corpus_state(),
+        }
+
+    def list(self) -> List[Dict[str, Any]]:
+        """All subcorpora with their sizes"""
+        if not self._has_tables():
+            return []
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT name FROM subcorpora ORDER BY name")
+        return [self.get(row[0]) for row in cursor.fetchall()]
+
+    def ranges(self, name: str, kind: str = 'token') -> List[Tuple[int, int]]:
+        """Materialized (start, end) id ranges of a subcorpus"""
+        subcorpus_id = self.get(name)['subcorpus_id']
+        cursor = self.conn.cursor()
+        cursor.execute("""
+            SELECT range_start, range_end FROM subcorpus_ranges
+            WHERE subcorpus_id = ? AND kind = ? ORDER BY range_start
+        """, (subcorpus_id, kind))
+        return [tuple(row) for row in cursor.fetchall()]
@@ -0,0 +1,428 @@
+"""
+Query Tracing
+
+Opt-in instrumentation of CorpusQuery: every SQL statement issued by a public
+method is recorded with its parameters count, row count and time (execute
+plus fetching), optionally with its EXPLAIN QUERY PLAN. Full table scans and
+statements repeated many times within one call (N+1 patterns, such as one
+window query per target occurrence in collocation_analysis) are flagged, and
+latencies are kept in a histogram per method.
+
+Results go to a JSON-lines log file (one line per call) and/or an in-process
+summary that can be dumped:
+
+    query = CorpusQuery("corpus.db")
+    tracer = query.enable_tracing(explain=True, log_path="logs/query_trace.jsonl")
+    query.collocation_analysis("ev")
+    print(tracer.format_summary())
+"""
+
+import re
+import json
+import time
+import logging
+import threading
+from collections import Counter, deque
+from functools import wraps
+from inspect import isgeneratorfunction
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Union
+
+from ingestion.profiler import LatencyHistogram
+
+logger = logging.getLogger(__name__)
+
+# 'SCAN tokens' / 'SCAN t1': a table read row by row; index scans
+# ('SCAN t USING COVERING INDEX ...') and virtual tables (FTS) are not flagged
+FULL_SCAN_PATTERN = re.compile(r'^SCAN (\w+)$')
+
+# Calls issuing the same statement at least this often are flagged as N+1
+DEFAULT_REPEAT_THRESHOLD = 10
+
+
+def _normalize_sql(sql: str) -> str:
+    return ' '.join(sql.split())
+
+
+def statement_shape(sql: str) -> str:
+    """SQL with inlined numbers and IN lists replaced, so that per-row queries built by string formatting group together"""
+    sql = re.sub(r'\bIN \(\s*[\d\s,]+\)', 'IN (...)', sql)
+    return re.sub(r'(?<![\w.])\d+(?![\w.])', '?', sql)
+
+
+class StatementTrace:
+    """One executed statement: SQL, rows fetched, seconds spent, plan"""
+
+    __slots__ = ('sql', 'params', 'rows', 'seconds', 'plan', 'full_scans')
+
+    def __init__(self, sql: str, params: int):
+        self.sql = sql
+        self.params = params
+        self.rows = 0
+        self.seconds = 0.0
+        self.plan: Optional[List[str]] = None
+        self.full_scans: List[str] = []
+
+    def to_dict(self) -> Dict[str, Any]:
+        record = {'sql': self.sql, 'params': self.params, 'rows': self.rows,
+                  'ms': round(self.seconds * 1000, 3)}
+        if self.plan is not None:
+            record['plan'] = self.plan
+        if self.full_scans:
+            record['full_scans'] = self.full_scans
+        return record
+
+
+class CallTrace:
+    """One public CorpusQuery call and the statements it issued"""
+
+    __slots__ = ('method', 'arguments', 'statements', 'seconds', 'error')
+
+    def __init__(self, method: str, arguments: Dict[str, Any]):
+        self.method = method
+        self.arguments = arguments
+        self.statements: List[StatementTrace] = []
+        self.seconds = 0.0
+        self.error: Optional[str] = None
+
+    def repeated_statements(self, threshold: int) -> Dict[str, int]:
+        counts = Counter(statement_shape(statement.sql) for statement in self.statements)
+        return {sql: n for sql, n in counts.items() if n >= threshold}
+
+    def to_dict(self, repeat_threshold: int = DEFAULT_REPEAT_THRESHOLD) -> Dict[str, Any]:
+        record = {
+            'method': self.method,
+            'arguments': self.arguments,
+            'ms': round(self.seconds * 1000, 3),
+            'statements': len(self.statements),
+            'rows': sum(statement.rows for statement in self.statements),
+            'sql_ms': round(sum(statement.seconds for statement in self.statements) * 1000, 3),
+        }
+        full_scans = sorted({table for statement in self.statements for table in statement.full_scans})
+        if full_scans:
+            record['full_scans'] = full_scans
+        repeated = self.repeated_statements(repeat_threshold)
+        if repeated:
+            record['repeated_statements'] = repeated
+        if self.error:
+            record['error'] = self.error
+        # One entry per statement shape: an N+1 loop would repeat the same entry
+        seen = {}
+        for statement in self.statements:
+            shape = statement_shape(statement.sql)
+            entry = seen.get(shape)
+            if entry is None:
+                seen[shape] = entry = statement.to_dict()
+                entry['sql'] = shape
+                entry['executions'] = 0
+                entry['rows'] = entry['ms'] = 0
+            entry['executions'] += 1
+            entry['rows'] += statement.rows
+            entry['ms'] = round(entry['ms'] + statement.seconds * 1000, 3)
+        record['sql'] = list(seen.values())
+        return record
+
+
+class QueryTracer:
+    """Collects call and statement traces of CorpusQuery instances"""
+
+    def __init__(self, explain: bool = False, log_path: Optional[Union[str, Path]] = None,
+                 slow_ms: Optional[float] = None, keep_calls: int = 200,
+                 repeat_threshold: int = DEFAULT_REPEAT_THRESHOLD):
+        """
+        Args:
+            explain: Capture EXPLAIN QUERY PLAN of each distinct statement
+                     (cached per SQL text) and flag full table scans
+            log_path: Append one JSON line per call to this file
+            slow_ms: Log calls slower than this at WARNING level
+            keep_calls: Recent calls kept in memory for recent_calls()
+            repeat_threshold: Executions of one statement within a call that
+                              flag it as an N+1 pattern
+        """
+        self.explain = explain
+        self.log_path = Path(log_path) if log_path else None
+        self.slow_ms = slow_ms
+        self.repeat_threshold = repeat_threshold
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._plans: Dict[str, List[str]] = {}
+        self._recent = deque(maxlen=keep_calls)
+        self.methods: Dict[str, Dict[str, Any]] = {}
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        if self.log_path is not None:
+            self.log_path.parent.mkdir(parents=True, exist_ok=True)
+
+    # --- Calls --------------------------------------------------------------
+
+    def _stack(self) -> List[CallTrace]:
+        stack = getattr(self._local, 'stack', None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self, method: str, arguments: Dict[str, Any]) -> CallTrace:
+        """Start a call on the current thread; statements are attributed to it"""
+        call = CallTrace(method, arguments)
+        self._stack().append(call)
+        return call
+
+    def end(self, call: CallTrace, seconds: float, error: Optional[BaseException] = None) -> None:
+        """Finish a call: update the method summary, histogram and log"""
+        stack = self._stack()
+        if call in stack:
+            stack.remove(call)
+        call.seconds += seconds
+        if error is not None:
+            call.error = f"{type(error).__name__}: {error}"
+        record = call.to_dict(self.repeat_threshold)
+
+        with self._lock:
+            summary = self.methods.setdefault(call.method, {
+                'calls': 0, 'errors': 0, 'statements': 0, 'max_statements': 0,
+                'rows': 0, 'full_scan_calls': 0, 'repeated_statement_calls': 0,
+            })
+            summary['calls'] += 1
+            summary['errors'] += error is not None
+            summary['statements'] += record['statements']
+            summary['max_statements'] = max(summary['max_statements'], record['statements'])
+            summary['rows'] += record['rows']
+            summary['full_scan_calls'] += 'full_scans' in record
+            summary['repeated_statement_calls'] += 'repeated_statements' in record
+            self.histograms.setdefault(call.method, LatencyHistogram()).record(call.seconds)
+            self._recent.append(record)
+            if self.log_path is not None:
+                with open(self.log_path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+        if self.slow_ms is not None and record['ms'] >= self.slow_ms:
+            logger.warning(f"Slow query {call.method}: {record['ms']:.1f} ms, "
+                           f"{record['statements']} statements, {record['rows']} rows")
+        if 'repeated_statements' in record:
+            logger.debug(f"{call.method} repeated statements: {record['repeated_statements']}")
+
+    # --- Statements -----------------------------------------------------------
+
+    def statement(self, sql: str, params: Any, connection) -> StatementTrace:
+        """Record a statement of the current call (plans are captured on first sight)"""
+        normalized = _normalize_sql(sql)
+        trace = StatementTrace(normalized, len(params) if params is not None else 0)
+        stack = self._stack()
+        if stack:
+            stack[-1].statements.append(trace)
+
+        if self.explain and normalized.split(' ', 1)[0].upper() in ('SELECT', 'WITH'):
+            shape = statement_shape(normalized)
+            plan = self._plans.get(shape)
+            if plan is None:
+                plan = self._explain(connection, sql, params)
+                with self._lock:
+                    self._plans[shape] = plan
+            trace.plan = plan
+            trace.full_scans = [match.group(1) for match in map(FULL_SCAN_PATTERN.match, plan) if match]
+        return trace
+
+    @staticmethod
+    def _explain(connection, sql: str, params: Any) -> List[str]:
+        try:
+            rows = connection.execute(f"EXPLAIN QUERY PLAN {sql}",
+                                      params if params is not None else ()).fetchall()
+        except Exception as e:
+            return [f"(plan unavailable: {e})"]
+        return [row[3] for row in rows]
+
+    # --- Reporting -------------------------------------------------------------
+
+    def recent_calls(self, method: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Recorded calls, most recent last"""
+        with self._lock:
+            return [record for record in self._recent if method is None or record['method'] == method]
+
+    def summary(self) -> Dict[str, Any]:
+        """Per-method call counts, statements per call, rows, flags and latency histograms"""
+        with self._lock:
+            methods = {}
+            for method, summary in self.methods.items():
+                methods[method] = {
+                    **summary,
+                    'statements_per_call': round(summary['statements'] / summary['calls'], 2),
+                    'latency_ms': self.histograms[method].to_dict(),
+                }
+            full_scans = {sql: [m.group(1) for m in map(FULL_SCAN_PATTERN.match, plan) if m]
+                          for sql, plan in self._plans.items()}
+            return {
+                'methods': methods,
+                'full_scan_statements': {sql: tables for sql, tables in full_scans.items() if tables},
+            }
+
+    def format_summary(self) -> str:
+        """The summary as a text table"""
+        lines = [f"{'method':<28} {'calls':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>9} "
+                 f"{'stmt/call':>9} {'rows':>9}  flags"]
+        for method, summary in sorted(self.summary()['methods'].items()):
+            latency = summary['latency_ms']
+            flags = []
+            if summary['full_scan_calls']:
+                flags.append(f"full scan x{summary['full_scan_calls']}")
+            if summary['repeated_statement_calls']:
+                flags.append(f"N+1 x{summary['repeated_statement_calls']}")
+            lines.append(f"{method:<28} {summary['calls']:>6} {latency['p50_ms']:>8} {latency['p99_ms']:>8} "
+                         f"{latency['max_ms']:>9} {summary['statements_per_call']:>9} "
+                         f"{summary['rows']:>9}  {', '.join(flags)}")
+        return '\n'.join(lines)
+
+    def dump(self, path: Union[str, Path]) -> Path:
+        """Write the summary and the recent calls as JSON"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'summary': self.summary(), 'recent_calls': self.recent_calls()}, f,
+                      indent=2, ensure_ascii=False, default=str)
+        return path
+
+    def reset(self) -> None:
+        """Forget all traces (cached plans are kept)"""
+        with self._lock:
+            self._recent.clear()
+            self.methods.clear()
+            self.histograms.clear()
+
+
+class TracingCursor:
+    """sqlite3.Cursor proxy timing execute and fetches and counting rows"""
+
+    def __init__(self, cursor, tracer: QueryTracer, connection):
+        self._cursor = cursor
+        self._tracer = tracer
+        self._connection = connection
+        self._trace: Optional[StatementTrace] = None
+
+    def execute(self, sql: str, parameters: Any = ()):
+        self._trace = self._tracer.statement(sql, parameters, self._connection)
+        start = time.perf_counter()
+        try:
+            self._cursor.execute(sql, parameters)
+        finally:
+            self._trace.seconds += time.perf_counter() - start
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters):
+        self._trace = self._tracer.statement(sql, None, self._connection)
+        start = time.perf_counter()
+        try:
+            self._cursor.executemany(sql, seq_of_parameters)
+        finally:
+            self._trace.seconds += time.perf_counter() - start
+        return self
+
+    def _fetch(self, fetch, *args):
+        start = time.perf_counter()
+        rows = fetch(*args)
+        if self._trace is not None:
+            self._trace.seconds += time.perf_counter() - start
+            if isinstance(rows, list):
+                self._trace.rows += len(rows)
+            elif rows is not None:
+                self._trace.rows += 1
+        return rows
+
+    def fetchone(self):
+        return self._fetch(self._cursor.fetchone)
+
+    def fetchmany(self, size: Optional[int] = None):
+        return self._fetch(self._cursor.fetchmany, size if size is not None else self._cursor.arraysize)
+
+    def fetchall(self):
+        return self._fetch(self._cursor.fetchall)
+
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    def __getattr__(self, name: str):
+        return getattr(self._cursor, name)
+
+
+class TracingConnection:
+    """sqlite3.Connection proxy whose cursors are traced"""
+
+    def __init__(self, connection, tracer: QueryTracer):
+        self._connection = connection
+        self._tracer = tracer
+
+    def cursor(self, *args) -> TracingCursor:
+        return TracingCursor(self._connection.cursor(*args), self._tracer, self._connection)
+
+    def execute(self, sql: str, parameters: Any = ()) -> TracingCursor:
+        return self.cursor().execute(sql, parameters)
+
+    def __getattr__(self, name: str):
+        return getattr(self._connection, name)
+
+
+def _summarize_arguments(arguments: tuple, keywords: Dict[str, Any]) -> Dict[str, Any]:
+    summary = {f'arg{i}': value for i, value in enumerate(arguments)}
+    summary.update(keywords)
+    return {name: value if isinstance(value, (str, int, float, bool, type(None))) else repr(value)[:80]
+            for name, value in summary.items()}
+
+
+def traced(method):
+    """
+    Trace a public CorpusQuery method when its instance has a tracer
+
+    Generator methods are traced across their iteration, so the statements
+    they issue while being consumed belong to the call.
+    """
+    name = method.__name__
+
+    if isgeneratorfunction(method):
+        @wraps(method)
+        def generator_wrapper(self, *args, **kwargs):
+            tracer = self.tracer
+            if tracer is None:
+                yield from method(self, *args, **kwargs)
+                return
+            call = CallTrace(name, _summarize_arguments(args, kwargs))
+            iterator = method(self, *args, **kwargs)
+            error = None
+            try:
+                while True:
+                    # Only the time spent producing items belongs to the call;
+                    # consumers may be on another thread between items
+                    stack = tracer._stack()
+                    stack.append(call)
+                    start = time.perf_counter()
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    finally:
+                        call.seconds += time.perf_counter() - start
+                        stack.remove(call)
+                    yield item
+            except BaseException as e:
+                if not isinstance(e, GeneratorExit):
+                    error = e
+                raise
+            finally:
+                tracer.end(call, 0.0, error)
+        return generator_wrapper
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        tracer = self.tracer
+        if tracer is None:
+            return method(self, *args, **kwargs)
+        call = tracer.begin(name, _summarize_arguments(args, kwargs))
+        start = time.perf_counter()
+        try:
+            result = method(self, *args, **kwargs)
+        except BaseException as e:
+            tracer.end(call, time.perf_counter() - start, e)
+            raise
+        tracer.end(call, time.perf_counter() - start)
+        return result
+    return wrapper
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Test script for the CoNLL-U / tagged CSV importer
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion.annotated_importer import AnnotatedCorpusImporter
+from export.corpus_exporter import CorpusExporter
+from query.corpus_query import CorpusQuery
+
+SAMPLE_CONLLU = """# newdoc id = haber-1
+# sent_id = 1
+# text = Ali eve geldi.
+1\tAli\tAli\tPROPN\t_\tCase=Nom\t3\tnsubj\t_\t_
+2\teve\tev\tNOUN\t_\tCase=Dat\t3\tobl\t_\t_
+3\tgeldi\tgel\tVERB\t_\tTense=Past\t0\troot\t_\tSpaceAfter=No
+4\t.\t.\tPUNCT\t_\t_\t3\tpunct\t_\t_
+
+# sent_id = 2
+1-2\tEvdekiler\t_\t_\t_\t_\t_\t_\t_\t_
+1\tEvde\tev\tNOUN\t_\tCase=Loc\t2\tnmod\t_\t_
+2\tkiler\tki\tADJ\t_\t_\t3\tnsubj\t_\t_
+3\tuyudu\tuyu\tVERB\t_\t_\t0\troot\t_\t_
+
+"""
+
+
+def test_conllu_import():
+    """Heads are resolved to token_ids inside their own sentence"""
+    print("=== TESTING CONLL-U IMPORT ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        conllu_path = os.path.join(tmp, "sample.conllu")
+        with open(conllu_path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_CONLLU)
+        db_path = os.path.join(tmp, "imported.db")
+
+        importer = AnnotatedCorpusImporter(db_path, defer_indexes=True)
+        doc_id = importer.import_file(conllu_path)
+        assert importer.stats['sentences_processed'] == 2
+        assert importer.stats['tokens_processed'] == 7  # multiword range line skipped
+
+        # Importing the same file again is a no-op
+        assert importer.import_file(conllu_path) is None
+
+        conn = importer.db.connection
+        doc = conn.execute("SELECT doc_name, token_count FROM documents WHERE doc_id = ?",
+                           (doc_id,)).fetchone()
+        assert doc['doc_name'] == 'haber-1' and doc['token_count'] == 7
+
+        rows = conn.execute("""
+            SELECT t.form, h.form AS head_form, t.sent_id = h.sent_id AS same_sent
+            FROM tokens t JOIN tokens h ON t.dep_head = h.token_id
+            ORDER BY t.token_id
+        """).fetchall()
+        heads = {(r['form'], r['head_form']) for r in rows}
+        assert ('eve', 'geldi') in heads and ('kiler', 'uyudu') in heads
+        assert all(r['same_sent'] for r in rows)
+
+        geldi = conn.execute("SELECT start_char, end_char FROM tokens WHERE form = 'geldi'").fetchone()
+        assert (geldi['start_char'], geldi['end_char']) == (8, 13)
+
+        # FTS index is populated even though the per-row trigger was bypassed
+        assert conn.execute("SELECT COUNT(*) FROM tokens_fts WHERE tokens_fts MATCH 'geldi'").fetchone()[0] == 1
+        importer.close()
+
+        query = CorpusQuery(db_path)
+        sketch = query.word_sketch('ev')
+        query.close()
+        assert 'obl' in sketch
+
+    print(">> CoNLL-U import: PASS")
+
+
+def conllu_columns(text):
+    """(ID, FORM, HEAD, DEPREL) of the word lines of every sentence"""
+    sentences = []
+    for block in text.strip().split("\n\n"):
+        words = [line.split("\t") for line in block.splitlines() if line and not line.startswith('#')]
+        sentences.append([(w[0], w[1], w[6], w[7]) for w in words if w[0].isdigit()])
+    return sentences
+
+
+def test_conllu_round_trip():
+    """Importing and exporting CoNLL-U keeps IDs, HEAD and DEPREL"""
+    print("=== TESTING CONLL-U ROUND TRIP ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "imported.db")
+        importer = AnnotatedCorpusImporter(db_path)
+        # A document before the sample, so its token_ids do not start at 1
+        first_path = os.path.join(tmp, "first.conllu")
+        with open(first_path, 'w', encoding='utf-8') as f:
+            f.write("# text = Kedi uyudu.\n1\tKedi\tkedi\tNOUN\t_\t_\t2\tnsubj\t_\t_\n"
+                    "2\tuyudu\tuyu\tVERB\t_\t_\t0\troot\t_\tSpaceAfter=No\n"
+                    "3\t.\t.\tPUNCT\t_\t_\t2\tpunct\t_\t_\n\n")
+        importer.import_file(first_path)
+        sample_path = os.path.join(tmp, "sample.conllu")
+        with open(sample_path, 'w', encoding='utf-8') as f:
+            f.write(SAMPLE_CONLLU)
+        importer.import_file(sample_path)
+        importer.close()
+
+        out_path = os.path.join(tmp, "out.conllu")
+        CorpusExporter(db_path, chunk_size=3).export(out_path)
+        with open(out_path, encoding='utf-8') as f:
+            exported = conllu_columns(f.read())
+        with open(first_path, encoding='utf-8') as f:
+            expected = conllu_columns(f.read()) + conllu_columns(SAMPLE_CONLLU)
+        assert len(exported) == 3
+        for sentence, expected_sentence in zip(exported, expected):
+            for column in range(4):
+                assert [w[column] for w in sentence] == [w[column] for w in expected_sentence], \
+                    (column, sentence, expected_sentence)
+
+    print(">> CoNLL-U round trip: PASS")
+
+
+def test_tagged_csv_import():
+    """Word/tag CSV rows are grouped into sentences and tags mapped to UPOS"""
+    print("\n=== TESTING TAGGED CSV IMPORT ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, "tags.csv")
+        with open(csv_path, 'w', encoding='utf-8') as f:
+            f.write("Full_Sentence,Word,Tag\n"
+                    "hızlıca koştu,hızlıca,BELİRTEÇ-ADVERB\n"
+                    "hızlıca koştu,koştu,FİİL-VERB\n"
+                    "dün geldi,dün,BELİRTEÇ-ADVERB\n"
+                    "dün geldi,geldi,FİİL-VERB\n")
+
+        importer = AnnotatedCorpusImporter(os.path.join(tmp, "csv.db"))
+        importer.import_file(csv_path)
+        rows = importer.db.connection.execute(
+            "SELECT form, upos, xpos FROM tokens ORDER BY token_id").fetchall()
+        importer.close()
+
+        assert [r['upos'] for r in rows] == ['ADV', 'VERB', 'ADV', 'VERB']
+        assert rows[1]['xpos'] == 'FİİL-VERB'
+
+    print(">> Tagged CSV import: PASS")
+
+
+if __name__ == "__main__":
+    test_conllu_import()
+    test_conllu_round_trip()
+    test_tagged_csv_import()
+    print("\n=== TEST COMPLETE ===")
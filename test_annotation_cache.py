@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Test script for the persistent annotation cache
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlp.annotation_cache import AnnotationCache
+from nlp.backends import CustomBertBackend, FallbackTokens, register_backend
+from nlp.turkish_processor import TurkishNLPProcessor
+
+
+class FlakyBert:
+    """Stands in for CustomBERTProcessor: the model fails on its first call"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def process_text(self, text):
+        self.calls += 1
+        if self.calls == 1:
+            raise RuntimeError("CUDA out of memory")
+        return [{'word': word, 'upos': 'NOUN', 'start_char': 0, 'end_char': len(word),
+                 'bert_confidence': 0.9} for word in text.split()]
+
+    def get_model_version(self):
+        return 'flaky@v1'
+
+
+@register_backend
+class FlakyBertBackend(CustomBertBackend):
+    name = 'test_flaky_bert'
+    auto_priority = None
+
+    def load(self):
+        self.bert = FlakyBert()
+
+
+def test_hits_and_persistence():
+    """Repeated sentences hit the cache, also after reopening the file"""
+    print("=== TESTING CACHE HITS ===")
+
+    processor = TurkishNLPProcessor(backend='simple')
+    calls = []
+
+    def annotate(sentence):
+        calls.append(sentence)
+        return processor.process_text(sentence)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "corpus.annotations.db")
+
+        with AnnotationCache(path, 'custom_bert', 'model@v1') as cache:
+            first = cache.annotate("Ev çok güzel.", annotate)
+            second = cache.annotate("Ev çok güzel.", annotate)
+            assert first == second and len(calls) == 1
+            # Whitespace variants share the entry; offsets follow the actual text
+            spaced = cache.annotate("Ev  çok güzel.", annotate)
+            assert len(calls) == 1
+            assert [(t['start_char'], t['end_char']) for t in spaced][:2] == [(0, 2), (4, 7)]
+            assert cache.get_stats()['hit_rate'] == 2 / 3
+
+        with AnnotationCache(path, 'custom_bert', 'model@v1') as cache:
+            cache.annotate("Ev çok güzel.", annotate)
+            assert len(calls) == 1
+
+        # Another model version never sees these annotations
+        with AnnotationCache(path, 'custom_bert', 'model@v2') as cache:
+            assert cache.get("Ev çok güzel.") is None
+
+    print(">> Cache hits: PASS")
+
+
+def test_fallbacks_not_cached():
+    """Rule-based fallbacks after a model error are not cached under the model's key"""
+    print("\n=== TESTING FALLBACKS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = TurkishNLPProcessor(backend='test_flaky_bert')
+        processor.enable_annotation_cache(os.path.join(tmp, "corpus.annotations.db"))
+        bert = processor.custom_bert_processor
+
+        # The model raises once, the backend falls back to rule-based tokens
+        assert [t['upos'] for t in processor.process_text("Ev güzel")] == [None, None]
+        # The next call reaches the model instead of the cached fallback
+        assert [t['upos'] for t in processor.process_text("Ev güzel")] == ['NOUN', 'NOUN']
+        assert bert.calls == 2
+        assert [t['upos'] for t in processor.process_text("Ev güzel")] == ['NOUN', 'NOUN']
+        assert bert.calls == 2
+        processor.annotation_cache.close()
+
+        # Same for cache.annotate() (update_db_with_bert.py)
+        with AnnotationCache(os.path.join(tmp, "bert.db"), 'custom_bert', 'flaky@v1') as cache:
+            fallback = FallbackTokens([{'word': 'Ev', 'start_char': 0, 'end_char': 2}])
+            assert cache.annotate("Ev.", lambda sentence: fallback) == fallback
+            assert cache.get("Ev.") is None
+
+    print(">> Fallbacks not cached: PASS")
+
+
+def test_size_bounded_eviction():
+    """Least recently used entries are evicted once the size budget is exceeded"""
+    print("\n=== TESTING CACHE EVICTION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cache.db")
+        cache = AnnotationCache(path, 'stanza', 'v1', max_size_mb=0.01, flush_every=10)
+        for i in range(200):
+            cache.put(f"Cümle numarası {i}.", [{'word': 'Cümle', 'start_char': 0, 'end_char': 5,
+                                               'upos': 'NOUN', 'padding': 'x' * 100}])
+        cache.flush()
+
+        stats = cache.get_stats()
+        assert stats['evictions'] > 0
+        assert stats['size_mb'] <= 0.01
+        assert cache.get("Cümle numarası 199.") is not None
+        assert cache.get("Cümle numarası 0.") is None
+        cache.close()
+
+    print(">> Cache eviction: PASS")
+
+
+if __name__ == "__main__":
+    test_hits_and_persistence()
+    test_fallbacks_not_cached()
+    test_size_bounded_eviction()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Test script for the synthetic corpus generator and the benchmark suite
+"""
+
+import sys
+import os
+import re
+import json
+import tempfile
+from collections import Counter
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from benchmarks.corpus_generator import generate_corpus, parse_size, TurkishLikeVocabulary
+from benchmarks.suite import run_suite, compare_results
+
+
+def test_generator():
+    """Same seed gives the same corpus; the word distribution is Zipfian"""
+    print("=== TESTING CORPUS GENERATOR ===")
+
+    assert parse_size('1M') == 1_000_000
+    assert parse_size('250k') == 250_000
+    assert parse_size('100M') == 100_000_000
+
+    with tempfile.TemporaryDirectory() as tmp:
+        first = generate_corpus(Path(tmp) / 'a', '20k', seed=7, document_words=4000)
+        second = generate_corpus(Path(tmp) / 'b', '20k', seed=7, document_words=4000)
+        assert first['documents'] == second['documents'] == 5
+        for path in sorted((Path(tmp) / 'a').glob('doc_*.txt')):
+            assert path.read_bytes() == (Path(tmp) / 'b' / path.name).read_bytes()
+
+        # An existing corpus with the same parameters is reused
+        mtime = (Path(tmp) / 'a' / 'doc_000001.txt').stat().st_mtime_ns
+        again = generate_corpus(Path(tmp) / 'a', '20k', seed=7, document_words=4000)
+        assert again['probe_words'] == first['probe_words']
+        assert (Path(tmp) / 'a' / 'doc_000001.txt').stat().st_mtime_ns == mtime
+
+        text = ' '.join(path.read_text(encoding='utf-8') for path in (Path(tmp) / 'a').glob('doc_*.txt'))
+        words = re.findall(r'\w+', text.lower())
+        assert abs(len(words) - 20_000) < 200
+        counts = Counter(words)
+        ranked = [n for _, n in counts.most_common()]
+        assert counts.most_common(1)[0][0] == first['probe_words']['high']
+        # Zipf-Mandelbrot: ((10 + 2.7) / (1 + 2.7)) ** 1.07 ~ 3.7 between rank 1 and 10
+        assert 2.5 < ranked[0] / ranked[9] < 6
+        assert sum(1 for n in ranked if n == 1) > len(ranked) / 3
+
+    vocabulary = TurkishLikeVocabulary(5000, seed=1)
+    assert len(set(vocabulary.words)) == 5000
+    assert any(any(c in word for c in 'çğıöşü') for word in vocabulary.words[:200])
+
+    print(">> Corpus generator: PASS")
+
+
+def test_compare_results():
+    """Slowdowns above the tolerance are regressions; tiny timings are ignored"""
+    print("=== TESTING BASELINE COMPARISON ===")
+
+    baseline = {'results': {
+        'kwic.high': {'seconds': 0.100},
+        'frequency.norm': {'seconds': 0.200},
+        'cql.single': {'seconds': 0.001},
+        'ingest.stanza': {'skipped': 'not installed'},
+    }}
+    current = {'results': {
+        'kwic.high': {'seconds': 0.150},
+        'frequency.norm': {'seconds': 0.210},
+        'cql.single': {'seconds': 0.004},
+        'ingest.stanza': {'seconds': 10.0},
+        'word_sketch': {'seconds': 1.0},
+    }}
+    regressions = compare_results(current, baseline, tolerance=0.25)
+    assert [r['name'] for r in regressions] == ['kwic.high']
+    assert regressions[0]['ratio'] == 1.5
+    assert compare_results(current, baseline, tolerance=0.6) == []
+
+    print(">> Baseline comparison: PASS")
+
+
+def test_suite_run():
+    """A small end-to-end run produces results for every benchmark"""
+    print("=== TESTING BENCHMARK SUITE ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        document = run_suite('20k', backends=('simple',), repeats=1, work_dir=Path(tmp))
+        results = document['results']
+        assert results['ingest.simple']['documents'] == 4
+        assert results['ingest.simple']['tokens'] > 20_000
+        for name in ('kwic.high', 'kwic.mid', 'kwic.low', 'frequency.norm', 'collocation.mid',
+                     'cql.single', 'cql.sequence', 'word_sketch', 'export.conllu', 'export.ndjson'):
+            assert name in results, name
+        assert results['kwic.high']['results'] == 100
+        assert results['kwic.low']['results'] > 0
+        assert results['export.conllu']['tokens'] == results['ingest.simple']['tokens']
+        assert document['corpus']['words'] == 20_000
+        assert document['environment']['sqlite']
+
+        # Results are plain JSON and compare cleanly against themselves
+        document = json.loads(json.dumps(document))
+        assert compare_results(document, document) == []
+
+    print(">> Benchmark suite: PASS")
+
+
+if __name__ == "__main__":
+    test_generator()
+    test_compare_results()
+    test_suite_run()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Test script for sliding-window BERT inference: windowing of long sentences
+and the per-word aggregation of sub-token predictions, with a stub
+tokenizer and a stub model returning fixed logits
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+from nlp.backends import CustomBertBackend
+from nlp.custom_bert_processor import CustomBERTProcessor
+
+N_LABELS = 5
+LABELS = {0: 'AD-NOUN', 1: 'FİİL-VERB', 2: 'SIFAT-ADJECTIVE', 3: 'NOKTALAMA-PUNCTUATION', 4: 'BAĞLAÇ-CCONJ'}
+PIECE = 3
+
+
+class StubEncoding(dict):
+    """The parts of a fast-tokenizer BatchEncoding that _predict uses"""
+
+    def __init__(self, arrays, word_ids):
+        super().__init__(arrays)
+        self._word_ids = word_ids
+
+    def word_ids(self, window):
+        return self._word_ids[window]
+
+
+class StubTokenizer:
+    """
+    WordPiece-like tokenizer: words split into pieces of PIECE characters,
+    truncated into overflowing windows like a Hugging Face fast tokenizer
+    """
+
+    model_max_length = 512
+
+    def __init__(self):
+        self.vocab = {'[PAD]': 0, '[CLS]': 1, '[SEP]': 2}
+
+    def num_special_tokens_to_add(self):
+        return 2
+
+    def subtokens(self, words):
+        """(id, word index, offset start, offset end) of every sub-token"""
+        pieces = []
+        for word_index, word in enumerate(words):
+            for start in range(0, len(word), PIECE):
+                piece = ('##' if start else '') + word[start:start + PIECE]
+                piece_id = self.vocab.setdefault(piece, len(self.vocab))
+                pieces.append((piece_id, word_index, start, min(start + PIECE, len(word))))
+        return pieces
+
+    def __call__(self, words, is_split_into_words=True, return_tensors="np", truncation=True,
+                 max_length=512, stride=0, return_overflowing_tokens=True,
+                 return_offsets_mapping=True, padding=True):
+        assert is_split_into_words and return_tensors == "np"
+        # A list of word lists is a batch of sentences
+        batch = words if words and isinstance(words[0], list) else [words]
+        content = max_length - 2
+        windows, samples = [], []
+        for sample, sentence in enumerate(batch):
+            pieces, start = self.subtokens(sentence), 0
+            while True:
+                windows.append(pieces[start:start + content])
+                samples.append(sample)
+                if start + content >= len(pieces):
+                    break
+                start += content - stride
+
+        length = max(len(window) for window in windows) + 2
+        ids = np.zeros((len(windows), length), dtype=np.int64)
+        mask = np.zeros_like(ids)
+        offsets = np.zeros((len(windows), length, 2), dtype=np.int64)
+        word_ids = []
+        for i, window in enumerate(windows):
+            ids[i, :len(window) + 2] = [1] + [p[0] for p in window] + [2]
+            mask[i, :len(window) + 2] = 1
+            offsets[i, 1:len(window) + 1] = [(p[2], p[3]) for p in window]
+            word_ids.append([None] + [p[1] for p in window] + [None] * (length - len(window) - 1))
+        return StubEncoding({'input_ids': ids, 'attention_mask': mask, 'offset_mapping': offsets,
+                             'overflow_to_sample_mapping': np.asarray(samples, dtype=np.int64)},
+                            word_ids)
+
+
+class Named:
+    def __init__(self, name):
+        self.name = name
+
+
+class StubSession:
+    """
+    ONNX Runtime session stand-in with fixed logits per sub-token id; with
+    `contextual` the logits also depend on the position in the window, as a
+    real model's do
+    """
+
+    def __init__(self, contextual=False):
+        self.contextual = contextual
+        self.calls = []
+
+    def get_inputs(self):
+        return [Named('input_ids'), Named('attention_mask')]
+
+    def run(self, outputs, feed):
+        ids = feed['input_ids']
+        self.calls.append(ids.shape[0])
+        positions = np.arange(ids.shape[1])[None, :] if self.contextual else 0
+        labels = np.arange(N_LABELS)[None, None, :]
+        key = (ids * 7 + positions * 3)[..., None]
+        return [np.cos(key * (labels + 1) * 0.37) * 3.0]
+
+
+def make_processor(window_size, window_stride, contextual=False, window_batch_size=16):
+    """A processor with the stubs in place of the tokenizer and the model"""
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = CustomBERTProcessor(model_path=os.path.join(tmp, "none"), allow_download=False,
+                                        window_size=window_size, window_stride=window_stride,
+                                        window_batch_size=window_batch_size)
+    processor.tokenizer = StubTokenizer()
+    processor.model = type('Model', (), {'config': type('Config', (), {'max_position_embeddings': 512,
+                                                                       'id2label': LABELS})})()
+    processor._configure_windows()
+    processor.onnx_session = StubSession(contextual)
+    processor.nlp_pipeline = None
+    processor.is_loaded = True
+    return processor
+
+
+def probabilities(processor, ids):
+    """Softmax of the stub logits for one window of ids"""
+    logits = processor.onnx_session.run(['logits'], {'input_ids': np.asarray([ids])})[0][0]
+    exp = np.exp(logits - logits.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+def old_loop(word_ids, predictions, confidences, n_words):
+    """The per-sub-token loop used before vectorization (one window)"""
+    labels = [None] * n_words
+    sums = [0.0] * n_words
+    counts = [0] * n_words
+    for word_id, prediction, confidence in zip(word_ids, predictions, confidences):
+        if word_id is None:
+            continue
+        if labels[word_id] is None:
+            labels[word_id] = prediction
+        sums[word_id] += confidence
+        counts[word_id] += 1
+    return labels, [s / c if c else 0.0 for s, c in zip(sums, counts)]
+
+
+def reference_windows(processor, words):
+    """
+    Windowed prediction by loops: every window is aggregated like the old loop,
+    and a word takes the window holding its first sub-token, then the one with
+    the highest mean confidence (earliest on ties)
+    """
+    encoding = processor.tokenizer(words, max_length=processor.window_size,
+                                   stride=processor._window_overlap)
+    best = [(-1.0, None, 0.0)] * len(words)
+    for window in range(len(encoding['input_ids'])):
+        probs = probabilities(processor, encoding['input_ids'][window])
+        word_ids = encoding.word_ids(window)
+        labels, means = old_loop(word_ids, probs.argmax(axis=-1).tolist(), probs.max(axis=-1).tolist(),
+                                 len(words))
+        offsets = encoding['offset_mapping'][window][:, 0]
+        for word in range(len(words)):
+            if word not in word_ids:
+                continue
+            first = word_ids.index(word)
+            score = (2.0 if offsets[first] == 0 else 0.0) + means[word]
+            if score > best[word][0]:
+                best[word] = (score, labels[word], means[word])
+    return [label for _, label, _ in best], [mean for _, _, mean in best]
+
+
+def assert_same(actual, expected):
+    labels, confidences = actual
+    assert labels == expected[0], (labels, expected[0])
+    assert np.allclose(confidences, expected[1], atol=1e-12), (confidences, expected[1])
+
+
+SHORT = ["Ev", "çok", "güzel", "."]
+LONG = ("Öğretmenlerimizden biri dün akşam kütüphaneye giderken yağmura yakalandı ve "
+        "ıslanmış kitaplarını kurutmak için saatlerce uğraştı .").split() * 3
+
+
+def test_single_window():
+    """A sentence within one window: the vectorized aggregation equals the old loop"""
+    print("=== TESTING SINGLE WINDOW ===")
+
+    processor = make_processor(512, None, contextual=True)
+    for words in (SHORT, LONG[:12], ["a"], ["çalışkanlıklarından"]):
+        encoding = processor.tokenizer(words, max_length=512)
+        probs = probabilities(processor, encoding['input_ids'][0])
+        expected = old_loop(encoding.word_ids(0), probs.argmax(axis=-1).tolist(),
+                            probs.max(axis=-1).tolist(), len(words))
+        assert_same(processor._predict(words), expected)
+        assert processor.onnx_session.calls[-1] == 1
+    print(">> Single window: PASS")
+
+
+def test_windows():
+    """Long sentences over strided windows, words split across window boundaries"""
+    print("=== TESTING STRIDED WINDOWS ===")
+
+    for window_size, stride, batch_size in ((12, None, 16), (12, 4, 2), (16, 14, 3), (9, 7, 1), (40, 13, 4)):
+        processor = make_processor(window_size, stride, contextual=True, window_batch_size=batch_size)
+        content = window_size - 2
+        encoding = processor.tokenizer(LONG, max_length=processor.window_size,
+                                       stride=processor._window_overlap)
+        n_windows = len(encoding['input_ids'])
+        assert n_windows > 1
+        # Consecutive windows overlap by content - stride sub-tokens
+        assert processor._window_overlap == content - processor.window_stride
+        # Some word is cut by a window boundary
+        starts = [encoding['offset_mapping'][w][1, 0] for w in range(1, n_windows)]
+        assert any(start > 0 for start in starts), (window_size, stride)
+
+        labels, confidences = processor._predict(LONG)
+        assert sum(processor.onnx_session.calls) == n_windows
+        assert max(processor.onnx_session.calls) <= batch_size
+        assert all(label is not None for label in labels)
+        assert_same((labels, confidences), reference_windows(processor, LONG))
+    print(">> Strided windows: PASS")
+
+    # A context-free model labels every word as a single window would: the
+    # label always comes from the word's first sub-token
+    whole = make_processor(512, None)
+    expected_labels = whole._predict(LONG)[0]
+    for window_size, stride in ((6, 1), (6, 3), (12, None), (16, 14)):
+        processor = make_processor(window_size, stride)
+        assert processor._predict(LONG)[0] == expected_labels, (window_size, stride)
+    print(">> Windows agree with one window: PASS")
+
+
+def test_word_longer_than_stride():
+    """A word split over more sub-tokens than the stride keeps its first-piece label"""
+    print("=== TESTING SPLIT WORDS ===")
+
+    words = ["ev", "çalışkanlaştırılamayanlardan", "mı", "sınız", "?"] * 2
+    whole = make_processor(512, None)
+    for window_size, stride in ((6, 1), (7, 2), (8, 3)):
+        processor = make_processor(window_size, stride, contextual=True)
+        assert_same(processor._predict(words), reference_windows(processor, words))
+        context_free = make_processor(window_size, stride)
+        assert context_free._predict(words)[0] == whole._predict(words)[0]
+    print(">> Split words: PASS")
+
+
+def test_batched_backend():
+    """CustomBertBackend.annotate runs sentences through the model together"""
+    print("=== TESTING BATCHED BACKEND ===")
+
+    sentences = ["Ev çok güzel.", "", " ".join(LONG), "Ali eve döndü, kapıyı açtı ve oturdu.",
+                 "Kitap masada.", "Öğretmenlerimizden biri çalışkanlıklarından söz etti!"]
+    for window_size, stride, batch_size in ((512, None, 16), (12, 4, 2), (16, 14, 3)):
+        backend = CustomBertBackend()
+        backend.batch_size = 4
+        backend.bert = make_processor(window_size, stride, contextual=True, window_batch_size=batch_size)
+        expected = [backend.annotate_sentence(sentence) for sentence in sentences]
+        single_calls = backend.bert.onnx_session.calls
+        backend.bert.onnx_session.calls = []
+
+        annotated = list(backend.annotate(iter(sentences)))
+        assert annotated == expected
+        assert not any(getattr(tokens, 'fallback', False) for tokens in annotated)
+        assert [token.word for token in annotated[0]] == ["Ev", "çok", "güzel", "."]
+        assert annotated[0][-1].upos == 'PUNCT' and annotated[1] == []
+        assert all(0.0 < token.bert_confidence <= 1.0 for tokens in annotated for token in tokens)
+        # The same windows in no more model calls: one per 4 sentences when they fit a window
+        calls = backend.bert.onnx_session.calls
+        assert sum(calls) == sum(single_calls) and len(calls) <= len(single_calls)
+        assert max(calls) <= batch_size
+        assert window_size < 512 or calls == [3, 2]
+    print(">> Same tokens as sentence by sentence: PASS")
+
+    # A model failure falls back to rule-based tokens for the batch
+    backend.bert.onnx_session = None
+    annotated = list(backend.annotate(sentences[:2]))
+    assert getattr(annotated[0], 'fallback', False) and annotated[0][0].upos is None
+    assert [token.word for token in annotated[0]] == ["Ev", "çok", "güzel", "."]
+    print(">> Fallback on model errors: PASS")
+
+
+if __name__ == "__main__":
+    test_single_window()
+    test_windows()
+    test_word_longer_than_stride()
+    test_batched_backend()
+    print("\n=== TEST COMPLETE ===")
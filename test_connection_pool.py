@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Test script for the corpus connection pool
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+import threading
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.connection_pool import CorpusConnectionPool, get_connection_pool, run_concurrency_benchmark
+from query.corpus_query import CorpusQuery
+
+
+def test_readers_are_thread_local_and_read_only():
+    """Each thread gets its own read-only connection"""
+    print("=== TESTING POOL READERS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "pool.db")
+        pool = CorpusConnectionPool(db_path, create=True)
+
+        main_conn = pool.reader()
+        assert pool.reader() is main_conn
+
+        other = {}
+        def worker():
+            other['conn'] = pool.reader()
+            pool.release_reader()
+        t = threading.Thread(target=worker)
+        t.start()
+        t.join()
+        assert other['conn'] is not main_conn
+
+        try:
+            main_conn.execute("DELETE FROM tokens")
+            assert False, "reader connection should be read-only"
+        except sqlite3.OperationalError:
+            pass
+
+        mode = main_conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode.lower() == 'wal'
+        pool.close()
+
+    print(">> Pool readers: PASS")
+
+
+def test_writer_and_pooled_query():
+    """Writes through the writer are visible to pooled CorpusQuery readers"""
+    print("\n=== TESTING POOL WRITER ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "pool.db")
+        pool = CorpusConnectionPool(db_path, create=True)
+
+        with pool.writer() as conn:
+            cur = conn.cursor()
+            cur.execute("INSERT INTO documents (doc_name) VALUES ('d1')")
+            doc_id = cur.lastrowid
+            cur.execute("""
+                INSERT INTO sentences (doc_id, sent_number, sent_text, token_start, token_end)
+                VALUES (?, 1, 'ev güzel', 0, 2)
+            """, (doc_id,))
+            sent_id = cur.lastrowid
+            cur.executemany("""
+                INSERT INTO tokens (doc_id, sent_id, token_number, form, norm, start_char, end_char)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, [(doc_id, sent_id, 0, 'ev', 'ev', 0, 2),
+                  (doc_id, sent_id, 1, 'güzel', 'güzel', 3, 8)])
+
+        query = CorpusQuery(db_path, pool=pool)
+        freq = query.frequency_list()
+        query.close()
+        assert {row['word'] for row in freq} == {'ev', 'güzel'}
+
+        # Closing a pooled query keeps the connection available
+        assert pool.reader().execute("SELECT COUNT(*) FROM tokens").fetchone()[0] == 2
+        pool.close()
+
+    print(">> Pool writer: PASS")
+
+
+def test_missing_database_and_finished_threads():
+    """Missing databases are not created; readers of finished threads are closed"""
+    print("\n=== TESTING POOL LIFETIME ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "pool.db")
+        for open_pool in (lambda: CorpusConnectionPool(db_path), lambda: get_connection_pool(db_path)):
+            try:
+                open_pool()
+                assert False, "a missing database should not be created"
+            except FileNotFoundError:
+                pass
+        assert not os.path.exists(db_path)
+
+        pool = CorpusConnectionPool(db_path, create=True)
+        connections = []
+        def worker():
+            connections.append(pool.reader())
+        for _ in range(5):
+            t = threading.Thread(target=worker)
+            t.start()
+            t.join()
+            # The finished worker's reader is closed when the next one opens
+            assert pool.get_pool_info()['open_readers'] == 0
+        try:
+            connections[0].execute("SELECT 1")
+            assert False, "reader of a finished thread should be closed"
+        except sqlite3.ProgrammingError:
+            pass
+        pool.reader()
+        assert pool.get_pool_info()['open_readers'] == 1
+        pool.close()
+
+    print(">> Pool lifetime: PASS")
+
+
+def test_benchmark_leaves_corpus_alone():
+    """The concurrency benchmark runs on a scratch copy, not on the corpus"""
+    print("\n=== TESTING BENCHMARK ===")
+
+    results = run_concurrency_benchmark(None, n_readers=2, duration=0.2, write_batch=50)
+    assert results['reads'] > 0 and results['writes_tokens'] > 0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "corpus.db")
+        pool = CorpusConnectionPool(db_path, create=True)
+        with pool.writer() as conn:
+            conn.execute("INSERT INTO documents (doc_name) VALUES ('d1')")
+        pool.close()
+        with open(db_path, 'rb') as f:
+            before = f.read()
+
+        results = run_concurrency_benchmark(db_path, n_readers=2, duration=0.2, write_batch=50)
+        assert results['writes_tokens'] > 0
+        with open(db_path, 'rb') as f:
+            assert f.read() == before
+        conn = sqlite3.connect(db_path)
+        assert conn.execute("SELECT doc_name FROM documents").fetchall() == [('d1',)]
+        conn.close()
+
+    print(">> Benchmark on a scratch copy: PASS")
+
+
+if __name__ == "__main__":
+    test_readers_are_thread_local_and_read_only()
+    test_writer_and_pooled_query()
+    test_missing_database_and_finished_threads()
+    test_benchmark_leaves_corpus_alone()
+    print("\n=== TEST COMPLETE ===")
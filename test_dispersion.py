@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Test script for dispersion statistics: range, Juilland's D, Gries' DP and
+ARF over the whole vocabulary, computed by the first lookup and stored, and
+combined over the shards of a sharded corpus
+"""
+
+import sys
+import os
+import math
+import random
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import numpy as np
+
+import ingestion.corpus_ingestor as corpus_ingestor
+from analysis.dispersion import DispersionAnalyzer, dispersion_measures
+from database.connection_pool import CorpusConnectionPool
+from database.sharding import ShardedCorpus
+from ingestion.corpus_ingestor import CorpusIngestor
+from ingestion.sharded_ingestor import ShardedCorpusIngestor
+from query.corpus_query import CorpusQuery
+from query.sharded_query import ShardedCorpusQuery
+
+TEXTS = [
+    "Ev büyük ve güzel. Ev çok sıcak ve ev temiz.\n",
+    "Kitap masada ve kalem yanında. Ali kitap okudu.\n",
+    "Hava güzel ve güneşli. Çocuklar parkta oynadı ve güldü.\n",
+    "Deniz mavi ve sakin. Ev denize yakın.\n",
+]
+
+
+def reference_measures(types, docs, word):
+    """The measures of one word, straight from their definitions"""
+    total = len(types)
+    parts = sorted(set(docs))
+    sizes = {d: docs.count(d) for d in parts}
+    counts = {d: sum(1 for t, dd in zip(types, docs) if t == word and dd == d) for d in parts}
+    f = sum(counts.values())
+    n = len(parts)
+
+    relative = [counts[d] / sizes[d] for d in parts]
+    mean = sum(relative) / n
+    sd = math.sqrt(sum((r - mean) ** 2 for r in relative) / n)
+    d = 1 - sd / mean / math.sqrt(n - 1)
+
+    shares = {p: sizes[p] / total for p in parts}
+    dp = 0.5 * sum(abs(counts[p] / f - shares[p]) for p in parts)
+    dp_norm = dp / (1 - min(shares.values()))
+
+    positions = [i for i, t in enumerate(types) if t == word]
+    segment = total / f
+    distances = [positions[0] + total - positions[-1]] + \
+        [b - a for a, b in zip(positions, positions[1:])]
+    arf = sum(min(x, segment) for x in distances) / segment
+
+    return {'frequency': f, 'range': sum(1 for c in counts.values() if c), 'juilland_d': d,
+            'dp': dp, 'dp_norm': dp_norm, 'arf': arf}
+
+
+def test_measures():
+    """Vectorized measures equal the textbook definitions"""
+    print("=== TESTING DISPERSION MEASURES ===")
+
+    rng = random.Random(7)
+    types, docs = [], []
+    for doc in range(12):
+        for _ in range(rng.randint(5, 60)):
+            # Zipf-like types; -1 counts towards the size but has no type
+            types.append(-1 if rng.random() < 0.05 else min(int(rng.paretovariate(1.2)) - 1, 29))
+            docs.append(doc * 3 + 10)
+    measures = dispersion_measures(np.array(types), np.array(docs), 30)
+
+    for word in range(30):
+        if word not in types:
+            assert measures['frequency'][word] == 0
+            continue
+        expected = reference_measures(types, docs, word)
+        for name, value in expected.items():
+            assert abs(measures[name][word] - value) < 1e-9, (word, name, measures[name][word], value)
+    print(">> Against the definitions: PASS")
+
+    # Hand-checkable cases: four documents of 4 tokens
+    types = [0, 1, 2, 3,  0, 1, 2, 3,  0, 1, 2, 3,  0, 1, 1, 1]
+    docs = [1] * 4 + [2] * 4 + [3] * 4 + [4] * 4
+    m = dispersion_measures(np.array(types), np.array(docs), 4)
+    # 0: once per document, evenly spaced
+    assert m['range'][0] == 4 and abs(m['juilland_d'][0] - 1) < 1e-12 and abs(m['dp'][0]) < 1e-12
+    assert abs(m['arf'][0] - 4) < 1e-12
+    # 1: clumped at the end
+    assert m['dp'][1] > 0 and m['arf'][1] < m['frequency'][1]
+    # 3: absent from the last document
+    assert m['range'][3] == 3 and abs(m['dp'][3] - 0.25) < 1e-12 and abs(m['dp_norm'][3] - 1 / 3) < 1e-12
+    one = dispersion_measures(np.array([0, 1, 1]), np.array([5, 5, 5]), 2)
+    assert np.isnan(one['juilland_d'][0]) and one['arf'][0] == 1.0
+    print(">> Known values: PASS")
+
+
+def test_stored_dispersion():
+    """The first lookup computes and stores the measures; later ones look them up"""
+    print("=== TESTING STORED DISPERSION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = Path(tmp) / "docs"
+        docs.mkdir()
+        for i, text in enumerate(TEXTS):
+            (docs / f"doc{i}.txt").write_text(text, encoding="utf-8")
+        db_path = os.path.join(tmp, "corpus.db")
+        ingestor = CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False)
+        ingestor.ingest_directory(str(docs))
+
+        query = CorpusQuery(db_path)
+        # Not computed at ingestion (DISPERSION_AFTER_INGESTION is off)
+        assert DispersionAnalyzer(query.conn).status('norm') is None
+        status = query._dispersion_analyzer('norm').status('norm')
+        assert status['doc_count'] == 4 and not status['stale']
+        assert status['token_count'] == query.conn.execute(
+            "SELECT COUNT(*) FROM tokens WHERE is_punctuation = 0").fetchone()[0]
+
+        # Recomputing from scratch in Python gives the stored values
+        rows = query.conn.execute(
+            "SELECT norm, doc_id FROM tokens WHERE is_punctuation = 0 ORDER BY token_id").fetchall()
+        types, doc_ids = [r[0] for r in rows], [r[1] for r in rows]
+        for word in ('ev', 've', 'kitap', 'deniz'):
+            expected = reference_measures(types, doc_ids, word)
+            stored = query.dispersion(word)
+            for name, value in expected.items():
+                assert abs(stored[name] - value) < 1e-9, (word, name)
+        assert query.dispersion('yok') is None
+        print(">> Computed on the first lookup: PASS")
+
+        frequencies = query.frequency_list(dispersion=True)
+        ve = next(f for f in frequencies if f['word'] == 've')
+        assert ve['range'] == 4 and ve['dp'] == query.dispersion('ve')['dp']
+        assert 'dp' not in query.frequency_list()[0]
+        ranking = query.dispersion_ranking('dp', min_freq=2)
+        assert ranking[0]['word'] == 've'
+        assert [r['dp'] for r in ranking] == sorted(r['dp'] for r in ranking)
+        assert query.dispersion_ranking('range', min_freq=1, limit=1, descending=True)[0]['word'] == 've'
+        for call in (lambda: query.dispersion_ranking('entropy'),
+                     lambda: query.dispersion('ev', word_type='upos'),
+                     lambda: query.frequency_list(dispersion=True, subcorpus='x')):
+            try:
+                call()
+                assert False
+            except ValueError:
+                pass
+        print(">> Lookups: PASS")
+
+        # A new document makes the measures stale until the next lookup
+        (docs / "doc9.txt").write_text("Ev ev ev ev ev.\n", encoding="utf-8")
+        ingestor.ingest_file(docs / "doc9.txt")
+        assert DispersionAnalyzer(query.conn).status('norm')['stale']
+        assert query.dispersion('ev')['frequency'] == 9
+        status = DispersionAnalyzer(query.conn).status('norm')
+        assert not status['stale'] and status['doc_count'] == 5
+
+        # Pooled (read-only) connections compute through the pool's writer
+        (docs / "doc8.txt").write_text("Ev yine ev.\n", encoding="utf-8")
+        ingestor.ingest_file(docs / "doc8.txt")
+        pool = CorpusConnectionPool(db_path)
+        pooled = CorpusQuery(db_path, pool=pool)
+        assert pooled.dispersion('ev')['frequency'] == 11
+        assert not DispersionAnalyzer(query.conn).status('norm')['stale']
+        pooled.close()
+        pool.close()
+        print(">> Recomputed when stale: PASS")
+
+        # With DISPERSION_AFTER_INGESTION, ingestion runs refresh every computed word type
+        query.compute_dispersion('lemma')
+        (docs / "doc7.txt").write_text("Deniz ve ev.\n", encoding="utf-8")
+        corpus_ingestor.DISPERSION_AFTER_INGESTION = True
+        try:
+            ingestor.ingest_directory(str(docs))
+        finally:
+            corpus_ingestor.DISPERSION_AFTER_INGESTION = False
+        runs = DispersionAnalyzer(query.conn).runs()
+        assert [r['word_type'] for r in runs] == ['lemma', 'norm']
+        assert not any(r['stale'] for r in runs) and runs[1]['doc_count'] == 7
+        ingestor.close()
+        query.close()
+
+    print(">> Refreshed by ingestion: PASS")
+
+
+def test_sharded_dispersion():
+    """Sharded corpora combine the shards' partial measures exactly"""
+    print("=== TESTING SHARDED DISPERSION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = Path(tmp) / "docs"
+        docs.mkdir()
+        rng = random.Random(11)
+        vocabulary = "ev okul kitap deniz hava ve bir güzel yol su kalem masa çocuk".split()
+        for i in range(14):
+            words = [vocabulary[min(int(rng.paretovariate(1.1)) - 1, len(vocabulary) - 1)]
+                     for _ in range(rng.randint(3, 40))]
+            (docs / f"doc{i:02d}.txt").write_text(" ".join(words).capitalize() + ".\n", encoding="utf-8")
+        db_path = os.path.join(tmp, "corpus.db")
+        CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False).ingest_directory(str(docs))
+        corpus = ShardedCorpus.create(Path(tmp) / "shards", 3)
+        ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False,
+                              workers=0).ingest_directory(str(docs))
+
+        # Corpus order of a sharded corpus: the shards' tokens in shard (doc_id) order
+        types, doc_ids = [], []
+        for path in corpus.shard_paths:
+            shard = CorpusQuery(str(path))
+            rows = shard.conn.execute(
+                "SELECT norm, doc_id FROM tokens WHERE is_punctuation = 0 ORDER BY token_id").fetchall()
+            assert rows
+            types.extend(r[0] for r in rows)
+            doc_ids.extend(r[1] for r in rows)
+            shard.close()
+
+        single = CorpusQuery(db_path)
+        sharded = ShardedCorpusQuery(corpus, workers=0)
+        run = sharded.compute_dispersion()
+        assert run['doc_count'] == 14 and run['token_count'] == len(types) and not run['stale']
+        for word in set(types):
+            expected = reference_measures(types, doc_ids, word)
+            measures = sharded.dispersion(word)
+            for name, value in expected.items():
+                assert abs(measures[name] - value) < 1e-9, (word, name, measures[name], value)
+            # Everything but ARF is independent of the document order
+            stored = single.dispersion(word)
+            for name in ('frequency', 'range', 'juilland_d', 'dp', 'dp_norm'):
+                assert abs(measures[name] - stored[name]) < 1e-9, (word, name)
+        assert sharded.dispersion('yok') is None
+        print(">> Against the definitions: PASS")
+
+        ranking = sharded.dispersion_ranking('juilland_d', min_freq=2, limit=-1, descending=True)
+        assert [r['word'] for r in ranking] == [r['word'] for r in single.dispersion_ranking(
+            'juilland_d', min_freq=2, limit=-1, descending=True)]
+        listed = sharded.frequency_list(dispersion=True)
+        assert all(entry['dp'] == sharded.dispersion(entry['word'])['dp'] for entry in listed)
+        for call in (lambda: sharded.dispersion_ranking('entropy'),
+                     lambda: sharded.dispersion('ev', word_type='upos'),
+                     lambda: sharded.frequency_list(dispersion=True, subcorpus='x')):
+            try:
+                call()
+                assert False
+            except ValueError:
+                pass
+        print(">> Rankings and frequency lists: PASS")
+
+        # Kept until a shard changes
+        computed_at = sharded._dispersion['norm']
+        sharded.dispersion('ev')
+        assert sharded._dispersion['norm'] is computed_at
+        (docs / "doc99.txt").write_text("Ev ev ev.\n", encoding="utf-8")
+        ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False,
+                              workers=0).ingest_directory(str(docs))
+        assert sharded.dispersion('ev')['frequency'] == types.count('ev') + 3
+        assert sharded._dispersion['norm'][1]['doc_count'] == 15
+        sharded.close()
+        single.close()
+
+    print(">> Recomputed when shards change: PASS")
+
+
+if __name__ == "__main__":
+    test_measures()
+    test_stored_dispersion()
+    test_sharded_dispersion()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Test script for document metadata: extraction from JSON/XML during
+ingestion, stored facet counts, faceted filtering and per-facet frequencies
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.sharding import ShardedCorpus
+from ingestion.corpus_ingestor import CorpusIngestor
+from ingestion.sharded_ingestor import ShardedCorpusIngestor
+from ingestion.metadata import MetadataCollector
+from ingestion.streaming_readers import iter_json_strings, iter_xml_strings
+from query.corpus_query import CorpusQuery
+from query.sharded_query import ShardedCorpusQuery
+
+JSON_DOCS = [
+    {"author": "Ayşe Yılmaz", "year": 2019, "genre": "haber", "tags": ["ekonomi", "siyaset"],
+     "text": "Ekonomi büyüdü. Ev fiyatları arttı ve ekonomi canlandı."},
+    {"metadata": {"author": "Mehmet Kaya", "year": 2021, "genre": "haber", "tags": ["ekonomi"]},
+     "paragraphs": ["Seçim sonuçları açıklandı.", "Ekonomi gündemdeydi."]},
+    {"author": "Ayşe Yılmaz", "year": 2022, "genre": "köşe yazısı", "draft": False,
+     "text": "Bu hafta ev kiraları konuşuldu. Ev sahipleri memnun."},
+]
+XML_DOCS = [
+    '<doc genre="roman" year="2005"><author>Orhan Demir</author><title>Deniz</title>'
+    '<body><p>Ali eve döndü.</p><p>Ev sessiz ve karanlıktı.</p></body></doc>',
+    '<doc genre="roman" year="2010"><author>Elif Şahin</author>'
+    '<body><p>Ayşe pencereden baktı. Deniz çok güzeldi ve ev uzaktaydı.</p></body></doc>',
+]
+
+
+def write_docs(directory):
+    directory.mkdir()
+    for i, doc in enumerate(JSON_DOCS):
+        (directory / f"doc{i}.json").write_text(json.dumps(doc, ensure_ascii=False), encoding="utf-8")
+    for i, doc in enumerate(XML_DOCS):
+        (directory / f"roman{i}.xml").write_text(doc, encoding="utf-8")
+    (directory / "notlar.txt").write_text("Ev ve ekonomi üzerine notlar.\n", encoding="utf-8")
+    return directory
+
+
+def ingest(docs, db_path, **kwargs):
+    ingestor = CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False)
+    stats = ingestor.ingest_directory(str(docs), **kwargs)
+    ingestor.close()
+    return stats
+
+
+def scanned_facets(query, key):
+    """Facet counts computed from scratch"""
+    return {row[0]: (row[1], row[2]) for row in query.conn.execute("""
+        SELECT m.value, COUNT(*), SUM(d.token_count) FROM document_metadata m
+        JOIN documents d ON d.doc_id = m.doc_id WHERE m.key = ? GROUP BY m.value
+    """, (key,))}
+
+
+def test_extraction():
+    """Readers collect metadata without changing the extracted text"""
+    print("=== TESTING METADATA EXTRACTION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = write_docs(Path(tmp) / "docs")
+        collector = MetadataCollector(['author', 'year', 'genre', 'tags', 'draft'])
+        text = list(iter_json_strings(docs / "doc1.json", metadata=collector))
+        assert text == list(iter_json_strings(docs / "doc1.json"))
+        assert collector.values == {'author': [('Mehmet Kaya', None)], 'year': [('2021', 2021.0)],
+                                    'genre': [('haber', None)], 'tags': [('ekonomi', None)]}
+
+        collector = MetadataCollector(['draft', 'text'])
+        list(iter_json_strings(docs / "doc2.json", metadata=collector))
+        assert collector.values['draft'] == [('false', None)]
+        # Long values are text, not metadata
+        collector.offer('TEXT', 'uzun ' * 100)
+        assert len(collector.values['text']) == 1
+
+        collector = MetadataCollector(['Author', 'year', 'genre', 'title', 'p'])
+        text = list(iter_xml_strings(docs / "roman0.xml", collector))
+        assert text == list(iter_xml_strings(docs / "roman0.xml"))
+        assert collector.values['Author'] == [('Orhan Demir', None)]
+        assert collector.values['year'] == [('2005', 2005.0)]
+        assert collector.values['p'] == [('Ali eve döndü.', None), ('Ev sessiz ve karanlıktı.', None)]
+
+    print(">> Readers: PASS")
+
+
+def test_facets_and_filters():
+    """Stored facet counts, filters, subcorpora and per-facet frequencies"""
+    print("=== TESTING FACETS AND FILTERS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = write_docs(Path(tmp) / "docs")
+        db_path = os.path.join(tmp, "corpus.db")
+        ingest(docs, db_path)
+        query = CorpusQuery(db_path)
+
+        assert query.metadata_keys() == {'author': 4, 'genre': 3, 'tags': 2, 'title': 1, 'year': 5}
+        for key in query.metadata_keys():
+            stored = {r['value']: (r['doc_count'], r['token_count']) for r in query.facet_counts(key)}
+            assert stored == scanned_facets(query, key), key
+        genres = query.facet_counts('genre')
+        assert [(r['value'], r['doc_count']) for r in genres] == [('haber', 2), ('roman', 2), ('köşe yazısı', 1)]
+        assert len(query.facet_counts('genre', limit=1)) == 1
+        print(">> Stored facet counts: PASS")
+
+        def names(filters, **kwargs):
+            return [d['doc_name'] for d in query.filter_documents(filters, **kwargs)]
+
+        assert names({'genre': 'haber'}) == ['doc0.json', 'doc1.json']
+        assert names({'year': {'min': 2006, 'max': 2021}}) == ['doc0.json', 'doc1.json', 'roman1.xml']
+        assert names({'year': [2005, 2022]}) == ['doc2.json', 'roman0.xml']
+        assert names({'tags': 'ekonomi', 'author': {'not': 'Mehmet*'}}) == ['doc0.json']
+        assert names({'genre': None}) == ['notlar.txt']
+        assert names({'genre': {'not': 'roman'}}) == ['doc0.json', 'doc1.json', 'doc2.json', 'notlar.txt']
+        assert names({'genre': 'roman', 'doc_name': 'roman1*'}) == ['roman1.xml']
+        assert names({}, limit=2) == ['doc0.json', 'doc1.json']
+        first = query.filter_documents({'author': 'Ayşe Yılmaz'})[0]
+        assert first['metadata'] == {'author': ['Ayşe Yılmaz'], 'genre': ['haber'],
+                                     'tags': ['ekonomi', 'siyaset'], 'year': ['2019']}
+        for bad in ({'genus': 'haber'}, {'year': {'regex': '20*'}}):
+            try:
+                query.filter_documents(bad)
+                assert False, bad
+            except ValueError:
+                pass
+        # Drill-down: authors among the news documents
+        assert [(r['value'], r['doc_count']) for r in query.facet_counts('author', filters={'genre': 'haber'})] \
+            == [('Ayşe Yılmaz', 1), ('Mehmet Kaya', 1)]
+        print(">> Faceted filtering: PASS")
+
+        news = query.define_subcorpus('haber', {'genre': 'haber'})
+        assert news['doc_count'] == 2
+        assert query.define_subcorpus('yeni', {'year': {'min': 2020}})['doc_count'] == 2
+        assert [r['value'] for r in query.facet_counts('author', subcorpus='haber')] == \
+            ['Ayşe Yılmaz', 'Mehmet Kaya']
+        assert names({'author': 'Ayşe Yılmaz'}, subcorpus='haber') == ['doc0.json']
+        print(">> Metadata in subcorpus definitions: PASS")
+
+        frequencies = query.facet_frequency('ekonomi', 'genre')
+        expected = dict(query.conn.execute("""
+            SELECT m.value, COUNT(*) FROM tokens t JOIN document_metadata m
+            ON m.doc_id = t.doc_id AND m.key = 'genre' WHERE t.norm = 'ekonomi' GROUP BY m.value
+        """).fetchall())
+        assert {r['value']: r['frequency'] for r in frequencies if r['frequency']} == expected
+        assert [r['value'] for r in frequencies][-1] in ('roman', 'köşe yazısı')
+        for r in frequencies:
+            assert abs(r['per_million'] - r['frequency'] * 1e6 / r['token_count']) < 1e-6
+        assert [r['frequency'] for r in query.facet_frequency('ev', 'genre', subcorpus='haber')] == [1]
+        print(">> Per-facet frequencies: PASS")
+
+        # Replacing a document moves its counts to its new values
+        (docs / "doc2.json").write_text(json.dumps(
+            {"author": "Can Öz", "year": 2023, "genre": "haber", "text": "Yeni bir haber yazıldı."},
+            ensure_ascii=False), encoding="utf-8")
+        ingest(docs, db_path, pipeline=True, annotator_workers=0)
+        assert [(r['value'], r['doc_count']) for r in query.facet_counts('genre')] == [('haber', 3), ('roman', 2)]
+        for key in query.metadata_keys():
+            stored = {r['value']: (r['doc_count'], r['token_count']) for r in query.facet_counts(key)}
+            assert stored == scanned_facets(query, key), key
+        assert query.subcorpora.get('haber')['doc_count'] == 3
+        print(">> Facet counts follow re-ingestion: PASS")
+        query.close()
+
+
+def test_sharded_facets():
+    """Facets and filters over shards match a single database"""
+    print("=== TESTING SHARDED FACETS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = write_docs(Path(tmp) / "docs")
+        db_path = os.path.join(tmp, "corpus.db")
+        ingest(docs, db_path)
+        corpus = ShardedCorpus.create(Path(tmp) / "shards", 3)
+        ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False,
+                              workers=0).ingest_directory(str(docs))
+
+        single = CorpusQuery(db_path)
+        sharded = ShardedCorpusQuery(corpus, workers=0)
+        assert sharded.metadata_keys() == single.metadata_keys()
+        for key in single.metadata_keys():
+            assert sharded.facet_counts(key) == single.facet_counts(key)
+        assert sharded.facet_counts('author', filters={'genre': 'haber'}) == \
+            single.facet_counts('author', filters={'genre': 'haber'})
+        assert sharded.facet_frequency('ev', 'year') == single.facet_frequency('ev', 'year')
+        for filters in ({'genre': 'roman'}, {'year': {'min': 2010}}, {'title': 'Deniz'}):
+            assert sorted(d['doc_name'] for d in sharded.filter_documents(filters)) == \
+                sorted(d['doc_name'] for d in single.filter_documents(filters))
+        # 'title' is on one shard only
+        assert sharded.define_subcorpus('baslikli', {'title': '*'})['doc_count'] == 1
+        try:
+            sharded.filter_documents({'genus': 'roman'})
+            assert False
+        except ValueError:
+            pass
+        sharded.close()
+        single.close()
+
+    print(">> Sharded facets: PASS")
+
+
+if __name__ == "__main__":
+    test_extraction()
+    test_facets_and_filters()
+    test_sharded_facets()
+    print("\n=== TEST COMPLETE ===")
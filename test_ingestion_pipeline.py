@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Test script for the staged ingestion pipeline
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion.corpus_ingestor import CorpusIngestor
+
+
+def write_corpus(docs: Path):
+    docs.mkdir()
+    (docs / "a.txt").write_text("Ev çok güzel. Kedi uyuyor.\n\nBugün hava güzel.\n" * 40, encoding="utf-8")
+    (docs / "b.txt").write_text("Ali okula gitti. Ayşe kitap okuyor.\n", encoding="utf-8")
+    (docs / "c.txt").write_text("Ali okula gitti. Ayşe kitap okuyor.\n", encoding="utf-8")
+    (docs / "d.txt").write_text("   \n", encoding="utf-8")
+
+
+def table_rows(ingestor):
+    cursor = ingestor.db.connection.cursor()
+    sentences = cursor.execute(
+        "SELECT doc_id, sent_number, sent_text, token_start, token_end FROM sentences ORDER BY sent_id").fetchall()
+    tokens = cursor.execute(
+        "SELECT doc_id, token_number, form, upos, morph FROM tokens ORDER BY token_id").fetchall()
+    fts = cursor.execute("SELECT COUNT(*) FROM tokens_fts WHERE tokens_fts MATCH 'güzel'").fetchone()[0]
+    return [tuple(row) for row in sentences], [tuple(row) for row in tokens], fts
+
+
+def test_pipeline_matches_sequential():
+    """Pipelined ingestion stores exactly what the sequential path stores"""
+    print("=== TESTING PIPELINED INGESTION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = Path(tmp) / "docs"
+        write_corpus(docs)
+
+        ingestor = CorpusIngestor(os.path.join(tmp, "sequential.db"), nlp_backend='simple')
+        ingestor.ingest_directory(str(docs))
+        expected = table_rows(ingestor)
+        expected_stats = dict(ingestor.stats)
+        ingestor.close()
+
+        for workers in (0, 1):
+            ingestor = CorpusIngestor(os.path.join(tmp, f"pipeline{workers}.db"), nlp_backend='simple')
+            progress = []
+            ingestor.ingest_directory(str(docs), pipeline=True, annotator_workers=workers,
+                                      progress_callback=progress.append)
+            assert table_rows(ingestor) == expected
+            assert ingestor.stats == expected_stats
+            assert ingestor.get_manifest_summary() == {'done': 4}
+
+            stages = ingestor.get_processing_stats()['pipeline_stats']['stages']
+            assert stages['write']['tokens'] == expected_stats['tokens_processed']
+            assert stages['annotate']['tokens'] >= stages['write']['tokens']
+            assert stages['read']['bytes'] > 0
+            assert progress and progress[-1]['files_written'] == 4
+            ingestor.close()
+            print(f">> annotator_workers={workers}: same rows as sequential ingestion: PASS")
+
+
+def test_failed_document_is_skipped():
+    """A document failing in the writer is rolled back; the pipeline moves on"""
+    print("\n=== TESTING PIPELINE ERROR HANDLING ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = Path(tmp) / "docs"
+        write_corpus(docs)
+        ingestor = CorpusIngestor(os.path.join(tmp, "corpus.db"), nlp_backend='simple')
+
+        insert = ingestor._insert_tokens_batch
+        calls = []
+
+        def fail_first(sentences_batch):
+            calls.append(len(sentences_batch))
+            if len(calls) == 1:
+                raise RuntimeError("disk full")
+            insert(sentences_batch)
+
+        ingestor._insert_tokens_batch = fail_first
+        ingestor.ingest_directory(str(docs), pipeline=True, annotator_workers=0, progress_callback=None)
+
+        assert ingestor.stats['errors'] == 1
+        assert ingestor.get_manifest_summary() == {'pending': 1, 'done': 3}
+        names = [row[0] for row in ingestor.db.connection.execute("SELECT doc_name FROM documents")]
+        assert names == ['b.txt']
+        ingestor.close()
+
+    print(">> Failed document rolled back, others ingested: PASS")
+
+
+if __name__ == "__main__":
+    test_pipeline_matches_sequential()
+    test_failed_document_is_skipped()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for the per-stage ingestion profiler and run reports
+"""
+
+import sys
+import os
+import json
+import time
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion.profiler import IngestionProfiler, LatencyHistogram
+from ingestion.corpus_ingestor import CorpusIngestor
+
+
+def test_exclusive_stage_times():
+    """Nested stages are subtracted from the stage that pulls them"""
+    print("=== TESTING STAGE TIMES ===")
+
+    profiler = IngestionProfiler()
+
+    def read():
+        for chunk in ("abc", "defg"):
+            time.sleep(0.05)
+            yield chunk
+
+    chunks = profiler.iterate('read', read(), units=len)
+    for _ in profiler.iterate('annotate', chunks):
+        with profiler.stage('insert', units=10):
+            time.sleep(0.02)
+
+    stages = profiler.get_stats()['stages']
+    assert stages['read']['bytes'] == 7 and stages['read']['calls'] == 3
+    assert stages['read']['wall_seconds'] >= 0.1
+    # annotate only pulled from read: its own time is near zero
+    assert stages['annotate']['wall_seconds'] < 0.02
+    assert stages['insert']['tokens'] == 20
+    assert profiler.get_stats()['latency_ms']['insert']['count'] == 2
+    print(">> Exclusive stage times: PASS")
+
+
+def test_latency_histogram():
+    """Percentiles come from bucket bounds, capped by the maximum"""
+    histogram = LatencyHistogram()
+    for ms in (0.3, 0.4, 3, 4, 40):
+        histogram.record(ms / 1000)
+    summary = histogram.to_dict()
+    assert summary['count'] == 5
+    assert summary['p50_ms'] == 5
+    assert summary['p99_ms'] == 40
+    assert summary['buckets'] == {'<=0.5ms': 2, '<=5ms': 2, '<=50ms': 1}
+    print(">> Latency histogram: PASS")
+
+
+def test_run_report():
+    """Stage profile in get_processing_stats(), JSON report and cProfile output"""
+    print("\n=== TESTING RUN REPORT ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = Path(tmp) / "docs"
+        docs.mkdir()
+        (docs / "a.txt").write_text("Ev çok güzel. Kedi uyuyor.\n\nBugün hava güzel.\n", encoding="utf-8")
+        (docs / "b.txt").write_text("Ali okula gitti.\n", encoding="utf-8")
+        report_path = Path(tmp) / "reports" / "run.json"
+
+        ingestor = CorpusIngestor(os.path.join(tmp, "corpus.db"), nlp_backend='simple',
+                                  code_profiler='cprofile')
+        ingestor.ingest_directory(str(docs), report_path=str(report_path))
+
+        profile = ingestor.get_processing_stats()['profile']
+        assert profile['stages']['insert']['tokens'] == ingestor.stats['tokens_processed']
+        assert profile['stages']['annotate']['tokens'] == ingestor.stats['tokens_processed']
+        assert profile['stages']['split']['sentences'] == ingestor.stats['sentences_processed']
+        assert profile['stages']['read']['bytes'] > 0
+        assert profile['latency_ms']['commit']['count'] == 2
+
+        report = json.loads(report_path.read_text(encoding='utf-8'))
+        assert report['files'] == 2
+        assert report['processing_stats']['documents_processed'] == 2
+        assert set(report['profile']['stages']) >= {'read', 'split', 'annotate', 'insert', 'fts', 'commit'}
+        assert report['code_profile']['profiler'] == 'cprofile'
+        assert Path(report['code_profile']['output']).exists()
+        assert report['code_profile']['top_functions']
+        ingestor.close()
+
+    print(">> Run report and cProfile hook: PASS")
+
+
+if __name__ == "__main__":
+    test_exclusive_stage_times()
+    test_latency_histogram()
+    test_run_report()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+Test script for lexical diversity (MATTR, MTLD, HD-D, Yule's K) and Turkish
+readability, accumulated per document at ingestion and combined per corpus
+"""
+
+import sys
+import os
+import math
+import random
+import tempfile
+import weakref
+from collections import Counter
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from analysis.lexical_diversity import (LexicalStatsAccumulator, LexicalStatsIndex, count_syllables,
+                                        lexical_measures, frequency_spectrum)
+from database.sharding import ShardedCorpus
+from ingestion.corpus_ingestor import CorpusIngestor
+from ingestion.sharded_ingestor import ShardedCorpusIngestor
+from query.corpus_query import CorpusQuery
+from query.sharded_query import ShardedCorpusQuery
+
+TEXTS = [
+    "Ev büyük ve güzel. Ev çok sıcak ve ev temiz. Bahçedeki ağaçlar yeşillendi.\n",
+    "Kitap masada ve kalem yanında. Ali kitap okudu. Öğretmenlerimizden biri geldi.\n",
+    "Hava güzel ve güneşli. Çocuklar parkta oynadı ve güldü.\n",
+    "Deniz mavi ve sakin. Ev denize yakın. Deniz kenarında yürüdük, deniz çok güzeldi.\n",
+]
+CONLLU = """# text = Ev güzel.
+1\tEv\tev\tNOUN\t_\t_\t2\tnsubj\t_\t_
+2\tgüzel\tgüzel\tADJ\t_\t_\t0\troot\t_\tSpaceAfter=No
+3\t.\t.\tPUNCT\t_\t_\t2\tpunct\t_\t_
+
+"""
+
+
+def reference(sentences, window=50, threshold=0.72, sample=42):
+    """Measures of a text straight from their definitions"""
+    words = [w for sentence in sentences for w in sentence]
+    n = len(words)
+    counts = Counter(words)
+    if n >= window:
+        mattr = sum(len(set(words[i:i + window])) / window for i in range(n - window + 1)) / (n - window + 1)
+    else:
+        mattr = len(counts) / n
+    factors, types, length = 0.0, set(), 0
+    for w in words:
+        types.add(w)
+        length += 1
+        if len(types) / length <= threshold:
+            factors, types, length = factors + 1, set(), 0
+    if length:
+        factors += (1 - len(types) / length) / (1 - threshold)
+    hdd = sum(1 - math.comb(n - f, sample) / math.comb(n, sample) for f in counts.values()) / sample \
+        if n >= sample else None
+    k = 1e4 * (sum(f * f for f in counts.values()) - n) / (n * n)
+
+    syllables = [sum(c in 'aeıioöuü' for c in w) or 1 for w in words]
+    s = sum(1 for sentence in sentences if sentence)
+    oks, ohs = n / s, sum(syllables) / n
+    h = [sum(1 for y in syllables if (y == k_ if k_ < 6 else y >= 6)) / s for k_ in (3, 4, 5, 6)]
+    return {'mattr': mattr, 'mtld': n / factors if factors else None, 'hdd': hdd, 'yules_k': k,
+            'ttr': len(counts) / n,
+            'atesman': 198.825 - 40.175 * ohs - 2.610 * oks,
+            'cetinkaya_uzun': 118.823 - 25.987 * ohs - 0.971 * oks,
+            'bezirci_yilmaz': math.sqrt(oks * (0.84 * h[0] + 1.5 * h[1] + 3.5 * h[2] + 26.25 * h[3]))}
+
+
+def assert_close(actual, expected, names=None):
+    for name in names or expected:
+        if expected[name] is None:
+            assert actual[name] is None, name
+        else:
+            assert abs(actual[name] - expected[name]) < 1e-9, (name, actual[name], expected[name])
+
+
+def test_measures():
+    """The streaming accumulator equals the textbook definitions"""
+    print("=== TESTING LEXICAL MEASURES ===")
+
+    assert [count_syllables(w) for w in ('ev', 'kitaplar', 'öğretmenlerimizden', '2019')] == [1, 3, 7, 1]
+
+    rng = random.Random(3)
+    vocabulary = ['ev', 'okul', 'kitaplar', 'öğretmen', 'bahçedeki', 'çalışkanlıklarından', 've', 'bir',
+                  'güzel', 'araba', 'deniz', 'İstanbul'.lower(), 'yol', 'su', 'hava', 'gökyüzü']
+    for n_words in (5, 45, 60, 400):
+        sentences, total = [], 0
+        while total < n_words:
+            size = min(rng.randint(1, 12), n_words - total)
+            sentences.append([vocabulary[min(int(rng.paretovariate(0.9)) - 1, 15)] for _ in range(size)])
+            total += size
+        accumulator = LexicalStatsAccumulator()
+        for sentence in sentences:
+            accumulator.add_sentence(sentence)
+        accumulator.add_sentence([])
+        results = accumulator.results()
+        assert results['word_count'] == n_words and results['sentence_count'] == len(sentences)
+        assert_close(results, reference(sentences))
+    print(">> Against the definitions: PASS")
+
+    # All words different: no MTLD factor, so no MTLD
+    accumulator = LexicalStatsAccumulator()
+    accumulator.add_sentence(['bir', 'iki', 'üç'])
+    assert accumulator.results()['mtld'] is None and accumulator.results()['mattr'] == 1.0
+    empty = LexicalStatsAccumulator().results()
+    assert empty['word_count'] == 0 and all(empty[m] is None for m in ('mattr', 'mtld', 'hdd', 'atesman'))
+    print(">> Short texts: PASS")
+
+
+def stored_and_scanned(query):
+    index = LexicalStatsIndex(query.conn)
+    totals, frequencies = index.scan()
+    return query.get_advanced_stats(), lexical_measures(totals, frequency_spectrum(frequencies.values())), \
+        frequencies
+
+
+def test_stored_stats():
+    """Ingestion stores per-document statistics; corpus values combine them"""
+    print("=== TESTING STORED LEXICAL STATISTICS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = Path(tmp) / "docs"
+        docs.mkdir()
+        for i, text in enumerate(TEXTS):
+            (docs / f"doc{i}.txt").write_text(text * 8, encoding="utf-8")
+        db_path = os.path.join(tmp, "corpus.db")
+        ingestor = CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False)
+        ingestor.ingest_directory(str(docs))
+        query = CorpusQuery(db_path)
+
+        # Per document: the same as the definitions over the stored words
+        documents = query.document_lexical_stats()
+        assert len(documents) == 4
+        for document in documents:
+            rows = query.conn.execute("""
+                SELECT sent_id, norm FROM tokens WHERE doc_id = ? AND is_punctuation = 0 ORDER BY token_id
+            """, (document['doc_id'],)).fetchall()
+            sentences = [[norm for sent, norm in rows if sent == sent_id]
+                         for sent_id in sorted({sent for sent, _ in rows})]
+            assert_close(document, reference(sentences))
+        assert [d['doc_name'] for d in query.document_lexical_stats(doc_ids=[2])] == ['doc1.txt']
+        print(">> Per-document statistics: PASS")
+
+        stats, scanned, frequencies = stored_and_scanned(query)
+        assert_close(stats, scanned, ('mattr', 'mtld', 'hdd', 'yules_k', 'atesman', 'ttr'))
+        assert stats['unique_types'] == len(frequencies) and stats['word_tokens'] == sum(frequencies.values())
+        assert stats['total_tokens'] == query.conn.execute("SELECT COUNT(*) FROM tokens").fetchone()[0]
+        assert dict(query.conn.execute("SELECT word, frequency FROM lexical_types")) == frequencies
+        print(">> Corpus statistics from stored totals: PASS")
+
+        # Changed and added documents update the corpus word frequencies
+        (docs / "doc0.txt").write_text("Yepyeni bir metin yazıldı. Metin kısa.\n", encoding="utf-8")
+        (docs / "doc9.conllu").write_text(CONLLU, encoding="utf-8")
+        ingestor.ingest_directory(str(docs), file_patterns=['*.txt', '*.conllu'])
+        stats, scanned, frequencies = stored_and_scanned(query)
+        assert query.conn.execute("SELECT COUNT(*) FROM lexical_stats").fetchone()[0] == 5
+        assert dict(query.conn.execute("SELECT word, frequency FROM lexical_types")) == frequencies
+        assert_close(stats, scanned, ('mattr', 'mtld', 'hdd', 'yules_k', 'bezirci_yilmaz'))
+        print(">> Updated on re-ingestion: PASS")
+
+        query.define_subcorpus('iki', {'doc_name': ['doc1.txt', 'doc3.txt']})
+        info = query.subcorpora.get('iki')
+        totals, frequencies = LexicalStatsIndex(query.conn).scan(info['subcorpus_id'])
+        assert_close(query.get_advanced_stats(subcorpus='iki'),
+                     lexical_measures(totals, frequency_spectrum(frequencies.values())), ('mattr', 'hdd', 'mtld'))
+        assert [d['doc_name'] for d in query.document_lexical_stats(subcorpus='iki')] == ['doc1.txt', 'doc3.txt']
+        print(">> Subcorpus statistics: PASS")
+
+        # A database from before lexical statistics falls back to a scan
+        query.conn.execute("DELETE FROM lexical_stats")
+        query.conn.execute("DELETE FROM lexical_types")
+        query.conn.commit()
+        assert_close(query.get_advanced_stats(), scanned, ('mattr', 'hdd', 'atesman'))
+
+        # The scan keeps one document's accumulator at a time
+        index = LexicalStatsIndex(query.conn)
+        live = weakref.WeakSet()
+
+        def tracked_accumulator():
+            accumulator = LexicalStatsAccumulator()
+            live.add(accumulator)
+            return accumulator
+
+        index.accumulator = tracked_accumulator
+        cursor = query.conn.execute("""
+            SELECT doc_id, sent_id, norm FROM tokens
+            WHERE is_punctuation = 0 AND norm IS NOT NULL AND norm != '' ORDER BY token_id
+        """)
+        doc_ids = []
+        for doc_id, accumulator in index._accumulate(cursor):
+            doc_ids.append(doc_id)
+            assert len(live) == 1
+        assert len(doc_ids) == 5 and doc_ids == sorted(set(doc_ids))
+        assert query.compute_lexical_stats() == 5
+        assert_close(query.get_advanced_stats(), scanned, ('mattr', 'hdd', 'atesman'))
+        assert dict(query.conn.execute("SELECT word, frequency FROM lexical_types")) == \
+            dict(stored_and_scanned(query)[2])
+        ingestor.close()
+        query.close()
+
+    print(">> Missing statistics: PASS")
+
+
+def test_sharded_stats():
+    """Sharded corpora combine the shards' totals and word frequencies"""
+    print("=== TESTING SHARDED LEXICAL STATISTICS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = Path(tmp) / "docs"
+        docs.mkdir()
+        for i, text in enumerate(TEXTS):
+            (docs / f"doc{i}.txt").write_text(text * 3, encoding="utf-8")
+        db_path = os.path.join(tmp, "corpus.db")
+        CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False).ingest_directory(str(docs))
+        corpus = ShardedCorpus.create(Path(tmp) / "shards", 3)
+        ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False,
+                              workers=0).ingest_directory(str(docs))
+
+        single = CorpusQuery(db_path)
+        sharded = ShardedCorpusQuery(corpus, workers=0)
+        names = ('word_tokens', 'unique_types', 'ttr', 'mattr', 'mtld', 'hdd', 'yules_k',
+                 'atesman', 'cetinkaya_uzun', 'bezirci_yilmaz')
+        assert_close(sharded.get_advanced_stats(), single.get_advanced_stats(), names)
+        assert sorted(d['doc_name'] for d in sharded.document_lexical_stats()) == \
+            [d['doc_name'] for d in single.document_lexical_stats()]
+        assert sharded.compute_lexical_stats() == 0
+        sharded.close()
+        single.close()
+
+    print(">> Sharded statistics: PASS")
+
+
+if __name__ == "__main__":
+    test_measures()
+    test_stored_stats()
+    test_sharded_stats()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test script for the shared model registry
+"""
+
+import sys
+import os
+import threading
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlp import model_registry
+from nlp.model_registry import ModelRegistry, get_model_registry
+from nlp.turkish_processor import TurkishNLPProcessor
+
+
+def test_single_load_across_threads():
+    """Concurrent requests for the same model load it once"""
+    print("=== TESTING SHARED LOADING ===")
+
+    loads = []
+
+    def loader(model_name, allow_download):
+        loads.append(model_name)
+        return object()
+
+    model_registry.LOADERS['dummy'] = loader
+    try:
+        registry = ModelRegistry()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get('dummy', 'm')))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(loads) == 1
+        assert all(model is results[0] for model in results)
+        assert registry.is_loaded('dummy', 'm')
+
+        assert registry.unload('dummy') == 1
+        assert not registry.is_loaded('dummy', 'm')
+        registry.get('dummy', 'm')
+        assert len(loads) == 2
+    finally:
+        del model_registry.LOADERS['dummy']
+
+    print(">> Shared loading: PASS")
+
+
+def test_failures_and_preload():
+    """Failed loads are not retried on every request; warm-up retries them"""
+    print("\n=== TESTING FAILURES AND PRELOAD ===")
+
+    attempts = []
+
+    def loader(model_name, allow_download):
+        attempts.append(model_name)
+        if len(attempts) == 1:
+            raise OSError("model not found")
+        return object()
+
+    model_registry.LOADERS['flaky'] = loader
+    try:
+        registry = ModelRegistry()
+        for _ in range(3):
+            try:
+                registry.get('flaky')
+            except OSError:
+                pass
+        assert len(attempts) == 1
+
+        finished = []
+        registry.preload(['flaky'], callback=finished.append).join()
+        assert finished == [{'flaky:default': None}]
+        assert registry.is_loaded('flaky')
+    finally:
+        del model_registry.LOADERS['flaky']
+
+    print(">> Failures and preload: PASS")
+
+
+def test_download_retries():
+    """Failures without download allowed and unloaded BERT processors are retried"""
+    print("\n=== TESTING DOWNLOAD RETRIES ===")
+
+    attempts = []
+
+    def loader(model_name, allow_download):
+        attempts.append(allow_download)
+        if not allow_download:
+            raise OSError("model not in the store and download disabled")
+        return object()
+
+    class Unloaded:
+        is_loaded = False
+
+    model_registry.LOADERS['offline'] = loader
+    model_registry.LOADERS['unloaded'] = lambda model_name, allow_download: Unloaded()
+    try:
+        registry = ModelRegistry()
+        for _ in range(2):
+            try:
+                registry.get('offline', allow_download=False)
+                assert False
+            except OSError:
+                pass
+        assert attempts == [False]
+        model = registry.get('offline', allow_download=True)
+        assert attempts == [False, True] and registry.get('offline', allow_download=False) is model
+
+        first = registry.get('unloaded')
+        assert registry.get('unloaded') is not first and not registry.is_loaded('unloaded')
+    finally:
+        del model_registry.LOADERS['offline']
+        del model_registry.LOADERS['unloaded']
+
+    print(">> Download retries: PASS")
+
+
+def test_processors_share_models():
+    """Processors for the same backend share one model instance"""
+    print("\n=== TESTING PROCESSOR SHARING ===")
+
+    first = TurkishNLPProcessor(backend='custom_bert')
+    second = TurkishNLPProcessor(backend='custom_bert')
+    # Only a loaded model is shared; a processor that fell back is retried
+    if first.backend == 'custom_bert' and first.custom_bert_processor.is_loaded:
+        assert first.custom_bert_processor is second.custom_bert_processor
+        assert get_model_registry().is_loaded('custom_bert')
+        print(">> Processor sharing: PASS")
+    else:
+        print(">> Processor sharing: SKIPPED (no BERT model loaded)")
+
+
+if __name__ == "__main__":
+    test_single_load_across_threads()
+    test_failures_and_preload()
+    test_download_retries()
+    test_processors_share_models()
+    print("\n=== TEST COMPLETE ===")
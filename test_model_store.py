@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline model store
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlp.model_store import ModelStore, ModelStoreError
+
+
+def make_model(directory):
+    """Fake model directory with a config and a weights file"""
+    directory.mkdir(parents=True)
+    (directory / "config.json").write_text('{"model_type": "bert"}', encoding='utf-8')
+    (directory / "model.safetensors").write_bytes(b"\x00" * 4096)
+
+
+def test_offline_resolution():
+    """Installed models resolve locally; missing ones fail without a download"""
+    print("=== TESTING OFFLINE RESOLUTION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_model(Path(tmp) / "source")
+        store = ModelStore(Path(tmp) / "store", offline=True)
+
+        store.add_local('custom_bert', 'org/turkish-pos', Path(tmp) / "source")
+        directory = store.resolve('custom_bert', 'org/turkish-pos')
+        assert directory == store.model_dir('custom_bert', 'org/turkish-pos')
+        assert (directory / "config.json").exists()
+        assert [m['name'] for m in store.list_models()] == ['org/turkish-pos']
+
+        try:
+            store.resolve('stanza', 'tr')
+            assert False, "missing model resolved in offline mode"
+        except ModelStoreError as e:
+            assert "install" in str(e)
+
+    print(">> Offline resolution: PASS")
+
+
+def test_checksum_verification():
+    """Corrupted files are detected, also when size and mtime look unchanged"""
+    print("\n=== TESTING CHECKSUM VERIFICATION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_model(Path(tmp) / "source")
+        store = ModelStore(Path(tmp) / "store", offline=True)
+        directory = store.add_local('custom_bert', 'model', Path(tmp) / "source")
+        assert store.verify('custom_bert', 'model') == []
+
+        weights = directory / "model.safetensors"
+        stat = weights.stat()
+        weights.write_bytes(b"\x01" * 4096)
+        os.utime(weights, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        # The quick check trusts the recorded size/mtime; a full check does not
+        assert store.verify('custom_bert', 'model') == []
+        assert store.verify('custom_bert', 'model', full=True) == ["checksum mismatch model.safetensors"]
+
+        os.utime(weights, None)
+        try:
+            store.resolve('custom_bert', 'model')
+            assert False, "corrupted model resolved"
+        except ModelStoreError as e:
+            assert "checksum mismatch" in str(e)
+
+    print(">> Checksum verification: PASS")
+
+
+def test_export_dirs():
+    """Derived files live outside the model and are keyed by its content"""
+    print("\n=== TESTING EXPORT DIRECTORIES ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        make_model(Path(tmp) / "source")
+        store = ModelStore(Path(tmp) / "store", offline=True)
+        directory = store.add_local('custom_bert', 'model', Path(tmp) / "source")
+
+        export = store.export_dir(directory, 'onnx')
+        assert directory not in export.parents
+        assert store.export_dir(directory, 'onnx') == export
+        assert store.export_dir(directory, 'onnx') != store.export_dir(directory, 'other')
+
+        # New weights (re-installed with a new manifest) get a new directory
+        (Path(tmp) / "source" / "model.safetensors").write_bytes(b"\x02" * 4096)
+        directory = store.add_local('custom_bert', 'model', Path(tmp) / "source")
+        assert store.export_dir(directory, 'onnx') != export
+
+        # Directories outside the store are keyed by their files' size and mtime
+        outside = store.export_dir(Path(tmp) / "source", 'onnx')
+        (Path(tmp) / "source" / "model.safetensors").write_bytes(b"\x03" * 8192)
+        assert store.export_dir(Path(tmp) / "source", 'onnx') != outside
+        assert [m['name'] for m in store.list_models()] == ['model']
+
+    print(">> Export directories: PASS")
+
+
+if __name__ == "__main__":
+    test_offline_resolution()
+    test_checksum_verification()
+    test_export_dirs()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Test script for the pluggable NLP backend interface
+"""
+
+import sys
+import os
+import tempfile
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlp.backends import (NLPBackend, Token, Sentence, register_backend, registered_backends,
+                          BACKENDS, POS, CACHEABLE)
+from nlp.turkish_processor import TurkishNLPProcessor
+
+
+@register_backend
+class UpperBackend(NLPBackend):
+    """Plugin backend: tags every word NOUN, counts the sentences it sees"""
+
+    name = 'test_upper'
+    capabilities = frozenset({POS, CACHEABLE})
+
+    def load(self):
+        self.calls = []
+
+    def annotate(self, sentences):
+        sentences = list(sentences)
+        self.calls.append(len(sentences))
+        for sentence in sentences:
+            tokens = self.rule_based_tokens(sentence)
+            for token in tokens:
+                token.upos = 'PUNCT' if token.is_punctuation else 'NOUN'
+            yield tokens
+
+
+def test_plugin_backend():
+    """A registered plugin is selectable by name and exposes its capabilities"""
+    print("=== TESTING PLUGIN BACKEND ===")
+
+    assert 'test_upper' in registered_backends()
+    processor = TurkishNLPProcessor(backend='test_upper')
+    assert processor.backend == 'test_upper'
+    assert processor.supports(POS) and not processor.supports('dependency')
+
+    info = processor.get_processing_info()
+    assert info['features_available']['pos_tagging']
+    assert not info['features_available']['dependency_parsing']
+
+    tokens = processor.process_text("Kitabı okudum.")
+    assert [token['upos'] for token in tokens] == ['NOUN', 'NOUN', 'PUNCT']
+    assert isinstance(tokens[0], dict)
+    print(">> Plugin backend: PASS")
+
+
+def test_batched_stream_with_cache():
+    """annotate() keeps order, and only cache misses reach the backend, batched"""
+    print("\n=== TESTING BATCHED STREAM ===")
+
+    sentences = ["Ev güzel.", "Okula gittim.", "Ev güzel.", "Yarın gelirim."]
+    with tempfile.TemporaryDirectory() as tmp:
+        processor = TurkishNLPProcessor(backend='test_upper')
+        processor.enable_annotation_cache(os.path.join(tmp, "cache.db"))
+
+        first = list(processor.annotate(sentences, batch_size=2))
+        assert [tokens[0].word for tokens in first] == ["Ev", "Okula", "Ev", "Yarın"]
+        assert all(isinstance(token, Token) for tokens in first for token in tokens)
+
+        second = list(processor.annotate(sentences, batch_size=2))
+        assert second == first
+        # Batches of two sentences, no backend call for the fully cached pass
+        print(f"  backend calls: {processor.annotator.calls}")
+        assert processor.annotator.calls == [2, 1]
+        processor.close()
+
+    del BACKENDS['test_upper']
+    print(">> Batched stream: PASS")
+
+
+def test_token_record():
+    """Token records round-trip through the dict format"""
+    print("\n=== TESTING TOKEN RECORD ===")
+
+    token = Token("Kitabı", upos='NOUN', morph='Case=Acc', start_char=0, end_char=6)
+    data = token.to_dict()
+    assert data['norm'] == 'kitabı' and 'bert_confidence' not in data
+    assert Token.from_dict(data) == token
+    assert token['upos'] == 'NOUN' and token.get('missing') is None
+    assert not hasattr(token, '__dict__')
+    print(">> Token record: PASS")
+
+
+def test_sentence_rows():
+    """Sentence records produce the sentences/tokens table rows directly"""
+    print("\n=== TESTING SENTENCE ROWS ===")
+
+    tokens = [Token("Ev", start_char=0, end_char=2), Token(".", upos='PUNCT', start_char=2,
+                                                          end_char=3, is_punctuation=True,
+                                                          dep_head=1, dep_rel='punct')]
+    sentence = Sentence("Ev.", tokens, doc_id=7, sent_id=40, sent_number=3, token_start=10, token_id=100)
+    assert sentence.sentence_row() == (40, 7, 3, "Ev.", 10, 12)
+    rows = list(sentence.token_rows())
+    assert rows[0] == (100, 7, 40, 10, "Ev", "ev", None, None, None, None, None, None, 0, 2, False, False)
+    assert rows[1][:4] == (101, 7, 40, 11) and rows[1][7] == 'PUNCT' and rows[1][14] == 1
+    # Sentence-relative heads become token_ids
+    assert rows[1][10:12] == (100, 'punct')
+    print(">> Sentence rows: PASS")
+
+
+if __name__ == "__main__":
+    test_plugin_backend()
+    test_batched_stream_with_cache()
+    test_token_record()
+    test_sentence_rows()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Test script for the HTTP query service: JSON and NDJSON responses, timing
+headers, parameter errors, request coalescing and timeouts
+"""
+
+import sys
+import os
+import json
+import time
+import socket
+import asyncio
+import tempfile
+import threading
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import query.query_server as query_server
+from ingestion.corpus_ingestor import CorpusIngestor
+from query.corpus_query import CorpusQuery
+from query.query_server import CorpusQueryServer
+
+TEXTS = [
+    "Ev büyük ve güzel. Ali eve döndü ve ev sessizdi.\n",
+    "Kitap masada ve kalem yanında. Ali kitap okudu.\n",
+    "Hava güzel ve güneşli. Çocuklar parkta oynadı ve güldü.\n",
+]
+
+
+class RunningServer:
+    """A CorpusQueryServer on an ephemeral port, served from a background thread"""
+
+    def __init__(self, db_path, **kwargs):
+        self.server = CorpusQueryServer(db_path, port=0, **kwargs)
+        self.loop = asyncio.new_event_loop()
+        started = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.server.start())
+            started.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, daemon=True)
+        self.thread.start()
+        started.wait(10)
+
+    def slow_down(self, seconds):
+        """Make every (non-streamed) query take at least `seconds`"""
+        run_query = self.server._run_query
+
+        def slow_query(method_name, kwargs):
+            time.sleep(seconds)
+            return run_query(method_name, kwargs)
+        self.server._run_query = slow_query
+
+    def request(self, path):
+        """GET path; returns (status, headers, raw body)"""
+        with socket.create_connection(('127.0.0.1', self.server.port), timeout=10) as sock:
+            sock.sendall(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode('ascii'))
+            data = b""
+            while True:
+                block = sock.recv(65536)
+                if not block:
+                    break
+                data += block
+        head, body = data.split(b"\r\n\r\n", 1)
+        lines = head.decode('latin-1').split("\r\n")
+        headers = {}
+        for line in lines[1:]:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+        return int(lines[0].split()[1]), headers, body
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result(10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(10)
+
+
+def dechunk(body):
+    """Chunks of a chunked transfer-encoded body (without the final empty chunk)"""
+    chunks = []
+    while True:
+        size_line, body = body.split(b"\r\n", 1)
+        size = int(size_line, 16)
+        if size == 0:
+            return chunks
+        chunks.append(body[:size])
+        assert body[size:size + 2] == b"\r\n"
+        body = body[size + 2:]
+
+
+def make_db(tmp):
+    docs = Path(tmp) / "docs"
+    docs.mkdir()
+    for i, text in enumerate(TEXTS):
+        (docs / f"doc{i}.txt").write_text(text, encoding="utf-8")
+    db_path = os.path.join(tmp, "corpus.db")
+    ingestor = CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False)
+    ingestor.ingest_directory(str(docs))
+    ingestor.close()
+    return db_path
+
+
+def test_responses():
+    """JSON and NDJSON responses, timing headers and client errors"""
+    print("=== TESTING QUERY SERVER RESPONSES ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = make_db(tmp)
+        query = CorpusQuery(db_path)
+        expected = query.frequency_list(limit=-1)
+        query.close()
+        running = RunningServer(db_path)
+        try:
+            status, headers, body = running.request("/kwic?term=ev&window=3")
+            assert status == 200
+            assert json.loads(body)['results'] and json.loads(body)['endpoint'] == 'kwic'
+            assert headers['server-timing'].startswith('query;dur=')
+            assert float(headers['x-query-time-ms']) >= 0 and headers['x-coalesced'] == 'false'
+            print(">> JSON and timing headers: PASS")
+
+            for path in ("/kwic", "/kwic?term=ev&window=abc", "/kwic?term=ev&colour=red",
+                         "/frequency?word_type=stem", "/frequency?word_type=stem&format=ndjson"):
+                status, _, body = running.request(path)
+                assert status == 400 and 'error' in json.loads(body), path
+            assert running.request("/nowhere")[0] == 404
+            print(">> Bad parameters: PASS")
+
+            # The frequency list is streamed from a generator, in several chunks
+            query_server.NDJSON_CHUNK_ROWS = 4
+            status, headers, body = running.request("/frequency?limit=-1&format=ndjson")
+            assert status == 200 and headers['transfer-encoding'] == 'chunked'
+            assert 'x-query-time-ms' in headers and 'x-result-count' not in headers
+            chunks = dechunk(body)
+            assert len(chunks) == -(-len(expected) // 4)
+            rows = [json.loads(line) for chunk in chunks for line in chunk.decode('utf-8').splitlines()]
+            assert rows == expected
+
+            # Other endpoints send their complete result in chunks
+            status, headers, body = running.request("/kwic?term=ve&format=ndjson")
+            rows = [json.loads(line) for chunk in dechunk(body) for line in chunk.decode('utf-8').splitlines()]
+            assert status == 200 and int(headers['x-result-count']) == len(rows) > 4
+            print(">> Chunked NDJSON: PASS")
+        finally:
+            query_server.NDJSON_CHUNK_ROWS = 500
+            running.close()
+
+
+def test_coalescing_and_timeout():
+    """Identical concurrent requests share one query; slow queries time out"""
+    print("=== TESTING COALESCING AND TIMEOUTS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = make_db(tmp)
+        running = RunningServer(db_path)
+        running.slow_down(0.5)
+        try:
+            responses = []
+            threads = [threading.Thread(target=lambda: responses.append(running.request("/kwic?term=ev")))
+                       for _ in range(3)]
+            for thread in threads:
+                thread.start()
+                time.sleep(0.05)
+            for thread in threads:
+                thread.join()
+            assert [status for status, _, _ in responses] == [200, 200, 200]
+            assert len({body for _, _, body in responses}) == 1
+            assert sorted(headers['x-coalesced'] for _, headers, _ in responses) == ['false', 'true', 'true']
+            assert running.server.stats['queries_executed'] == 1 and running.server.stats['coalesced'] == 2
+            assert not running.server._inflight
+            # A different query is not coalesced with it
+            assert running.request("/kwic?term=ali")[1]['x-coalesced'] == 'false'
+            assert running.server.stats['queries_executed'] == 2
+            print(">> Request coalescing: PASS")
+        finally:
+            running.close()
+
+        running = RunningServer(db_path, request_timeout=0.1)
+        running.slow_down(0.5)
+        try:
+            status, _, body = running.request("/kwic?term=ev")
+            assert status == 504 and json.loads(body)['error'] == 'Query timed out'
+        finally:
+            running.close()
+
+    print(">> Timeouts: PASS")
+
+
+if __name__ == "__main__":
+    test_responses()
+    test_coalescing_and_timeout()
+    print("\n=== TEST COMPLETE ===")
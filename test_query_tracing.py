@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Test script for CorpusQuery tracing
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion.corpus_ingestor import CorpusIngestor
+from query.corpus_query import CorpusQuery
+from query.tracing import QueryTracer
+
+
+def build_corpus(tmp):
+    docs = Path(tmp) / "docs"
+    docs.mkdir()
+    (docs / "a.txt").write_text("Ev çok güzel. Ev büyük ve güzel.\n\nBugün ev temiz.\n", encoding="utf-8")
+    db_path = os.path.join(tmp, "corpus.db")
+    ingestor = CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False)
+    ingestor.ingest_directory(str(docs))
+    ingestor.close()
+    return db_path
+
+
+def test_trace_calls_and_flags():
+    """Statements, rows, plans, full scans and repeated statements per call"""
+    print("=== TESTING QUERY TRACING ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = build_corpus(tmp)
+        log_path = Path(tmp) / "trace.jsonl"
+
+        query = CorpusQuery(db_path)
+        expected = query.collocation_analysis('ev', min_freq=1, colloc_min_freq=1)
+        assert query.tracer is None
+
+        tracer = QueryTracer(explain=True, log_path=log_path, repeat_threshold=3)
+        query.enable_tracing(tracer=tracer)
+        assert query.collocation_analysis('ev', min_freq=1, colloc_min_freq=1) == expected
+
+        call = tracer.recent_calls('collocation_analysis')[0]
+        assert call['statements'] > 3 and call['rows'] > 0
+        # The window query runs once per occurrence of 'ev'
+        assert any(n == 3 for n in call['repeated_statements'].values())
+        # Total token count reads the whole table
+        assert call['full_scans'] == ['tokens']
+        assert all('plan' in statement for statement in call['sql'])
+        print(">> Statements, plans and flags recorded: PASS")
+
+        exported = sum(1 for _ in query.get_all_tokens_for_export())
+        export_call = tracer.recent_calls('get_all_tokens_for_export')[0]
+        assert export_call['rows'] == exported
+        print(">> Generator methods traced across iteration: PASS")
+
+        summary = tracer.summary()['methods']
+        assert summary['collocation_analysis']['calls'] == 1
+        assert summary['collocation_analysis']['repeated_statement_calls'] == 1
+        assert summary['collocation_analysis']['latency_ms']['count'] == 1
+        assert 'collocation_analysis' in tracer.format_summary()
+
+        lines = log_path.read_text(encoding='utf-8').splitlines()
+        assert [json.loads(line)['method'] for line in lines] == ['collocation_analysis',
+                                                                 'get_all_tokens_for_export']
+
+        query.disable_tracing()
+        query.frequency_list()
+        assert tracer.summary()['methods'].keys() == {'collocation_analysis', 'get_all_tokens_for_export'}
+        query.close()
+
+    print(">> Summary, log file and disabling: PASS")
+
+
+if __name__ == "__main__":
+    test_trace_calls_and_flags()
+    print("\n=== TEST COMPLETE ===")
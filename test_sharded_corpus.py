@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Test script for sharded corpora: shard layout, concurrent ingestion and
+fan-out queries that match a single database
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.sharding import ShardedCorpus, SHARD_ID_STRIDE
+from ingestion.corpus_ingestor import CorpusIngestor
+from ingestion.sharded_ingestor import ShardedCorpusIngestor
+from query.corpus_query import CorpusQuery
+from query.sharded_query import ShardedCorpusQuery
+from query.tracing import QueryTracer
+
+TEXTS = [
+    "Ev çok güzel. Ev büyük ve güzel.\n\nBugün ev temiz ve sıcak.\n",
+    "Kitap masada. Ali kitap okudu ve uyudu.\n",
+    "Hava güzel ve güneşli. Çocuklar parkta oynadı.\n\nAkşam ev sessizdi.\n",
+    "Okul büyük. Öğretmen kitap verdi ve gitti.\n",
+    "Deniz mavi ve sakin. Ev denize yakın.\n",
+    "Yarın okul var. Ali ve Ayşe okula gidecek.\n",
+]
+
+CONLLU = """# sent_id = 1
+# text = Ali eve geldi.
+1\tAli\tAli\tPROPN\t_\tCase=Nom\t3\tnsubj\t_\t_
+2\teve\tev\tNOUN\t_\tCase=Dat\t3\tobl\t_\t_
+3\tgeldi\tgel\tVERB\t_\tTense=Past\t0\troot\t_\tSpaceAfter=No
+4\t.\t.\tPUNCT\t_\t_\t3\tpunct\t_\t_
+
+"""
+
+
+def build_sources(tmp):
+    docs = Path(tmp) / "docs"
+    docs.mkdir()
+    for i, text in enumerate(TEXTS):
+        (docs / f"doc{i}.txt").write_text(text, encoding="utf-8")
+    for i in range(4):
+        (docs / f"parsed{i}.conllu").write_text(CONLLU.replace("Ali", ["Ali", "Ayşe", "Can", "Ece"][i]),
+                                                encoding="utf-8")
+    return docs
+
+
+def check_same_results(single, sharded):
+    """Every query gives the same answer on one database and on the shards"""
+    def rows(results, *keys):
+        return sorted(tuple(r[k] for k in keys) for r in results)
+
+    assert rows(single.frequency_list(limit=-1), 'word', 'frequency') == \
+        rows(sharded.frequency_list(limit=-1), 'word', 'frequency')
+    assert rows(single.frequency_list(min_freq=2), 'word', 'frequency') == \
+        rows(sharded.frequency_list(min_freq=2), 'word', 'frequency')
+    assert [r['frequency'] for r in single.frequency_list(limit=3)] == \
+        [r['frequency'] for r in sharded.frequency_list(limit=3)]
+
+    for word in ('ev', 've', 'kitap'):
+        for measure in ('pmi', 'log_likelihood', 't_score'):
+            expected = single.collocation_analysis(word, min_freq=1, colloc_min_freq=1, measure=measure)
+            actual = sharded.collocation_analysis(word, min_freq=1, colloc_min_freq=1, measure=measure)
+            key = ('collocate', 'co_occurrence_count', 'target_freq', 'collocate_freq')
+            assert rows(expected, *key) == rows(actual, *key)
+            assert sorted(round(r['score'], 9) for r in expected) == sorted(round(r['score'], 9) for r in actual)
+
+    kwic = sharded.kwic_concordance('ev', limit=1000)
+    assert rows(single.kwic_concordance('ev', limit=1000), 'keyword', 'left_context', 'right_context') == \
+        rows(kwic, 'keyword', 'left_context', 'right_context')
+    assert kwic == sorted(kwic, key=lambda r: (r['doc_id'], r['sent_id'], r['token_number']))
+    assert len(sharded.kwic_concordance('ev', limit=2)) == 2
+
+    assert rows(single.cql_search('[word="ve"]'), 'keyword', 'left_context') == \
+        rows(sharded.cql_search('[word="ve"]'), 'keyword', 'left_context')
+
+    expected_sketch = single.word_sketch('ev')
+    assert 'obl' in expected_sketch
+    assert dict(sharded.word_sketch('ev')) == dict(expected_sketch)
+
+    assert single.get_pos_distribution() == sharded.get_pos_distribution()
+    expected_stats = single.get_advanced_stats()
+    actual_stats = sharded.get_advanced_stats()
+    for key in ('total_tokens', 'unique_types', 'ttr', 'total_sentences', 'avg_sent_len'):
+        assert expected_stats[key] == actual_stats[key], key
+    expected = single.get_processing_stats()['database_stats']
+    actual = sharded.get_processing_stats()['database_stats']
+    assert actual.pop('shards') == 3 and actual == expected
+    assert sum(1 for _ in single.get_all_tokens_for_export()) == sum(1 for _ in sharded.get_all_tokens_for_export())
+
+
+def test_sharded_ingestion():
+    """Files are spread over the shards, each shard in its own id range"""
+    print("=== TESTING SHARDED INGESTION ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = build_sources(tmp)
+        corpus = ShardedCorpus.create(Path(tmp) / "shards", 3)
+        assert ShardedCorpus(Path(tmp) / "shards").num_shards == 3
+        assert ShardedCorpus.create(Path(tmp) / "shards", 3).shard_paths == corpus.shard_paths
+
+        ingestor = ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False, workers=0)
+        stats = ingestor.ingest_directory(str(docs))
+        assert stats['documents_processed'] == 10 and stats['errors'] == 0
+        assert sum(shard['files'] for shard in ingestor.shard_stats) == 10
+
+        doc_ids = []
+        for index, path in enumerate(corpus.shard_paths):
+            query = CorpusQuery(str(path))
+            names = [r[0] for r in query.conn.execute("SELECT doc_name FROM documents")]
+            ids = [r[0] for r in query.conn.execute("SELECT doc_id FROM documents")]
+            token_ids = [r[0] for r in query.conn.execute("SELECT token_id FROM tokens")]
+            query.close()
+            assert all(corpus.shard_for_file(name) == index for name in names if name.endswith('.txt'))
+            assert all(corpus.shard_for_doc_id(doc_id) == index for doc_id in ids)
+            assert all(index * SHARD_ID_STRIDE < t < (index + 1) * SHARD_ID_STRIDE for t in token_ids)
+            doc_ids.extend(ids)
+        assert len(doc_ids) == len(set(doc_ids)) == 10
+
+        # Re-ingesting sends every file to the shard that already has it
+        again = ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False, workers=0)
+        assert again.ingest_directory(str(docs))['files_skipped'] == 10
+
+    print(">> Shard layout and ingestion: PASS")
+
+
+def test_sharded_queries():
+    """Fan-out queries return what a single database returns"""
+    print("=== TESTING SHARDED QUERIES ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        docs = build_sources(tmp)
+        single_path = os.path.join(tmp, "single.db")
+        ingestor = CorpusIngestor(single_path, nlp_backend='simple', annotation_cache=False)
+        ingestor.ingest_directory(str(docs))
+        ingestor.close()
+
+        # Shards written by worker processes, queried in this process
+        corpus = ShardedCorpus.create(Path(tmp) / "shards", 3)
+        ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False,
+                              workers=2).ingest_directory(str(docs))
+
+        single = CorpusQuery(single_path)
+        sharded = ShardedCorpusQuery(corpus, workers=0)
+        check_same_results(single, sharded)
+        sharded.close()
+        print(">> In-process fan-out: PASS")
+
+        sharded = ShardedCorpusQuery(Path(tmp) / "shards", workers=2)
+        check_same_results(single, sharded)
+        sharded.close()
+        single.close()
+
+    print(">> Parallel fan-out: PASS")
+
+
+def test_unsupported_members():
+    """Tracing and per-database accessors are rejected with a clear error"""
+    print("=== TESTING UNSUPPORTED MEMBERS ===")
+
+    def raises_type_error(call) -> bool:
+        try:
+            call()
+        except TypeError:
+            return True
+        return False
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = ShardedCorpus.create(Path(tmp) / "shards", 2)
+        assert raises_type_error(lambda: ShardedCorpusQuery(corpus, workers=0, tracer=QueryTracer()))
+
+        sharded = ShardedCorpusQuery(corpus, workers=0)
+        assert raises_type_error(sharded.enable_tracing)
+        assert raises_type_error(lambda: sharded.subcorpora)
+        assert raises_type_error(lambda: sharded.metadata)
+        # The sharded equivalents still work
+        assert sharded.list_subcorpora() == []
+        assert sharded.metadata_keys() == {}
+        sharded.close()
+
+    print(">> Unsupported members: PASS")
+
+
+if __name__ == "__main__":
+    test_sharded_ingestion()
+    test_sharded_queries()
+    test_unsupported_members()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test script for the streaming TXT/JSON/XML readers
+"""
+
+import sys
+import os
+import json
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingestion.streaming_readers import (
+    iter_decoded, iter_text_chunks, iter_json_chunks, iter_json_strings, iter_xml_chunks
+)
+
+
+def test_text_chunks():
+    """Chunks end on paragraph boundaries and reassemble to the decoded file"""
+    print("=== TESTING TEXT CHUNKS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.txt"
+        text = "Bu bir cümle. İkinci cümle!\r\n\r\nYeni paragraf. " * 2000
+        path.write_bytes(text.encode("utf-8"))
+
+        chunks = list(iter_text_chunks(path, chunk_size=5000))
+        assert len(chunks) > 1
+        assert all(len(chunk) <= 5000 for chunk in chunks)
+        assert chunks[0].endswith("\n\n")
+        assert "".join(chunks) == text.replace("\r\n", "\n")
+
+        # Legacy Turkish encoding is detected without re-reading the file
+        path.write_bytes("Ağaç şişe ığdır\n".encode("cp1254"))
+        assert "".join(iter_text_chunks(path)) == "Ağaç şişe ığdır\n"
+
+    print(">> Text chunks: PASS")
+
+
+def test_encoding_switch():
+    """Switching to the fallback encoding mid-file loses no bytes"""
+    print("\n=== TESTING ENCODING SWITCH ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.txt"
+        head = ("Ağaç " * 3).encode("utf-8")
+        legacy = " ığdır\n".encode("cp1254")
+
+        # The UTF-8 'ş' straddles the first two reads, the second of which
+        # also holds the first cp1254 byte: decoding switches at that byte
+        path.write_bytes(head + "şişe".encode("utf-8") + legacy)
+        text = "".join(iter_decoded(path, read_size=len(head) + 1))
+        assert text == "Ağaç Ağaç Ağaç şişe ığdır\n", text
+
+        # A bad byte right after the first byte of a character: that byte is
+        # decoded with the fallback encoding too
+        data = head + b"\xc5" + legacy
+        path.write_bytes(data)
+        text = "".join(iter_decoded(path, read_size=len(head) + 1))
+        assert text == head.decode("utf-8") + (b"\xc5" + legacy).decode("cp1254"), text
+
+    print(">> Encoding switch: PASS")
+
+
+def test_json_strings():
+    """Values are yielded in order, keys are skipped, and block boundaries are handled"""
+    print("\n=== TESTING JSON STREAMING ===")
+
+    data = {"title": "Başlık", "items": [{"text": "ev \"güzel\""}, 12, -2.5e3, True, None, ""]}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.json"
+        path.write_text(json.dumps(data), encoding="utf-8")
+
+        expected = ["Başlık", 'ev "güzel"', "12", "-2500.0", "True", ""]
+        assert list(iter_json_strings(path, read_size=3)) == expected
+        assert "".join(iter_json_chunks(path)) == 'Başlık ev "güzel" 12 -2500.0 True'
+
+        path.write_text('{"a": [1, 2}', encoding="utf-8")
+        try:
+            list(iter_json_strings(path))
+            assert False, "malformed JSON should raise"
+        except ValueError:
+            pass
+
+    print(">> JSON streaming: PASS")
+
+
+def test_xml_chunks():
+    """Text and tails come out in document order"""
+    print("\n=== TESTING XML STREAMING ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / "doc.xml"
+        path.write_text("<doc>Giriş<p>Bir <b>iki</b> üç</p>son<p/></doc>", encoding="utf-8")
+        assert "".join(iter_xml_chunks(path, chunk_size=4)) == "Giriş Bir  iki  üç son"
+
+    print(">> XML streaming: PASS")
+
+
+if __name__ == "__main__":
+    test_text_chunks()
+    test_encoding_switch()
+    test_json_strings()
+    test_xml_chunks()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Test script for subcorpora: definitions, materialized id ranges, cached
+sizes and the subcorpus= argument of the query methods
+"""
+
+import sys
+import os
+import tempfile
+from pathlib import Path
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from database.sharding import ShardedCorpus
+from ingestion.corpus_ingestor import CorpusIngestor
+from ingestion.sharded_ingestor import ShardedCorpusIngestor
+from query.corpus_query import CorpusQuery
+from query.sharded_query import ShardedCorpusQuery
+from query.subcorpus import to_ranges, merge_ranges
+
+NEWS = [
+    "Ekonomi büyüdü ve işsizlik azaldı. Ev fiyatları arttı.\n",
+    "Seçim sonuçları açıklandı. Halk sandığa gitti ve oy verdi.\n\nEv kiraları yükseldi.\n",
+    "Deprem bölgesinde ev yapımı sürüyor. Yeni ev teslim edildi.\n",
+]
+NOVELS = [
+    "Ali eve döndü. Ev sessiz ve karanlıktı.\n",
+    "Ayşe pencereden baktı ve gülümsedi. Bahçe çiçek açmıştı.\n",
+    "Yaşlı adam ev ile deniz arasında yürüdü.\n",
+]
+
+
+def write_docs(directory, only_news=False):
+    directory.mkdir()
+    for i, text in enumerate(NEWS):
+        (directory / f"haber_{i}.txt").write_text(text, encoding="utf-8")
+    if not only_news:
+        for i, text in enumerate(NOVELS):
+            (directory / f"roman_{i}.txt").write_text(text, encoding="utf-8")
+    return directory
+
+
+def ingest(docs, db_path):
+    ingestor = CorpusIngestor(db_path, nlp_backend='simple', annotation_cache=False)
+    ingestor.ingest_directory(str(docs))
+    ingestor.close()
+
+
+def check_matches_reference(query, reference, subcorpus):
+    """Queries on a subcorpus equal the same queries on a database of only its documents"""
+    def rows(results, *keys):
+        return sorted(tuple(r[k] for k in keys) for r in results)
+
+    assert rows(query.frequency_list(subcorpus=subcorpus), 'word', 'frequency') == \
+        rows(reference.frequency_list(), 'word', 'frequency')
+    assert rows(query.kwic_concordance('ev', limit=1000, subcorpus=subcorpus),
+                'keyword', 'left_context', 'right_context') == \
+        rows(reference.kwic_concordance('ev', limit=1000), 'keyword', 'left_context', 'right_context')
+    assert rows(query.cql_search('[word="ve"]', subcorpus=subcorpus), 'keyword', 'left_context') == \
+        rows(reference.cql_search('[word="ve"]'), 'keyword', 'left_context')
+    assert rows(query.cql_search('[] [word="ve"]', subcorpus=subcorpus), 'keyword', 'left_context') == \
+        rows(reference.cql_search('[] [word="ve"]'), 'keyword', 'left_context')
+    key = ('collocate', 'co_occurrence_count', 'target_freq', 'collocate_freq', 'score')
+    assert rows(query.collocation_analysis('ev', min_freq=1, colloc_min_freq=1, subcorpus=subcorpus), *key) == \
+        rows(reference.collocation_analysis('ev', min_freq=1, colloc_min_freq=1), *key)
+    assert query.get_pos_distribution(subcorpus=subcorpus) == reference.get_pos_distribution()
+    expected, actual = reference.get_advanced_stats(), query.get_advanced_stats(subcorpus=subcorpus)
+    for name in ('total_tokens', 'unique_types', 'total_sentences', 'avg_sent_len'):
+        assert expected[name] == actual[name], name
+    assert reference.get_processing_stats()['database_stats'] == \
+        {k: v for k, v in query.get_processing_stats(subcorpus=subcorpus)['database_stats'].items() if k != 'shards'}
+    assert [row[2] for row, _ in query.get_all_tokens_for_export(subcorpus=subcorpus)] == \
+        [row[2] for row, _ in reference.get_all_tokens_for_export()]
+    assert dict(query.word_sketch('ev', subcorpus=subcorpus)) == dict(reference.word_sketch('ev'))
+
+
+def test_ranges():
+    """Ids compress into inclusive runs"""
+    print("=== TESTING RANGES ===")
+    assert to_ranges([1, 2, 3, 7, 9, 10]) == [(1, 3), (7, 7), (9, 10)]
+    assert to_ranges([]) == []
+    assert merge_ranges([(10, 12), (1, 3), (4, 6), (11, 20)]) == [(1, 6), (10, 20)]
+    print(">> Range compression: PASS")
+
+
+def test_subcorpus_queries():
+    """Definitions, sizes, staleness and every query method with subcorpus="""
+    print("=== TESTING SUBCORPUS QUERIES ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        full_db = os.path.join(tmp, "full.db")
+        news_db = os.path.join(tmp, "news.db")
+        ingest(write_docs(Path(tmp) / "all"), full_db)
+        ingest(write_docs(Path(tmp) / "news", only_news=True), news_db)
+
+        query = CorpusQuery(full_db)
+        reference = CorpusQuery(news_db)
+
+        news = query.define_subcorpus('haber', {'doc_name': 'haber_*'})
+        assert news['doc_count'] == 3 and not news['stale']
+        size = reference.get_processing_stats()['database_stats']
+        assert news['token_count'] == size['total_tokens']
+        # The documents' tokens are consecutive: one range
+        assert news['range_count'] == 1
+        assert query.subcorpora.ranges('haber', 'doc') == [(1, 3)]
+
+        check_matches_reference(query, reference, 'haber')
+        print(">> Queries restricted to the subcorpus: PASS")
+
+        frequencies = query.frequency_list(subcorpus='haber')
+        words = query.subcorpus_size('haber')['word_count']
+        assert all(abs(f['per_million'] - f['frequency'] * 1e6 / words) < 1e-6 for f in frequencies)
+        assert 'per_million' not in query.frequency_list()[0]
+
+        # Operators, lists and the empty definition
+        assert query.define_subcorpus('iki', {'doc_name': ['haber_0.txt', 'roman_2.txt']})['range_count'] == 2
+        assert query.define_subcorpus('hepsi', {})['doc_count'] == 6
+        expected = query.conn.execute("""
+            SELECT COUNT(*) FROM documents WHERE token_count >= 12 AND doc_name NOT GLOB 'roman_*'
+        """).fetchone()[0]
+        assert 0 < expected < 3
+        assert query.define_subcorpus('uzun', {'token_count': {'min': 12},
+                                               'doc_name': {'not': 'roman_*'}})['doc_count'] == expected
+        assert [s['name'] for s in query.list_subcorpora()] == ['haber', 'hepsi', 'iki', 'uzun']
+        for bad in ({'genre': 'haber'}, {'doc_name': {'regex': 'x'}}):
+            try:
+                query.define_subcorpus('bad', bad)
+                assert False, bad
+            except ValueError:
+                pass
+        try:
+            query.frequency_list(subcorpus='yok')
+            assert False
+        except ValueError:
+            pass
+        assert query.drop_subcorpus('iki') and not query.drop_subcorpus('iki')
+        print(">> Definitions and sizes: PASS")
+
+        # New documents make subcorpora stale until the next ingestion refreshes them
+        (Path(tmp) / "all" / "haber_9.txt").write_text("Yeni ev haberi geldi.\n", encoding="utf-8")
+        ingestor = CorpusIngestor(full_db, nlp_backend='simple', annotation_cache=False)
+        ingestor.ingest_file(Path(tmp) / "all" / "haber_9.txt")
+        assert query.subcorpora.get('haber')['stale']
+        ingestor.ingest_directory(str(Path(tmp) / "all"))
+        ingestor.close()
+        refreshed = query.subcorpora.get('haber')
+        assert refreshed['doc_count'] == 4 and not refreshed['stale']
+        assert query.subcorpora.get('hepsi')['doc_count'] == 7
+        print(">> Stale subcorpora refreshed by ingestion: PASS")
+
+        query.close()
+        reference.close()
+
+
+def test_sharded_subcorpus():
+    """Subcorpora of a sharded corpus are defined per shard and merged"""
+    print("=== TESTING SHARDED SUBCORPUS ===")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        news_db = os.path.join(tmp, "news.db")
+        docs = write_docs(Path(tmp) / "all")
+        ingest(write_docs(Path(tmp) / "news", only_news=True), news_db)
+        corpus = ShardedCorpus.create(Path(tmp) / "shards", 2)
+        ShardedCorpusIngestor(corpus, nlp_backend='simple', annotation_cache=False, workers=0).ingest_directory(str(docs))
+
+        sharded = ShardedCorpusQuery(corpus, workers=0)
+        reference = CorpusQuery(news_db)
+        news = sharded.define_subcorpus('haber', {'doc_name': 'haber_*'})
+        assert news['doc_count'] == 3 and 'subcorpus_id' not in news
+        assert sharded.subcorpus_size('haber')['token_count'] == news['token_count']
+        assert [s['name'] for s in sharded.list_subcorpora()] == ['haber']
+        check_matches_reference(sharded, reference, 'haber')
+        assert sharded.drop_subcorpus('haber') and sharded.list_subcorpora() == []
+        sharded.close()
+        reference.close()
+
+    print(">> Sharded subcorpus: PASS")
+
+
+if __name__ == "__main__":
+    test_ranges()
+    test_subcorpus_queries()
+    test_sharded_subcorpus()
+    print("\n=== TEST COMPLETE ===")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for the suffix-trie Turkish morphological analyzer
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlp.turkish_morphology import TurkishMorphAnalyzer
+
+
+def test_suffix_parsing():
+    """Vowel harmony, consonant alternations and morphotactics"""
+    print("=== TESTING SUFFIX PARSING ===")
+
+    analyzer = TurkishMorphAnalyzer()
+    cases = {
+        'evlerde': ('ev', 'Case=Loc', 'Number=Plur'),
+        'kitabı': ('kitap', 'Case=Acc', None),
+        "Ankara'ya": ('ankara', 'Case=Dat', None),
+        'geliyorum': ('gel', 'Aspect=Prog', 'Person=1'),
+        'gelmiyor': ('gel', 'Polarity=Neg', 'Aspect=Prog'),
+    }
+    for form, (lemma, feature, other) in cases.items():
+        features = analyzer.features(form)
+        print(f"  {form:<12} -> {analyzer.lemma(form):<8} {features}")
+        assert analyzer.lemma(form) == lemma, form
+        assert feature in features, form
+        assert other is None or other in features, form
+
+    assert analyzer.guess_pos('geliyorum') == 'VERB'
+    assert analyzer.guess_pos('evlerde') == 'NOUN'
+    assert analyzer.guess_pos('ve') == 'CCONJ'
+    print(">> Suffix parsing: PASS")
+
+
+def test_root_shapes():
+    """Words are not split into stems that cannot be Turkish roots"""
+    print("\n=== TESTING ROOT SHAPES ===")
+
+    analyzer = TurkishMorphAnalyzer()
+    # Unsegmented: no '-di' past on 'ke', no dative on 'mas' or 'çalışm'
+    for form in ('kedi', 'masa', 'çalışma', 'temiz', 'kadın', 'öğrenci', 'doktor', 'oda'):
+        print(f"  {form:<12} -> {analyzer.lemma(form):<8} {analyzer.features(form)}")
+        assert analyzer.lemma(form) == form, form
+        assert analyzer.guess_pos(form) != 'VERB', form
+
+    cases = {
+        'kediler': ('kedi', 'Number=Plur'),
+        'masada': ('masa', 'Case=Loc'),
+        'denizde': ('deniz', 'Case=Loc'),
+        'kalemi': ('kalem', 'Case=Acc'),
+        'evi': ('ev', 'Case=Acc'),
+        'suyu': ('su', 'Case=Acc'),
+        'geldi': ('gel', 'Tense=Past'),
+        'aldı': ('al', 'Tense=Past'),
+        'dedi': ('de', 'Tense=Past'),
+    }
+    for form, (lemma, feature) in cases.items():
+        features = analyzer.features(form)
+        print(f"  {form:<12} -> {analyzer.lemma(form):<8} {features}")
+        assert analyzer.lemma(form) == lemma, form
+        assert feature in features, form
+    print(">> Root shapes: PASS")
+
+
+def test_analysis_cache():
+    """Repeated surface forms are served from the LRU cache"""
+    print("\n=== TESTING ANALYSIS CACHE ===")
+
+    analyzer = TurkishMorphAnalyzer(cache_size=1000)
+    for _ in range(5):
+        for form in ('evlerde', 'kitabı', 'geliyorum'):
+            analyzer.features(form)
+
+    info = analyzer.cache_info()
+    print(f"  {info}")
+    assert info['features']['misses'] == 3
+    assert info['features']['hits'] == 12
+    assert info['analyze']['misses'] == 3
+    print(">> Analysis cache: PASS")
+
+
+if __name__ == "__main__":
+    test_suffix_parsing()
+    test_root_shapes()
+    test_analysis_cache()
+    print("\n=== TEST COMPLETE ===")
@@ -36,7 +36,7 @@ def test_turkish_support():
         
         # Check if Turkish characters are in the regex pattern
         import inspect
-        source = inspect.getsource(processor._process_simple)
+        source = inspect.getsource(processor.annotator.rule_based_tokens)
         if "\\u015F" in source or "ş" in source:
             print("✓ Turkish characters found in tokenization regex")
         else:
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the rule-based Turkish tokenizer and sentence splitter
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from nlp.turkish_tokenizer import TurkishTokenizer
+from nlp.turkish_processor import TurkishNLPProcessor
+
+
+def test_sentence_splitting():
+    """Abbreviations, initials, ordinals and decimals do not end sentences"""
+    print("=== TESTING SENTENCE SPLITTING ===")
+
+    tokenizer = TurkishTokenizer()
+    text = ("Dr. Ahmet Yılmaz 19. yüzyılda yaşadı. Prof. A. Kaya 3,14 sayısını buldu! "
+            "Sonra Ankara'ya gitti...\n\nYeni paragraf")
+    sentences = tokenizer.split_sentences(text)
+    assert sentences == [
+        "Dr. Ahmet Yılmaz 19. yüzyılda yaşadı.",
+        "Prof. A. Kaya 3,14 sayısını buldu!",
+        "Sonra Ankara'ya gitti...",
+        "Yeni paragraf",
+    ], sentences
+
+    print(">> Sentence splitting: PASS")
+
+    # Abbreviations that are also words end sentences unless a number follows
+    assert tokenizer.split_sentences("Bu bir yay. Sonra geldi.") == ["Bu bir yay.", "Sonra geldi."]
+    assert [form for form, _, _ in tokenizer.tokenize("Bu bir yay.")] == ["Bu", "bir", "yay", "."]
+    text = "İletişim Yay. 2005 baskısı. Kur. Sonra."
+    assert tokenizer.split_sentences(text) == ["İletişim Yay. 2005 baskısı.", "Kur.", "Sonra."]
+    assert "Yay." in [form for form, _, _ in tokenizer.tokenize(text)]
+    print(">> Ambiguous abbreviations: PASS")
+
+    # An ordinal starting a sentence stays with it
+    assert tokenizer.split_sentences("1. Madde burada. 2. Madde orada.") == \
+        ["1. Madde burada.", "2. Madde orada."]
+    assert tokenizer.split_sentences("Yıl 2019. Sonra geldi.") == ["Yıl 2019.", "Sonra geldi."]
+    print(">> Sentence-initial ordinals: PASS")
+
+
+def test_tokens_have_true_offsets():
+    """Every token is the exact slice of the input at its offsets"""
+    print("\n=== TESTING TOKEN OFFSETS ===")
+
+    tokenizer = TurkishTokenizer()
+    text = "T.C. vatandaşı, 12.05.2023'te  www.ornek.com.tr adresine (ali@ornek.com) yazdı?!"
+    tokens = tokenizer.tokenize(text)
+    assert [form for form, _, _ in tokens] == [
+        "T.C.", "vatandaşı", ",", "12.05.2023'te", "www.ornek.com.tr", "adresine",
+        "(", "ali@ornek.com", ")", "yazdı", "?!",
+    ]
+    assert all(text[start:end] == form for form, start, end in tokens)
+
+    print(">> Token offsets: PASS")
+
+
+def test_simple_backend():
+    """The simple backend emits punctuation tokens with real offsets"""
+    print("\n=== TESTING SIMPLE BACKEND ===")
+
+    processor = TurkishNLPProcessor(backend='simple')
+    sentence = "Şu çalışma, çok güzel."
+    tokens = processor.process_text(sentence)
+    assert [t['word'] for t in tokens] == ["Şu", "çalışma", ",", "çok", "güzel", "."]
+    assert all(sentence[t['start_char']:t['end_char']] == t['word'] for t in tokens)
+    assert [t['is_punctuation'] for t in tokens] == [False, False, True, False, False, True]
+
+    print(">> Simple backend: PASS")
+
+
+if __name__ == "__main__":
+    test_sentence_splitting()
+    test_tokens_have_true_offsets()
+    test_simple_backend()
+    print("\n=== TEST COMPLETE ===")
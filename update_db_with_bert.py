@@ -19,6 +19,7 @@ from tqdm import tqdm
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from nlp.custom_bert_processor import create_custom_bert_processor
+from nlp.annotation_cache import AnnotationCache, default_cache_path
 
 # Logging setup
 logging.basicConfig(
@@ -28,10 +29,12 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class DatabaseUpdater:
-    def __init__(self, db_path: str):
+    def __init__(self, db_path: str, use_cache: bool = True):
         self.db_path = db_path
         self.conn = None
         self.bert = None
+        self.use_cache = use_cache
+        self.cache = None
         
     def connect(self):
         """Veritabanına bağlan"""
@@ -51,6 +54,11 @@ class DatabaseUpdater:
             logger.warning("BERT modeli tam yüklenemedi! Basit işleme modunda çalışacak.")
         else:
             logger.info("BERT modeli başarıyla yüklendi.")
+        
+        # Tekrarlanan cümleler için anotasyon önbelleği (model sürümüne göre anahtarlanır)
+        if self.use_cache:
+            self.cache = AnnotationCache(default_cache_path(self.db_path), 'custom_bert',
+                                         self.bert.get_model_version())
 
     def update_all_sentences(self):
         """Tüm cümleleri yeniden işle ve güncelle"""
@@ -82,8 +90,11 @@ class DatabaseUpdater:
                 text = row['sent_text']
                 
                 try:
-                    # BERT ile işle
-                    tokens = self.bert.process_text(text)
+                    # BERT ile işle (önbellekte varsa modeli çalıştırma)
+                    if self.cache is not None:
+                        tokens = self.cache.annotate(text, self.bert.process_text)
+                    else:
+                        tokens = self.bert.process_text(text)
                     
                     # Eski tokenları sil (bu cümle için)
                     self.conn.execute("DELETE FROM tokens WHERE sent_id = ?", (sent_id,))
@@ -107,6 +118,11 @@ class DatabaseUpdater:
             logger.info("GÜNCELLEME TAMAMLANDI!")
             logger.info(f"Başarılı: {updated_count}")
             logger.info(f"Hatalı: {error_count}")
+            if self.cache is not None:
+                self.cache.flush()
+                cache_stats = self.cache.get_stats()
+                logger.info(f"Önbellek: {cache_stats['hits']} isabet, {cache_stats['misses']} ıska "
+                            f"(isabet oranı {cache_stats['hit_rate']:.1%})")
             
         except Exception as e:
             self.conn.rollback()
@@ -146,6 +162,8 @@ class DatabaseUpdater:
         self.conn.executemany(query, data)
 
     def close(self):
+        if self.cache:
+            self.cache.close()
         if self.conn:
             self.conn.close()
 